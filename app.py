@@ -1,10 +1,17 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, current_app
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, current_app, Response, stream_with_context, g
 from src.models.sql_generator import SQLGenerationManager
 from src.utils.feedback_manager import FeedbackManager
 from src.utils.schema_manager import SchemaManager
 from src.utils.user_manager import UserManager
 from src.utils.template_filters import register_filters
 from src.utils.background_tasks import BackgroundTaskManager
+from src.utils.job_queue import QueueFullError, PRIORITIES
+from src.utils.shared_store import create_shared_store
+from src.utils.model_registry import get_model_registry
+from src.utils.embedding_cache import get_embedding_cache
+from src.utils.async_llm_client import get_llm_metrics
+from src.utils.single_flight import get_single_flight
+from src.utils.completion_cache import BYPASS_HEADER as LLM_CACHE_BYPASS_HEADER, set_cache_bypass, reset_cache_bypass, get_completion_cache
 from src.routes.schema_routes import schema_bp
 from src.routes.auth_routes import auth_bp, admin_required, permission_required
 from src.routes.admin_routes import admin_bp
@@ -23,13 +30,12 @@ from src.routes.data_mapping_routes import data_mapping_bp  # Import data mappin
 from src.routes.project_mapping_routes import project_mapping_bp  # Import project mapping routes
 from src.routes.code_generator_routes import code_generator_bp  # Import code generator routes
 from src.models.user import Permissions
-from config.config import SECRET_KEY, DEBUG, MCP_SERVER_SCRIPT_PATH, AUTH_PROVIDER
+from config.config import SECRET_KEY, DEBUG, MCP_SERVER_SCRIPT_PATH, AUTH_PROVIDER, QUERY_PROGRESS_TTL, MODEL_PRELOAD
 import logging
 import os
 import sys
 import time
 import uuid
-import threading
 from datetime import datetime
 from threading import Thread
 import signal
@@ -128,6 +134,10 @@ user_manager = UserManager()
 # Initialize the background task manager
 background_task_mgr = BackgroundTaskManager(sql_manager, user_manager)
 
+# Warm up the shared embedding and reranking models so the first queries do not pay the load time
+if MODEL_PRELOAD:
+    get_model_registry().preload()
+
 # Set up knowledge base permissions
 from src.utils.setup_knowledge_permissions import setup_knowledge_permissions
 setup_knowledge_permissions()
@@ -154,6 +164,8 @@ from src.routes.config_routes import config_bp
 app.register_blueprint(config_bp)
 from src.routes.query_editor_routes import query_editor_bp
 app.register_blueprint(query_editor_bp)
+from src.routes.query_result_routes import query_result_bp
+app.register_blueprint(query_result_bp)
 # Register MCP server management blueprint
 from src.routes.mcp_admin_routes import mcp_admin_bp
 app.register_blueprint(mcp_admin_bp)
@@ -171,9 +183,21 @@ app.register_blueprint(code_generator_bp)
 def inject_csrf_token():
     return dict(csrf_token=generate_csrf_token)
 
-# Store query progress with thread-safe lock
-query_progress_lock = threading.Lock()
-query_progress = {}
+# Let a request skip the LLM response cache for debugging with the X-LLM-Cache: bypass header
+@app.before_request
+def apply_llm_cache_bypass():
+    if request.headers.get(LLM_CACHE_BYPASS_HEADER, '').lower() == 'bypass':
+        g.llm_cache_bypass_token = set_cache_bypass(True)
+
+@app.teardown_request
+def reset_llm_cache_bypass(exception):
+    token = g.pop('llm_cache_bypass_token', None)
+    if token is not None:
+        reset_cache_bypass(token)
+
+# Store query progress where every worker process can read it; finished or abandoned entries expire
+query_progress_store = create_shared_store('query_progress')
+query_progress_store.start_sweeper(max_age=QUERY_PROGRESS_TTL)
 
 # Import login_required from auth_utils
 from src.utils.auth_utils import login_required
@@ -202,6 +226,9 @@ def process_query():
     query = data.get('query').replace("@","table ")
     workspace_name = data.get('workspace', 'Default')
     explicit_tables = data.get('tables', [])  # Get user-specified tables if provided
+    priority_name = data.get('priority', 'interactive')
+    if priority_name not in PRIORITIES:
+        return jsonify({"error": f"Invalid priority '{priority_name}', expected one of: {', '.join(PRIORITIES)}"}), 400
     
     # Log if explicit tables are provided
     if explicit_tables:
@@ -209,15 +236,14 @@ def process_query():
     
     # Generate unique ID for this query
     query_id = str(uuid.uuid4())
-    with query_progress_lock:
-        query_progress[query_id] = {
-            'status': 'processing',
-            'current_step': 0,
-            'steps': [],
-            'result': None,
-            'error': None,
-            'start_time': time.time()  # Add timestamp when query is initiated
-        }
+    query_progress_store.set(query_id, {
+        'status': 'queued',
+        'current_step': 0,
+        'steps': [],
+        'result': None,
+        'error': None,
+        'start_time': time.time()  # Add timestamp when query is initiated
+    })
     
     selected_workspaces = [w for w in sql_manager.schema_manager.get_workspaces() if w['name'] == workspace_name]
     
@@ -227,23 +253,33 @@ def process_query():
     # Capture client IP address
     ip_address = request.remote_addr
     
-    # Start processing in background using the BackgroundTaskManager
-    background_task_mgr.process_query_task(
-        query_id=query_id,
-        query=query,
-        workspace_name=workspace_name,
-        selected_workspaces=selected_workspaces,
-        explicit_tables=explicit_tables,
-        user_id=user_id,
-        query_progress=query_progress,
-        update_progress_func=update_progress,
-        query_progress_lock=query_progress_lock,
-        ip_address=ip_address  # Pass the IP address to the background task
-    )
+    # Queue processing in background using the BackgroundTaskManager
+    try:
+        background_task_mgr.process_query_task(
+            query_id=query_id,
+            query=query,
+            workspace_name=workspace_name,
+            selected_workspaces=selected_workspaces,
+            explicit_tables=explicit_tables,
+            user_id=user_id,
+            progress_store=query_progress_store,
+            update_progress_func=update_progress,
+            ip_address=ip_address,  # Pass the IP address to the background task
+            priority=PRIORITIES[priority_name]
+        )
+    except QueueFullError as e:
+        query_progress_store.delete(query_id)
+        logger.warning(f"Rejected query from user {user_id}: job queue is full")
+        response = jsonify({
+            "error": f"The server is busy, please try again in {e.retry_after} seconds",
+            "retry_after": e.retry_after
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
     
     return jsonify({
         "query_id": query_id,
-        "status": "processing"
+        "status": "queued"
     })
 
 @app.route('/api/tables/suggestions', methods=['GET'])
@@ -302,36 +338,188 @@ def get_table_suggestions():
 @login_required
 def get_query_progress(query_id):
     """Get the progress of a query"""
-    with query_progress_lock:
-        if query_id not in query_progress:
-            return jsonify({"error": "Query not found"}), 404
-            
-        progress = query_progress[query_id]
+    progress = query_progress_store.get(query_id)
+    if progress is None:
+        return jsonify({"error": "Query not found"}), 404
+    
+    # If query is complete, clean up
+    if progress['status'] in ['completed', 'error']:
+        if progress['status'] == 'completed':
+            query_progress_store.delete(query_id)  # Clean up completed queries
+        return jsonify(progress)
+    
+    progress = expire_timed_out_query(query_id, progress)
+    if progress['status'] == 'error':
+        return jsonify(progress), 408  # Return 408 Request Timeout status
         
-        # If query is complete, clean up
-        if progress['status'] in ['completed', 'error']:
-            result = progress.copy()
+    return jsonify(progress)
+
+@app.route('/api/query/stream/<query_id>', methods=['GET'])
+@login_required
+def stream_query_progress(query_id):
+    """Push the progress steps and final result of a query as Server-Sent Events
+    
+    Event IDs are step numbers, so a reconnecting client that sends Last-Event-ID
+    only receives the steps it has not seen yet.
+    """
+    if query_progress_store.get(query_id) is None:
+        return jsonify({"error": "Query not found"}), 404
+    
+    try:
+        sent = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0)
+    except ValueError:
+        sent = 0
+    
+    def format_event(event, data, event_id=None):
+        lines = [f"id: {event_id}"] if event_id is not None else []
+        lines.append(f"event: {event}")
+        lines.append(f"data: {app.json.dumps(data)}")
+        return "\n".join(lines) + "\n\n"
+    
+    def generate():
+        nonlocal sent
+        seen_changes = query_progress_store.change_count(query_id)
+        progress, version = None, None
+        last_write = time.time()
+        yield "retry: 2000\n\n"
+        
+        while True:
+            # Only deserialize the entry when its version changed since the last check
+            latest = query_progress_store.version(query_id)
+            if latest is not None and latest != version:
+                progress, version = query_progress_store.get_versioned(query_id)
+            if latest is None or progress is None:
+                yield format_event('failed', {'error': "Query not found"})
+                return
+            progress = expire_timed_out_query(query_id, progress)
+            
+            steps = progress.get('steps', [])
+            while sent < len(steps):
+                yield format_event('step', {'index': sent, 'step': steps[sent]}, sent + 1)
+                sent += 1
+                last_write = time.time()
+            
             if progress['status'] == 'completed':
-                del query_progress[query_id]  # Clean up completed queries
-            return jsonify(result)
-        
-        # Check for timeout (2 minutes = 120 seconds)
-        current_time = time.time()
-        if 'start_time' in progress and (current_time - progress['start_time']) > 120:
-            logger.warning(f"Query {query_id} timed out after 2 minutes")
-            progress['status'] = 'error'
-            progress['error'] = "Query processing timed out after 2 minutes"
-            result = progress.copy()
-            return jsonify(result), 408  # Return 408 Request Timeout status
+                yield format_event('result', progress['result'], len(steps) + 1)
+                return
+            if progress['status'] == 'error':
+                yield format_event('failed', {'error': progress['error']}, len(steps) + 1)
+                return
             
-        return jsonify(progress)
+            # Comment lines keep proxies from closing an idle stream
+            if time.time() - last_write >= 15:
+                yield ": keepalive\n\n"
+                last_write = time.time()
+            
+            # Steps of this query from this worker wake the stream immediately; other workers are picked up on the next check
+            seen_changes = query_progress_store.wait_for_change(query_id, seen_changes, timeout=0.5)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def expire_timed_out_query(query_id, progress):
+    """Mark a query as failed when it has been processing for more than 2 minutes
+    
+    Args:
+        query_id (str): ID of the query
+        progress (dict): Current progress entry of the query
+        
+    Returns:
+        dict: The progress entry, with status 'error' if the query timed out
+    """
+    if progress['status'] in ['completed', 'error'] or 'start_time' not in progress:
+        return progress
+    if time.time() - progress['start_time'] <= 120:
+        return progress
+    
+    logger.warning(f"Query {query_id} timed out after 2 minutes")
+    
+    def mark_timed_out(entry):
+        if entry['status'] not in ['completed', 'error']:
+            entry['status'] = 'error'
+            entry['error'] = "Query processing timed out after 2 minutes"
+    
+    return query_progress_store.mutate(query_id, mark_timed_out) or progress
 
 def update_progress(query_id, step_info):
     """Update the progress of a query"""
-    with query_progress_lock:
-        if query_id in query_progress:
-            query_progress[query_id]['current_step'] += 1
-            query_progress[query_id]['steps'].append(step_info)
+    def add_step(entry):
+        entry['current_step'] += 1
+        entry['steps'].append(step_info)
+    
+    query_progress_store.mutate(query_id, add_step)
+
+@app.route('/api/query/queue/stats', methods=['GET'])
+@login_required
+@admin_required
+def get_query_queue_stats():
+    """Get depth, wait time and throughput statistics of the query job queue"""
+    return jsonify(background_task_mgr.get_queue_stats())
+
+@app.route('/api/models/stats', methods=['GET'])
+@login_required
+@admin_required
+def get_model_stats():
+    """Get load status, load time and memory use of the shared local models"""
+    return jsonify(get_model_registry().stats())
+
+@app.route('/api/llm/stats', methods=['GET'])
+@login_required
+@admin_required
+def get_llm_stats():
+    """Get latency, token, retry and hedging statistics of LLM calls per call site"""
+    return jsonify(get_llm_metrics().stats())
+
+@app.route('/api/llm/coalescing/stats', methods=['GET'])
+@login_required
+@admin_required
+def get_llm_coalescing_stats():
+    """Get how many completion and embedding requests shared an in-flight upstream call"""
+    return jsonify(get_single_flight().stats())
+
+@app.route('/api/llm/cache/stats', methods=['GET'])
+@login_required
+@admin_required
+def get_llm_cache_stats():
+    """Get hit/miss statistics of the LLM response cache per call site"""
+    cache = get_completion_cache()
+    if not cache:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, "stats": cache.stats()})
+
+@app.route('/api/llm/cache/clear', methods=['POST'])
+@login_required
+@admin_required
+def clear_llm_cache():
+    """Remove cached LLM responses, optionally only those of one call site"""
+    cache = get_completion_cache()
+    if not cache:
+        return jsonify({"enabled": False})
+    call_site = (request.get_json(silent=True) or {}).get('call_site')
+    cache.clear(call_site)
+    return jsonify({"enabled": True, "cleared": call_site or "all"})
+
+@app.route('/api/models/embedding-cache/stats', methods=['GET'])
+@login_required
+@admin_required
+def get_embedding_cache_stats():
+    """Get hit rate, size and eviction statistics of the embedding cache"""
+    cache = get_embedding_cache()
+    if not cache:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, "stats": cache.stats()})
+
+@app.route('/api/query/cache/stats', methods=['GET'])
+@login_required
+@admin_required
+def get_query_cache_stats():
+    """Get hit/miss statistics of the semantic answer cache"""
+    if not sql_manager.semantic_cache:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, "stats": sql_manager.semantic_cache.stats()})
 
 @app.route('/api/schema', methods=['GET'])
 @login_required
@@ -764,6 +952,16 @@ def init_app_with_context(app):
             logger.info("AutoGen tables initialized")
         except Exception as e:
             logger.warning(f"Failed to initialize AutoGen tables: {e}")
+        # Tag vector collections the app wrote before embedding model tagging
+        try:
+            from src.utils.vector_store import VectorStore
+            vector_store = VectorStore()
+            if vector_store.connect():
+                vector_store.tag_app_collections()
+            else:
+                logger.warning("Vector store not available, app collections were not checked for tags")
+        except Exception as e:
+            logger.warning(f"Failed to tag app vector collections: {e}")
         logger.info("Application-wide components initialization complete")
 
 # Register initialization function with the app
@@ -784,8 +982,15 @@ def shutdown_handler(signal_received=None, frame=None):
     finally:
         loop.close()
     
+    # Let running queries finish before the managers they use are closed
+    background_task_mgr.shutdown(wait=True, timeout=10)
+    
     if sql_manager:
         sql_manager.close()
+    
+    # Release pooled database connections
+    from src.utils.database import dispose_engines
+    dispose_engines()
     print("Application shutdown complete.")
     sys.exit(0)
 
@@ -6,15 +6,24 @@ This service is decoupled from the main Text2SQL application.
 """
 
 import os
+import base64
+import gzip
+import json
 import logging
 import time
 from typing import List, Dict, Any, Optional
-from flask import Flask, request, jsonify
+import numpy as np
+import requests
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 import chromadb
 from chromadb.config import Settings
 from chromadb.utils import embedding_functions
 
+from serving import (
+    AdmissionQueue, CollectionStatsCache, LatencyHistograms, format_query_results, render_queue_metrics
+)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -22,9 +31,89 @@ logging.basicConfig(
 )
 logger = logging.getLogger('chromadb_service')
 
+# Maximum number of documents written to ChromaDB in one call by the batch endpoints
+MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', 1000))
+
+# Responses at least this large are gzip-compressed for clients that accept it
+GZIP_MIN_BYTES = int(os.getenv('GZIP_MIN_BYTES', 65536))
+
+# Texts stored or searched without embeddings are embedded by the shared embedding server
+# (src/services/embedding_server.py) when EMBEDDING_SERVICE_URL is set, else by a local
+# sentence-transformers model, which should be the same model the application uses
+EMBEDDING_SERVICE_URL = os.getenv('EMBEDDING_SERVICE_URL', '')
+EMBEDDING_SERVICE_TIMEOUT = int(os.getenv('EMBEDDING_SERVICE_TIMEOUT', 30))
+CHROMA_EMBEDDING_MODEL = os.getenv('CHROMA_EMBEDDING_MODEL', 'all-MiniLM-L12-v2')
+# Tag of the local model's embedding space; bump it only when the vectors change
+CHROMA_EMBEDDING_MODEL_VERSION = os.getenv('CHROMA_EMBEDDING_MODEL_VERSION', CHROMA_EMBEDDING_MODEL)
+
+# Collection metadata key holding the version tag of the model that produced its vectors.
+# Writes and vector searches tagged with another version, or into untagged collections
+# that already hold vectors, are refused with 409.
+EMBEDDING_MODEL_KEY = 'embedding_model'
+
+# Content type of JSON bodies whose embedding fields are base64 float32 buffers
+# (the same wire format as src/utils/vector_codec.py in the Text2SQL application)
+VECTOR_MEDIA_TYPE = 'application/vnd.text2sql.vectors+json'
+
+# Reads (searches, gets) and writes run in separate admission queues so that bulk
+# ingestion cannot take every worker thread away from queries. Requests beyond
+# the concurrency wait in the queue; a full queue or a wait longer than the
+# timeout is answered with 503 and Retry-After.
+READ_CONCURRENCY = int(os.getenv('READ_CONCURRENCY', 8))
+READ_QUEUE_SIZE = int(os.getenv('READ_QUEUE_SIZE', 64))
+WRITE_CONCURRENCY = int(os.getenv('WRITE_CONCURRENCY', 2))
+WRITE_QUEUE_SIZE = int(os.getenv('WRITE_QUEUE_SIZE', 16))
+QUEUE_TIMEOUT = float(os.getenv('QUEUE_TIMEOUT', 10))
+
+# Worker threads of the server; enough for every admitted and queued request plus probes
+SERVICE_THREADS = int(os.getenv('SERVICE_THREADS', READ_CONCURRENCY + READ_QUEUE_SIZE +
+                                WRITE_CONCURRENCY + WRITE_QUEUE_SIZE + 4))
+
+# Seconds collection counts and metadata are cached; writes through the service invalidate them
+COLLECTION_STATS_TTL = float(os.getenv('COLLECTION_STATS_TTL', 30))
+
+# Endpoints that modify collections; every other endpoint except the probes is a read
+WRITE_ENDPOINTS = {
+    'create_collection', 'delete_collection', 'add_documents', 'add_documents_batch',
+    'delete_document', 'update_document', 'tag_collection'
+}
+PROBE_ENDPOINTS = {'health_check', 'readiness_check', 'metrics'}
+
 app = Flask(__name__)
+
+read_queue = AdmissionQueue('read', READ_CONCURRENCY, READ_QUEUE_SIZE, QUEUE_TIMEOUT)
+write_queue = AdmissionQueue('write', WRITE_CONCURRENCY, WRITE_QUEUE_SIZE, QUEUE_TIMEOUT)
+request_latency = LatencyHistograms()
+collection_stats = CollectionStatsCache(COLLECTION_STATS_TTL)
 CORS(app)  # Enable CORS for cross-origin requests
 
+class RemoteEmbeddingFunction:
+    """ChromaDB embedding function calling the shared embedding server"""
+    
+    def __init__(self, service_url: str, timeout: int = EMBEDDING_SERVICE_TIMEOUT):
+        """Connect to the embedding server and read its model version
+        
+        Args:
+            service_url: Base URL of the embedding server
+            timeout: Seconds to wait for a response
+        """
+        self.service_url = service_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({'Accept': f"{VECTOR_MEDIA_TYPE}, application/json"})
+        response = self.session.get(f"{self.service_url}/info", timeout=timeout)
+        response.raise_for_status()
+        self.version = response.json()['version']
+    
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        response = self.session.post(
+            f"{self.service_url}/embed",
+            json={'texts': list(input), 'model_version': self.version},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return np.asarray(decode_vectors(response.json()['embeddings']), dtype=np.float32).tolist()
+
 class ChromaDBService:
     """ChromaDB service handler"""
     
@@ -37,6 +126,7 @@ class ChromaDBService:
         self.persist_directory = persist_directory
         self.client = None
         self.embedding_function = None
+        self.embedding_version = None
         self.logger = logging.getLogger('chromadb_service')
         
     def connect(self) -> bool:
@@ -56,9 +146,15 @@ class ChromaDBService:
             self.client = chromadb.PersistentClient(path=self.persist_directory)
             
             # Initialize embedding function
-            self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-                model_name="all-MiniLM-L6-v2"
-            )
+            if EMBEDDING_SERVICE_URL:
+                self.embedding_function = RemoteEmbeddingFunction(EMBEDDING_SERVICE_URL)
+                self.embedding_version = self.embedding_function.version
+            else:
+                self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
+                    model_name=CHROMA_EMBEDDING_MODEL
+                )
+                self.embedding_version = CHROMA_EMBEDDING_MODEL_VERSION
+            self.logger.info(f"Embedding texts with {self.embedding_version}")
             
             self.logger.info(f"ChromaDB connection established in {time.time() - start_time:.2f}s")
             return True
@@ -71,6 +167,234 @@ class ChromaDBService:
         if not self.client:
             return self.connect()
         return True
+    
+    def get_collection(self, name: str):
+        """Get a collection that embeds texts with the service's embedding function
+        
+        Raises:
+            Exception: If the collection does not exist
+        """
+        return self.client.get_collection(name=name, embedding_function=self.embedding_function)
+    
+    def get_or_create_collection(self, name: str, embedding_model: Optional[str] = None):
+        """Get a collection, creating it tagged with the model of the vectors about to be written
+        
+        Args:
+            name: Name of the collection
+            embedding_model: Version tag of the embedding model (optional)
+        """
+        try:
+            return self.get_collection(name)
+        except Exception:
+            metadata = {EMBEDDING_MODEL_KEY: embedding_model} if embedding_model else None
+            return self.client.create_collection(
+                name=name,
+                embedding_function=self.embedding_function,
+                metadata=metadata
+            )
+
+def check_embedding_model(collection, embedding_model: Optional[str], write: bool = False) -> Optional[str]:
+    """Refuse to mix vectors of different embedding models in one collection
+    
+    Empty collections without a model tag are tagged by their first tagged write.
+    Untagged collections that already hold vectors (created before tagging) are
+    refused until they are tagged with PUT /collections/<name>/embedding_model (the app
+    does so for its own collections at startup) or deleted and re-indexed, since their
+    vectors may come from another model.
+    
+    Args:
+        collection: ChromaDB collection
+        embedding_model: Version tag of the vectors of the request, None if unknown
+        write: Whether the vectors will be written
+        
+    Returns:
+        str or None: Error message if the versions differ
+    """
+    if not embedding_model:
+        return None
+    metadata = dict(getattr(collection, 'metadata', None) or {})
+    tagged = metadata.get(EMBEDDING_MODEL_KEY)
+    if tagged is None:
+        if collection.count():
+            return (f"Collection {collection.name} holds untagged embeddings; tag it with "
+                    f"PUT /collections/{collection.name}/embedding_model or delete and re-index it")
+        if write:
+            tag_collection_metadata(collection, embedding_model)
+    elif tagged != embedding_model:
+        return f"Collection {collection.name} holds embeddings of '{tagged}', not '{embedding_model}'"
+    return None
+
+def tag_collection_metadata(collection, embedding_model: str):
+    """Record the embedding model version of a collection's vectors in its metadata
+    
+    Args:
+        collection: ChromaDB collection
+        embedding_model: Version tag of the embedding model
+    """
+    metadata = dict(getattr(collection, 'metadata', None) or {})
+    metadata[EMBEDDING_MODEL_KEY] = embedding_model
+    # The distance function cannot be changed, so hnsw settings are left out
+    collection.modify(metadata={k: v for k, v in metadata.items() if not k.startswith('hnsw:')})
+
+def request_embedding_model(data: Dict[str, Any], has_vectors: bool) -> Optional[str]:
+    """Get the model version of a request's vectors
+    
+    Args:
+        data: Request body
+        has_vectors: Whether the request carries its own embeddings
+        
+    Returns:
+        str or None: The client's tag for its own embeddings, the service's model for texts it embeds
+    """
+    return data.get('embedding_model') if has_vectors else chroma_service.embedding_version
+
+def clean_metadata(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Convert metadata values to types ChromaDB can store
+    
+    Args:
+        metadata: Metadata dictionary (optional)
+        
+    Returns:
+        Dict: Metadata with lists joined by commas and None values dropped
+    """
+    clean = {}
+    for k, v in (metadata or {}).items():
+        if isinstance(v, list):
+            clean[k] = ','.join(str(x) for x in v)
+        elif v is not None:
+            clean[k] = str(v)
+    return clean
+
+def encode_vectors(vectors: Any) -> Dict[str, Any]:
+    """Encode a vector or a matrix of vectors as a base64 little-endian float32 buffer
+    
+    Args:
+        vectors: A vector or a list/array of vectors
+        
+    Returns:
+        Dict: {'dtype', 'shape', 'data'}
+    """
+    array = np.ascontiguousarray(np.asarray(vectors, dtype='<f4'))
+    return {
+        'dtype': 'float32',
+        'shape': list(array.shape),
+        'data': base64.b64encode(array.tobytes()).decode('ascii')
+    }
+
+def decode_vectors(value: Any) -> Any:
+    """Decode vectors sent as a base64 float32 buffer, leaving plain lists as they are
+    
+    Args:
+        value: Encoded buffer or nested lists of numbers
+        
+    Returns:
+        numpy.ndarray or the original value
+    """
+    if isinstance(value, dict) and 'data' in value:
+        buffer = base64.b64decode(value['data'])
+        return np.frombuffer(buffer, dtype='<f4').reshape(value['shape'])
+    return value
+
+def wants_binary_vectors() -> bool:
+    """Check whether the client accepts embeddings as encoded buffers"""
+    return VECTOR_MEDIA_TYPE in request.headers.get('Accept', '')
+
+def read_request_json() -> Optional[Dict[str, Any]]:
+    """Read the JSON body, decompressing it and decoding embedding buffers
+    
+    Returns:
+        Dict or None: Request body with embedding fields as NumPy arrays when sent as buffers
+    """
+    raw = request.get_data()
+    if not raw:
+        return None
+    if request.headers.get('Content-Encoding', '').lower() == 'gzip':
+        raw = gzip.decompress(raw)
+    data = json.loads(raw)
+    if isinstance(data, dict) and request.mimetype == VECTOR_MEDIA_TYPE:
+        for field in ('embeddings', 'query_embeddings', 'embedding'):
+            if field in data:
+                data[field] = decode_vectors(data[field])
+    return data
+
+def has_items(value: Any) -> bool:
+    """Check that a list or array field is present and not empty"""
+    return value is not None and len(value) > 0
+
+def embeddings_block(embeddings: Any) -> Any:
+    """Format result embeddings in the wire format the client accepts
+    
+    Args:
+        embeddings: Embeddings of one query's matches
+        
+    Returns:
+        Encoded buffer for vector clients, nested lists of floats otherwise
+    """
+    if embeddings is None:
+        return None
+    if wants_binary_vectors():
+        return encode_vectors(embeddings)
+    return np.asarray(embeddings, dtype=float).tolist()
+
+def load_collection_stats(collection_name: str) -> Dict[str, Any]:
+    """Read the count and metadata of a collection from ChromaDB
+    
+    Args:
+        collection_name: Name of the collection
+        
+    Returns:
+        Dict: 'name', 'count' and 'metadata'
+    """
+    collection = chroma_service.get_collection(collection_name)
+    return {
+        'name': collection_name,
+        'count': collection.count(),
+        'metadata': getattr(collection, 'metadata', None) or {}
+    }
+
+@app.before_request
+def admit_request():
+    """Start timing the request and admit it through the read or write queue"""
+    g.start_time = time.perf_counter()
+    if request.endpoint in PROBE_ENDPOINTS or request.endpoint is None:
+        return None
+    queue = write_queue if request.endpoint in WRITE_ENDPOINTS else read_queue
+    if not queue.acquire():
+        logger.warning(f"Rejected {request.method} {request.path}: {queue.name} queue is full")
+        return jsonify({'error': f'Service busy, {queue.name} queue is full'}), 503, {'Retry-After': '1'}
+    g.admission_queue = queue
+    return None
+
+@app.after_request
+def record_request(response):
+    """Record the request latency and drop cached stats of collections that were written"""
+    if request.endpoint in WRITE_ENDPOINTS and request.view_args:
+        collection_stats.invalidate(request.view_args.get('collection_name'))
+    start_time = g.get('start_time')
+    if start_time is not None:
+        request_latency.observe(request.endpoint or 'unknown', time.perf_counter() - start_time,
+                                response.status_code)
+    return response
+
+@app.teardown_request
+def release_request(exc):
+    """Give the queue slot of the request back"""
+    queue = g.pop('admission_queue', None)
+    if queue is not None:
+        queue.release()
+
+@app.after_request
+def compress_response(response):
+    """Gzip large responses for clients that accept it"""
+    if (response.status_code < 300 and not response.direct_passthrough
+            and 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+            and 'Content-Encoding' not in response.headers):
+        data = response.get_data()
+        if len(data) >= GZIP_MIN_BYTES:
+            response.set_data(gzip.compress(data, compresslevel=5))
+            response.headers['Content-Encoding'] = 'gzip'
+            response.headers['Vary'] = 'Accept-Encoding'
+    return response
 
 # Initialize the service
 chroma_service = ChromaDBService()
@@ -101,6 +425,21 @@ def health_check():
             'error': str(e)
         }), 500
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: ChromaDB is open and the read queue can take requests"""
+    ready = chroma_service.client is not None and not read_queue.saturated()
+    return jsonify({
+        'status': 'ready' if ready else 'not_ready',
+        'queues': {'read': read_queue.stats(), 'write': write_queue.stats()}
+    }), 200 if ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Request latency histograms and queue load in the Prometheus text format"""
+    body = request_latency.render() + render_queue_metrics([read_queue, write_queue])
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
 # Collection Management Endpoints
 
 @app.route('/collections', methods=['GET'])
@@ -114,21 +453,16 @@ def list_collections():
         if not chroma_service.ensure_connected():
             return jsonify({'error': 'Unable to connect to ChromaDB'}), 500
         
-        collection_list = chroma_service.client.list_collections()
         collections = []
-        
-        for col in collection_list:
+        for col in chroma_service.client.list_collections():
+            # Older ChromaDB versions return Collection objects, newer ones return names
+            name = getattr(col, 'name', col)
             try:
-                col_obj = chroma_service.client.get_collection(name=col.name)
-                collections.append({
-                    'name': col.name,
-                    'count': col_obj.count(),
-                    'metadata': getattr(col, 'metadata', {})
-                })
+                collections.append(collection_stats.get(name, load_collection_stats))
             except Exception as e:
-                logger.warning(f"Error getting collection info for {col.name}: {e}")
+                logger.warning(f"Error getting collection info for {name}: {e}")
                 collections.append({
-                    'name': col.name,
+                    'name': name,
                     'count': 0,
                     'error': str(e)
                 })
@@ -156,16 +490,12 @@ def get_collection(collection_name: str):
             return jsonify({'error': 'Unable to connect to ChromaDB'}), 500
         
         try:
-            collection = chroma_service.client.get_collection(name=collection_name)
             return jsonify({
                 'success': True,
-                'collection': {
-                    'name': collection_name,
-                    'count': collection.count(),
-                    'metadata': getattr(collection, 'metadata', {})
-                }
+                'collection': collection_stats.get(collection_name, load_collection_stats)
             })
         except Exception as e:
+            logger.warning(f"Lookup failed for collection {collection_name}: {e}")
             return jsonify({'error': f'Collection {collection_name} not found'}), 404
     except Exception as e:
         logger.error(f"Error getting collection {collection_name}: {e}")
@@ -188,12 +518,12 @@ def create_collection(collection_name: str):
         if not chroma_service.ensure_connected():
             return jsonify({'error': 'Unable to connect to ChromaDB'}), 500
         
-        data = request.get_json() or {}
+        data = read_request_json() or {}
         metadata = data.get('metadata', {})
         
         try:
             # Check if collection already exists
-            chroma_service.client.get_collection(name=collection_name)
+            chroma_service.get_collection(collection_name)
             return jsonify({'error': f'Collection {collection_name} already exists'}), 409
         except:
             # Collection doesn't exist, create it
@@ -237,11 +567,65 @@ def delete_collection(collection_name: str):
                 'message': f'Collection {collection_name} deleted successfully'
             })
         except Exception as e:
+            logger.warning(f"Lookup failed for collection {collection_name}: {e}")
             return jsonify({'error': f'Collection {collection_name} not found or cannot be deleted'}), 404
     except Exception as e:
         logger.error(f"Error deleting collection {collection_name}: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/collections/<collection_name>/embedding_model', methods=['PUT'])
+def tag_collection(collection_name: str):
+    """Tag a collection with the embedding model version of its vectors
+    
+    Operator step for collections created before tagging: tag them once their
+    vectors are known to come from the given model (or after re-embedding them),
+    so writes and vector searches of that model are accepted again.
+    
+    Args:
+        collection_name: Name of the collection
+        
+    Request Body:
+        embedding_model: Version tag of the embedding model
+        untagged_only: Only tag the collection if it is untagged and holds vectors,
+            as the app does for its own collections at startup (optional)
+        
+    Returns:
+        JSON response with success status, the previous and the current tag
+    """
+    try:
+        if not chroma_service.ensure_connected():
+            return jsonify({'error': 'Unable to connect to ChromaDB'}), 500
+        
+        data = read_request_json() or {}
+        embedding_model = data.get('embedding_model')
+        if not embedding_model:
+            return jsonify({'error': 'embedding_model is required'}), 400
+        
+        try:
+            collection = chroma_service.get_collection(collection_name)
+        except Exception:
+            return jsonify({'error': f'Collection {collection_name} not found'}), 404
+        
+        previous = (getattr(collection, 'metadata', None) or {}).get(EMBEDDING_MODEL_KEY)
+        if data.get('untagged_only') and (previous is not None or not collection.count()):
+            return jsonify({
+                'success': True,
+                'message': f'Collection {collection_name} left as it is',
+                'previous': previous,
+                'embedding_model': previous
+            })
+        tag_collection_metadata(collection, embedding_model)
+        logger.info(f"Tagged collection {collection_name} with {embedding_model} (was {previous})")
+        return jsonify({
+            'success': True,
+            'message': f'Collection {collection_name} tagged with {embedding_model}',
+            'previous': previous,
+            'embedding_model': embedding_model
+        })
+    except Exception as e:
+        logger.error(f"Error tagging collection {collection_name}: {e}")
+        return jsonify({'error': str(e)}), 500
+
 # Document Management Endpoints
 
 @app.route('/collections/<collection_name>/documents', methods=['POST'])
@@ -264,7 +648,7 @@ def add_documents(collection_name: str):
         if not chroma_service.ensure_connected():
             return jsonify({'error': 'Unable to connect to ChromaDB'}), 500
         
-        data = request.get_json()
+        data = read_request_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
@@ -279,14 +663,11 @@ def add_documents(collection_name: str):
         if len(documents) != len(ids):
             return jsonify({'error': 'Documents and ids must have the same length'}), 400
         
-        try:
-            collection = chroma_service.client.get_collection(name=collection_name)
-        except:
-            # Collection doesn't exist, create it
-            collection = chroma_service.client.create_collection(
-                name=collection_name,
-                embedding_function=chroma_service.embedding_function
-            )
+        embedding_model = request_embedding_model(data, has_items(embeddings))
+        collection = chroma_service.get_or_create_collection(collection_name, embedding_model)
+        mismatch = check_embedding_model(collection, embedding_model, write=True)
+        if mismatch:
+            return jsonify({'error': mismatch}), 409
         
         # Prepare data for insertion
         insert_data = {
@@ -296,19 +677,9 @@ def add_documents(collection_name: str):
         
         if metadatas:
             # Clean metadata to ensure compatibility
-            clean_metadatas = []
-            for metadata in metadatas:
-                clean_metadata = {}
-                if metadata:
-                    for k, v in metadata.items():
-                        if isinstance(v, list):
-                            clean_metadata[k] = ','.join(str(x) for x in v)
-                        elif v is not None:
-                            clean_metadata[k] = str(v)
-                clean_metadatas.append(clean_metadata)
-            insert_data['metadatas'] = clean_metadatas
-        
-        if embeddings:
+            insert_data['metadatas'] = [clean_metadata(metadata) for metadata in metadatas]
+        
+        if has_items(embeddings):
             insert_data['embeddings'] = embeddings
         
         collection.add(**insert_data)
@@ -322,6 +693,90 @@ def add_documents(collection_name: str):
         logger.error(f"Error adding documents to collection {collection_name}: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/collections/<collection_name>/documents/batch', methods=['POST'])
+def add_documents_batch(collection_name: str):
+    """Add or upsert many documents, written to ChromaDB in chunks
+    
+    A failing chunk does not stop the others; its ids are reported so the
+    caller can retry just those documents.
+    
+    Args:
+        collection_name: Name of the collection
+        
+    Request Body:
+        documents: List of documents
+        ids: List of document IDs
+        metadatas: List of metadata objects (optional)
+        embeddings: List of embeddings (optional, will auto-generate if not provided)
+        mode: 'add' (default) or 'upsert' to replace documents with the same IDs
+        
+    Returns:
+        JSON response with the written count and the failed IDs with their errors;
+        status 207 if only some chunks failed
+    """
+    try:
+        if not chroma_service.ensure_connected():
+            return jsonify({'error': 'Unable to connect to ChromaDB'}), 500
+        
+        data = read_request_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        documents = data.get('documents', [])
+        ids = [str(id_) for id_ in data.get('ids', [])]
+        metadatas = data.get('metadatas') or []
+        embeddings = data.get('embeddings')
+        if not has_items(embeddings):
+            embeddings = []
+        mode = data.get('mode', 'add')
+        
+        if not documents or not ids:
+            return jsonify({'error': 'Both documents and ids are required'}), 400
+        if len(documents) != len(ids):
+            return jsonify({'error': 'Documents and ids must have the same length'}), 400
+        if (metadatas and len(metadatas) != len(ids)) or (has_items(embeddings) and len(embeddings) != len(ids)):
+            return jsonify({'error': 'Metadatas and embeddings must have the same length as ids'}), 400
+        if mode not in ('add', 'upsert'):
+            return jsonify({'error': "mode must be 'add' or 'upsert'"}), 400
+        
+        embedding_model = request_embedding_model(data, has_items(embeddings))
+        collection = chroma_service.get_or_create_collection(collection_name, embedding_model)
+        mismatch = check_embedding_model(collection, embedding_model, write=True)
+        if mismatch:
+            return jsonify({'error': mismatch, 'failed': [{'id': id_, 'error': mismatch} for id_ in ids]}), 409
+        write = collection.upsert if mode == 'upsert' else collection.add
+        
+        written = 0
+        failed = []
+        for start in range(0, len(ids), MAX_BATCH_SIZE):
+            end = start + MAX_BATCH_SIZE
+            chunk = {'ids': ids[start:end], 'documents': documents[start:end]}
+            if metadatas:
+                chunk['metadatas'] = [clean_metadata(metadata) for metadata in metadatas[start:end]]
+            if has_items(embeddings):
+                chunk['embeddings'] = embeddings[start:end]
+            try:
+                write(**chunk)
+                written += len(chunk['ids'])
+            except Exception as e:
+                logger.error(f"Error writing documents {start}-{end} to collection {collection_name}: {e}")
+                failed.extend({'id': id_, 'error': str(e)} for id_ in chunk['ids'])
+        
+        response = {
+            'success': not failed,
+            'message': f'Wrote {written} of {len(ids)} documents to collection {collection_name}',
+            'count': written,
+            'failed': failed
+        }
+        if failed and written:
+            return jsonify(response), 207
+        if failed:
+            return jsonify(response), 500
+        return jsonify(response)
+    except Exception as e:
+        logger.error(f"Error adding document batch to collection {collection_name}: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/collections/<collection_name>/documents', methods=['GET'])
 def get_documents(collection_name: str):
     """Get documents from a collection
@@ -352,7 +807,7 @@ def get_documents(collection_name: str):
                 return jsonify({'error': 'Invalid where filter format'}), 400
         
         try:
-            collection = chroma_service.client.get_collection(name=collection_name)
+            collection = chroma_service.get_collection(collection_name)
             
             query_params = {
                 'limit': limit,
@@ -384,6 +839,7 @@ def get_documents(collection_name: str):
                 'count': len(documents)
             })
         except Exception as e:
+            logger.warning(f"Lookup failed for collection {collection_name}: {e}")
             return jsonify({'error': f'Collection {collection_name} not found'}), 404
     except Exception as e:
         logger.error(f"Error getting documents from collection {collection_name}: {e}")
@@ -405,7 +861,7 @@ def delete_document(collection_name: str, document_id: str):
             return jsonify({'error': 'Unable to connect to ChromaDB'}), 500
         
         try:
-            collection = chroma_service.client.get_collection(name=collection_name)
+            collection = chroma_service.get_collection(collection_name)
             collection.delete(ids=[document_id])
             
             return jsonify({
@@ -413,6 +869,7 @@ def delete_document(collection_name: str, document_id: str):
                 'message': f'Document {document_id} deleted from collection {collection_name}'
             })
         except Exception as e:
+            logger.warning(f"Lookup failed for document {document_id} in collection {collection_name}: {e}")
             return jsonify({'error': f'Document {document_id} not found in collection {collection_name}'}), 404
     except Exception as e:
         logger.error(f"Error deleting document {document_id} from collection {collection_name}: {e}")
@@ -432,6 +889,7 @@ def search_collection(collection_name: str):
         query_embeddings: List of query embeddings (optional)
         n_results: Number of results to return (default: 5)
         where: Filter condition (optional)
+        include_embeddings: Also return the embeddings of the matches (optional)
         
     Returns:
         JSON response with search results
@@ -440,7 +898,7 @@ def search_collection(collection_name: str):
         if not chroma_service.ensure_connected():
             return jsonify({'error': 'Unable to connect to ChromaDB'}), 500
         
-        data = request.get_json()
+        data = read_request_json()
         if not data:
             return jsonify({'error': 'No search data provided'}), 400
         
@@ -448,62 +906,121 @@ def search_collection(collection_name: str):
         query_embeddings = data.get('query_embeddings', [])
         n_results = data.get('n_results', 5)
         where_clause = data.get('where')
+        include_embeddings = data.get('include_embeddings', False)
         
-        if not query_texts and not query_embeddings:
+        if not query_texts and not has_items(query_embeddings):
             return jsonify({'error': 'Either query_texts or query_embeddings must be provided'}), 400
         
         try:
-            collection = chroma_service.client.get_collection(name=collection_name)
+            collection = chroma_service.get_collection(collection_name)
+            mismatch = check_embedding_model(collection, request_embedding_model(data, not query_texts))
+            if mismatch:
+                return jsonify({'error': mismatch}), 409
             
             query_params = {
                 'n_results': n_results,
                 'include': ['metadatas', 'documents', 'distances']
             }
+            if include_embeddings:
+                query_params['include'].append('embeddings')
             
             if where_clause:
                 query_params['where'] = where_clause
             
             if query_texts:
                 query_params['query_texts'] = query_texts
-            elif query_embeddings:
+            elif has_items(query_embeddings):
                 query_params['query_embeddings'] = query_embeddings
             
             results = collection.query(**query_params)
+            search_results = format_query_results(results)
             
-            # Format the results
-            search_results = []
-            if results and 'ids' in results and len(results['ids']) > 0:
-                ids = results['ids'][0] if results['ids'] else []
-                documents = results['documents'][0] if results['documents'] else []
-                metadatas = results['metadatas'][0] if results['metadatas'] else []
-                distances = results['distances'][0] if results['distances'] else []
-                
-                for i, doc_id in enumerate(ids):
-                    result = {
-                        'id': doc_id,
-                        'document': documents[i] if i < len(documents) else '',
-                        'metadata': metadatas[i] if i < len(metadatas) else {},
-                    }
-                    
-                    if i < len(distances):
-                        distance = distances[i]
-                        similarity = 1 / (1 + distance) if distance >= 0 else 0
-                        result['distance'] = distance
-                        result['similarity'] = similarity
-                    
-                    search_results.append(result)
-            
-            return jsonify({
+            response = {
                 'success': True,
                 'results': search_results,
                 'count': len(search_results)
-            })
+            }
+            if include_embeddings and results.get('embeddings') is not None:
+                response['embeddings'] = embeddings_block(results['embeddings'][0])
+            return jsonify(response)
         except Exception as e:
+            logger.warning(f"Lookup failed for collection {collection_name}: {e}")
             return jsonify({'error': f'Collection {collection_name} not found'}), 404
     except Exception as e:
         logger.error(f"Error searching collection {collection_name}: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/collections/<collection_name>/search/batch', methods=['POST'])
+def search_collection_batch(collection_name: str):
+    """Search a collection with many queries in one request
+    
+    Args:
+        collection_name: Name of the collection
+        
+    Request Body:
+        query_texts: List of query texts to search for (optional)
+        query_embeddings: List of query embeddings (optional)
+        n_results: Number of results to return per query (default: 5)
+        where: Filter condition applied to every query (optional)
+        include_embeddings: Also return the embeddings of the matches, one block per query (optional)
+        
+    Returns:
+        JSON response with one list of search results per query, in request order
+    """
+    try:
+        if not chroma_service.ensure_connected():
+            return jsonify({'error': 'Unable to connect to ChromaDB'}), 500
+        
+        data = read_request_json()
+        if not data:
+            return jsonify({'error': 'No search data provided'}), 400
+        
+        query_texts = data.get('query_texts', [])
+        query_embeddings = data.get('query_embeddings', [])
+        n_results = data.get('n_results', 5)
+        where_clause = data.get('where')
+        include_embeddings = data.get('include_embeddings', False)
+        
+        if not query_texts and not has_items(query_embeddings):
+            return jsonify({'error': 'Either query_texts or query_embeddings must be provided'}), 400
+        
+        try:
+            collection = chroma_service.get_collection(collection_name)
+        except Exception as e:
+            logger.warning(f"Lookup failed for collection {collection_name}: {e}")
+            return jsonify({'error': f'Collection {collection_name} not found'}), 404
+        mismatch = check_embedding_model(collection, request_embedding_model(data, not query_texts))
+        if mismatch:
+            return jsonify({'error': mismatch}), 409
+        
+        query_params = {
+            'n_results': n_results,
+            'include': ['metadatas', 'documents', 'distances']
+        }
+        if include_embeddings:
+            query_params['include'].append('embeddings')
+        if where_clause:
+            query_params['where'] = where_clause
+        if query_texts:
+            query_params['query_texts'] = query_texts
+        else:
+            query_params['query_embeddings'] = query_embeddings
+        
+        results = collection.query(**query_params)
+        query_count = len(query_texts) if query_texts else len(query_embeddings)
+        
+        response = {
+            'success': True,
+            'results': [format_query_results(results, i) for i in range(query_count)],
+            'count': query_count
+        }
+        if include_embeddings and results.get('embeddings') is not None:
+            response['embeddings'] = [embeddings_block(results['embeddings'][i]) for i in range(query_count)]
+        return jsonify(response)
+    except Exception as e:
+        logger.error(f"Error batch searching collection {collection_name}: {e}")
+        return jsonify({'error': str(e)}), 500
+
 # Update document endpoint
 @app.route('/collections/<collection_name>/documents/<document_id>', methods=['PUT'])
 def update_document(collection_name: str, document_id: str):
@@ -525,7 +1042,7 @@ def update_document(collection_name: str, document_id: str):
         if not chroma_service.ensure_connected():
             return jsonify({'error': 'Unable to connect to ChromaDB'}), 500
         
-        data = request.get_json()
+        data = read_request_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
@@ -537,7 +1054,11 @@ def update_document(collection_name: str, document_id: str):
             return jsonify({'error': 'document text is required'}), 400
         
         try:
-            collection = chroma_service.client.get_collection(name=collection_name)
+            collection = chroma_service.get_collection(collection_name)
+            mismatch = check_embedding_model(collection, request_embedding_model(data, has_items(embedding)),
+                                             write=True)
+            if mismatch:
+                return jsonify({'error': mismatch}), 409
             
             # Delete the existing document
             collection.delete(ids=[document_id])
@@ -550,15 +1071,9 @@ def update_document(collection_name: str, document_id: str):
             
             if metadata:
                 # Clean metadata
-                clean_metadata = {}
-                for k, v in metadata.items():
-                    if isinstance(v, list):
-                        clean_metadata[k] = ','.join(str(x) for x in v)
-                    elif v is not None:
-                        clean_metadata[k] = str(v)
-                update_data['metadatas'] = [clean_metadata]
+                update_data['metadatas'] = [clean_metadata(metadata)]
             
-            if embedding:
+            if has_items(embedding):
                 update_data['embeddings'] = [embedding]
             
             collection.add(**update_data)
@@ -568,6 +1083,7 @@ def update_document(collection_name: str, document_id: str):
                 'message': f'Document {document_id} updated in collection {collection_name}'
             })
         except Exception as e:
+            logger.warning(f"Lookup failed for collection {collection_name}: {e}")
             return jsonify({'error': f'Collection {collection_name} not found'}), 404
     except Exception as e:
         logger.error(f"Error updating document {document_id} in collection {collection_name}: {e}")
@@ -580,4 +1096,17 @@ if __name__ == '__main__':
     debug = os.getenv('CHROMADB_SERVICE_DEBUG', 'False').lower() == 'true'
     
     logger.info(f"Starting ChromaDB Service on {host}:{port}")
-    app.run(host=host, port=port, debug=debug)
+    if debug:
+        app.run(host=host, port=port, debug=debug)
+    else:
+        try:
+            from waitress import serve
+        except ImportError:
+            logger.warning("waitress is not installed, falling back to the threaded development server")
+            app.run(host=host, port=port, threaded=True)
+        else:
+            # One process with a bounded thread pool: ChromaDB's data directory must
+            # not be opened by several processes
+            logger.info(f"Serving with waitress, {SERVICE_THREADS} threads")
+            serve(app, host=host, port=port, threads=SERVICE_THREADS,
+                  connection_limit=SERVICE_THREADS * 4, channel_timeout=120)
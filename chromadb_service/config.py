@@ -14,7 +14,7 @@ class Config:
     
     # ChromaDB settings
     CHROMA_PERSIST_DIRECTORY = os.getenv('CHROMA_PERSIST_DIRECTORY', './chroma_data')
-    CHROMA_EMBEDDING_MODEL = os.getenv('CHROMA_EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+    CHROMA_EMBEDDING_MODEL = os.getenv('CHROMA_EMBEDDING_MODEL', 'all-MiniLM-L12-v2')
     
     # Logging settings
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
@@ -0,0 +1,260 @@
+"""
+Serving helpers for the ChromaDB Service: admission queues that bound how many
+reads and writes run at once, latency histograms exported at /metrics, and a
+cache of per-collection statistics, and the formatting of query results shared
+with the application's embedded vector store.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class AdmissionQueue:
+    """Bounded concurrency with a bounded, time-limited wait queue
+
+    Requests beyond the concurrency limit wait for a slot; once max_waiting
+    requests are waiting, or a request waited longer than the timeout, it is
+    rejected so the caller can answer 503 instead of piling up threads.
+    """
+
+    def __init__(self, name: str, concurrency: int, max_waiting: int, timeout: float):
+        """Initialize the queue
+
+        Args:
+            name: Name used in metrics and errors
+            concurrency: Requests allowed to run at once
+            max_waiting: Requests allowed to wait for a slot
+            timeout: Seconds a request may wait for a slot
+        """
+        self.name = name
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> bool:
+        """Take a slot, waiting up to the timeout
+
+        Returns:
+            bool: True if admitted (release must be called), False if rejected
+        """
+        with self._condition:
+            if self.active >= self.concurrency:
+                if self.waiting >= self.max_waiting:
+                    self.rejected += 1
+                    return False
+                self.waiting += 1
+                deadline = time.monotonic() + self.timeout
+                try:
+                    while self.active >= self.concurrency:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.rejected += 1
+                            return False
+                        self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.admitted += 1
+            return True
+
+    def release(self):
+        """Return a slot taken by acquire"""
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def saturated(self) -> bool:
+        """Check whether new requests would be rejected right away"""
+        with self._condition:
+            return self.active >= self.concurrency and self.waiting >= self.max_waiting
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the current load and counters of the queue"""
+        with self._condition:
+            return {
+                'concurrency': self.concurrency,
+                'max_waiting': self.max_waiting,
+                'active': self.active,
+                'waiting': self.waiting,
+                'admitted': self.admitted,
+                'rejected': self.rejected
+            }
+
+
+class LatencyHistograms:
+    """Per-endpoint request latency histograms and status counters"""
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        """Initialize the histograms
+
+        Args:
+            buckets: Upper bounds of the buckets in seconds
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+        self._statuses: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint: str, seconds: float, status_code: int):
+        """Record a finished request
+
+        Args:
+            endpoint: Flask endpoint name
+            seconds: Time spent handling the request, including queueing
+            status_code: HTTP status of the response
+        """
+        with self._lock:
+            histogram = self._endpoints.get(endpoint)
+            if histogram is None:
+                histogram = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+                self._endpoints[endpoint] = histogram
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram['counts'][i] += 1
+                    break
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+            key = (endpoint, str(status_code))
+            self._statuses[key] = self._statuses.get(key, 0) + 1
+
+    def render(self, prefix: str = 'chromadb_service') -> str:
+        """Render the histograms in the Prometheus text format
+
+        Args:
+            prefix: Metric name prefix
+
+        Returns:
+            str: Exposition text
+        """
+        with self._lock:
+            endpoints = {name: dict(histogram, counts=list(histogram['counts']))
+                         for name, histogram in self._endpoints.items()}
+            statuses = dict(self._statuses)
+
+        name = f'{prefix}_request_duration_seconds'
+        lines = [f'# HELP {name} Request latency by endpoint', f'# TYPE {name} histogram']
+        for endpoint, histogram in sorted(endpoints.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram['counts']):
+                cumulative += count
+                lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="+Inf"}} {histogram["count"]}')
+            lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {histogram["sum"]:.6f}')
+            lines.append(f'{name}_count{{endpoint="{endpoint}"}} {histogram["count"]}')
+
+        name = f'{prefix}_requests_total'
+        lines += [f'# HELP {name} Requests by endpoint and status', f'# TYPE {name} counter']
+        for (endpoint, status), count in sorted(statuses.items()):
+            lines.append(f'{name}{{endpoint="{endpoint}",status="{status}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def render_queue_metrics(queues: Iterable[AdmissionQueue], prefix: str = 'chromadb_service') -> str:
+    """Render the load of admission queues in the Prometheus text format
+
+    Args:
+        queues: Admission queues to report
+        prefix: Metric name prefix
+
+    Returns:
+        str: Exposition text
+    """
+    stats = [(queue.name, queue.stats()) for queue in queues]
+    lines = []
+    for field, kind, description in (('active', 'gauge', 'Requests running'),
+                                     ('waiting', 'gauge', 'Requests waiting for a slot'),
+                                     ('rejected', 'counter', 'Requests rejected with 503')):
+        name = f'{prefix}_queue_{field}' + ('_total' if kind == 'counter' else '')
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+        lines += [f'{name}{{queue="{queue}"}} {values[field]}' for queue, values in stats]
+    return '\n'.join(lines) + '\n'
+
+
+class CollectionStatsCache:
+    """Time-limited cache of collection counts and metadata
+
+    Writes through the service invalidate their collection, so the TTL only
+    bounds staleness from writers that bypass the service.
+    """
+
+    def __init__(self, ttl: float):
+        """Initialize the cache
+
+        Args:
+            ttl: Seconds a cached entry stays valid; 0 disables caching
+        """
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, loader: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """Get the statistics of a collection, loading them when missing or stale
+
+        Args:
+            name: Collection name
+            loader: Function returning the statistics of a collection
+
+        Returns:
+            Dict: Cached or freshly loaded statistics
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        stats = loader(name)
+        if self.ttl > 0:
+            with self._lock:
+                self._entries[name] = (time.monotonic(), stats)
+        return stats
+
+    def invalidate(self, name: Optional[str] = None):
+        """Drop the cached statistics of one collection, or of all if name is None"""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+
+def format_query_results(results: Dict[str, Any], query_index: int = 0) -> List[Dict[str, Any]]:
+    """Format the matches of one query from a ChromaDB query result
+
+    Args:
+        results: Result of collection.query
+        query_index: Position of the query in the request
+
+    Returns:
+        List[Dict]: Matches with id, document, metadata, distance and similarity
+    """
+    search_results = []
+    if not results or not results.get('ids') or len(results['ids']) <= query_index:
+        return search_results
+
+    ids = results['ids'][query_index]
+    documents = results['documents'][query_index] if results.get('documents') else []
+    metadatas = results['metadatas'][query_index] if results.get('metadatas') else []
+    distances = results['distances'][query_index] if results.get('distances') else []
+
+    for i, doc_id in enumerate(ids):
+        result = {
+            'id': doc_id,
+            'document': documents[i] if i < len(documents) else '',
+            'metadata': (metadatas[i] if i < len(metadatas) else None) or {},
+        }
+
+        if i < len(distances):
+            distance = distances[i]
+            result['distance'] = distance
+            result['similarity'] = 1 / (1 + distance) if distance >= 0 else 0
+
+        search_results.append(result)
+    return search_results
@@ -24,6 +24,33 @@ GITHUB_TOKEN = os.getenv('GITHUB_TOKEN', '')
 # Database configuration
 DATABASE_URI = os.getenv('DATABASE_URI', 'sqlite:///text2sql.db')
 
+# Connection pool settings for the shared query engines
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # Seconds before a connection is replaced
+
+# Query results are streamed from a server-side cursor; only the first page is returned inline
+QUERY_RESULT_MAX_ROWS = int(os.getenv('QUERY_RESULT_MAX_ROWS', '1000'))  # Rows in the first page
+QUERY_RESULT_MAX_BYTES = int(os.getenv('QUERY_RESULT_MAX_BYTES', str(2 * 1024 * 1024)))  # Approximate size of the first page
+QUERY_RESULT_FETCH_SIZE = int(os.getenv('QUERY_RESULT_FETCH_SIZE', '500'))  # Rows fetched per cursor round-trip
+QUERY_RESULT_HANDLE_TTL = int(os.getenv('QUERY_RESULT_HANDLE_TTL', '1800'))  # Seconds a truncated result stays pageable
+# The rest of a truncated result is read once from the same cursor and spilled to a per-handle
+# SQLite file, so every page comes from one consistent result without re-running the query
+QUERY_RESULT_SPILL_DIR = os.getenv('QUERY_RESULT_SPILL_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'result_spill'))
+QUERY_RESULT_SPILL_MAX_ROWS = int(os.getenv('QUERY_RESULT_SPILL_MAX_ROWS', '1000000'))  # Rows kept per result
+QUERY_RESULT_SPILL_MAX_BYTES = int(os.getenv('QUERY_RESULT_SPILL_MAX_BYTES', str(512 * 1024 * 1024)))  # Approximate size kept per result
+# Each running spill holds a pooled connection, so only a few run at once and each is time-limited;
+# a result that finds no free slot keeps its first page and is re-run from the database on download
+QUERY_RESULT_SPILL_CONCURRENCY = int(os.getenv('QUERY_RESULT_SPILL_CONCURRENCY', '2'))  # Spills running at once per process
+QUERY_RESULT_SPILL_TIMEOUT = float(os.getenv('QUERY_RESULT_SPILL_TIMEOUT', '120'))  # Seconds a spill may read from its cursor
+QUERY_RESULT_PAGE_WAIT = float(os.getenv('QUERY_RESULT_PAGE_WAIT', '30'))  # Seconds a page request waits for rows still being spilled
+
+# Cache of executed read-only SQL results, invalidated per table when data changes
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))  # Memory budget
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', '300'))  # Seconds
+
 # Application settings
 DEBUG = os.environ.get("DEBUG", "False").lower() == "true"
 SECRET_KEY = os.environ.get("SECRET_KEY", "default-dev-key-change-in-production")
@@ -58,6 +85,142 @@ LDAP_ATTRIBUTE_DISPLAY_NAME = os.getenv('LDAP_ATTRIBUTE_DISPLAY_NAME', 'displayN
 MAX_TOKENS = int(os.getenv('MAX_TOKENS', '2000'))
 TEMPERATURE = float(os.getenv('TEMPERATURE', '0.7'))
 
+# LLM provider request limits, shared by the sync and async clients
+LLM_REQUEST_TIMEOUT = float(os.getenv('LLM_REQUEST_TIMEOUT', '120'))  # Seconds per attempt
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '3'))  # Retries on 429, 5xx and connection errors
+LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', '0.5'))  # Seconds, doubled per retry
+LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', '30'))  # Upper bound, also for Retry-After
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '16'))  # In-flight async requests per process
+LLM_MAX_CONCURRENCY_PER_MODEL = int(os.getenv('LLM_MAX_CONCURRENCY_PER_MODEL', '8'))
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv('LLM_POOL_MAX_CONNECTIONS', '32'))
+# Send a second request when the first is slower than this latency percentile of its call site, 0 disables
+LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', '0'))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', '20'))  # Latencies needed before hedging
+LLM_METRICS_WINDOW = int(os.getenv('LLM_METRICS_WINDOW', '500'))  # Latency samples kept per call site
+# Let concurrent identical completion and embedding requests share one upstream call
+REQUEST_COALESCING_ENABLED = os.getenv('REQUEST_COALESCING_ENABLED', 'true').lower() == 'true'
+
+# Cache of completions for call sites whose answers only depend on their prompt.
+# Only call sites (log prefixes) listed with a TTL in seconds are cached.
+LLM_RESPONSE_CACHE_ENABLED = os.getenv('LLM_RESPONSE_CACHE_ENABLED', 'false').lower() == 'true'
+LLM_RESPONSE_CACHE_PATH = os.getenv('LLM_RESPONSE_CACHE_PATH', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'llm_response_cache.db'))
+LLM_RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('LLM_RESPONSE_CACHE_MAX_ENTRIES', '100000'))
+_default_llm_cache_ttls = 'INTENT=3600,TABLE=3600,COLUMN=3600,Query Reformatting=86400,CODEGEN_TABLE_NAMES=86400,DATA_MAPPING_SEMANTIC=86400'
+_configured_llm_cache_ttls = os.getenv('LLM_RESPONSE_CACHE_TTLS', _default_llm_cache_ttls)
+LLM_RESPONSE_CACHE_TTLS = {
+    site.strip(): int(ttl)
+    for site, _, ttl in (item.partition('=') for item in _configured_llm_cache_ttls.split(',') if '=' in item)
+}
+
+# Local embedding and reranking models, loaded once per process
+EMBEDDING_MODEL_NAME = os.getenv('EMBEDDING_MODEL_NAME', 'all-MiniLM-L12-v2')
+EMBEDDING_MODEL_REVISION = os.getenv('EMBEDDING_MODEL_REVISION', '')  # Bump to invalidate cached embeddings
+RERANKING_MODEL_NAME = os.getenv('RERANKING_MODEL_NAME', 'cross-encoder/ms-marco-MiniLM-L-6-v2')
+# CPU inference backend: 'torch' (fp32), 'onnx' (ONNX Runtime) or 'int8' (dynamic quantization)
+MODEL_INFERENCE_BACKEND = os.getenv('MODEL_INFERENCE_BACKEND', 'torch').lower()
+MODEL_PRELOAD = os.getenv('MODEL_PRELOAD', 'true').lower() == 'true'  # Load models in the background at startup
+MODEL_LOAD_RETRY_INTERVAL = int(os.getenv('MODEL_LOAD_RETRY_INTERVAL', '60'))  # Seconds before retrying a failed load
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '64'))  # Texts per encode call when embedding lists
+# Merge single-text embedding requests from concurrent threads into one encode call
+EMBEDDING_MICRO_BATCH_ENABLED = os.getenv('EMBEDDING_MICRO_BATCH_ENABLED', 'true').lower() == 'true'
+EMBEDDING_MICRO_BATCH_MAX_SIZE = int(os.getenv('EMBEDDING_MICRO_BATCH_MAX_SIZE', '32'))
+EMBEDDING_MICRO_BATCH_WAIT_MS = float(os.getenv('EMBEDDING_MICRO_BATCH_WAIT_MS', '5'))  # Max wait for other requests to join
+# Tag of the embedding space, written into vector collection metadata; vectors of another version are refused.
+# Independent of EMBEDDING_MODEL_REVISION: change it only when the vectors change, then re-index or re-tag collections
+EMBEDDING_MODEL_VERSION = os.getenv('EMBEDDING_MODEL_VERSION', EMBEDDING_MODEL_NAME)
+# Embedding space of the app's own collections written before tagging (the app always embedded with
+# all-MiniLM-L12-v2); untagged app collections holding vectors are tagged with it once at startup
+LEGACY_EMBEDDING_MODEL_VERSION = os.getenv('LEGACY_EMBEDDING_MODEL_VERSION', 'all-MiniLM-L12-v2')
+# Shared embedding server (python -m src.services.embedding_server) that loads the model once per host;
+# when set, app workers and the ChromaDB service embed through it instead of loading their own model
+EMBEDDING_SERVICE_URL = os.getenv('EMBEDDING_SERVICE_URL', '')  # e.g. http://localhost:8004, empty embeds in-process
+EMBEDDING_SERVICE_TIMEOUT = int(os.getenv('EMBEDDING_SERVICE_TIMEOUT', '30'))
+EMBEDDING_SERVICE_MAX_TEXTS = int(os.getenv('EMBEDDING_SERVICE_MAX_TEXTS', '512'))  # Texts per /embed request
+EMBEDDING_SERVICE_HOST = os.getenv('EMBEDDING_SERVICE_HOST', '0.0.0.0')
+EMBEDDING_SERVICE_PORT = int(os.getenv('EMBEDDING_SERVICE_PORT', '8004'))
+EMBEDDING_SERVICE_THREADS = int(os.getenv('EMBEDDING_SERVICE_THREADS', '32'))
+EMBEDDING_SERVICE_BATCH_SIZE = int(os.getenv('EMBEDDING_SERVICE_BATCH_SIZE', '64'))  # Texts per encode call of the server
+EMBEDDING_SERVICE_BATCH_WAIT_MS = float(os.getenv('EMBEDDING_SERVICE_BATCH_WAIT_MS', '10'))  # Max wait for requests to join
+# Cache of computed embeddings keyed by model and text, shared by workers through a SQLite file
+EMBEDDING_CACHE_ENABLED = os.getenv('EMBEDDING_CACHE_ENABLED', 'true').lower() == 'true'
+EMBEDDING_CACHE_MEMORY_ENTRIES = int(os.getenv('EMBEDDING_CACHE_MEMORY_ENTRIES', '10000'))  # In-process LRU tier
+EMBEDDING_CACHE_DISK_ENTRIES = int(os.getenv('EMBEDDING_CACHE_DISK_ENTRIES', '500000'))  # On-disk tier, 0 disables it
+EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'embedding_cache.db'))
+EMBEDDING_CACHE_FLUSH_INTERVAL = float(os.getenv('EMBEDDING_CACHE_FLUSH_INTERVAL', '1.0'))  # Seconds between batched disk writes
+EMBEDDING_CACHE_FLUSH_SIZE = int(os.getenv('EMBEDDING_CACHE_FLUSH_SIZE', '256'))  # Buffered vectors that trigger an early write
+
+# Local intent classifier trained on labeled examples and positive feedback queries;
+# queries it is unsure about are classified by the LLM
+INTENT_CLASSIFIER_ENABLED = os.getenv('INTENT_CLASSIFIER_ENABLED', 'false').lower() == 'true'
+INTENT_CLASSIFIER_THRESHOLD = float(os.getenv('INTENT_CLASSIFIER_THRESHOLD', '0.7'))  # Minimum probability to skip the LLM
+INTENT_CLASSIFIER_MARGIN = float(os.getenv('INTENT_CLASSIFIER_MARGIN', '0.3'))  # Lead over data_retrieval another intent needs
+INTENT_CLASSIFIER_EXAMPLES_PATH = os.getenv('INTENT_CLASSIFIER_EXAMPLES_PATH', os.path.join(os.path.dirname(__file__), 'data', 'intent_examples.json'))
+INTENT_CLASSIFIER_MAX_FEEDBACK_EXAMPLES = int(os.getenv('INTENT_CLASSIFIER_MAX_FEEDBACK_EXAMPLES', '500'))
+INTENT_CLASSIFIER_RETRAIN_INTERVAL = int(os.getenv('INTENT_CLASSIFIER_RETRAIN_INTERVAL', '3600'))  # Seconds
+
+# Background query job queue
+JOB_QUEUE_WORKERS = int(os.getenv('JOB_QUEUE_WORKERS', '8'))  # Queries processed concurrently per worker process
+JOB_QUEUE_MAX_SIZE = int(os.getenv('JOB_QUEUE_MAX_SIZE', '100'))  # Waiting queries before new ones get HTTP 429
+JOB_QUEUE_MAX_RUNNING_PER_USER = int(os.getenv('JOB_QUEUE_MAX_RUNNING_PER_USER', '2'))  # 0 for no per-user limit
+
+# Text-to-SQL pipeline configuration
+# Maximum number of stages (feedback search, workspace routing, schema loading...) one
+# request runs at the same time; its other ready stages wait for one of its own to finish
+SQL_PIPELINE_STAGES_PER_REQUEST = int(os.getenv('SQL_PIPELINE_STAGES_PER_REQUEST', '2'))
+# Threads shared by the pipelines of a worker process, by default one slice per job queue worker
+SQL_PIPELINE_MAX_WORKERS = int(os.getenv('SQL_PIPELINE_MAX_WORKERS',
+                                         str(JOB_QUEUE_WORKERS * SQL_PIPELINE_STAGES_PER_REQUEST)))
+
+# Minimum seconds between checks of schema.json / condition.json for changes made by other processes
+SCHEMA_RELOAD_CHECK_INTERVAL = float(os.getenv('SCHEMA_RELOAD_CHECK_INTERVAL', '1.0'))
+
+# Store for query progress and result handles. Use 'sqlite' when running more than one gunicorn worker
+SHARED_STORE_BACKEND = os.getenv('SHARED_STORE_BACKEND', 'memory').lower()  # 'memory' or 'sqlite'
+SHARED_STORE_PATH = os.getenv('SHARED_STORE_PATH', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'shared_state.db'))
+SHARED_STORE_SWEEP_INTERVAL = int(os.getenv('SHARED_STORE_SWEEP_INTERVAL', '60'))  # Seconds between expiry sweeps
+QUERY_PROGRESS_TTL = int(os.getenv('QUERY_PROGRESS_TTL', '600'))  # Seconds before finished or abandoned progress is removed
+
+# Semantic answer cache for natural language queries
+SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'true').lower() == 'true'
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.95'))  # Minimum cosine similarity for a hit
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '500'))
+SEMANTIC_CACHE_TTL = int(os.getenv('SEMANTIC_CACHE_TTL', '3600'))  # Seconds
+SEMANTIC_CACHE_REEXECUTE = os.getenv('SEMANTIC_CACHE_REEXECUTE', 'true').lower() == 'true'  # Re-run cached SQL for fresh data
+
+# Table pre-retrieval: embed table metadata and shortlist the top-K tables before the LLM is asked
+TABLE_INDEX_ENABLED = os.getenv('TABLE_INDEX_ENABLED', 'true').lower() == 'true'
+TABLE_INDEX_TOP_K = int(os.getenv('TABLE_INDEX_TOP_K', '15'))
+# Confidence mode skips the LLM when the best table beats the runner-up by the margin
+TABLE_INDEX_CONFIDENCE_MODE = os.getenv('TABLE_INDEX_CONFIDENCE_MODE', 'false').lower() == 'true'
+TABLE_INDEX_DOMINANCE_MARGIN = float(os.getenv('TABLE_INDEX_DOMINANCE_MARGIN', '0.15'))
+TABLE_INDEX_MIN_SCORE = float(os.getenv('TABLE_INDEX_MIN_SCORE', '0.5'))
+
+# Workspace routing: rank workspaces by table-embedding similarity and only ask the LLM when ambiguous
+WORKSPACE_INDEX_ENABLED = os.getenv('WORKSPACE_INDEX_ENABLED', 'true').lower() == 'true'
+WORKSPACE_INDEX_CENTROID_WEIGHT = float(os.getenv('WORKSPACE_INDEX_CENTROID_WEIGHT', '0.5'))  # Rest goes to the best table score
+WORKSPACE_INDEX_MARGIN = float(os.getenv('WORKSPACE_INDEX_MARGIN', '0.1'))  # Lead over the runner-up that skips the LLM
+# Another workspace whose best table scores within this of the leader's best table also goes to the LLM
+WORKSPACE_INDEX_TABLE_MARGIN = float(os.getenv('WORKSPACE_INDEX_TABLE_MARGIN', '0.1'))
+WORKSPACE_INDEX_MIN_SCORE = float(os.getenv('WORKSPACE_INDEX_MIN_SCORE', '0.3'))
+WORKSPACE_INDEX_PROMPT_TABLES = int(os.getenv('WORKSPACE_INDEX_PROMPT_TABLES', '5'))  # Tables per workspace listed to the LLM
+
+# Column pruning: rank columns locally (lexical + embedding) and only show the top-K per table to the LLM
+COLUMN_RANKER_ENABLED = os.getenv('COLUMN_RANKER_ENABLED', 'true').lower() == 'true'
+COLUMN_RANKER_TOP_K = int(os.getenv('COLUMN_RANKER_TOP_K', '25'))  # Columns per table besides primary and join keys
+COLUMN_RANKER_LEXICAL_WEIGHT = float(os.getenv('COLUMN_RANKER_LEXICAL_WEIGHT', '0.5'))  # Rest goes to embedding similarity
+# Confidence mode skips the LLM when every table has a column scoring at least the confidence score
+COLUMN_RANKER_CONFIDENCE_MODE = os.getenv('COLUMN_RANKER_CONFIDENCE_MODE', 'false').lower() == 'true'
+COLUMN_RANKER_CONFIDENCE_SCORE = float(os.getenv('COLUMN_RANKER_CONFIDENCE_SCORE', '0.6'))
+COLUMN_RANKER_KEEP_SCORE = float(os.getenv('COLUMN_RANKER_KEEP_SCORE', '0.35'))  # Columns kept without the LLM
+COLUMN_RANKER_MAX_VECTORS = int(os.getenv('COLUMN_RANKER_MAX_VECTORS', '20000'))  # Cached column embeddings (LRU)
+
+# Pruned schema cache per table set, top ranked columns and cluster of similar questions (needs the column ranker)
+PRUNED_SCHEMA_CACHE_ENABLED = os.getenv('PRUNED_SCHEMA_CACHE_ENABLED', 'false').lower() == 'true'
+PRUNED_SCHEMA_CACHE_THRESHOLD = float(os.getenv('PRUNED_SCHEMA_CACHE_THRESHOLD', '0.97'))  # Minimum cosine similarity for a hit
+PRUNED_SCHEMA_CACHE_KEY_COLUMNS = int(os.getenv('PRUNED_SCHEMA_CACHE_KEY_COLUMNS', '5'))  # Top ranked columns per table in the cache key
+PRUNED_SCHEMA_CACHE_MAX_ENTRIES = int(os.getenv('PRUNED_SCHEMA_CACHE_MAX_ENTRIES', '500'))
+PRUNED_SCHEMA_CACHE_TTL = int(os.getenv('PRUNED_SCHEMA_CACHE_TTL', '3600'))  # Seconds
+
 # Message format configuration
 MESSAGE_FORMAT = os.getenv('MESSAGE_FORMAT', 'openai').lower()  # 'openai' or 'llama'
 # Valid options: 'openai', 'llama'
@@ -97,8 +260,11 @@ LOGIN_ATTEMPT_WINDOW = int(os.getenv('LOGIN_ATTEMPT_WINDOW', '3600'))  # Time wi
 FAILED_LOGIN_LOCKOUT_THRESHOLD = int(os.getenv('FAILED_LOGIN_LOCKOUT_THRESHOLD', '5'))  # Lock account after this many failed attempts
 
 # ChromaDB Service configuration
-CHROMADB_SERVICE_URL = os.getenv('CHROMADB_SERVICE_URL', 'http://localhost:8001')
+CHROMADB_SERVICE_URL = os.getenv('CHROMADB_SERVICE_URL', 'http://localhost:8001')  # embedded://<path> opens ChromaDB in-process
 CHROMADB_SERVICE_TIMEOUT = int(os.getenv('CHROMADB_SERVICE_TIMEOUT', '30'))
+VECTOR_STORE_BATCH_SIZE = int(os.getenv('VECTOR_STORE_BATCH_SIZE', '256'))  # Vectors or queries per bulk request
+VECTOR_WIRE_FORMAT = os.getenv('VECTOR_WIRE_FORMAT', 'binary').lower()  # 'binary' (base64 float32) or 'json' (arrays)
+VECTOR_GZIP_MIN_BYTES = int(os.getenv('VECTOR_GZIP_MIN_BYTES', '65536'))  # Compress request bodies from this size, 0 disables
 
 # Logging configuration
 LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
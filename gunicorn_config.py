@@ -4,6 +4,7 @@ Optimized for handling high concurrency (50+ concurrent users)
 """
 
 import multiprocessing
+import os
 
 # Server socket
 bind = '0.0.0.0:5000'
@@ -11,8 +12,18 @@ backlog = 2048  # Listen backlog - how many requests can queue before server is
 
 # Worker processes
 # For I/O bound applications (which this is), workers = (2 * CPU) + 1 is typical
-# We use threads instead for better async handling
-workers = 1  # Single worker process
+# We use threads within each worker for better async handling. More than one worker
+# requires SHARED_STORE_BACKEND=sqlite so query progress and result handles are
+# visible to every worker, and the ChromaDB service instead of the embedded store
+workers = int(os.getenv('GUNICORN_WORKERS', '1'))
+if workers > 1 and os.getenv('SHARED_STORE_BACKEND', 'memory').lower() != 'sqlite':
+    print("Warning: GUNICORN_WORKERS > 1 without SHARED_STORE_BACKEND=sqlite, "
+          "progress polls may reach a worker that does not know the query. Using 1 worker.")
+    workers = 1
+if workers > 1 and os.getenv('CHROMADB_SERVICE_URL', '').startswith('embedded://'):
+    print("Warning: GUNICORN_WORKERS > 1 with an embedded:// CHROMADB_SERVICE_URL, "
+          "only one process may open the ChromaDB data directory. Using 1 worker.")
+    workers = 1
 worker_class = 'gthread'  # Use threaded worker
 threads = 50  # 50 threads per worker to handle 50+ concurrent connections
 max_requests = 1000  # Restart worker after 1000 requests to prevent memory leaks
@@ -46,6 +57,7 @@ print(f"""
 Gunicorn Configuration for Text2SQL
 ================================================================================
 Bind: {bind}
+Workers: {workers}
 Worker Class: {worker_class}
 Threads per Worker: {threads}
 Backlog: {backlog}
@@ -1,5 +1,13 @@
-from src.utils.schema_manager import SchemaManager
+from src.utils.schema_manager import get_schema_manager, register_schema_change_listener
 from src.utils.llm_engine import LLMEngine
+from src.utils.column_ranker import ColumnRanker, join_key_columns
+from src.utils.semantic_cache import SemanticQueryCache
+from config.config import (
+    COLUMN_RANKER_ENABLED, COLUMN_RANKER_TOP_K, COLUMN_RANKER_LEXICAL_WEIGHT,
+    COLUMN_RANKER_CONFIDENCE_MODE, COLUMN_RANKER_CONFIDENCE_SCORE, COLUMN_RANKER_KEEP_SCORE,
+    COLUMN_RANKER_MAX_VECTORS, PRUNED_SCHEMA_CACHE_ENABLED, PRUNED_SCHEMA_CACHE_THRESHOLD,
+    PRUNED_SCHEMA_CACHE_MAX_ENTRIES, PRUNED_SCHEMA_CACHE_TTL, PRUNED_SCHEMA_CACHE_KEY_COLUMNS
+)
 from azure.ai.inference.models import SystemMessage, UserMessage
 import logging
 import time
@@ -11,8 +19,48 @@ class ColumnAgent:
     def __init__(self):
         """Initialize the column agent"""
         self.llm_engine = LLMEngine()
-        self.schema_manager = SchemaManager()
+        self.schema_manager = get_schema_manager()
         self.logger = logging.getLogger('text2sql.agents.column')
+        self.column_ranker = None
+        if COLUMN_RANKER_ENABLED:
+            self.column_ranker = ColumnRanker(
+                self.llm_engine.generate_embeddings,
+                lexical_weight=COLUMN_RANKER_LEXICAL_WEIGHT,
+                max_vectors=COLUMN_RANKER_MAX_VECTORS
+            )
+            register_schema_change_listener(self.column_ranker.invalidate)
+        
+        # Pruned schemas per table set and top ranked columns, shared by near-duplicate questions
+        self.pruned_schema_cache = None
+        if PRUNED_SCHEMA_CACHE_ENABLED and self.column_ranker:
+            self.pruned_schema_cache = SemanticQueryCache(
+                embed_func=self.llm_engine.generate_embedding,
+                threshold=PRUNED_SCHEMA_CACHE_THRESHOLD,
+                max_entries=PRUNED_SCHEMA_CACHE_MAX_ENTRIES,
+                ttl_seconds=PRUNED_SCHEMA_CACHE_TTL
+            )
+            register_schema_change_listener(self.pruned_schema_cache.invalidate)
+    
+    def _rank_columns(self, query, table_info, tables, workspace_name=None):
+        """Rank the columns of the selected tables by similarity to the query
+        
+        Args:
+            query (str): The natural language query from the user
+            table_info (list): List of table dictionaries with column information
+            tables (list): Names of the selected tables
+            workspace_name (str, optional): Name of workspace the tables belong to
+            
+        Returns:
+            dict or None: Per table, columns as {'name', 'score', 'required'}; None if unavailable
+        """
+        if not self.column_ranker:
+            return None
+        try:
+            required = join_key_columns(self.schema_manager.get_join_conditions(tables, workspace_name))
+            return self.column_ranker.rank(query, table_info, required)
+        except Exception as e:
+            self.logger.warning(f"Column ranking failed, sending all columns to the LLM: {str(e)}")
+            return None
         
     def prune_columns(self, query, tables, workspace_name=None):
         """Prune irrelevant columns from the schema based on the user's query
@@ -63,6 +111,43 @@ class ColumnAgent:
             self.logger.warning("No valid tables found in schema")
             return ""
             
+        ranking = self._rank_columns(query, table_info, tables, workspace_name)
+        cache_scope = None
+        schema_version = self.schema_manager.get_schema_version()
+        if ranking:
+            required = {name: {c["name"] for c in columns if c["required"]} for name, columns in ranking.items()}
+            
+            # Reuse the pruned schema of a near-duplicate question over the same tables and top ranked columns
+            if self.pruned_schema_cache:
+                cache_scope = (workspace_name, tuple(sorted(tables)), self._top_columns_key(ranking))
+                cached = self.pruned_schema_cache.lookup(query, cache_scope, schema_version)
+                if cached:
+                    self.logger.info(f"Column pruning served from cache (similarity {cached['similarity']:.3f})")
+                    return cached["schema"]
+            
+            # Confidence mode: every table has a clearly matching column, no need to ask the LLM
+            if COLUMN_RANKER_CONFIDENCE_MODE and all(
+                    any(c["score"] >= COLUMN_RANKER_CONFIDENCE_SCORE for c in columns if not c["required"])
+                    for columns in ranking.values()):
+                selected_columns = {
+                    name: [c["name"] for c in columns if c["required"] or c["score"] >= COLUMN_RANKER_KEEP_SCORE]
+                    for name, columns in ranking.items()
+                }
+                result = self._build_pruned_schema(table_info, selected_columns)
+                self._cache_pruned_schema(query, cache_scope, schema_version, result)
+                processing_time = time.time() - start_time
+                self.logger.info(f"Column pruning completed in {processing_time:.2f}s without LLM")
+                return result
+            
+            # Show the LLM only the key columns and the top-K ranked columns of wide tables
+            for table in table_info:
+                columns = ranking[table["name"]]
+                if len(columns) - len(required[table["name"]]) > COLUMN_RANKER_TOP_K:
+                    keep = {c["name"] for c in columns if c["required"]}
+                    keep.update(c["name"] for c in [c for c in columns if not c["required"]][:COLUMN_RANKER_TOP_K])
+                    self.logger.info(f"Table '{table['name']}': trimmed LLM candidates to {len(keep)}/{len(columns)} columns")
+                    table["columns"] = [col for col in table["columns"] if col["name"] in keep]
+            
         # Format table and column information for the prompt
         schema_text = []
         for table in table_info:
@@ -100,6 +185,10 @@ Consider columns that might be needed for:
             
             # Extract JSON from response
             selected_columns = self._parse_column_selection(raw_response, table_info)
+            if ranking:
+                # Join keys are needed even when the model leaves them out
+                for table_name, columns in selected_columns.items():
+                    columns.extend(sorted(required[table_name] - set(columns)))
             
             # Log column pruning statistics
             for table in table_info:
@@ -115,6 +204,7 @@ Consider columns that might be needed for:
             
             # Build pruned schema
             result = self._build_pruned_schema(table_info, selected_columns)
+            self._cache_pruned_schema(query, cache_scope, schema_version, result)
             
             processing_time = time.time() - start_time
             self.logger.info(f"Column pruning completed in {processing_time:.2f}s")
@@ -126,6 +216,32 @@ Consider columns that might be needed for:
             # On error, return schema with all columns
             return self.schema_manager.format_schema_for_display(workspace_name, tables)
     
+    def _top_columns_key(self, ranking):
+        """Build the part of the cache key that tells questions about different columns apart
+        
+        Args:
+            ranking (dict): Per table, ranked columns as returned by _rank_columns
+            
+        Returns:
+            tuple: Per table, the sorted names of its top ranked non-key columns
+        """
+        return tuple(
+            (name, tuple(sorted(c["name"] for c in [c for c in columns if not c["required"]][:PRUNED_SCHEMA_CACHE_KEY_COLUMNS])))
+            for name, columns in sorted(ranking.items())
+        )
+    
+    def _cache_pruned_schema(self, query, scope, schema_version, schema):
+        """Cache a pruned schema for the question, table set and top ranked columns
+        
+        Args:
+            query (str): The natural language query from the user
+            scope (tuple or None): Workspace name, sorted table names and top ranked columns; None to skip caching
+            schema_version (str): Schema version the pruned schema was built from
+            schema (str): Pruned schema
+        """
+        if self.pruned_schema_cache and scope and schema:
+            self.pruned_schema_cache.store(query, scope, schema_version, {"schema": schema})
+    
     def _parse_column_selection(self, response_text, table_info):
         """Parse the AI response to extract selected columns
         
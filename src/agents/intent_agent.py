@@ -1,5 +1,13 @@
-from src.utils.schema_manager import SchemaManager
+from src.utils.schema_manager import get_schema_manager, register_schema_change_listener
 from src.utils.llm_engine import LLMEngine
+from src.utils.intent_classifier import IntentClassifier, INTENTS
+from src.utils.table_index import TableIndex
+from src.utils.workspace_index import WorkspaceIndex
+from config.config import (
+    INTENT_CLASSIFIER_ENABLED, INTENT_CLASSIFIER_THRESHOLD, INTENT_CLASSIFIER_MARGIN, WORKSPACE_INDEX_ENABLED,
+    WORKSPACE_INDEX_CENTROID_WEIGHT, WORKSPACE_INDEX_MARGIN, WORKSPACE_INDEX_MIN_SCORE,
+    WORKSPACE_INDEX_TABLE_MARGIN, WORKSPACE_INDEX_PROMPT_TABLES
+)
 from azure.ai.inference.models import SystemMessage, UserMessage
 import logging
 import time
@@ -8,45 +16,168 @@ import json
 class IntentAgent:
     """Agent for detecting the intent of user's natural language query"""
     
-    def __init__(self):
-        """Initialize the intent agent"""
+    def __init__(self, feedback_manager=None, table_index=None):
+        """Initialize the intent agent
+        
+        Args:
+            feedback_manager (FeedbackManager, optional): Source of positive feedback questions
+                                                          used to train the intent classifier
+            table_index (TableIndex, optional): Table index to rank workspaces with, shared with
+                                                the table agent; a new one is built if omitted
+        """
         self.llm_engine = LLMEngine()
-        self.schema_manager = SchemaManager()
+        self.schema_manager = get_schema_manager()
+        self.feedback_manager = feedback_manager
         self.logger = logging.getLogger('text2sql.agents.intent')
         
+        # Local classifier that answers confident cases without an LLM call
+        self.intent_classifier = None
+        if INTENT_CLASSIFIER_ENABLED:
+            self.intent_classifier = IntentClassifier(
+                embed_many=self.llm_engine.generate_embeddings,
+                feedback_loader=self._load_feedback_queries if feedback_manager else None
+            )
+            # Train at startup so the first request does not wait for it
+            self.intent_classifier.start_training()
+        
+        # Precomputed workspace embeddings that route clear cases without an LLM call
+        self.workspace_index = None
+        if WORKSPACE_INDEX_ENABLED:
+            if table_index is None:
+                table_index = TableIndex(self.schema_manager, self.llm_engine.generate_embeddings)
+                register_schema_change_listener(table_index.invalidate)
+            self.workspace_index = WorkspaceIndex(
+                table_index,
+                centroid_weight=WORKSPACE_INDEX_CENTROID_WEIGHT,
+                top_tables=WORKSPACE_INDEX_PROMPT_TABLES
+            )
+        
+    def _load_feedback_queries(self, limit):
+        """Get the questions of positive feedback samples for classifier training
+        
+        Args:
+            limit (int): Maximum number of questions
+            
+        Returns:
+            list: Query texts
+        """
+        samples, _ = self.feedback_manager.get_samples(page=1, limit=limit)
+        return [sample['query_text'] for sample in samples if sample.get('query_text')]
+        
     def detect_intent(self, query):
         """Detect the intent of a natural language query
         
+        The local classifier is tried first; the LLM is only asked when the
+        classifier's confidence is below INTENT_CLASSIFIER_THRESHOLD. Queries
+        default to data_retrieval: another intent must lead it by at least
+        INTENT_CLASSIFIER_MARGIN, and data_retrieval is used while the
+        classifier is still training.
+        
         Args:
             query (str): The natural language query from the user
             
         Returns:
-            dict: Dictionary with intent classification and confidence score
+            dict: Dictionary with intent classification, confidence score and the source of the decision
         """
         start_time = time.time()
         self.logger.info(f"Intent detection started for query: '{query}'")
         
-        # Define possible intents
-        intent_types = [
-            "data_retrieval",     # User wants to retrieve data (generate SQL query)
-            "schema_exploration", # User wants to explore database schema
-            "metadata_request",   # User wants information about the database itself
-            "general_question"    # General question not related to SQL generation
-        ]
+        if not self.intent_classifier:
+            # Default to data_retrieval intent without calling LLM
+            self.logger.info("Using default intent 'data_retrieval' without calling LLM")
+            return {"intent": "data_retrieval", "confidence": 1.0, "source": "default"}
         
-        # Default to data_retrieval intent without calling LLM
-        self.logger.info("Using default intent 'data_retrieval' without calling LLM")
-        result = {"intent": "data_retrieval", "confidence": 1.0}
+        prediction = None
+        try:
+            prediction = self.intent_classifier.classify(query)
+        except Exception as e:
+            self.logger.error(f"Intent classifier error: {str(e)}", exc_info=True)
+            
+        if prediction is None:
+            result = {"intent": "data_retrieval", "confidence": 1.0, "source": "default"}
+        elif (prediction["intent"] != "data_retrieval" and
+              prediction["confidence"] - prediction["scores"]["data_retrieval"] < INTENT_CLASSIFIER_MARGIN):
+            self.logger.info(f"Classifier prefers {prediction['intent']} without a clear lead, using data_retrieval")
+            result = {"intent": "data_retrieval", "confidence": prediction["scores"]["data_retrieval"],
+                      "source": "classifier"}
+        elif prediction["confidence"] >= INTENT_CLASSIFIER_THRESHOLD:
+            result = {"intent": prediction["intent"], "confidence": prediction["confidence"], "source": "classifier"}
+        else:
+            self.logger.info(f"Classifier unsure ({prediction['intent']}, {prediction['confidence']:.2f}), asking the LLM")
+            result = self._detect_intent_with_llm(query, prediction)
+            
         processing_time = time.time() - start_time
-        self.logger.info(f"Intent detection completed in {processing_time:.2f}s")
+        self.logger.info(f"Intent detection completed in {processing_time:.2f}s: {result['intent']} "
+                         f"({result['confidence']:.2f}, {result['source']})")
         return result
         
-    def determine_relevant_workspaces(self, query, workspaces):
+    def _detect_intent_with_llm(self, query, prediction=None):
+        """Ask the LLM for the intent of a query
+        
+        Args:
+            query (str): The natural language query from the user
+            prediction (dict, optional): The classifier's low-confidence guess, used if the LLM fails
+            
+        Returns:
+            dict: Dictionary with intent classification, confidence score and source
+        """
+        messages = [
+            SystemMessage("""You are an intent classification agent for a Text-to-SQL system.
+Classify the user query into exactly one of these intents:
+- data_retrieval: the user wants data from the database (a SQL query is needed)
+- schema_exploration: the user asks about tables, columns or relationships
+- metadata_request: the user asks about the database itself (size, counts, sources)
+- general_question: anything not related to the database
+Return ONLY the intent name, with no other text."""),
+            UserMessage(f"User query: {query}")
+        ]
+        
+        try:
+            raw_response = self.llm_engine.generate_completion(messages, log_prefix="INTENT")
+            intent = raw_response.strip().strip('."\'').lower()
+            if intent in INTENTS:
+                return {"intent": intent, "confidence": 1.0, "source": "llm"}
+            self.logger.warning(f"LLM returned an unknown intent: '{raw_response}'")
+        except Exception as e:
+            self.logger.error(f"LLM intent detection error: {str(e)}", exc_info=True)
+            
+        if prediction:
+            return {"intent": prediction["intent"], "confidence": prediction["confidence"], "source": "classifier"}
+        return {"intent": "data_retrieval", "confidence": 1.0, "source": "default"}
+        
+    def _rank_workspaces(self, query, workspaces):
+        """Rank workspaces by embedding similarity to the query
+        
+        Args:
+            query (str): The natural language query from the user
+            workspaces (list): List of workspace dictionaries
+            
+        Returns:
+            list or None: Workspaces as {'name', 'score', 'centroid_score', 'tables'} sorted by score,
+                          None if unavailable
+        """
+        if not self.workspace_index:
+            return None
+        try:
+            query_vectors = self.llm_engine.generate_embeddings([query])
+            if query_vectors is None:
+                return None
+            return self.workspace_index.rank(query_vectors[0], [w["name"] for w in workspaces])
+        except Exception as e:
+            self.logger.warning(f"Workspace ranking failed, asking the LLM with all workspaces: {str(e)}")
+            return None
+        
+    def determine_relevant_workspaces(self, query, workspaces, trace=None):
         """Determine which workspace(s) are relevant for the user's query
         
+        Workspaces are first ranked by embedding similarity. A clear winner is
+        returned directly; otherwise the LLM chooses among the closest
+        workspaces, seeing only their best matching tables.
+        
         Args:
             query (str): The natural language query from the user
             workspaces (list): List of workspace dictionaries
+            trace (dict, optional): Filled with the workspace ranking for the step trace
             
         Returns:
             list: List of relevant workspace names
@@ -65,10 +196,49 @@ class IntentAgent:
             self.logger.info(f"Only one workspace available, selecting: {workspace_name}")
             return [workspace_name]
         
+        candidates = workspaces
+        ranked_tables = None
+        ranking = self._rank_workspaces(query, workspaces)
+        if ranking:
+            if trace is not None:
+                trace["ranking"] = [
+                    {"name": w["name"], "score": w["score"], "tables": [t["name"] for t in w["tables"]]}
+                    for w in ranking
+                ]
+            self.logger.info("Workspace ranking: " + ", ".join(f"{w['name']} ({w['score']:.3f})" for w in ranking))
+            
+            # Workspaces with a table matching about as well as the leader's best table may be
+            # needed too, since a question can span workspaces
+            top_score = ranking[0]["score"]
+            top_table_score = ranking[0]["tables"][0]["score"] if ranking[0]["tables"] else 0.0
+            rivals = [w["name"] for w in ranking[1:]
+                      if w["tables"] and top_table_score - w["tables"][0]["score"] < WORKSPACE_INDEX_TABLE_MARGIN]
+            
+            # A workspace that clearly leads the others without rivals is selected without asking the LLM
+            if (top_score >= WORKSPACE_INDEX_MIN_SCORE and top_score - ranking[1]["score"] >= WORKSPACE_INDEX_MARGIN
+                    and not rivals):
+                result = [ranking[0]["name"]]
+                if trace is not None:
+                    trace["skipped_llm"] = True
+                processing_time = time.time() - start_time
+                self.logger.info(f"Workspace selection completed in {processing_time:.2f}s without LLM. Selected: {result[0]}")
+                return result
+            
+            # Ambiguous: only the workspaces close to the top compete, unless none scored well
+            if top_score >= WORKSPACE_INDEX_MIN_SCORE:
+                workspaces_by_name = {w["name"]: w for w in workspaces}
+                candidates = [workspaces_by_name[w["name"]] for w in ranking
+                              if top_score - w["score"] < WORKSPACE_INDEX_MARGIN or w["name"] in rivals]
+                self.logger.info(f"Narrowed workspace candidates to {len(candidates)} of {len(workspaces)}")
+            ranked_tables = {w["name"]: set(t["name"] for t in w["tables"]) for w in ranking}
+        
         # Get table information for each workspace for better context
         workspace_info = []
-        for workspace in workspaces:
+        for workspace in candidates:
             tables = self.schema_manager.get_tables(workspace["name"])
+            if ranked_tables is not None:
+                # List only the tables that best match the query
+                tables = [t for t in tables if t["name"] in ranked_tables.get(workspace["name"], ())]
             table_info = []
             for table in tables:
                 table_info.append(f"- {table['name']}: {table.get('description', 'No description')}")
@@ -104,7 +274,7 @@ Do not include any other text in your response."""),
             workspace_names = [w.strip() for w in workspace_names]
             
             # Validate the workspace names
-            valid_names = set(w["name"] for w in workspaces)
+            valid_names = set(w["name"] for w in candidates)
             original_count = len(workspace_names)
             workspace_names = [w for w in workspace_names if w in valid_names]
             filtered_count = len(workspace_names)
@@ -114,7 +284,7 @@ Do not include any other text in your response."""),
             
             if not workspace_names:
                 self.logger.warning("No valid workspaces selected, defaulting to first workspace")
-                result = [workspaces[0]["name"]]
+                result = [candidates[0]["name"]]
             else:
                 result = workspace_names
             
@@ -126,7 +296,7 @@ Do not include any other text in your response."""),
             processing_time = time.time() - start_time
             self.logger.error(f"Workspace selection error after {processing_time:.2f}s: {str(e)}", exc_info=True)
             # Default to first workspace on error
-            result = [workspaces[0]["name"]]
+            result = [candidates[0]["name"]]
             self.logger.warning(f"Defaulting to first workspace due to error: {result[0]}")
             return result
             
@@ -1,5 +1,10 @@
-from src.utils.schema_manager import SchemaManager
+from src.utils.schema_manager import get_schema_manager, register_schema_change_listener
 from src.utils.llm_engine import LLMEngine
+from src.utils.table_index import TableIndex
+from config.config import (
+    TABLE_INDEX_ENABLED, TABLE_INDEX_TOP_K, TABLE_INDEX_CONFIDENCE_MODE,
+    TABLE_INDEX_DOMINANCE_MARGIN, TABLE_INDEX_MIN_SCORE
+)
 from azure.ai.inference.models import SystemMessage, UserMessage
 import logging
 import time
@@ -11,15 +16,41 @@ class TableAgent:
     def __init__(self):
         """Initialize the table agent"""
         self.llm_engine = LLMEngine()
-        self.schema_manager = SchemaManager()
+        self.schema_manager = get_schema_manager()
         self.logger = logging.getLogger('text2sql.agents.table')
+        self.table_index = None
+        if TABLE_INDEX_ENABLED:
+            self.table_index = TableIndex(self.schema_manager, self.llm_engine.generate_embeddings)
+            register_schema_change_listener(self.table_index.invalidate)
+    
+    def _rank_tables(self, query, workspace_name=None):
+        """Rank workspace tables by embedding similarity to the query
+        
+        Args:
+            query (str): The natural language query from the user
+            workspace_name (str, optional): Name of workspace to rank tables from
+            
+        Returns:
+            list or None: Tables as {'name', 'score'} sorted by score, None if unavailable
+        """
+        if not self.table_index:
+            return None
+        try:
+            query_vectors = self.llm_engine.generate_embeddings([query])
+            if query_vectors is None:
+                return None
+            return self.table_index.rank(query_vectors[0], workspace_name)
+        except Exception as e:
+            self.logger.warning(f"Table pre-retrieval failed, using all tables: {str(e)}")
+            return None
         
-    def get_relevant_tables(self, query, workspace_name=None):
+    def get_relevant_tables(self, query, workspace_name=None, trace=None):
         """Identify tables that are relevant to the user's query
         
         Args:
             query (str): The natural language query from the user
             workspace_name (str, optional): Name of workspace to search in
+            trace (dict, optional): Filled with the embedding shortlist for the step trace
             
         Returns:
             list: List of relevant table names
@@ -42,6 +73,35 @@ class TableAgent:
             self.logger.info(f"Less than or equal to 3 tables available, returning all: {', '.join(table_names)}")
             return table_names
             
+        # Narrow the candidates to the top-K tables by embedding similarity
+        ranking = self._rank_tables(query, workspace_name)
+        if ranking:
+            shortlist = ranking[:TABLE_INDEX_TOP_K]
+            if trace is not None:
+                trace["shortlist"] = shortlist
+                trace["total_tables"] = len(all_tables)
+            self.logger.info("Table shortlist: " + ", ".join(f"{t['name']} ({t['score']:.3f})" for t in shortlist))
+            
+            # Confidence mode: one table clearly dominates, no need to ask the LLM
+            runner_up_score = ranking[1]["score"] if len(ranking) > 1 else 0.0
+            if (TABLE_INDEX_CONFIDENCE_MODE
+                    and ranking[0]["score"] >= TABLE_INDEX_MIN_SCORE
+                    and ranking[0]["score"] - runner_up_score >= TABLE_INDEX_DOMINANCE_MARGIN):
+                result = [ranking[0]["name"]]
+                if trace is not None:
+                    trace["skipped_llm"] = True
+                processing_time = time.time() - start_time
+                self.logger.info(f"Table selection completed in {processing_time:.2f}s without LLM. Selected: {result[0]}")
+                return result
+            
+            if len(all_tables) > TABLE_INDEX_TOP_K:
+                # The schema may have reloaded since get_tables; skip names it no longer has
+                tables_by_name = {t["name"]: t for t in all_tables}
+                narrowed = [tables_by_name[t["name"]] for t in shortlist if t["name"] in tables_by_name]
+                if narrowed:
+                    all_tables = narrowed
+                    self.logger.info(f"Narrowed table candidates to top {len(all_tables)} of {len(table_names)}")
+            
         # Format tables with descriptions for better context
         tables_info = []
         for table in all_tables:
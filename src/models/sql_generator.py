@@ -3,8 +3,14 @@ from src.agents.table_agent import TableAgent
 from src.agents.column_agent import ColumnAgent
 from src.utils.azure_client import AzureAIClient
 from src.utils.database import DatabaseManager
-from src.utils.schema_manager import SchemaManager
+from src.utils.schema_manager import get_schema_manager, register_schema_change_listener
 from src.utils.feedback_manager import FeedbackManager
+from src.utils.stage_executor import StageExecutor
+from src.utils.semantic_cache import SemanticQueryCache
+from config.config import (
+    SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_TTL, SEMANTIC_CACHE_REEXECUTE
+)
 import logging
 import time
 class SQLGenerationManager:
@@ -12,16 +18,28 @@ class SQLGenerationManager:
     
     def __init__(self):
         """Initialize the SQL Generation Manager"""
-        self.intent_agent = IntentAgent()
+        self.feedback_manager = FeedbackManager()
         self.table_agent = TableAgent()
+        self.intent_agent = IntentAgent(feedback_manager=self.feedback_manager, table_index=self.table_agent.table_index)
         self.column_agent = ColumnAgent()
         self.ai_client = AzureAIClient()
         self.db_manager = DatabaseManager()
-        self.schema_manager = SchemaManager()
-        self.feedback_manager = FeedbackManager()
+        self.schema_manager = get_schema_manager()
         self.logger = logging.getLogger('text2sql.sql_generator')
         
-    def process_query(self, query, workspaces=None, explicit_tables=None, progress_callback=None):
+        # Semantic answer cache, invalidated whenever the schema or join conditions are saved
+        self.semantic_cache = None
+        if SEMANTIC_CACHE_ENABLED:
+            self.semantic_cache = SemanticQueryCache(
+                embed_func=self.ai_client.llm_engine.generate_embedding,
+                threshold=SEMANTIC_CACHE_THRESHOLD,
+                max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+                ttl_seconds=SEMANTIC_CACHE_TTL
+            )
+            register_schema_change_listener(self.semantic_cache.invalidate)
+        
+    def process_query(self, query, workspaces=None, explicit_tables=None, progress_callback=None,
+                      result_owner=None):
         """Process a natural language query through the full pipeline
         
         Args:
@@ -29,6 +47,7 @@ class SQLGenerationManager:
             workspaces (list, optional): List of workspace dictionaries
             explicit_tables (list, optional): List of tables explicitly selected by the user
             progress_callback (callable, optional): Callback function for progress updates
+            result_owner (optional): ID of the user allowed to page through a truncated result
             
         Returns:
             dict: Processing results including SQL, explanation, and charts
@@ -67,8 +86,16 @@ class SQLGenerationManager:
         
         # Step 2: Process based on intent
         if intent == "data_retrieval":
-            # For data retrieval, go through full SQL generation pipeline
-            sql_result = self._generate_sql(query, workspaces, explicit_tables, progress_callback)
+            # For data retrieval, reuse the SQL of a near-duplicate question if one is cached,
+            # otherwise go through full SQL generation pipeline
+            # (the question is embedded at most once for both the lookup and storing the answer)
+            cache_question = self.semantic_cache.question(query) if self.semantic_cache else None
+            sql_result = self._get_cached_sql(cache_question, workspaces, explicit_tables, progress_callback,
+                                              result_owner)
+            if sql_result is None:
+                sql_result = self._generate_sql(query, workspaces, explicit_tables, progress_callback,
+                                                result_owner)
+                self._cache_sql(cache_question, workspaces, explicit_tables, sql_result)
             response.update(sql_result)
             
         elif intent == "schema_exploration":
@@ -125,7 +152,108 @@ class SQLGenerationManager:
         self.logger.info(f"Query processing completed in {processing_time:.2f}s")
         return response
         
-    def _generate_sql(self, query, workspaces=None, explicit_tables=None, progress_callback=None):
+    def _cache_scope(self, workspaces=None, explicit_tables=None):
+        """Build the semantic cache partition key for a request
+        
+        Args:
+            workspaces (list, optional): List of workspace dictionaries
+            explicit_tables (list, optional): List of tables explicitly selected by the user
+            
+        Returns:
+            tuple: Hashable scope of sorted workspace names and explicit tables
+        """
+        workspace_names = tuple(sorted(w["name"] for w in workspaces or []))
+        return workspace_names, tuple(sorted(explicit_tables or []))
+    
+    def _get_cached_sql(self, cache_question, workspaces=None, explicit_tables=None, progress_callback=None,
+                        result_owner=None):
+        """Answer a data retrieval query from the semantic cache
+        
+        Args:
+            cache_question (CacheQuestion): The natural language query prepared by the semantic cache
+            workspaces (list, optional): List of workspace dictionaries
+            explicit_tables (list, optional): List of tables explicitly selected by the user
+            progress_callback (callable, optional): Callback function for progress updates
+            result_owner (optional): ID of the user allowed to page through a truncated result
+            
+        Returns:
+            dict or None: SQL generation results on a cache hit, None on a miss
+        """
+        if not self.semantic_cache:
+            return None
+        
+        cached = self.semantic_cache.lookup(
+            cache_question,
+            self._cache_scope(workspaces, explicit_tables),
+            self.schema_manager.get_schema_version()
+        )
+        if not cached:
+            return None
+        
+        result = {
+            "sql": cached["sql"],
+            "explanation": cached["explanation"],
+            "error": None,
+            "steps": [],
+            "chart_data": None
+        }
+        
+        step_info = {
+            "step": "semantic_cache",
+            "description": "Reusing SQL from a similar previous question",
+            "result": f"Matched '{cached['cached_question']}' (similarity {cached['similarity']:.4f})"
+        }
+        result["steps"].append(step_info)
+        if progress_callback:
+            progress_callback(step_info)
+        
+        if SEMANTIC_CACHE_REEXECUTE:
+            # Re-run the cached SQL for fresh data, reusing the earlier dashboard analysis
+            if not self.db_manager.connect():
+                result["error"] = "Could not connect to database."
+                return result
+            self._execute_sql(cache_question.text, result, progress_callback,
+                              dashboard_recommendations=cached.get("dashboard_recommendations"),
+                              workspace_name=cached.get("workspace_name"), result_owner=result_owner)
+        else:
+            result["chart_data"] = cached.get("chart_data")
+        
+        return result
+    
+    def _cache_sql(self, cache_question, workspaces, explicit_tables, sql_result):
+        """Store a successful SQL generation result in the semantic cache
+        
+        Args:
+            cache_question (CacheQuestion): The natural language query prepared by the semantic cache
+            workspaces (list): List of workspace dictionaries
+            explicit_tables (list): List of tables explicitly selected by the user
+            sql_result (dict): SQL generation results
+        """
+        if not self.semantic_cache or sql_result.get("error") or not sql_result.get("sql"):
+            return
+        
+        chart_data = sql_result.get("chart_data") or {}
+        answer = {
+            "sql": sql_result["sql"],
+            "explanation": sql_result.get("explanation", ""),
+            "dashboard_recommendations": chart_data.get("dashboard_recommendations"),
+            "workspace_name": sql_result.get("workspace_name")
+        }
+        if not SEMANTIC_CACHE_REEXECUTE:
+            if chart_data.get("truncated"):
+                # The handle of a truncated result belongs to the user who ran the query
+                return
+            answer["chart_data"] = sql_result.get("chart_data")
+        
+        self.semantic_cache.store(
+            cache_question,
+            self._cache_scope(workspaces, explicit_tables),
+            self.schema_manager.get_schema_version(),
+            answer
+        )
+    
+    def _generate_sql(self, query, workspaces=None, explicit_tables=None, progress_callback=None,
+                      result_owner=None):
         """Generate SQL for a data retrieval query
         
         Args:
@@ -133,6 +261,7 @@ class SQLGenerationManager:
             workspaces (list, optional): List of workspace dictionaries
             explicit_tables (list, optional): List of tables explicitly selected by the user
             progress_callback (callable, optional): Callback function for progress updates
+            result_owner (optional): ID of the user allowed to page through a truncated result
             
         Returns:
             dict: SQL generation results
@@ -148,133 +277,147 @@ class SQLGenerationManager:
             "chart_data": None
         }
         
-        # Step 1: Connect to database for query execution
-        if not self.db_manager.connect():
-            result["error"] = "Could not connect to database."
-            return result
-            
-        # Step 2: Determine relevant workspace(s)
-        workspace_name = None
-        if workspaces:
-            if len(workspaces) > 1:
-                relevant_workspace_names = self.intent_agent.determine_relevant_workspaces(query, workspaces)
-                workspace_name = relevant_workspace_names[0] if relevant_workspace_names else None
-                
+        # Independent stages (database connection, feedback retrieval) start
+        # concurrently; dependent stages are scheduled as soon as their inputs
+        # are ready. The LLM stages wait for the database connection so a failed
+        # connection does not spend LLM calls. Results are joined below in
+        # pipeline order so the step trace keeps its familiar sequence.
+        workspace_trace = {}
+        table_trace = {}
+
+        def connect():
+            if not self.db_manager.connect():
+                raise ConnectionError("Could not connect to database.")
+            return True
+
+        stages = StageExecutor(log_prefix="SQLGEN")
+        stages.add("db_connect", connect)
+        stages.add("workspace_selection",
+                   lambda db_connect: self._select_workspace(query, workspaces, workspace_trace),
+                   depends_on=["db_connect"])
+        stages.add("feedback_search",
+                   lambda: self.feedback_manager.find_similar_queries_with_reranking(query, limit=1))
+        stages.add("table_selection",
+                   lambda workspace_selection: self._select_tables(
+                       query, workspace_selection[0], explicit_tables, table_trace),
+                   depends_on=["workspace_selection"])
+        stages.add("schema_preparation",
+                   lambda workspace_selection, table_selection: self.column_agent.prune_columns(
+                       query, table_selection, workspace_selection[0]) if table_selection else "",
+                   depends_on=["workspace_selection", "table_selection"])
+        stages.add("join_conditions",
+                   lambda workspace_selection, table_selection: self.schema_manager.get_join_conditions(
+                       table_selection, workspace_selection[0]) if len(table_selection) > 1 else [],
+                   depends_on=["workspace_selection", "table_selection"])
+        stages.add("examples",
+                   lambda workspace_selection, table_selection, join_conditions: self._build_examples(
+                       table_selection, join_conditions, workspace_selection[0]),
+                   depends_on=["workspace_selection", "table_selection", "join_conditions"])
+
+        try:
+            # Step 1: Connect to database for query execution
+            try:
+                stages.result("db_connect")
+            except ConnectionError as e:
+                stages.cancel_pending()
+                result["error"] = str(e)
+                return result
+
+            # Step 2: Determine relevant workspace(s)
+            workspace_name, relevant_workspace_names = stages.result("workspace_selection")
+            result["workspace_name"] = workspace_name
+            if relevant_workspace_names is not None:
                 step_info = {
                     "step": "workspace_selection",
                     "description": "Selecting relevant workspace(s)",
                     "result": ", ".join(relevant_workspace_names)
                 }
+                if workspace_trace.get("ranking"):
+                    # Expose the similarity ranking so the routing thresholds can be tuned
+                    ranking = workspace_trace["ranking"]
+                    step_info["ranking"] = ranking
+                    step_info["result"] += (
+                        f"\nRanking{' (LLM skipped)' if workspace_trace.get('skipped_llm') else ''}: "
+                        + ", ".join(f"{w['name']} ({w['score']:.3f})" for w in ranking)
+                    )
                 result["steps"].append(step_info)
                 if progress_callback:
                     progress_callback(step_info)
-            else:
-                workspace_name = workspaces[0]["name"]
-        
-        # Step 3: Select relevant tables - either from user selection or using Table Agent
-        if explicit_tables and len(explicit_tables) > 0:
-            # If user explicitly selected tables, use those
-            relevant_tables = explicit_tables
-            
+
+            # Step 3: Select relevant tables - either from user selection or using Table Agent
+            relevant_tables = stages.result("table_selection")
             step_info = {
                 "step": "table_selection",
-                "description": "Using explicitly selected tables",
+                "description": ("Using explicitly selected tables" if explicit_tables
+                                else "Automatically selecting relevant tables"),
                 "result": ", ".join(relevant_tables)
             }
+            if table_trace.get("shortlist"):
+                # Expose the embedding shortlist so the top-K setting can be tuned
+                shortlist = table_trace["shortlist"]
+                step_info["shortlist"] = shortlist
+                step_info["result"] += (
+                    f"\nShortlist (top {len(shortlist)} of {table_trace['total_tables']} tables"
+                    f"{', LLM skipped' if table_trace.get('skipped_llm') else ''}): "
+                    + ", ".join(f"{t['name']} ({t['score']:.3f})" for t in shortlist)
+                )
             result["steps"].append(step_info)
             if progress_callback:
                 progress_callback(step_info)
-        else:
-            # Otherwise use the TableAgent to determine relevant tables
-            relevant_tables = self.table_agent.get_relevant_tables(query, workspace_name)
-            
+
+            if not relevant_tables:
+                stages.cancel_pending()
+                result["error"] = "Could not identify relevant tables for the query"
+                return result
+
+            # Step 4: Get detailed schema for selected tables with column pruning
+            pruned_schema = stages.result("schema_preparation")
+
             step_info = {
-                "step": "table_selection",
-                "description": "Automatically selecting relevant tables",
-                "result": ", ".join(relevant_tables)
+                "step": "schema_preparation",
+                "description": "Selecting relevant columns",
+                "result": pruned_schema
             }
             result["steps"].append(step_info)
             if progress_callback:
                 progress_callback(step_info)
-        
-        if not relevant_tables:
-            result["error"] = "Could not identify relevant tables for the query"
-            return result
-        
-        # Step 4: Get detailed schema for selected tables with column pruning
-        pruned_schema = self.column_agent.prune_columns(query, relevant_tables, workspace_name)
-        
-        step_info = {
-            "step": "schema_preparation",
-            "description": "Selecting relevant columns",
-            "result": pruned_schema
-        }
-        result["steps"].append(step_info)
-        if progress_callback:
-            progress_callback(step_info)
 
-        # Step 5: Get join conditions if multiple tables involved
-        join_conditions = []
-        if len(relevant_tables) > 1:
-            join_conditions = self.schema_manager.get_join_conditions(relevant_tables, workspace_name)
-            
-            if join_conditions:
-                join_info = "\n".join([
-                    f"- Join between {join['left_table']} and {join['right_table']}: "
-                    f"{join['join_type']} JOIN on {join['condition']}"
-                    for join in join_conditions
-                ])
-                
-                step_info = {
-                    "step": "join_conditions",
-                    "description": "Identifying table join conditions",
-                    "result": join_info
-                }
-                result["steps"].append(step_info)
-                if progress_callback:
-                    progress_callback(step_info)
-                    
-                self.logger.info(f"Found {len(join_conditions)} join conditions for the relevant tables")
-            else:
-                self.logger.info("No pre-defined join conditions found for the selected tables")
-        
-        # Step 6: Get example queries
-        first_table = relevant_tables[0] if relevant_tables else None
-        examples = []
-        if first_table:
-            table_info = self.schema_manager.get_table_by_name(first_table, workspace_name)
-            if table_info:
-                # Generate examples based on table structure
-                examples = [
-                    {
-                        "question": f"How many records are in the {first_table} table?",
-                        "sql": f"SELECT COUNT(*) AS record_count FROM {first_table}"
-                    },
-                    {
-                        "question": f"Get all columns from {first_table}",
-                        "sql": f"SELECT * FROM {first_table} LIMIT 5"
+            # Step 5: Get join conditions if multiple tables involved
+            join_conditions = stages.result("join_conditions")
+            if len(relevant_tables) > 1:
+                if join_conditions:
+                    join_info = "\n".join([
+                        f"- Join between {join['left_table']} and {join['right_table']}: "
+                        f"{join['join_type']} JOIN on {join['condition']}"
+                        for join in join_conditions
+                    ])
+
+                    step_info = {
+                        "step": "join_conditions",
+                        "description": "Identifying table join conditions",
+                        "result": join_info
                     }
-                ]
-                
-                # Add example with primary key if available
-                primary_keys = [col["name"] for col in table_info["columns"] if col.get("is_primary_key")]
-                if primary_keys:
-                    pk = primary_keys[0]
-                    examples.append({
-                        "question": f"Get record from {first_table} by {pk}",
-                        "sql": f"SELECT * FROM {first_table} WHERE {pk} = 1"
-                    })
-                    
-                # Add join example if we have join conditions
-                if join_conditions and len(relevant_tables) > 1:
-                    join_example = self.generate_join_example(join_conditions[0], workspace_name)
-                    if join_example:
-                        examples.append(join_example)
-                        
-        # Step 6b: Find similar successful queries from feedback database using reranking
-        # First get top 10 candidates with vector search, then rerank them to get top 2
-        similar_queries = self.feedback_manager.find_similar_queries_with_reranking(query, limit=1)
-        
+                    result["steps"].append(step_info)
+                    if progress_callback:
+                        progress_callback(step_info)
+
+                    self.logger.info(f"Found {len(join_conditions)} join conditions for the relevant tables")
+                else:
+                    self.logger.info("No pre-defined join conditions found for the selected tables")
+
+            # Step 6: Get example queries
+            examples = stages.result("examples")
+
+            # Step 6b: Find similar successful queries from feedback database using reranking
+            # (vector search + rerank ran concurrently with the stages above)
+            similar_queries = stages.result("feedback_search")
+        except Exception:
+            stages.cancel_pending()
+            raise
+
+        self.logger.info("Pipeline stage timings: " +
+                         ", ".join(f"{name}={duration:.2f}s" for name, duration in stages.timings.items()))
+
         if similar_queries:
             # Add these as high-quality examples for the AI model
             self.logger.info(f"Found {len(similar_queries)} similar queries with reranking")
@@ -318,107 +461,49 @@ class SQLGenerationManager:
         
         # Step 8: Execute SQL if present and generate chart data
         if result["sql"]:
-            try:
-                query_result = self.db_manager.execute_query(result["sql"])
-                
-                if query_result["success"]:
-                    if query_result["data"] is not None:
-                        # Generate chart data if we have results
-                        data_df = query_result["data"]
-                        result["chart_data"] = {
-                            "columns": query_result["columns"],
-                            "data": data_df.to_dict(orient="records"),
-                            "row_count": query_result["row_count"]
-                        }
-                        
-                        # Create execution step info
-                        step_info = {
-                            "step": "query_execution",
-                            "description": "Executing SQL query",
-                            "result": f"Query returned {query_result['row_count']} rows"
-                        }
-                        
-                        # Add the step info
-                        result["steps"].append(step_info)
-                        if progress_callback:
-                            progress_callback(step_info)
-                        
-                        # Step 9: Analyze query results for dashboard potential as a separate step
-                        if query_result["row_count"] > 0:
-                            self.logger.info("Analyzing query results for dashboard potential")
-                            try:
-                                # Get a sample of data for analysis (up to 5 rows)
-                                data_sample = result["chart_data"]["data"][:5]
-                                
-                                # Call AI to analyze dashboard potential
-                                dashboard_analysis = self.ai_client.analyze_for_dashboard(
-                                    query=query, 
-                                    sql=result["sql"],
-                                    columns=query_result["columns"],
-                                    data_sample=data_sample
-                                )
-                                
-                                # Add dashboard recommendations to result
-                                result["chart_data"]["dashboard_recommendations"] = dashboard_analysis
-                                
-                                # Create dashboard analysis step info
-                                dashboard_suitable = dashboard_analysis.get('is_suitable', False)
-                                self.logger.info(f"Dashboard analysis completed: suitable={dashboard_suitable}")
-                                
-                                step_result = "Data is suitable for visualization\n" if dashboard_suitable else "Data is not suitable for visualization"
-                                if dashboard_suitable:
-                                    chart_type = dashboard_analysis.get('chart_type', '')
-                                    step_result += f" - Recommended chart type: {chart_type}\n"
-                                    step_result += f" - Recommended x axis: {dashboard_analysis.get('x_axis','').get('column', '')}\n"
-                                    step_result += f" - Recommended y axis: {dashboard_analysis.get('y_axis','').get('column', '')}"
-                                
-                                dashboard_step_info = {
-                                    "step": "dashboard_analysis",
-                                    "description": "Analyzing data for dashboard potential",
-                                    "result": step_result
-                                }
-                                
-                                result["steps"].append(dashboard_step_info)
-                                if progress_callback:
-                                    progress_callback(dashboard_step_info)
-                                
-                            except Exception as e:
-                                self.logger.error(f"Error during dashboard analysis: {str(e)}")
-                                # Don't fail the whole query if dashboard analysis fails
-                                result["chart_data"]["dashboard_recommendations"] = {
-                                    "is_suitable": False,
-                                    "reason": f"Error during analysis: {str(e)}"
-                                }
-                                
-                                # Add error step for dashboard analysis
-                                error_step_info = {
-                                    "step": "dashboard_analysis",
-                                    "description": "Analyzing data for dashboard potential",
-                                    "result": f"Error: {str(e)}"
-                                }
-                                result["steps"].append(error_step_info)
-                                if progress_callback:
-                                    progress_callback(error_step_info)
-                        
-                    else:
-                        # Create execution step info for no rows
-                        step_info = {
-                            "step": "query_execution",
-                            "description": "Executing SQL query",
-                            "result": "Query executed successfully with no rows returned"
-                        }
-                        
-                        # Add the step info
-                        result["steps"].append(step_info)
-                        if progress_callback:
-                            progress_callback(step_info)
-                else:
-                    # Create execution step info for error
-                    result["error"] = query_result["error"]
+            self._execute_sql(query, result, progress_callback, workspace_name=workspace_name,
+                              result_owner=result_owner)
+        
+        processing_time = time.time() - start_time
+        self.logger.info(f"SQL generation completed in {processing_time:.2f}s")
+        return result
+    
+    def _execute_sql(self, query, result, progress_callback=None, dashboard_recommendations=None, workspace_name=None,
+                     result_owner=None):
+        """Execute the generated SQL and attach chart data and dashboard analysis to the result
+        
+        Args:
+            query (str): The natural language query
+            result (dict): SQL generation result holding the SQL; updated in place
+            progress_callback (callable, optional): Callback function for progress updates
+            dashboard_recommendations (dict, optional): Previous dashboard analysis to reuse
+            workspace_name (str, optional): Workspace whose database the SQL runs against
+            result_owner (optional): ID of the user allowed to page through a truncated result
+        """
+        try:
+            query_result = self.db_manager.execute_query(result["sql"], workspace_name=workspace_name,
+                                                         result_owner=result_owner)
+            
+            if query_result["success"]:
+                if query_result["data"] is not None:
+                    # Generate chart data if we have results
+                    data_df = query_result["data"]
+                    result["chart_data"] = {
+                        "columns": query_result["columns"],
+                        "data": data_df.to_dict(orient="records"),
+                        "row_count": query_result["row_count"],
+                        "truncated": query_result.get("truncated", False),
+                        "result_handle": query_result.get("result_handle")
+                    }
+                    
+                    # Create execution step info
+                    step_result = f"Query returned {query_result['row_count']} rows"
+                    if query_result.get("truncated"):
+                        step_result = f"Query returned more than {query_result['row_count']} rows, showing the first {query_result['row_count']}"
                     step_info = {
                         "step": "query_execution",
                         "description": "Executing SQL query",
-                        "result": f"Error: {query_result['error']}"
+                        "result": step_result
                     }
                     
                     # Add the step info
@@ -426,23 +511,188 @@ class SQLGenerationManager:
                     if progress_callback:
                         progress_callback(step_info)
                     
-            except Exception as e:
-                result["error"] = f"Error executing query: {str(e)}"
-                self.logger.error(f"Query execution error: {str(e)}", exc_info=True)
-                
-                # Add error step for exception
-                error_step_info = {
+                    # Reuse a previous dashboard analysis for the same SQL instead of asking the LLM again
+                    if dashboard_recommendations is not None:
+                        result["chart_data"]["dashboard_recommendations"] = dashboard_recommendations
+                    
+                    # Step 9: Analyze query results for dashboard potential as a separate step
+                    elif query_result["row_count"] > 0:
+                        self.logger.info("Analyzing query results for dashboard potential")
+                        try:
+                            # Get a sample of data for analysis (up to 5 rows)
+                            data_sample = result["chart_data"]["data"][:5]
+                            
+                            # Call AI to analyze dashboard potential
+                            dashboard_analysis = self.ai_client.analyze_for_dashboard(
+                                query=query, 
+                                sql=result["sql"],
+                                columns=query_result["columns"],
+                                data_sample=data_sample
+                            )
+                            
+                            # Add dashboard recommendations to result
+                            result["chart_data"]["dashboard_recommendations"] = dashboard_analysis
+                            
+                            # Create dashboard analysis step info
+                            dashboard_suitable = dashboard_analysis.get('is_suitable', False)
+                            self.logger.info(f"Dashboard analysis completed: suitable={dashboard_suitable}")
+                            
+                            step_result = "Data is suitable for visualization\n" if dashboard_suitable else "Data is not suitable for visualization"
+                            if dashboard_suitable:
+                                chart_type = dashboard_analysis.get('chart_type', '')
+                                step_result += f" - Recommended chart type: {chart_type}\n"
+                                step_result += f" - Recommended x axis: {dashboard_analysis.get('x_axis','').get('column', '')}\n"
+                                step_result += f" - Recommended y axis: {dashboard_analysis.get('y_axis','').get('column', '')}"
+                            
+                            dashboard_step_info = {
+                                "step": "dashboard_analysis",
+                                "description": "Analyzing data for dashboard potential",
+                                "result": step_result
+                            }
+                            
+                            result["steps"].append(dashboard_step_info)
+                            if progress_callback:
+                                progress_callback(dashboard_step_info)
+                            
+                        except Exception as e:
+                            self.logger.error(f"Error during dashboard analysis: {str(e)}")
+                            # Don't fail the whole query if dashboard analysis fails
+                            result["chart_data"]["dashboard_recommendations"] = {
+                                "is_suitable": False,
+                                "reason": f"Error during analysis: {str(e)}"
+                            }
+                            
+                            # Add error step for dashboard analysis
+                            error_step_info = {
+                                "step": "dashboard_analysis",
+                                "description": "Analyzing data for dashboard potential",
+                                "result": f"Error: {str(e)}"
+                            }
+                            result["steps"].append(error_step_info)
+                            if progress_callback:
+                                progress_callback(error_step_info)
+                    
+                else:
+                    # Create execution step info for no rows
+                    step_info = {
+                        "step": "query_execution",
+                        "description": "Executing SQL query",
+                        "result": "Query executed successfully with no rows returned"
+                    }
+                    
+                    # Add the step info
+                    result["steps"].append(step_info)
+                    if progress_callback:
+                        progress_callback(step_info)
+            else:
+                # Create execution step info for error
+                result["error"] = query_result["error"]
+                step_info = {
                     "step": "query_execution",
                     "description": "Executing SQL query",
-                    "result": f"Error: {str(e)}"
+                    "result": f"Error: {query_result['error']}"
                 }
-                result["steps"].append(error_step_info)
+                
+                # Add the step info
+                result["steps"].append(step_info)
                 if progress_callback:
-                    progress_callback(error_step_info)
+                    progress_callback(step_info)
+                
+        except Exception as e:
+            result["error"] = f"Error executing query: {str(e)}"
+            self.logger.error(f"Query execution error: {str(e)}", exc_info=True)
+            
+            # Add error step for exception
+            error_step_info = {
+                "step": "query_execution",
+                "description": "Executing SQL query",
+                "result": f"Error: {str(e)}"
+            }
+            result["steps"].append(error_step_info)
+            if progress_callback:
+                progress_callback(error_step_info)
+
+    def _select_workspace(self, query, workspaces=None, trace=None):
+        """Resolve the workspace to generate SQL against
         
-        processing_time = time.time() - start_time
-        self.logger.info(f"SQL generation completed in {processing_time:.2f}s")
-        return result
+        Args:
+            query (str): The natural language query
+            workspaces (list, optional): List of workspace dictionaries
+            trace (dict, optional): Filled with the intent agent's workspace ranking
+            
+        Returns:
+            tuple: (workspace name or None, list of relevant workspace names when routing was needed, else None)
+        """
+        if not workspaces:
+            return None, None
+        if len(workspaces) == 1:
+            return workspaces[0]["name"], None
+        
+        relevant_workspace_names = self.intent_agent.determine_relevant_workspaces(query, workspaces, trace=trace)
+        workspace_name = relevant_workspace_names[0] if relevant_workspace_names else None
+        return workspace_name, relevant_workspace_names
+    
+    def _select_tables(self, query, workspace_name=None, explicit_tables=None, trace=None):
+        """Select the tables to generate SQL against
+        
+        Args:
+            query (str): The natural language query
+            workspace_name (str, optional): Workspace to select tables from
+            explicit_tables (list, optional): List of tables explicitly selected by the user
+            trace (dict, optional): Filled with the table agent's shortlist details
+            
+        Returns:
+            list: List of relevant table names
+        """
+        if explicit_tables:
+            # If user explicitly selected tables, use those
+            return list(explicit_tables)
+        # Otherwise use the TableAgent to determine relevant tables
+        return self.table_agent.get_relevant_tables(query, workspace_name, trace=trace)
+    
+    def _build_examples(self, relevant_tables, join_conditions, workspace_name=None):
+        """Build example queries from the structure of the selected tables
+        
+        Args:
+            relevant_tables (list): List of relevant table names
+            join_conditions (list): Join conditions between the relevant tables
+            workspace_name (str, optional): Workspace name for context
+            
+        Returns:
+            list: Example queries with question and SQL
+        """
+        first_table = relevant_tables[0] if relevant_tables else None
+        examples = []
+        if first_table:
+            table_info = self.schema_manager.get_table_by_name(first_table, workspace_name)
+            if table_info:
+                # Generate examples based on table structure
+                examples = [
+                    {
+                        "question": f"How many records are in the {first_table} table?",
+                        "sql": f"SELECT COUNT(*) AS record_count FROM {first_table}"
+                    },
+                    {
+                        "question": f"Get all columns from {first_table}",
+                        "sql": f"SELECT * FROM {first_table} LIMIT 5"
+                    }
+                ]
+                
+                # Add example with primary key if available
+                primary_keys = [col["name"] for col in table_info["columns"] if col.get("is_primary_key")]
+                if primary_keys:
+                    pk = primary_keys[0]
+                    examples.append({
+                        "question": f"Get record from {first_table} by {pk}",
+                        "sql": f"SELECT * FROM {first_table} WHERE {pk} = 1"
+                    })
+                    
+                # Add join example if we have join conditions
+                if join_conditions and len(relevant_tables) > 1:
+                    join_example = self.generate_join_example(join_conditions[0], workspace_name)
+                    if join_example:
+                        examples.append(join_example)
+        return examples
     
     def generate_join_example(self, join_condition, workspace_name=None):
         """Generate an example query using the join condition
@@ -4,7 +4,8 @@ Handles database querying and browsing functionality.
 """
 
 from flask import Blueprint, render_template, jsonify, request, session
-from src.utils.database import DatabaseManager, get_db_session
+from src.utils.database import DatabaseManager, get_db_session, get_pool_stats
+from src.utils.result_cache import get_result_cache, sql_dialect
 from src.routes.auth_routes import admin_required
 from src.utils.user_manager import UserManager
 from sqlalchemy import text, inspect
@@ -33,6 +34,60 @@ def db_query_editor():
     
     return render_template('admin/db_query_editor.html')
 
+@admin_db_bp.route('/pool-stats')
+@admin_required
+def get_connection_pool_stats():
+    """Get connection pool statistics for the shared database engines"""
+    try:
+        return jsonify({'success': True, 'pools': get_pool_stats()})
+    except Exception as e:
+        logger.error(f"Error getting connection pool stats: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@admin_db_bp.route('/result-cache/stats')
+@admin_required
+def get_result_cache_stats():
+    """Get hit rate and saved execution time of the executed-SQL result cache"""
+    result_cache = get_result_cache()
+    if result_cache is None:
+        return jsonify({'success': True, 'enabled': False})
+    return jsonify({'success': True, 'enabled': True, 'stats': result_cache.stats()})
+
+@admin_db_bp.route('/result-cache/invalidate', methods=['POST'])
+@admin_required
+def invalidate_result_cache():
+    """Invalidate cached results after data was changed outside the application
+    
+    Accepts {"tables": [...]} to mark tables as changed, {"versions": {table: version}}
+    to report data-version counters, or an empty body to clear the whole cache.
+    """
+    result_cache = get_result_cache()
+    if result_cache is None:
+        return jsonify({'success': True, 'enabled': False})
+    
+    data = request.get_json(silent=True) or {}
+    tables = data.get('tables') or []
+    versions = data.get('versions') or {}
+    if not isinstance(tables, list) or not isinstance(versions, dict):
+        return jsonify({'error': "'tables' must be a list and 'versions' an object"}), 400
+    try:
+        if tables:
+            result_cache.invalidate_tables(tables)
+        for table, version in versions.items():
+            result_cache.set_data_version(table, int(version))
+        if not tables and not versions:
+            result_cache.clear()
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid invalidation request: {str(e)}'}), 400
+    
+    user_manager.log_audit_event(
+        user_id=session.get('user_id'),
+        action='invalidate_result_cache',
+        details=f"Invalidated result cache for tables: {', '.join(tables + list(versions)) or 'all'}",
+        ip_address=request.remote_addr
+    )
+    return jsonify({'success': True, 'enabled': True, 'stats': result_cache.stats()})
+
 @admin_db_bp.route('/schema')
 @admin_required
 def get_db_schema():
@@ -199,6 +254,11 @@ def execute_query():
                 # Try to get affected rows if available
                 affected_rows = getattr(result, 'rowcount', 0)
             
+            # Drop cached results of the tables this statement may have changed
+            result_cache = get_result_cache()
+            if result_cache is not None:
+                result_cache.invalidate_statement(sql, sql_dialect(db_manager.engine.dialect.name))
+            
             # Audit log successful non-SELECT query execution
             user_manager.log_audit_event(
                 user_id=session.get('user_id'),
@@ -65,7 +65,8 @@ def execute_query_api():
             )
             return jsonify({'error': 'Unable to connect to database'}), 500
             
-        query_result = db_manager.execute_query(sql_query)
+        query_result = db_manager.execute_query(sql_query, workspace_name=workspace,
+                                                result_owner=session.get('user_id'))
         
         if query_result['success']:
             # Convert DataFrame to list of dictionaries for JSON serialization
@@ -88,7 +89,9 @@ def execute_query_api():
             return jsonify({
                 'status': 'success',
                 'results': results,
-                'columns': columns
+                'columns': columns,
+                'truncated': query_result.get('truncated', False),
+                'result_handle': query_result.get('result_handle')
             })
         else:
             # Audit log failed query execution
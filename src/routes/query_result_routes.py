@@ -0,0 +1,111 @@
+"""
+Query result routes for Text2SQL application.
+Serves further pages and full downloads of results that were truncated
+to the first page when the query was executed. Rows come from the result's
+spill file, or from one fresh run of the query when a download finds the
+spill incomplete; only the user who ran the query can read them.
+"""
+
+from flask import Blueprint, jsonify, request, session, Response, stream_with_context
+import csv
+import io
+import json
+import logging
+from src.utils.auth_utils import login_required
+from src.utils.database import DatabaseManager
+from src.utils.query_results import get_result_store, SPILL_CAPPED, SPILL_COMPLETE, SPILL_ERROR
+from config.config import QUERY_RESULT_MAX_ROWS
+
+query_result_bp = Blueprint('query_result', __name__, url_prefix='/api/query/results')
+logger = logging.getLogger('text2sql.query_results')
+
+
+def _get_handle_or_404(handle):
+    """Look up a result handle of the current user, returning (entry, None) or (None, error response)"""
+    entry = get_result_store().get_for_owner(handle, session.get('user_id'))
+    if entry is None:
+        return None, (jsonify({'error': 'Result not found or expired, please run the query again'}), 404)
+    return entry, None
+
+
+@query_result_bp.route('/<handle>', methods=['GET'])
+@login_required
+def get_result_page(handle):
+    """Get a page of a truncated query result"""
+    entry, error = _get_handle_or_404(handle)
+    if error:
+        return error
+
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', QUERY_RESULT_MAX_ROWS)), 1), QUERY_RESULT_MAX_ROWS)
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+
+    rows, has_more, status = get_result_store().read_page(handle, offset, limit)
+    if status == SPILL_ERROR and not rows:
+        logger.error(f"Result {handle} could not be read completely")
+        return jsonify({'error': 'The result could not be read completely, please run the query again'}), 500
+
+    columns = entry['columns']
+    return jsonify({
+        'columns': columns,
+        'data': [dict(zip(columns, row)) for row in rows],
+        'offset': offset,
+        'row_count': len(rows),
+        'has_more': has_more,
+        # Rows past the spill caps are only available through the download
+        'capped': status == SPILL_CAPPED and not has_more
+    })
+
+
+@query_result_bp.route('/<handle>/download', methods=['GET'])
+@login_required
+def download_result(handle):
+    """Stream the full result of a query as CSV or NDJSON"""
+    entry, error = _get_handle_or_404(handle)
+    if error:
+        return error
+
+    output_format = request.args.get('format', 'csv').lower()
+    if output_format not in ('csv', 'ndjson'):
+        return jsonify({'error': "format must be 'csv' or 'ndjson'"}), 400
+
+    result_store = get_result_store()
+
+    def result_rows():
+        if result_store.spill_status(handle) == SPILL_COMPLETE:
+            yield from result_store.iter_rows(handle)
+            return
+        # The spill is capped, failed or still running: stream the whole result from one fresh
+        # run, as resuming a re-run past the spilled rows can duplicate or skip rows
+        db_manager = DatabaseManager(entry['connection_string'])
+        with db_manager.stream_query(entry['sql'], entry['workspace_name']) as (_, rows):
+            yield from rows
+
+    def generate():
+        columns = entry['columns']
+        rows = result_rows()
+        if output_format == 'ndjson':
+            for row in rows:
+                yield json.dumps(dict(zip(columns, row)), default=str) + '\n'
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            # Flush in chunks rather than per row to keep the response efficient
+            if buffer.tell() >= 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        yield buffer.getvalue()
+
+    mimetype = 'application/x-ndjson' if output_format == 'ndjson' else 'text/csv'
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=query_result.{output_format}'}
+    )
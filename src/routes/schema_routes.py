@@ -2,7 +2,7 @@ from flask import Blueprint, render_template, request, jsonify, session
 import logging
 import json
 import os
-from src.utils.schema_manager import SchemaManager
+from src.utils.schema_manager import get_schema_manager
 from src.utils.user_manager import UserManager
 import time
 
@@ -13,7 +13,7 @@ logger = logging.getLogger('text2sql.routes.schema')
 schema_bp = Blueprint('schema', __name__, url_prefix='/admin')
 
 # Initialize schema manager and user manager
-schema_manager = SchemaManager()
+schema_manager = get_schema_manager()
 user_manager = UserManager()
 
 @schema_bp.route('/schema')
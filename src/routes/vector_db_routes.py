@@ -10,8 +10,7 @@ from src.utils.vector_store import VectorStore
 from src.routes.auth_routes import admin_required, permission_required
 from src.models.user import Permissions
 from src.utils.user_manager import UserManager
-from sentence_transformers import SentenceTransformer
-import time
+from src.utils.llm_engine import LLMEngine
 import numpy as np
 import json
 
@@ -27,9 +26,6 @@ user_manager = UserManager()
 # Initialize vector store
 vector_store = VectorStore()
 
-# Initialize embedding model for text search
-embedding_model = None
-
 def convert_numpy_types(obj):
     """Convert NumPy types to native Python types for JSON serialization"""
     if isinstance(obj, np.integer):
@@ -378,8 +374,6 @@ def delete_collection_data(collection_name, id):
 @permission_required(Permissions.ADMIN_ACCESS)
 def search_collection(collection_name):
     """Search for similar vectors in a collection"""
-    global embedding_model
-    
     try:
         data = request.get_json()
         if not data or 'search_text' not in data:
@@ -516,13 +510,14 @@ def upload_collection_data(collection_name):
                 'error': f'Collection {collection_name} does not exist'
             }), 404
         
-        # Load embedding model
-        global embedding_model
+        # Load the embedding model the collections are tagged with
+        llm_engine = LLMEngine()
+        embedding_model = llm_engine.get_embedding_model()
         if embedding_model is None:
-            start_time = time.time()
-            logger.info("Loading embedding model...")
-            embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-            logger.info(f"Embedding model loaded in {time.time() - start_time:.2f}s")
+            return jsonify({
+                'success': False,
+                'error': 'Embedding model could not be loaded'
+            }), 500
         
         # Process the file
         file_extension = file.filename.split('.')[-1].lower()
@@ -647,7 +642,7 @@ def upload_collection_data(collection_name):
                     
         if not vector_dimension:
             # If we couldn't find dimension, default to the model's dimension
-            vector_dimension = 384  # Default for all-MiniLM-L6-v2
+            vector_dimension = embedding_model.get_sentence_embedding_dimension()
         
         # Generate embeddings and insert records
         inserted_count = 0
@@ -668,7 +663,9 @@ def upload_collection_data(collection_name):
             logger.error(f"Error fetching collection schema: {str(schema_e)}")
             logger.error(f"Schema error traceback: {traceback.format_exc()}")
         
-        for record in records:
+        # Collect the records to embed
+        entries = []
+        for record_id, record in enumerate(records, start=1):
             try:
                 # Check if text field exists in record
                 if text_field_name not in record:
@@ -684,41 +681,9 @@ def upload_collection_data(collection_name):
                     error_count += 1
                     continue
                 
-                try:
-                    # Generate embedding
-                    logger.debug(f"Generating embedding for text: '{text[:100]}...' (truncated)")
-                    embedding = embedding_model.encode(text).tolist()
-                    
-                    # Prepare metadata (exclude text from metadata)
-                    metadata = {k: v for k, v in record.items() if k != text_field_name}
-                    
-                    # Generate a unique ID for this record
-                    record_id = inserted_count + error_count + 1
-                    
-                    logger.debug(f"Inserting record {record_id} with metadata: {list(metadata.keys())}")
-                    
-                    # Insert into collection using the ChromaDB API
-                    try:
-                        success = vector_store.insert_embedding(
-                            collection_name=collection_name,
-                            feedback_id=record_id,
-                            vector=embedding,
-                            query_text=text,
-                            metadata=metadata
-                        )
-                        if success:
-                            inserted_count += 1
-                        else:
-                            error_count += 1
-                            logger.error(f"Failed to insert record {record_id}")
-                    except Exception as insert_error:
-                        logger.error(f"Error inserting record into collection: {str(insert_error)}")
-                        logger.error(f"Insert error traceback: {traceback.format_exc()}")
-                        error_count += 1
-                except Exception as embed_error:
-                    logger.error(f"Error generating embedding: {str(embed_error)}")
-                    logger.error(f"Embedding error traceback: {traceback.format_exc()}")
-                    error_count += 1
+                # Prepare metadata (exclude text from metadata)
+                metadata = {k: v for k, v in record.items() if k != text_field_name}
+                entries.append({'id': record_id, 'text': text, 'metadata': metadata})
                 
             except Exception as record_error:
                 logger.error(f"Error processing record: {str(record_error)}")
@@ -727,6 +692,23 @@ def upload_collection_data(collection_name):
                     logger.error(f"Problematic record keys: {list(record.keys()) if isinstance(record, dict) else 'Not a dict'}")
                 error_count += 1
         
+        # Embed all records in one batch and insert them with one request per batch
+        if entries:
+            embeddings = llm_engine.generate_embeddings([entry['text'] for entry in entries])
+            if embeddings is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Embeddings could not be generated'
+                }), 500
+            for entry, embedding in zip(entries, embeddings):
+                entry['vector'] = embedding
+            
+            result = vector_store.insert_embeddings(collection_name, entries)
+            inserted_count = result['count']
+            error_count += len(result['failed'])
+            for failure in result['failed']:
+                logger.error(f"Failed to insert record {failure['id']}: {failure['error']}")
+        
         # Explicitly flush changes and ensure data is committed
         try:
             # ChromaDB automatically handles persistence
@@ -121,7 +121,7 @@ Return only the JSON object, no additional text or explanation.
             
             # Convert prompt to messages format
             messages = [{"role": "user", "content": prompt}]
-            response = self.llm.generate_completion(messages)
+            response = await self.llm.agenerate_completion(messages, log_prefix="CODEGEN_MAPPING_INFO")
             
             # Extract content from response
             if hasattr(response, 'choices') and response.choices:
@@ -445,7 +445,7 @@ Return only the JSON array, no additional text or explanation.
             
             # Convert prompt to messages format for generate_completion
             messages = [{"role": "user", "content": prompt}]
-            response = self.llm.generate_completion(messages)
+            response = await self.llm.agenerate_completion(messages, log_prefix="CODEGEN_TABLE_NAMES")
             
             # Extract content from response
             if hasattr(response, 'choices') and response.choices:
@@ -662,7 +662,7 @@ Start with: -- Generated Code for {mapping_name}{f' (Version {version_number})'
             
             # Convert prompt to messages format
             messages = [{"role": "user", "content": prompt}]
-            response = self.llm.generate_completion(messages)
+            response = await self.llm.agenerate_completion(messages, log_prefix="CODEGEN")
             
             # Extract content from response
             if hasattr(response, 'choices') and response.choices:
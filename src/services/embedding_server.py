@@ -0,0 +1,158 @@
+"""
+Shared embedding server.
+Loads the embedding model once per host and serves it to the app workers and
+the ChromaDB service, so every process embeds into the same space without
+loading its own copy. Concurrent /embed requests are merged into batched
+encode calls.
+
+Usage: python -m src.services.embedding_server [--host 0.0.0.0] [--port 8004]
+"""
+
+import logging
+import threading
+from typing import Optional
+
+import numpy as np
+from flask import Flask, jsonify, request
+
+from config.config import (
+    EMBEDDING_MODEL_NAME, EMBEDDING_MODEL_VERSION, EMBEDDING_SERVICE_HOST, EMBEDDING_SERVICE_PORT,
+    EMBEDDING_SERVICE_THREADS, EMBEDDING_SERVICE_BATCH_SIZE, EMBEDDING_SERVICE_BATCH_WAIT_MS,
+    EMBEDDING_SERVICE_MAX_TEXTS, EMBEDDING_SERVICE_TIMEOUT
+)
+from src.utils.embedding_batcher import EmbeddingMicroBatcher
+from src.utils.vector_codec import VECTOR_MEDIA_TYPE, encode_vectors
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('embedding_server')
+
+app = Flask(__name__)
+
+_model = None
+_batcher: Optional[EmbeddingMicroBatcher] = None
+_model_lock = threading.Lock()
+
+
+def get_batcher() -> EmbeddingMicroBatcher:
+    """Load the embedding model on first use and get the batcher feeding it
+
+    Returns:
+        EmbeddingMicroBatcher: Batcher merging concurrent requests into encode calls
+    """
+    global _model, _batcher
+
+    if _batcher is None:
+        with _model_lock:
+            if _batcher is None:
+                # Always load in-process: this server is what EMBEDDING_SERVICE_URL points to
+                from src.utils.model_backends import load_embedding_model
+                _model = load_embedding_model(EMBEDDING_MODEL_NAME)
+
+                def encode_batch(texts):
+                    return _model.encode(texts, batch_size=EMBEDDING_SERVICE_BATCH_SIZE, convert_to_numpy=True)
+
+                _batcher = EmbeddingMicroBatcher(encode_batch, max_batch_size=EMBEDDING_SERVICE_BATCH_SIZE,
+                                                 max_wait_ms=EMBEDDING_SERVICE_BATCH_WAIT_MS)
+    return _batcher
+
+
+def model_info() -> dict:
+    """Get the name, version tag, dimension and backend of the served model"""
+    batcher = get_batcher()
+    return {
+        'model': EMBEDDING_MODEL_NAME,
+        'version': EMBEDDING_MODEL_VERSION,
+        'dimension': _model.get_sentence_embedding_dimension(),
+        'backend': getattr(_model, 'inference_backend', None),
+        'batching': batcher.stats()
+    }
+
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint, healthy once the model is loaded"""
+    try:
+        get_batcher()
+        return jsonify({'status': 'healthy', 'service': 'Embedding Server', 'version': EMBEDDING_MODEL_VERSION})
+    except Exception as e:
+        return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
+
+
+@app.route('/info', methods=['GET'])
+def info():
+    """Model name, version tag, dimension and batching statistics"""
+    try:
+        return jsonify(model_info())
+    except Exception as e:
+        logger.error(f"Error loading embedding model: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/embed', methods=['POST'])
+def embed():
+    """Embed a list of texts
+
+    Request Body:
+        texts: List of texts to embed
+        model_version: Version tag the caller expects (optional); a different one is refused
+
+    Returns:
+        JSON response with the model version and one embedding per text, as a base64
+        float32 buffer for clients accepting the vector media type
+    """
+    data = request.get_json(silent=True) or {}
+    texts = data.get('texts')
+    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+        return jsonify({'error': 'texts must be a list of strings'}), 400
+    if len(texts) > EMBEDDING_SERVICE_MAX_TEXTS:
+        return jsonify({'error': f'At most {EMBEDDING_SERVICE_MAX_TEXTS} texts per request'}), 413
+    expected_version = data.get('model_version')
+    if expected_version and expected_version != EMBEDDING_MODEL_VERSION:
+        return jsonify({'error': f"Server embeds with '{EMBEDDING_MODEL_VERSION}', not '{expected_version}'"}), 409
+
+    try:
+        batcher = get_batcher()
+        if texts:
+            vectors = np.asarray(batcher.submit_many(texts, timeout=EMBEDDING_SERVICE_TIMEOUT), dtype=np.float32)
+        else:
+            vectors = np.zeros((0, _model.get_sentence_embedding_dimension()), dtype=np.float32)
+    except Exception as e:
+        logger.error(f"Error embedding {len(texts)} texts: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+    binary = VECTOR_MEDIA_TYPE in request.headers.get('Accept', '')
+    return jsonify({
+        'model': EMBEDDING_MODEL_NAME,
+        'version': EMBEDDING_MODEL_VERSION,
+        'dimension': int(vectors.shape[1]),
+        'embeddings': encode_vectors(vectors) if binary else vectors.tolist()
+    })
+
+
+def main():
+    """Load the model and serve the API"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Shared Embedding Server')
+    parser.add_argument('--host', default=EMBEDDING_SERVICE_HOST, help='Host to bind to')
+    parser.add_argument('--port', type=int, default=EMBEDDING_SERVICE_PORT, help='Port to bind to')
+    parser.add_argument('--threads', type=int, default=EMBEDDING_SERVICE_THREADS, help='Worker threads')
+    args = parser.parse_args()
+
+    # Load the model before accepting requests so the first callers do not time out
+    logger.info(f"Loading embedding model {EMBEDDING_MODEL_VERSION}")
+    get_batcher()
+
+    logger.info(f"Starting Embedding Server on {args.host}:{args.port}")
+    try:
+        from waitress import serve
+    except ImportError:
+        logger.warning("waitress is not installed, falling back to the threaded development server")
+        app.run(host=args.host, port=args.port, threaded=True)
+    else:
+        serve(app, host=args.host, port=args.port, threads=args.threads)
+
+
+if __name__ == '__main__':
+    main()
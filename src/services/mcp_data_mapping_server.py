@@ -134,7 +134,7 @@ async def analyze_unmapped_column(table: str, column: str) -> str:
                 Return only the enhanced description text, no additional formatting.
                 """
                 
-                enhanced_description = llm.complete(enhancement_prompt)
+                enhanced_description = await llm.agenerate_completion([{"role": "user", "content": enhancement_prompt}], log_prefix="DATA_MAPPING_DESCRIPTION")
                 
             except Exception as llm_error:
                 logger.warning(f"LLM enhancement failed: {str(llm_error)}")
@@ -285,7 +285,7 @@ async def analyze_granularity_fit(source_table: str, target_table: str) -> str:
             JUSTIFICATION: [explanation]
             """
             
-            response = llm.complete(granularity_prompt)
+            response = await llm.agenerate_completion([{"role": "user", "content": granularity_prompt}], log_prefix="DATA_MAPPING_GRANULARITY")
             
             # Parse LLM response
             lines = response.strip().split('\n')
@@ -580,7 +580,7 @@ async def find_semantic_column_matches(source_column_info: str, target_table: st
             Return only the JSON array, no additional text.
             """
             
-            response = llm.complete(semantic_prompt)
+            response = await llm.agenerate_completion([{"role": "user", "content": semantic_prompt}], log_prefix="DATA_MAPPING_SEMANTIC")
             
             # Parse LLM response
             try:
@@ -739,7 +739,7 @@ async def generate_etl_logic(source_info: str, target_info: str, join_clause: st
             Return only the JSON object, no additional text.
             """
             
-            response = llm.complete(etl_prompt)
+            response = await llm.agenerate_completion([{"role": "user", "content": etl_prompt}], log_prefix="DATA_MAPPING_ETL")
             
             # Parse LLM response
             try:
@@ -885,7 +885,7 @@ async def propose_new_table_structure(subject_area: str, required_columns: str,
             Return only the JSON object, no additional text.
             """
             
-            response = llm.complete(structure_prompt)
+            response = await llm.agenerate_completion([{"role": "user", "content": structure_prompt}], log_prefix="DATA_MAPPING_STRUCTURE")
             
             # Parse LLM response
             try:
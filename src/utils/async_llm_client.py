@@ -0,0 +1,465 @@
+"""
+Asynchronous client for the OpenAI-compatible LLM provider.
+Requests from any event loop run on one long-lived loop thread of the client,
+so they share a pooled HTTP client and are limited process-wide by a global
+and a per-model semaphore. Rate-limited, failed and timed-out requests are
+retried with exponential backoff honoring Retry-After, and slow requests can be
+hedged with a second request once they exceed a latency percentile of their
+call site. Latency and token usage are recorded per call site.
+"""
+
+import asyncio
+import atexit
+import email.utils
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+from openai import AsyncOpenAI, APIConnectionError, APIStatusError
+
+from config.config import (
+    OPENROUTER_API_KEY, OPENROUTER_BASE_URL,
+    LLM_REQUEST_TIMEOUT, LLM_MAX_RETRIES, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY,
+    LLM_MAX_CONCURRENCY, LLM_MAX_CONCURRENCY_PER_MODEL, LLM_POOL_MAX_CONNECTIONS,
+    LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_SAMPLES, LLM_METRICS_WINDOW
+)
+
+logger = logging.getLogger('text2sql.async_llm_client')
+
+
+class LLMCallMetrics:
+    """Thread-safe latency, token and retry counters per call site"""
+
+    def __init__(self, window: int = LLM_METRICS_WINDOW, min_samples: int = LLM_HEDGE_MIN_SAMPLES):
+        """Initialize the metrics
+
+        Args:
+            window (int, optional): Number of latest latencies kept per call site
+            min_samples (int, optional): Latencies needed before percentiles are reported
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self._sites: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _site(self, call_site: str) -> Dict[str, Any]:
+        """Get the counters of a call site; caller must hold the lock"""
+        if call_site not in self._sites:
+            self._sites[call_site] = {
+                'latencies': deque(maxlen=self.window), 'calls': 0, 'errors': 0, 'retries': 0,
+                'hedges': 0, 'hedge_wins': 0, 'prompt_tokens': 0, 'completion_tokens': 0
+            }
+        return self._sites[call_site]
+
+    def record(self, call_site: str, latency: float, prompt_tokens: int = 0, completion_tokens: int = 0,
+               error: bool = False):
+        """Record a finished call
+
+        Args:
+            call_site (str): Name of the calling component
+            latency (float): Seconds the call took
+            prompt_tokens (int, optional): Prompt tokens reported by the provider
+            completion_tokens (int, optional): Completion tokens reported by the provider
+            error (bool, optional): Whether the call failed
+        """
+        with self._lock:
+            site = self._site(call_site)
+            site['calls'] += 1
+            if error:
+                site['errors'] += 1
+                return
+            site['latencies'].append(latency)
+            site['prompt_tokens'] += prompt_tokens or 0
+            site['completion_tokens'] += completion_tokens or 0
+
+    def record_response(self, call_site: str, latency: float, response: Any):
+        """Record a successful call together with the token usage of its response"""
+        usage = getattr(response, 'usage', None)
+        self.record(call_site, latency,
+                    prompt_tokens=getattr(usage, 'prompt_tokens', 0) or 0,
+                    completion_tokens=getattr(usage, 'completion_tokens', 0) or 0)
+
+    def record_retry(self, call_site: str):
+        """Record a retried attempt"""
+        with self._lock:
+            self._site(call_site)['retries'] += 1
+
+    def record_hedge(self, call_site: str, won: bool = False):
+        """Record a hedged request, or that a hedged request answered first"""
+        with self._lock:
+            self._site(call_site)['hedge_wins' if won else 'hedges'] += 1
+
+    def latency_percentile(self, call_site: str, percentile: float) -> Optional[float]:
+        """Get a latency percentile of a call site
+
+        Returns:
+            float or None: Seconds, None until min_samples latencies were recorded
+        """
+        with self._lock:
+            latencies = sorted(self._site(call_site)['latencies'])
+        if len(latencies) < self.min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get the counters and latency percentiles of every call site
+
+        Returns:
+            Dict: Statistics keyed by call site
+        """
+        with self._lock:
+            sites = {name: dict(site, latencies=sorted(site['latencies'])) for name, site in self._sites.items()}
+
+        result = {}
+        for name, site in sites.items():
+            latencies = site.pop('latencies')
+            site['p50_latency'] = latencies[len(latencies) // 2] if latencies else None
+            site['p95_latency'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None
+            result[name] = site
+        return result
+
+
+def is_retryable(error: Exception) -> bool:
+    """Check whether a failed request may succeed when retried
+
+    Args:
+        error (Exception): Error raised by the OpenAI client
+
+    Returns:
+        bool: True for rate limits, server errors, timeouts and connection errors
+    """
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, APIConnectionError)
+
+
+def retry_delay(error: Exception, attempt: int, base_delay: float = LLM_RETRY_BASE_DELAY,
+                max_delay: float = LLM_RETRY_MAX_DELAY) -> float:
+    """Get the seconds to wait before retrying a failed request
+
+    A Retry-After header (seconds or HTTP date) from the provider is honored;
+    otherwise the delay grows exponentially with full jitter.
+
+    Args:
+        error (Exception): Error raised by the failed attempt
+        attempt (int): Number of the failed attempt, starting at 0
+        base_delay (float, optional): Delay ceiling of the first retry
+        max_delay (float, optional): Upper bound of any delay
+
+    Returns:
+        float: Seconds to wait
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    retry_after = headers.get('retry-after-ms')
+    if retry_after is not None:
+        try:
+            return min(max_delay, max(0.0, float(retry_after) / 1000))
+        except ValueError:
+            pass
+    retry_after = headers.get('retry-after')
+    if retry_after is not None:
+        try:
+            return min(max_delay, max(0.0, float(retry_after)))
+        except ValueError:
+            try:
+                retry_at = email.utils.parsedate_to_datetime(retry_after)
+                return min(max_delay, max(0.0, retry_at.timestamp() - time.time()))
+            except (TypeError, ValueError):
+                pass
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class AsyncLLMClient:
+    """Rate-limited, retrying chat completion client for async callers
+
+    Callers typically run their own short-lived event loop per request, so the
+    client runs every request on its own long-lived loop thread instead. The
+    HTTP connection pool and the concurrency limits are created once on that
+    loop and shared by all callers of the process.
+    """
+
+    def __init__(self, api_key: Optional[str] = OPENROUTER_API_KEY, base_url: str = OPENROUTER_BASE_URL,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, max_concurrency_per_model: int = LLM_MAX_CONCURRENCY_PER_MODEL,
+                 timeout: float = LLM_REQUEST_TIMEOUT, max_retries: int = LLM_MAX_RETRIES,
+                 hedge_percentile: float = LLM_HEDGE_PERCENTILE, max_connections: int = LLM_POOL_MAX_CONNECTIONS,
+                 metrics: Optional[LLMCallMetrics] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """Initialize the client
+
+        Args:
+            api_key (str, optional): Provider API key
+            base_url (str, optional): Provider base URL
+            max_concurrency (int, optional): Maximum in-flight requests of the process
+            max_concurrency_per_model (int, optional): Maximum in-flight requests per model
+            timeout (float, optional): Seconds per attempt
+            max_retries (int, optional): Retries after the first attempt
+            hedge_percentile (float, optional): Latency percentile after which a request is hedged, 0 disables hedging
+            max_connections (int, optional): Size of the HTTP connection pool
+            metrics (LLMCallMetrics, optional): Metrics to record into, the shared metrics by default
+            transport (httpx.AsyncBaseTransport, optional): Custom HTTP transport
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_concurrency_per_model = max_concurrency_per_model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.hedge_percentile = hedge_percentile
+        self.max_connections = max_connections
+        self.metrics = metrics or get_llm_metrics()
+        self.transport = transport
+        self._event_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_state: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def _loop(self) -> asyncio.AbstractEventLoop:
+        """Get the client's event loop, starting its thread on first use"""
+        with self._lock:
+            if self._event_loop is None:
+                loop = asyncio.new_event_loop()
+
+                def run_loop():
+                    loop.run_forever()
+                    loop.close()
+
+                threading.Thread(target=run_loop, name='async-llm-client', daemon=True).start()
+                self._event_loop = loop
+            return self._event_loop
+
+    def _state(self) -> Dict[str, Any]:
+        """Get the client and semaphores, creating them on first use; only called on the client's loop"""
+        if self._loop_state is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                timeout=self.timeout,
+                transport=self.transport
+            )
+            self._loop_state = {
+                'client': AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                                      timeout=self.timeout, http_client=http_client),
+                'global': asyncio.Semaphore(self.max_concurrency),
+                'models': {}
+            }
+        return self._loop_state
+
+    def _model_semaphore(self, state: Dict[str, Any], model: str) -> asyncio.Semaphore:
+        """Get the semaphore limiting requests to one model"""
+        if model not in state['models']:
+            state['models'][model] = asyncio.Semaphore(self.max_concurrency_per_model)
+        return state['models'][model]
+
+    async def _on_client_loop(self, coro):
+        """Await a coroutine on the client's loop; cancelling the caller cancels the request"""
+        loop = self._loop()
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    async def chat_completion(self, call_site: str = "LLM", **params):
+        """Create a chat completion
+
+        Args:
+            call_site (str, optional): Name of the calling component, used for metrics and hedging
+            **params: Parameters of chat.completions.create, including model and messages
+
+        Returns:
+            ChatCompletion: The provider response
+        """
+        return await self._on_client_loop(self._chat_completion(call_site, params))
+
+    async def _chat_completion(self, call_site: str, params: Dict[str, Any]):
+        """Create a chat completion; runs on the client's loop"""
+        state = self._state()
+        async with state['global'], self._model_semaphore(state, params['model']):
+            start_time = time.monotonic()
+            try:
+                response = await self._with_retries(state, call_site, params)
+            except Exception:
+                self.metrics.record(call_site, time.monotonic() - start_time, error=True)
+                raise
+        self.metrics.record_response(call_site, time.monotonic() - start_time, response)
+        return response
+
+    async def stream_chat_completion(self, call_site: str = "LLM", **params) -> AsyncIterator[str]:
+        """Stream the text of a chat completion
+
+        The concurrency permits are held until the stream is exhausted or closed.
+        Only establishing the stream is retried.
+
+        Args:
+            call_site (str, optional): Name of the calling component, used for metrics
+            **params: Parameters of chat.completions.create, including model and messages
+
+        Yields:
+            str: Content chunks
+        """
+        loop = self._loop()
+        caller_loop = asyncio.get_running_loop()
+        if caller_loop is loop:
+            async for content in self._stream_chat_completion(call_site, params):
+                yield content
+            return
+
+        # Chunks are produced on the client's loop and handed over through a queue of the caller's loop
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def deliver(item):
+            try:
+                caller_loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                pass  # The caller's loop is closed
+
+        async def produce():
+            try:
+                async for content in self._stream_chat_completion(call_site, params):
+                    deliver((True, content))
+            except Exception as e:
+                deliver((False, e))
+            else:
+                deliver((False, None))
+
+        producer = asyncio.run_coroutine_threadsafe(produce(), loop)
+        try:
+            while True:
+                more, value = await queue.get()
+                if not more:
+                    if value is not None:
+                        raise value
+                    return
+                yield value
+        finally:
+            producer.cancel()
+
+    async def _stream_chat_completion(self, call_site: str, params: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream the text of a chat completion; runs on the client's loop"""
+        state = self._state()
+        async with state['global'], self._model_semaphore(state, params['model']):
+            start_time = time.monotonic()
+            try:
+                stream = await self._with_retries(state, call_site, dict(params, stream=True))
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            except Exception:
+                self.metrics.record(call_site, time.monotonic() - start_time, error=True)
+                raise
+        self.metrics.record(call_site, time.monotonic() - start_time)
+
+    def close(self, timeout: float = 5.0):
+        """Close the HTTP client and stop the client's loop; a later request starts a new one
+
+        Args:
+            timeout (float, optional): Seconds to wait for open connections to close
+        """
+        with self._lock:
+            loop, self._event_loop = self._event_loop, None
+        if loop is None:
+            return
+
+        async def shutdown():
+            state, self._loop_state = self._loop_state, None
+            if state is not None:
+                await state['client'].close()
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"Error closing the async LLM client: {str(e)}")
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+
+    async def _with_retries(self, state: Dict[str, Any], call_site: str, params: Dict[str, Any]):
+        """Run a request, retrying retryable failures with backoff"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._hedged(state, call_site, params)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = retry_delay(e, attempt)
+                self.metrics.record_retry(call_site)
+                logger.warning(f"[{call_site}] LLM request failed ({str(e)}), retry {attempt + 1} "
+                               f"of {self.max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _hedged(self, state: Dict[str, Any], call_site: str, params: Dict[str, Any]):
+        """Run a request, sending a second one if the first is slower than usual
+
+        The hedged request takes a spare global and per-model permit and is
+        skipped when either is exhausted, so hedging never pushes the provider
+        beyond the concurrency caps.
+        """
+        create = lambda: state['client'].chat.completions.create(**params)
+        threshold = None
+        if self.hedge_percentile and not params.get('stream'):
+            threshold = self.metrics.latency_percentile(call_site, self.hedge_percentile)
+        if threshold is None:
+            return await create()
+
+        tasks = [asyncio.ensure_future(create())]
+        hedge_permits = []
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=threshold)
+            permits = [state['global'], self._model_semaphore(state, params['model'])]
+            if not done and not any(permit.locked() for permit in permits):
+                # Neither semaphore is exhausted, so acquiring does not wait
+                for permit in permits:
+                    await permit.acquire()
+                    hedge_permits.append(permit)
+                self.metrics.record_hedge(call_site)
+                logger.info(f"[{call_site}] LLM request slower than {threshold:.2f}s, sending hedged request")
+                tasks.append(asyncio.ensure_future(create()))
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if len(tasks) > 1 and task is tasks[1]:
+                            self.metrics.record_hedge(call_site, won=True)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            for permit in hedge_permits:
+                permit.release()
+
+
+# Shared instances for this process
+_llm_metrics = LLMCallMetrics()
+_async_llm_client = None
+_async_llm_client_lock = threading.Lock()
+
+
+def get_llm_metrics() -> LLMCallMetrics:
+    """Get the process-wide LLM call metrics
+
+    Returns:
+        LLMCallMetrics: The shared metrics
+    """
+    return _llm_metrics
+
+
+def get_async_llm_client() -> AsyncLLMClient:
+    """Get the process-wide async LLM client
+
+    Returns:
+        AsyncLLMClient: The shared client
+    """
+    global _async_llm_client
+
+    if _async_llm_client is None:
+        with _async_llm_client_lock:
+            if _async_llm_client is None:
+                _async_llm_client = AsyncLLMClient()
+                atexit.register(_async_llm_client.close)
+    return _async_llm_client
@@ -4,7 +4,8 @@ Handles tasks that need to run asynchronously without blocking the main request.
 """
 
 import logging
-from threading import Thread
+import time
+from src.utils.job_queue import JobQueue, PRIORITY_INTERACTIVE
 
 # Initialize logger
 logger = logging.getLogger('text2sql')
@@ -12,15 +13,23 @@ logger = logging.getLogger('text2sql')
 class BackgroundTaskManager:
     """Manages background tasks for the application"""
     
-    def __init__(self, sql_manager, user_manager):
-        """Initialize with required managers"""
+    def __init__(self, sql_manager, user_manager, job_queue=None):
+        """Initialize with required managers
+        
+        Args:
+            sql_manager (SQLGenerationManager): Manager that processes queries
+            user_manager (UserManager): Manager used for audit logging
+            job_queue (JobQueue, optional): Queue running the tasks, a new bounded queue by default
+        """
         self.sql_manager = sql_manager
         self.user_manager = user_manager
+        self.job_queue = job_queue or JobQueue(name='query')
     
     def process_query_task(self, query_id, query, workspace_name, selected_workspaces, 
-                         explicit_tables, user_id, query_progress, update_progress_func, query_progress_lock=None, ip_address=None):
+                         explicit_tables, user_id, progress_store, update_progress_func, ip_address=None,
+                         priority=PRIORITY_INTERACTIVE):
         """
-        Process a SQL query in the background
+        Queue a SQL query for processing in the background
         
         Args:
             query_id (str): Unique ID for this query
@@ -29,28 +38,33 @@ class BackgroundTaskManager:
             selected_workspaces (list): List of workspace objects
             explicit_tables (list): Tables explicitly specified by the user
             user_id (int): ID of the user who initiated the query (None if not logged in)
-            query_progress (dict): Dictionary to store query progress
+            progress_store (MemoryStore): Store holding the progress entry of the query
             update_progress_func (function): Function to update progress
-            query_progress_lock (threading.Lock, optional): Lock for thread-safe access to query_progress
             ip_address (str, optional): IP address of the client making the request
+            priority (int, optional): Job priority, PRIORITY_INTERACTIVE or PRIORITY_BATCH
+            
+        Raises:
+            QueueFullError: If the job queue is at capacity
         """
-        # Create a new thread for processing
         def process_in_background():
+            # Skip queries that timed out or were abandoned while waiting in the queue
+            progress = progress_store.get(query_id)
+            if progress is None or progress.get('status') == 'error':
+                logger.info(f"Skipping query {query_id} that is no longer pending")
+                return
+            
+            # The processing timeout counts from when a worker picks the query up
+            progress_store.update(query_id, status='processing', start_time=time.time())
             try:
                 result = self.sql_manager.process_query(
                     query, 
                     selected_workspaces, 
                     explicit_tables,
-                    progress_callback=lambda step: update_progress_func(query_id, step)
+                    progress_callback=lambda step: update_progress_func(query_id, step),
+                    result_owner=user_id
                 )
                 
-                if query_progress_lock:
-                    with query_progress_lock:
-                        query_progress[query_id]['result'] = result
-                        query_progress[query_id]['status'] = 'completed'
-                else:
-                    query_progress[query_id]['result'] = result
-                    query_progress[query_id]['status'] = 'completed'
+                progress_store.update(query_id, result=result, status='completed')
                 
                 # Log audit for the query
                 if user_id:
@@ -66,13 +80,7 @@ class BackgroundTaskManager:
                     
             except Exception as e:
                 logger.exception(f"Exception while processing query: {str(e)}")
-                if query_progress_lock:
-                    with query_progress_lock:
-                        query_progress[query_id]['error'] = str(e)
-                        query_progress[query_id]['status'] = 'error'
-                else:
-                    query_progress[query_id]['error'] = str(e)
-                    query_progress[query_id]['status'] = 'error'
+                progress_store.update(query_id, error=str(e), status='error')
                 
                 # Log audit for failed query
                 if user_id:
@@ -86,5 +94,27 @@ class BackgroundTaskManager:
                         ip_address=ip_address
                     )
         
-        # Start the thread
-        Thread(target=process_in_background).start()
\ No newline at end of file
+        def cancel():
+            progress_store.update(query_id, error="The server is restarting, please run the query again",
+                                  status='error')
+        
+        # Queue the task; raises QueueFullError when the queue is at capacity
+        self.job_queue.submit(process_in_background, user_id=user_id, priority=priority, job_id=query_id,
+                              on_cancel=cancel)
+    
+    def get_queue_stats(self):
+        """Get statistics of the query job queue
+        
+        Returns:
+            dict: Queue depth, running jobs and wait time metrics
+        """
+        return self.job_queue.stats()
+    
+    def shutdown(self, wait=True, timeout=None):
+        """Stop accepting new tasks, fail queued tasks and wait for running tasks to finish
+        
+        Args:
+            wait (bool, optional): Wait for the workers to finish
+            timeout (float, optional): Maximum seconds to wait for all workers together
+        """
+        self.job_queue.shutdown(wait=wait, timeout=timeout)
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+Local column ranker for the Text2SQL pipeline.
+Scores the columns of the selected tables against a question by combining
+lexical overlap of the column name with embedding similarity of the column
+name and description, so wide tables can be pruned without (or before)
+asking the LLM. Primary keys and join keys are always kept.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+
+logger = logging.getLogger('text2sql.column_ranker')
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text and identifiers into lower-case word tokens
+
+    Splits on non-alphanumeric characters and camelCase boundaries and strips a
+    plural 's' so that 'orderDates' and 'order date' share their tokens.
+
+    Args:
+        text (str): Question, column name or description
+
+    Returns:
+        List[str]: Tokens
+    """
+    text = re.sub(r'([a-z0-9])([A-Z])', r'\1 \2', text or '')
+    tokens = []
+    for token in re.split(r'[^A-Za-z0-9]+', text.lower()):
+        if len(token) > 3 and token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+            token = token[:-1]
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+def join_key_columns(join_conditions: Iterable[Dict[str, Any]]) -> Dict[str, Set[str]]:
+    """Get the columns referenced by join conditions
+
+    Args:
+        join_conditions (iterable): Join condition dictionaries with a 'condition' like 'a.x = b.y'
+
+    Returns:
+        Dict[str, Set[str]]: Column names per table
+    """
+    keys: Dict[str, Set[str]] = {}
+    for join in join_conditions:
+        for table, column in re.findall(r'([A-Za-z_][\w]*)\.([A-Za-z_][\w]*)', join.get("condition", "")):
+            keys.setdefault(table, set()).add(column)
+    return keys
+
+
+def column_document(column: Dict[str, Any]) -> str:
+    """Build the text that represents a column for embedding
+
+    Args:
+        column (dict): Column dictionary with 'name' and optional 'description'
+
+    Returns:
+        str: Column name words and description as a single text
+    """
+    return f"{' '.join(tokenize(column.get('name', '')))}: {column.get('description', '')}"
+
+
+class ColumnRanker:
+    """Scores columns by lexical and embedding similarity to a question
+
+    Column embeddings are cached by document hash, so a column is embedded once
+    until its name or description changes. The cache is bounded (LRU) and
+    cleared when the schema changes, so renamed or dropped columns do not pile up.
+    """
+
+    def __init__(self, embed_texts: Callable[[List[str]], Optional[np.ndarray]], lexical_weight: float = 0.5,
+                 max_vectors: int = 20000):
+        """Initialize the column ranker
+
+        Args:
+            embed_texts (callable): Function embedding a list of texts into a 2D array, or None if unavailable
+            lexical_weight (float, optional): Weight of the lexical score; the rest goes to embedding similarity
+            max_vectors (int, optional): Maximum number of cached column embeddings (LRU eviction)
+        """
+        self.embed_texts = embed_texts
+        self.lexical_weight = lexical_weight
+        self.max_vectors = max_vectors
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def invalidate(self, schema_version: Optional[str] = None):
+        """Drop the cached column embeddings after a schema change
+
+        Args:
+            schema_version (str, optional): New schema version (unused, the whole cache is dropped)
+        """
+        with self._lock:
+            dropped = len(self._vectors)
+            self._vectors.clear()
+        logger.info(f"Column ranker dropped {dropped} cached column embeddings")
+
+    def _column_vectors(self, documents: List[str]) -> Optional[np.ndarray]:
+        """Get unit-length embeddings for column documents, embedding only unseen ones"""
+        digests = [hashlib.sha1(document.encode('utf-8')).hexdigest() for document in documents]
+        with self._lock:
+            missing = {digest: document for digest, document in zip(digests, documents) if digest not in self._vectors}
+        if missing:
+            vectors = self.embed_texts(list(missing.values()))
+            if vectors is None:
+                return None
+            vectors = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            fresh = dict(zip(missing, vectors / norms))
+        else:
+            fresh = {}
+        with self._lock:
+            matrix = []
+            for digest in digests:
+                vector = self._vectors.get(digest)
+                if vector is None:
+                    # Embedded above, or evicted by a concurrent request since the lookup
+                    vector = fresh.get(digest)
+                    if vector is None:
+                        return None
+                    self._vectors[digest] = vector
+                self._vectors.move_to_end(digest)
+                matrix.append(vector)
+            while len(self._vectors) > self.max_vectors:
+                self._vectors.popitem(last=False)
+            return np.stack(matrix)
+
+    def rank(self, query: str, tables: List[Dict[str, Any]], required: Dict[str, Set[str]] = None,
+             query_vector: Optional[Sequence[float]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Score the columns of each table against a question
+
+        Args:
+            query (str): The natural language question
+            tables (list): Table dictionaries with 'name' and 'columns'
+            required (dict, optional): Column names per table that must be kept (e.g. join keys)
+            query_vector (array-like, optional): Embedding of the question; embedded here if omitted
+
+        Returns:
+            Dict[str, List[Dict]]: Per table, columns as {'name', 'score', 'required'} sorted by score,
+                                   required columns first
+        """
+        required = required or {}
+        query_tokens = set(tokenize(query))
+
+        documents = [column_document(col) for table in tables for col in table["columns"]]
+        similarities = None
+        if documents and (1 - self.lexical_weight) > 0:
+            try:
+                if query_vector is None:
+                    vectors = self.embed_texts([query])
+                    query_vector = vectors[0] if vectors is not None else None
+                matrix = self._column_vectors(documents) if query_vector is not None else None
+                if matrix is not None:
+                    vector = np.asarray(query_vector, dtype=np.float32).ravel()
+                    norm = np.linalg.norm(vector)
+                    if norm:
+                        similarities = matrix @ (vector / norm)
+            except Exception as e:
+                logger.warning(f"Column embedding failed, using lexical scores only: {str(e)}")
+
+        ranking = {}
+        position = 0
+        for table in tables:
+            table_required = required.get(table["name"], set())
+            columns = []
+            for col in table["columns"]:
+                name_tokens = set(tokenize(col["name"]))
+                lexical = len(name_tokens & query_tokens) / len(name_tokens) if name_tokens else 0.0
+                if similarities is not None:
+                    score = self.lexical_weight * lexical + (1 - self.lexical_weight) * float(similarities[position])
+                else:
+                    score = lexical
+                columns.append({
+                    'name': col["name"],
+                    'score': score,
+                    'required': bool(col.get("is_primary_key")) or col["name"] in table_required
+                })
+                position += 1
+            columns.sort(key=lambda column: (not column['required'], -column['score']))
+            ranking[table["name"]] = columns
+        return ranking
@@ -0,0 +1,243 @@
+"""
+Disk-backed cache of LLM completions.
+Call sites whose answers only depend on their prompt (table selection, column
+pruning, query reformatting...) opt in with a TTL; their completions are keyed
+by a hash of the model, messages, tools, temperature and max_tokens and stored
+in a SQLite file shared by all worker processes. Setting the X-LLM-Cache:
+bypass request header skips the cache for that request.
+"""
+
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from config.config import (
+    LLM_RESPONSE_CACHE_ENABLED, LLM_RESPONSE_CACHE_PATH, LLM_RESPONSE_CACHE_TTLS, LLM_RESPONSE_CACHE_MAX_ENTRIES
+)
+
+logger = logging.getLogger('text2sql.completion_cache')
+
+BYPASS_HEADER = 'X-LLM-Cache'
+
+# Set for the duration of a request that asked to bypass the cache; copied into
+# background jobs and pipeline stages started by that request
+_bypass = contextvars.ContextVar('llm_cache_bypass', default=False)
+
+
+def cache_bypassed() -> bool:
+    """Check whether the current request asked to bypass the completion cache"""
+    return _bypass.get()
+
+
+def set_cache_bypass(bypass: bool) -> contextvars.Token:
+    """Set whether the current context bypasses the completion cache
+
+    Returns:
+        contextvars.Token: Token to restore the previous value with reset_cache_bypass
+    """
+    return _bypass.set(bypass)
+
+
+def reset_cache_bypass(token: contextvars.Token):
+    """Restore the bypass flag saved by set_cache_bypass"""
+    _bypass.reset(token)
+
+
+@contextmanager
+def bypass_completion_cache():
+    """Context manager running the enclosed LLM calls without the completion cache"""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def completion_key(model: str, messages: Any, tools: Any = None, temperature: Optional[float] = None,
+                   max_tokens: Optional[int] = None) -> str:
+    """Get the cache key of a completion request
+
+    Args:
+        model (str): Model name
+        messages (list): Request messages
+        tools (list, optional): Tool definitions
+        temperature (float, optional): Sampling temperature
+        max_tokens (int, optional): Maximum completion tokens
+
+    Returns:
+        str: SHA-256 hex digest of the canonical JSON of the request
+    """
+    payload = json.dumps({
+        'model': model, 'messages': messages, 'tools': tools,
+        'temperature': temperature, 'max_tokens': max_tokens
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CompletionCache:
+    """SQLite store of completion texts with a TTL per call site"""
+
+    def __init__(self, path: str = LLM_RESPONSE_CACHE_PATH, ttls: Optional[Dict[str, int]] = None,
+                 max_entries: int = LLM_RESPONSE_CACHE_MAX_ENTRIES):
+        """Initialize the cache and create its table
+
+        Args:
+            path (str, optional): Path of the SQLite file
+            ttls (dict, optional): Seconds to keep completions per call site; others are not cached
+            max_entries (int, optional): Maximum stored completions
+        """
+        self.path = path
+        self.ttls = dict(LLM_RESPONSE_CACHE_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._stats_lock = threading.Lock()
+        self._puts_since_prune = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            "key TEXT PRIMARY KEY, call_site TEXT NOT NULL, completion TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._connection().execute("CREATE INDEX IF NOT EXISTS idx_completions_created_at ON completions(created_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, call_site: str, counter: str):
+        """Increment a counter of a call site"""
+        with self._stats_lock:
+            site = self._stats.setdefault(call_site, {'hits': 0, 'misses': 0, 'stores': 0})
+            site[counter] += 1
+
+    def enabled_for(self, call_site: str) -> bool:
+        """Check whether completions of a call site are cached in the current context"""
+        return call_site in self.ttls and not cache_bypassed()
+
+    def get(self, call_site: str, key: str) -> Optional[str]:
+        """Look up a completion
+
+        Args:
+            call_site (str): Calling component, selects the TTL
+            key (str): Key from completion_key
+
+        Returns:
+            str or None: The cached completion, None on miss, expiry or bypass
+        """
+        if not self.enabled_for(call_site):
+            return None
+        try:
+            row = self._connection().execute(
+                "SELECT completion, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading completion cache: {str(e)}")
+            return None
+        if row is None or time.time() - row[1] > self.ttls[call_site]:
+            self._count(call_site, 'misses')
+            return None
+        self._count(call_site, 'hits')
+        return row[0]
+
+    def put(self, call_site: str, key: str, completion: str):
+        """Store a completion if its call site is cached
+
+        Args:
+            call_site (str): Calling component
+            key (str): Key from completion_key
+            completion (str): Completion text
+        """
+        if not self.enabled_for(call_site) or completion is None:
+            return
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO completions (key, call_site, completion, created_at) VALUES (?, ?, ?, ?)",
+                (key, call_site, completion, time.time())
+            )
+            self._count(call_site, 'stores')
+
+            # Pruning scans the table, so only do it every 1% of capacity
+            self._puts_since_prune += 1
+            if self._puts_since_prune >= max(1, self.max_entries // 100):
+                self._puts_since_prune = 0
+                self._prune(conn)
+        except sqlite3.Error as e:
+            logger.error(f"Error writing completion cache: {str(e)}")
+
+    def _prune(self, conn: sqlite3.Connection):
+        """Delete expired completions and the oldest ones beyond capacity"""
+        longest_ttl = max(self.ttls.values(), default=0)
+        conn.execute("DELETE FROM completions WHERE created_at < ?", (time.time() - longest_ttl,))
+        count = conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM completions WHERE key IN "
+                "(SELECT key FROM completions ORDER BY created_at LIMIT ?)", (count - self.max_entries,)
+            )
+
+    def clear(self, call_site: Optional[str] = None):
+        """Remove cached completions
+
+        Args:
+            call_site (str, optional): Only remove completions of this call site
+        """
+        if call_site is None:
+            self._connection().execute("DELETE FROM completions")
+        else:
+            self._connection().execute("DELETE FROM completions WHERE call_site = ?", (call_site,))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit and miss counters per call site
+
+        Returns:
+            Dict: TTLs, stored entries and counters per call site
+        """
+        rows = self._connection().execute("SELECT call_site, COUNT(*) FROM completions GROUP BY call_site").fetchall()
+        entries = dict(rows)
+        with self._stats_lock:
+            counters = {site: dict(values) for site, values in self._stats.items()}
+
+        result = {}
+        for site in set(self.ttls) | set(counters) | set(entries):
+            values = counters.get(site, {'hits': 0, 'misses': 0, 'stores': 0})
+            lookups = values['hits'] + values['misses']
+            result[site] = dict(values, ttl=self.ttls.get(site), entries=entries.get(site, 0),
+                                hit_rate=(values['hits'] / lookups) if lookups else 0.0)
+        return result
+
+
+# Shared cache for this process
+_completion_cache = None
+_completion_cache_lock = threading.Lock()
+
+
+def get_completion_cache() -> Optional[CompletionCache]:
+    """Get the process-wide completion cache
+
+    Returns:
+        CompletionCache or None: The shared cache, None if disabled in the configuration
+    """
+    global _completion_cache
+
+    if not LLM_RESPONSE_CACHE_ENABLED:
+        return None
+    if _completion_cache is None:
+        with _completion_cache_lock:
+            if _completion_cache is None:
+                _completion_cache = CompletionCache()
+    return _completion_cache
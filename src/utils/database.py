@@ -1,16 +1,142 @@
-from sqlalchemy import create_engine, text, pool
+from sqlalchemy import create_engine, text, pool, event
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, scoped_session
-from src.utils.schema_manager import SchemaManager
+from src.utils.schema_manager import get_schema_manager
+from contextlib import contextmanager, ExitStack
 import pandas as pd
 import logging
+import threading
 import time
 import sqlite3
-from config.config import DATABASE_URI
+from src.utils.query_results import estimate_row_size, get_result_store
+from src.utils.result_cache import analyze_sql, get_result_cache, sql_dialect
+from config.config import (
+    DATABASE_URI, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    QUERY_RESULT_MAX_ROWS, QUERY_RESULT_MAX_BYTES, QUERY_RESULT_FETCH_SIZE
+)
 
 # Create a global session factory
 _Session = None
 
+# Registry of long-lived engines keyed by connection string, with usage counters keyed by engine id
+_engines = {}
+_engine_stats = {}
+_engines_lock = threading.Lock()
+
+def get_engine(connection_string=None):
+    """Get the shared, pooled engine for a connection string
+    
+    Engines are created once per connection string and reused for the life of the
+    process, so each query only checks a connection out of an existing pool.
+    
+    Args:
+        connection_string (str, optional): SQLAlchemy connection string, defaults to config
+        
+    Returns:
+        sqlalchemy.engine.Engine: The pooled engine
+    """
+    connection_string = connection_string or DATABASE_URI
+    engine = _engines.get(connection_string)
+    if engine is not None:
+        return engine
+    
+    with _engines_lock:
+        engine = _engines.get(connection_string)
+        if engine is None:
+            logger = logging.getLogger('text2sql.database')
+            engine_args = {
+                'pool_pre_ping': True,
+                'pool_recycle': DB_POOL_RECYCLE
+            }
+            if connection_string.startswith('sqlite'):
+                engine_args['connect_args'] = {'check_same_thread': False, 'timeout': 20}
+                if ':memory:' in connection_string or connection_string.rstrip('/') == 'sqlite:':
+                    # In-memory databases only exist on their single connection
+                    engine_args['poolclass'] = pool.StaticPool
+                else:
+                    engine_args['poolclass'] = pool.QueuePool
+            if engine_args.get('poolclass') is not pool.StaticPool:
+                engine_args.update({
+                    'pool_size': DB_POOL_SIZE,
+                    'max_overflow': DB_MAX_OVERFLOW,
+                    'pool_timeout': DB_POOL_TIMEOUT
+                })
+            
+            engine = create_engine(connection_string, **engine_args)
+            stats = {
+                'checkouts': 0,
+                'connections_created': 0,
+                'total_wait_time': 0.0,
+                'max_wait_time': 0.0
+            }
+            
+            @event.listens_for(engine, 'connect')
+            def _on_connect(dbapi_connection, connection_record):
+                stats['connections_created'] += 1
+            
+            _engine_stats[id(engine)] = stats
+            _engines[connection_string] = engine
+            logger.info(f"Created pooled engine for {engine.url.render_as_string(hide_password=True)}")
+    return engine
+
+@contextmanager
+def checkout_connection(engine):
+    """Check a connection out of an engine's pool, recording the wait time
+    
+    Args:
+        engine (sqlalchemy.engine.Engine): Engine from get_engine
+        
+    Yields:
+        sqlalchemy.engine.Connection: The checked-out connection
+    """
+    wait_start = time.time()
+    with engine.connect() as conn:
+        wait_time = time.time() - wait_start
+        stats = _engine_stats.get(id(engine))
+        if stats is not None:
+            with _engines_lock:
+                stats['checkouts'] += 1
+                stats['total_wait_time'] += wait_time
+                stats['max_wait_time'] = max(stats['max_wait_time'], wait_time)
+        yield conn
+
+def get_pool_stats():
+    """Get connection pool statistics for all registered engines
+    
+    Returns:
+        list: One dictionary per engine with pool size, checked-out and overflow
+              connections and connection wait times
+    """
+    pool_stats = []
+    with _engines_lock:
+        items = list(_engines.items())
+    for connection_string, engine in items:
+        engine_pool = engine.pool
+        stats = _engine_stats.get(id(engine), {})
+        checkouts = stats.get('checkouts', 0)
+        pool_stats.append({
+            'url': engine.url.render_as_string(hide_password=True),
+            'pool_class': type(engine_pool).__name__,
+            'pool_size': engine_pool.size() if hasattr(engine_pool, 'size') else None,
+            'checked_out': engine_pool.checkedout() if hasattr(engine_pool, 'checkedout') else None,
+            'checked_in': engine_pool.checkedin() if hasattr(engine_pool, 'checkedin') else None,
+            'overflow': engine_pool.overflow() if hasattr(engine_pool, 'overflow') else None,
+            'status': engine_pool.status(),
+            'checkouts': checkouts,
+            'connections_created': stats.get('connections_created', 0),
+            'avg_wait_ms': (stats.get('total_wait_time', 0.0) / checkouts * 1000) if checkouts else 0.0,
+            'max_wait_ms': stats.get('max_wait_time', 0.0) * 1000
+        })
+    return pool_stats
+
+def dispose_engines():
+    """Dispose all registered engines and their pooled connections"""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _engine_stats.clear()
+
 def get_db_session():
     """Get a scoped database session
     
@@ -109,12 +235,12 @@ class DatabaseManager:
         self.engine = None
         
     def connect(self):
-        """Establish database connection"""
+        """Establish database connection using the shared engine for the connection string"""
         start_time = time.time()
         self.logger.info("Attempting database connection")
         
         try:
-            self.engine = create_engine(self.connection_string)
+            self.engine = get_engine(self.connection_string)
             self.logger.info(f"Database connection established in {time.time() - start_time:.2f}s")
             return True
         except Exception as e:
@@ -122,69 +248,173 @@ class DatabaseManager:
             print(f"Database connection error: {e}")
             return False
     
-    def execute_query(self, sql_query):
-        """Execute an SQL query and return results
+    def get_workspace_engine(self, workspace_name=None):
+        """Get the engine for a workspace
+        
+        A workspace can point at its own database with a 'database_uri' entry in
+        schema.json; otherwise the manager's default connection is used.
+        
+        Args:
+            workspace_name (str, optional): Name of the workspace
+            
+        Returns:
+            sqlalchemy.engine.Engine: The pooled engine for the workspace
+        """
+        if workspace_name:
+            workspace = get_schema_manager().get_workspace_by_name(workspace_name)
+            if workspace and workspace.get('database_uri'):
+                return get_engine(workspace['database_uri'])
+        if not self.engine:
+            self.engine = get_engine(self.connection_string)
+        return self.engine
+    
+    @contextmanager
+    def stream_query(self, sql_query, workspace_name=None):
+        """Execute an SQL query on a server-side cursor and iterate over its rows
+        
+        Rows are fetched from the database in batches of QUERY_RESULT_FETCH_SIZE, so
+        arbitrarily large results can be paged or downloaded without loading them
+        into memory. The connection stays checked out until the block exits.
         
         Args:
             sql_query (str): The SQL query to execute
+            workspace_name (str, optional): Workspace whose database the query runs against
+            
+        Yields:
+            tuple: (columns, rows) with the column names and an iterator over row tuples
+        """
+        engine = self.get_workspace_engine(workspace_name)
+        with checkout_connection(engine) as conn:
+            result = conn.execution_options(stream_results=True).execute(text(sql_query))
+            
+            def iterate_rows():
+                while True:
+                    batch = result.fetchmany(QUERY_RESULT_FETCH_SIZE)
+                    if not batch:
+                        break
+                    for row in batch:
+                        yield tuple(row)
+            
+            try:
+                yield list(result.keys()), iterate_rows()
+            finally:
+                result.close()
+    
+    def execute_query(self, sql_query, workspace_name=None, max_rows=None, max_bytes=None, use_cache=True,
+                      result_owner=None):
+        """Execute an SQL query and return the first page of results
+        
+        At most max_rows rows (and roughly max_bytes of data) are returned. When the
+        result is larger, it is marked as truncated and a result handle is returned
+        that can be used to fetch further pages or download the full result. The
+        rest of the result is read from the same cursor in the background and
+        spilled to disk for those requests.
+        
+        Args:
+            sql_query (str): The SQL query to execute
+            workspace_name (str, optional): Workspace whose database the query runs against
+            max_rows (int, optional): Row cap for the returned page, defaults to QUERY_RESULT_MAX_ROWS
+            max_bytes (int, optional): Size cap for the returned page, defaults to QUERY_RESULT_MAX_BYTES
+            use_cache (bool, optional): Serve and store read-only results through the result cache
+            result_owner (optional): ID of the user allowed to page through a truncated result
             
         Returns:
             dict: Dictionary with query results and metadata
         """
         start_time = time.time()
         self.logger.info(f"Executing SQL query: {sql_query}")
+        max_rows = QUERY_RESULT_MAX_ROWS if max_rows is None else max_rows
+        max_bytes = QUERY_RESULT_MAX_BYTES if max_bytes is None else max_bytes
         
-        if not self.engine:
-            self.logger.warning("No active database connection, attempting to connect")
-            if not self.connect():
-                self.logger.error("Failed to connect to database to execute query")
-                return {"error": "Database connection failed", "data": None}
+        try:
+            engine = self.get_workspace_engine(workspace_name)
+        except Exception as e:
+            self.logger.error(f"Failed to connect to database to execute query: {str(e)}", exc_info=True)
+            return {"error": "Database connection failed", "data": None}
+        
+        # Serve byte-identical read-only SQL from the result cache
+        result_cache = get_result_cache()
+        dialect = sql_dialect(engine.dialect.name)
+        cache_args = (str(engine.url), workspace_name, sql_query)
+        # Parsed once, for both caching the result and invalidating after writes
+        analysis = analyze_sql(sql_query, dialect) if result_cache is not None else None
+        data_versions = None
+        if result_cache is not None and use_cache:
+            cached = result_cache.get(*cache_args, variant=(max_rows, max_bytes))
+            if cached is not None:
+                self.logger.info(f"Query result served from cache ({cached['row_count']} rows)")
+                return cached
+            # Taken before execution, so a write landing meanwhile makes the stored result stale
+            data_versions = result_cache.data_versions()
         
         try:
-            # Execute the query and fetch results
-            with self.engine.connect() as conn:
-                self.logger.info("Query execution started")
-                execution_start = time.time()
-                result = conn.execute(text(sql_query))
-                data = result.fetchall()
-                execution_time = time.time() - execution_start
-                self.logger.info(f"Query execution completed in {execution_time:.2f}s")
+            # Execute the query and fetch the first page from a server-side cursor
+            self.logger.info("Query execution started")
+            execution_start = time.time()
+            data = []
+            page_bytes = 0
+            truncated = False
+            result_handle = None
+            with ExitStack() as cursor_scope:
+                columns, rows = cursor_scope.enter_context(self.stream_query(sql_query, workspace_name))
+                for row in rows:
+                    if len(data) >= max_rows or page_bytes >= max_bytes:
+                        truncated = True
+                        break
+                    data.append(row)
+                    page_bytes += estimate_row_size(row)
                 
-                # Convert to pandas DataFrame for easier data manipulation
-                if data:
-                    df = pd.DataFrame(data, columns=result.keys())
-                    self.logger.info(f"Query returned {len(df)} rows with {len(df.columns)} columns")
-                    
-                    # Log sample data (first few rows) at debug level
-                    # if len(df) > 0:
-                    #     sample_size = min(3, len(df))
-                    #     sample_df = df.head(sample_size)
-                    #     self.logger.info(f"Sample data (first {sample_size} rows):\n{sample_df.to_string()}")
-                    
-                    processing_time = time.time() - start_time
-                    self.logger.info(f"Query processing completed in {processing_time:.2f}s")
-                    
-                    return {
-                        "success": True,
-                        "data": df,
-                        "row_count": len(df),
-                        "columns": df.columns.tolist(),
-                        "error": None,
-                        "execution_time": execution_time
-                    }
-                else:
-                    self.logger.info("Query executed successfully but returned no rows")
-                    processing_time = time.time() - start_time
-                    self.logger.info(f"Query processing completed in {processing_time:.2f}s")
-                    
-                    return {
-                        "success": True,
-                        "data": None,
-                        "row_count": 0,
-                        "columns": result.keys(),
-                        "error": None,
-                        "execution_time": execution_time
-                    }
+                if truncated:
+                    # Hand the open cursor to a background spill of the whole result
+                    result_store = get_result_store()
+                    result_handle = result_store.register(
+                        sql_query, columns, workspace_name=workspace_name,
+                        connection_string=self.connection_string, owner=result_owner
+                    )
+                    result_store.spill(result_handle, rows, release=cursor_scope.pop_all().close, buffered=data + [row])
+                    self.logger.info(f"Result truncated after {len(data)} rows (~{page_bytes} bytes), handle {result_handle}")
+            execution_time = time.time() - execution_start
+            self.logger.info(f"Query execution completed in {execution_time:.2f}s")
+            
+            # Convert to pandas DataFrame for easier data manipulation
+            if data:
+                df = pd.DataFrame(data, columns=columns)
+                self.logger.info(f"Query returned {len(df)} rows with {len(df.columns)} columns")
+                
+                processing_time = time.time() - start_time
+                self.logger.info(f"Query processing completed in {processing_time:.2f}s")
+                
+                query_result = {
+                    "success": True,
+                    "data": df,
+                    "row_count": len(df),
+                    "columns": df.columns.tolist(),
+                    "truncated": truncated,
+                    "result_handle": result_handle,
+                    "error": None,
+                    "execution_time": execution_time
+                }
+            else:
+                self.logger.info("Query executed successfully but returned no rows")
+                processing_time = time.time() - start_time
+                self.logger.info(f"Query processing completed in {processing_time:.2f}s")
+                
+                query_result = {
+                    "success": True,
+                    "data": None,
+                    "row_count": 0,
+                    "columns": columns,
+                    "truncated": False,
+                    "result_handle": None,
+                    "error": None,
+                    "execution_time": execution_time
+                }
+            
+            # Truncated results are not cached: their handle belongs to the user who ran the query
+            if data_versions is not None and not truncated:
+                result_cache.put(*cache_args, query_result, variant=(max_rows, max_bytes),
+                                 dialect=dialect, data_versions=data_versions, analysis=analysis)
+            return query_result
                     
         except SQLAlchemyError as e:
             processing_time = time.time() - start_time
@@ -196,9 +426,15 @@ class DatabaseManager:
                 "data": None,
                 "row_count": 0,
                 "columns": [],
+                "truncated": False,
+                "result_handle": None,
                 "error": error_msg,
                 "execution_time": processing_time
             }
+        finally:
+            # Writes may have changed tables even when they failed part-way
+            if result_cache is not None:
+                result_cache.invalidate_statement(sql_query, dialect, analysis=analysis)
     
     def get_query_examples(self, table_name=None, limit=5):
         """Get example queries for a given table or the database
@@ -214,7 +450,7 @@ class DatabaseManager:
         examples = []
         
         # Use schema manager to get table information
-        schema_manager = SchemaManager()
+        schema_manager = get_schema_manager()
         
         # Add table-specific examples if table_name is provided
         if table_name:
@@ -324,11 +560,9 @@ class DatabaseManager:
         return examples
     
     def close(self):
-        """Close database connections"""
+        """Release the engine reference; pooled engines are shared and disposed by dispose_engines()"""
         self.logger.info("Closing database connection")
-        if self.engine:
-            self.engine.dispose()
-            self.logger.info("Database engine disposed")
+        self.engine = None
     
     def save_user_query(self, user_id, query_text, query_name, query_description):
         """Save a user query to the database
@@ -0,0 +1,732 @@
+"""
+In-process vector database client for Text2SQL application.
+Talks to a ChromaDB PersistentClient directly instead of going through the
+ChromaDB service, which removes the HTTP hop and JSON (de)serialization of
+every vector for single-host deployments. Selected with an embedded:// URL,
+e.g. CHROMADB_SERVICE_URL=embedded://./chroma_data.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from chromadb_service.serving import format_query_results
+from src.utils.model_registry import get_embedding_model
+from src.utils.vector_store_client import VectorStoreClient
+
+logger = logging.getLogger('text2sql.vector_embedded')
+
+EMBEDDED_SCHEME = 'embedded://'
+
+# Collection metadata key holding the version tag of the model that produced its vectors
+EMBEDDING_MODEL_KEY = 'embedding_model'
+
+# One ChromaDB client and embedding function per data directory, shared by all stores of the process
+_shared_clients: Dict[str, Tuple[Any, Any]] = {}
+_shared_clients_lock = threading.Lock()
+
+# Lock file taken in every opened data directory, so a second process cannot open it too
+LOCK_FILE_NAME = '.text2sql.lock'
+_lock_files: Dict[str, Any] = {}
+
+
+def is_embedded_url(url: Optional[str]) -> bool:
+    """Check whether a vector store URL selects the embedded backend
+
+    Args:
+        url (str): Value of CHROMADB_SERVICE_URL or an explicit store URI
+
+    Returns:
+        bool: True for embedded:// URLs
+    """
+    return bool(url) and url.startswith(EMBEDDED_SCHEME)
+
+
+def embedded_path(url: str) -> str:
+    """Get the data directory of an embedded:// URL
+
+    Args:
+        url (str): URL like embedded://./chroma_data or embedded:///var/lib/chroma
+
+    Returns:
+        str: The data directory, ./chroma_data if the URL has none
+    """
+    return url[len(EMBEDDED_SCHEME):] or './chroma_data'
+
+
+class ModelEmbeddingFunction:
+    """ChromaDB embedding function backed by the app's shared embedding model
+
+    Texts stored or searched without vectors are embedded by the same model as
+    the vectors the app computes itself, so both live in one embedding space.
+    """
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        model = get_embedding_model()
+        if model is None:
+            raise RuntimeError("Embedding model is not available")
+        return np.asarray(model.encode(list(input), convert_to_numpy=True), dtype=np.float32).tolist()
+
+
+def _lock_data_directory(path: str):
+    """Take an exclusive lock on a data directory for the lifetime of the process
+
+    Args:
+        path (str): Absolute ChromaDB data directory
+
+    Raises:
+        RuntimeError: If another process holds the directory
+    """
+    try:
+        import fcntl
+    except ImportError:
+        logger.warning(f"File locks are not supported here, make sure only one process opens {path}")
+        return
+
+    lock_file = open(os.path.join(path, LOCK_FILE_NAME), 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        raise RuntimeError(f"Embedded ChromaDB at {path} is already open in another process; "
+                           f"run a single worker or use the ChromaDB service")
+    _lock_files[path] = lock_file
+
+
+def _get_shared_client(persist_directory: str) -> Tuple[Any, Any]:
+    """Get the process-wide ChromaDB client and embedding function for a data directory
+
+    Args:
+        persist_directory (str): ChromaDB data directory
+
+    Returns:
+        Tuple: (chromadb.PersistentClient, embedding function)
+
+    Raises:
+        RuntimeError: If another process has the data directory open
+    """
+    path = os.path.abspath(persist_directory)
+    if path not in _shared_clients:
+        with _shared_clients_lock:
+            if path not in _shared_clients:
+                # Optional dependency, only needed when the embedded backend is selected
+                import chromadb
+
+                os.makedirs(path, exist_ok=True)
+                if path not in _lock_files:
+                    _lock_data_directory(path)
+                client = chromadb.PersistentClient(path=path)
+                _shared_clients[path] = (client, ModelEmbeddingFunction())
+    return _shared_clients[path]
+
+
+class EmbeddedVectorStoreClient:
+    """In-process ChromaDB client with the same interface as VectorStoreClient
+
+    Only one process may open a data directory, which connect() enforces with
+    an exclusive file lock, so this backend suits a single-worker deployment
+    where the app replaces the ChromaDB service.
+    """
+
+    _clean_metadata = staticmethod(VectorStoreClient._clean_metadata)
+    _format_result = staticmethod(VectorStoreClient._format_result)
+
+    def __init__(self, persist_directory: str = './chroma_data', batch_size: int = 256,
+                 embedding_model: str = None):
+        """Initialize the embedded vector database client
+
+        Args:
+            persist_directory (str, optional): ChromaDB data directory
+            batch_size (int, optional): Default number of vectors or queries per bulk call
+            embedding_model (str, optional): Version tag of the embedding model; collections holding
+                vectors of another version are refused for writes and vector searches
+        """
+        self.logger = logging.getLogger('text2sql.vector_embedded')
+        self.persist_directory = persist_directory
+        self.batch_size = batch_size
+        self.embedding_model = embedding_model
+        self.client = None
+        self.embedding_function = None
+
+    def _collection(self, collection_name: str, create: bool = False):
+        """Get a collection, connecting on first use
+
+        Args:
+            collection_name (str): Name of the collection
+            create (bool, optional): Create the collection if it does not exist
+
+        Returns:
+            chromadb Collection
+
+        Raises:
+            Exception: If not connected or the collection does not exist and create is False
+        """
+        if self.client is None and not self.connect():
+            raise RuntimeError(f"Embedded ChromaDB at {self.persist_directory} is not available")
+        try:
+            return self.client.get_collection(name=collection_name, embedding_function=self.embedding_function)
+        except Exception:
+            if not create:
+                raise
+        metadata = {"created_by": "text2sql_app"}
+        if self.embedding_model:
+            metadata[EMBEDDING_MODEL_KEY] = self.embedding_model
+        return self.client.create_collection(
+            name=collection_name,
+            embedding_function=self.embedding_function,
+            metadata=metadata
+        )
+
+    def _vector_collection(self, collection_name: str, write: bool = False):
+        """Get a collection for writing or searching vectors, checking its embedding model
+
+        Empty collections without a model tag are tagged by their first write. Untagged
+        collections that already hold vectors are refused until they are tagged (the app
+        does so for its own collections at startup), or deleted and re-indexed.
+
+        Args:
+            collection_name (str): Name of the collection
+            write (bool, optional): Vectors will be written, creating the collection if needed
+
+        Returns:
+            chromadb Collection
+
+        Raises:
+            ValueError: If the collection holds vectors of another or an unknown embedding model version
+        """
+        collection = self._collection(collection_name, create=write)
+        if not self.embedding_model:
+            return collection
+        metadata = dict(getattr(collection, 'metadata', None) or {})
+        tagged = metadata.get(EMBEDDING_MODEL_KEY)
+        if tagged is None:
+            if collection.count():
+                raise ValueError(f"Collection {collection_name} holds untagged embeddings; "
+                                 f"tag it with tag_collection or delete and re-index it")
+            if write:
+                self._tag(collection, self.embedding_model)
+        elif tagged != self.embedding_model:
+            raise ValueError(f"Collection {collection_name} holds embeddings of '{tagged}', "
+                             f"not '{self.embedding_model}'")
+        return collection
+
+    @staticmethod
+    def _tag(collection, embedding_model: str):
+        """Record the embedding model version of a collection's vectors in its metadata"""
+        metadata = dict(getattr(collection, 'metadata', None) or {})
+        metadata[EMBEDDING_MODEL_KEY] = embedding_model
+        # The distance function cannot be changed, so hnsw settings are left out
+        collection.modify(metadata={k: v for k, v in metadata.items() if not k.startswith('hnsw:')})
+
+    @staticmethod
+    def _format_entry(doc_id: str, document: Optional[str], metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Format a stored entry like VectorStoreClient.query_by_filter"""
+        result = {'id': doc_id, 'query_text': document or '', 'text': document or ''}
+        for key, value in (metadata or {}).items():
+            if isinstance(value, str) and ',' in value and key.endswith('_used'):
+                result[key] = value.split(',')
+            else:
+                result[key] = value
+        return result
+
+    @staticmethod
+    def _attach_embeddings(results: List[Dict[str, Any]], embeddings: Any) -> List[Dict[str, Any]]:
+        """Add the embeddings of search matches to the formatted results as NumPy arrays"""
+        if embeddings is not None:
+            for result, embedding in zip(results, embeddings):
+                result['embedding'] = np.asarray(embedding, dtype=np.float32)
+        return results
+
+    def connect(self) -> bool:
+        """Open the ChromaDB data directory in-process
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        start_time = time.time()
+        self.logger.info(f"Opening embedded ChromaDB at {self.persist_directory}")
+
+        try:
+            self.client, self.embedding_function = _get_shared_client(self.persist_directory)
+            self.logger.info(f"Embedded ChromaDB opened in {time.time() - start_time:.2f}s")
+            return True
+        except ImportError:
+            self.logger.error("The embedded vector store requires the chromadb package")
+            return False
+        except Exception as e:
+            self.logger.error(f"Embedded ChromaDB error: {str(e)}", exc_info=True)
+            return False
+
+    def count(self, collection_name: str) -> int:
+        """Count documents in a collection
+
+        Args:
+            collection_name: Name of the collection
+
+        Returns:
+            int: Number of documents in the collection
+        """
+        try:
+            return self._collection(collection_name).count()
+        except Exception as e:
+            self.logger.error(f"Error counting documents in collection {collection_name}: {str(e)}")
+            return 0
+
+    def list_entries(self, collection_name: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """List entries in a collection with metadata
+
+        Args:
+            collection_name: Name of the collection
+            limit: Maximum number of entries to return
+
+        Returns:
+            List[Dict]: List of entries with metadata
+        """
+        try:
+            results = self._collection(collection_name).get(limit=limit, include=['metadatas', 'documents'])
+            documents = results.get('documents') or []
+            metadatas = results.get('metadatas') or []
+            return [
+                {
+                    'id': doc_id,
+                    'text': documents[i] if i < len(documents) else '',
+                    'metadata': (metadatas[i] if i < len(metadatas) else None) or {}
+                }
+                for i, doc_id in enumerate(results.get('ids', []))
+            ]
+        except Exception as e:
+            self.logger.error(f"Error listing entries in collection {collection_name}: {str(e)}")
+            return []
+
+    def init_collection(self, collection_name: str, dimension: int = None) -> bool:
+        """Initialize a vector collection if it doesn't exist
+
+        Args:
+            collection_name (str): Name of the collection to initialize
+            dimension (int, optional): Vector dimension (not used, kept for compatibility)
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            self._collection(collection_name, create=True)
+            self.logger.info(f"Collection '{collection_name}' is ready")
+            return True
+        except Exception as e:
+            self.logger.error(f"Error initializing collection {collection_name}: {str(e)}", exc_info=True)
+            return False
+
+    def delete_collection(self, collection_name: str) -> bool:
+        """Delete a collection
+
+        Args:
+            collection_name (str): Name of the collection to delete
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            if self.client is None and not self.connect():
+                return False
+            self.client.delete_collection(name=collection_name)
+            self.logger.info(f"Deleted collection {collection_name}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Error deleting collection {collection_name}: {str(e)}", exc_info=True)
+            return False
+
+    def insert_embedding(self, collection_name: str, feedback_id: int, vector: List[float],
+                         query_text: str, metadata: Dict[str, Any] = None) -> bool:
+        """Insert a vector embedding into the database
+
+        Args:
+            collection_name (str): Name of the collection to insert into
+            feedback_id (int): ID of the feedback entry (primary key)
+            vector (List[float]): Vector embedding to store (optional)
+            query_text (str): The query text associated with the embedding
+            metadata (Dict): Additional metadata to store with the vector
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            doc_data = {"documents": [query_text], "ids": [str(feedback_id)]}
+            if metadata:
+                doc_data["metadatas"] = [self._clean_metadata(metadata, query_text)]
+            if vector is not None and len(vector) > 0:
+                doc_data["embeddings"] = [np.asarray(vector, dtype=np.float32)]
+
+            self._vector_collection(collection_name, write=True).add(**doc_data)
+            self.logger.info(f"Inserted embedding for feedback_id {feedback_id} into collection {collection_name}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Error inserting embedding into collection {collection_name}: {str(e)}", exc_info=True)
+            return False
+
+    def _write_embeddings(self, collection_name: str, items: List[Dict[str, Any]], mode: str,
+                          batch_size: int = None) -> Dict[str, Any]:
+        """Write many embeddings, one ChromaDB call per chunk
+
+        Args:
+            collection_name (str): Name of the collection to write to
+            items (List[Dict]): Entries with 'id', 'text' and optional 'vector' and 'metadata'
+            mode (str): 'add' or 'upsert'
+            batch_size (int, optional): Entries per call, defaults to the client's batch size
+
+        Returns:
+            Dict: 'success' (all written), 'count' (written) and 'failed' ([{'id', 'error'}])
+        """
+        batch_size = batch_size or self.batch_size
+        written = 0
+        failed = []
+
+        try:
+            collection = self._vector_collection(collection_name, write=True)
+        except Exception as e:
+            self.logger.error(f"Error opening collection {collection_name}: {str(e)}")
+            return {'success': False, 'count': 0,
+                    'failed': [{'id': str(item['id']), 'error': str(e)} for item in items]}
+        write = collection.upsert if mode == 'upsert' else collection.add
+
+        # ChromaDB needs embeddings for all documents of a call or for none
+        with_vectors = [item for item in items if item.get('vector') is not None and len(item['vector']) > 0]
+        without_vectors = [item for item in items if item.get('vector') is None or len(item['vector']) == 0]
+
+        for group in (with_vectors, without_vectors):
+            for start in range(0, len(group), batch_size):
+                chunk = group[start:start + batch_size]
+                doc_data = {
+                    "documents": [item['text'] for item in chunk],
+                    "ids": [str(item['id']) for item in chunk]
+                }
+                if any(item.get('metadata') for item in chunk):
+                    doc_data["metadatas"] = [
+                        self._clean_metadata(item.get('metadata'), item['text']) for item in chunk
+                    ]
+                if group is with_vectors:
+                    doc_data["embeddings"] = np.asarray([item['vector'] for item in chunk], dtype=np.float32)
+
+                try:
+                    write(**doc_data)
+                    written += len(chunk)
+                except Exception as e:
+                    self.logger.error(f"Error writing embedding batch to collection {collection_name}: {str(e)}")
+                    failed.extend({'id': id_, 'error': str(e)} for id_ in doc_data['ids'])
+
+        if failed:
+            self.logger.warning(f"Wrote {written}/{len(items)} embeddings to collection {collection_name}, {len(failed)} failed")
+        else:
+            self.logger.info(f"Wrote {written} embeddings to collection {collection_name} ({mode})")
+        return {'success': not failed, 'count': written, 'failed': failed}
+
+    def insert_embeddings(self, collection_name: str, items: List[Dict[str, Any]],
+                          batch_size: int = None) -> Dict[str, Any]:
+        """Insert many vector embeddings with one call per batch
+
+        Args:
+            collection_name (str): Name of the collection to insert into
+            items (List[Dict]): Entries with 'id', 'text' and optional 'vector' and 'metadata'
+            batch_size (int, optional): Entries per call, defaults to the client's batch size
+
+        Returns:
+            Dict: 'success' (all written), 'count' (written) and 'failed' ([{'id', 'error'}])
+        """
+        return self._write_embeddings(collection_name, items, 'add', batch_size)
+
+    def upsert_embeddings(self, collection_name: str, items: List[Dict[str, Any]],
+                          batch_size: int = None) -> Dict[str, Any]:
+        """Insert or replace many vector embeddings with one call per batch
+
+        Args:
+            collection_name (str): Name of the collection to write to
+            items (List[Dict]): Entries with 'id', 'text' and optional 'vector' and 'metadata'
+            batch_size (int, optional): Entries per call, defaults to the client's batch size
+
+        Returns:
+            Dict: 'success' (all written), 'count' (written) and 'failed' ([{'id', 'error'}])
+        """
+        return self._write_embeddings(collection_name, items, 'upsert', batch_size)
+
+    def _query(self, collection_name: str, limit: int, filter_expr: Optional[Dict[str, Any]],
+               include_embeddings: bool = False, **query) -> Dict[str, Any]:
+        """Run collection.query with the include list used by the ChromaDB service"""
+        include = ['metadatas', 'documents', 'distances']
+        if include_embeddings:
+            include.append('embeddings')
+        if filter_expr:
+            query['where'] = filter_expr
+        return self._vector_collection(collection_name).query(n_results=limit, include=include, **query)
+
+    def search_many(self, collection_name: str, vectors: List[List[float]], limit: int = 5,
+                    filter_expr: Optional[Dict[str, Any]] = None, batch_size: int = None,
+                    include_embeddings: bool = False) -> List[List[Dict[str, Any]]]:
+        """Search for similar vectors for many query vectors with one call per batch
+
+        Args:
+            collection_name (str): Name of the collection to search in
+            vectors (List[List[float]] or numpy.ndarray): Query vectors to search with
+            limit (int): Maximum number of results per query
+            filter_expr (Dict[str, Any], optional): ChromaDB where clause applied to every query
+            batch_size (int, optional): Queries per call, defaults to the client's batch size
+            include_embeddings (bool, optional): Add each match's embedding as a NumPy array
+
+        Returns:
+            List[List[Dict]]: Search results per query vector, in input order; empty for failed batches
+        """
+        batch_size = batch_size or self.batch_size
+        all_results = []
+        for start in range(0, len(vectors), batch_size):
+            chunk = np.asarray(vectors[start:start + batch_size], dtype=np.float32)
+            chunk_results = [[] for _ in range(len(chunk))]
+            try:
+                results = self._query(collection_name, limit, filter_expr, include_embeddings,
+                                      query_embeddings=chunk)
+                embeddings = results.get('embeddings')
+                for i in range(len(chunk)):
+                    chunk_results[i] = self._attach_embeddings(
+                        [self._format_result(result) for result in format_query_results(results, i)],
+                        embeddings[i] if embeddings is not None else None)
+            except Exception as e:
+                self.logger.error(f"Error batch searching collection {collection_name}: {str(e)}", exc_info=True)
+            all_results.extend(chunk_results)
+        return all_results
+
+    def search_similar(self, collection_name: str, vector: List[float], limit: int = 5,
+                       filter_expr: Optional[Dict[str, Any]] = None, output_fields: List[str] = None,
+                       include_embeddings: bool = False) -> List[Dict[str, Any]]:
+        """Search for similar vectors
+
+        Args:
+            collection_name (str): Name of the collection to search in
+            vector (List[float] or numpy.ndarray): Query vector to search with
+            limit (int): Maximum number of results to return
+            filter_expr (Dict[str, Any], optional): ChromaDB where clause for filtering
+            output_fields (List[str], optional): Specific fields to return (kept for compatibility)
+            include_embeddings (bool, optional): Add each match's embedding as a NumPy array
+
+        Returns:
+            List[Dict]: List of search results with similarity scores
+        """
+        try:
+            results = self._query(collection_name, limit, filter_expr, include_embeddings,
+                                  query_embeddings=np.asarray([vector], dtype=np.float32))
+            embeddings = results.get('embeddings')
+            return self._attach_embeddings(
+                [self._format_result(result) for result in format_query_results(results)],
+                embeddings[0] if embeddings is not None else None)
+        except Exception as e:
+            self.logger.error(f"Error searching similar vectors in collection {collection_name}: {str(e)}", exc_info=True)
+            return []
+
+    def update_embedding(self, collection_name: str, feedback_id: int, vector: List[float],
+                         query_text: str, metadata: Dict[str, Any] = None) -> bool:
+        """Update an existing vector embedding
+
+        Args:
+            collection_name (str): Name of the collection to update in
+            feedback_id (int): ID of the feedback entry to update
+            vector (List[float]): New vector embedding
+            query_text (str): Updated query text
+            metadata (Dict): Updated metadata
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            collection = self._vector_collection(collection_name, write=True)
+            # Replace the entry like the ChromaDB service does, so stale metadata keys are dropped
+            collection.delete(ids=[str(feedback_id)])
+            update_data = {"ids": [str(feedback_id)], "documents": [query_text]}
+            if metadata:
+                update_data["metadatas"] = [self._clean_metadata(metadata, query_text)]
+            if vector is not None and len(vector) > 0:
+                update_data["embeddings"] = [np.asarray(vector, dtype=np.float32)]
+            collection.add(**update_data)
+            self.logger.info(f"Updated embedding for feedback_id {feedback_id} in collection {collection_name}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Error updating embedding in collection {collection_name}: {str(e)}", exc_info=True)
+            return False
+
+    def delete_embedding(self, collection_name: str, feedback_id: int) -> bool:
+        """Delete a vector embedding from the database
+
+        Args:
+            collection_name (str): Name of the collection to delete from
+            feedback_id (int): ID of the feedback entry to delete
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            self._collection(collection_name).delete(ids=[str(feedback_id)])
+            self.logger.info(f"Deleted embedding for feedback_id {feedback_id} from collection {collection_name}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Error deleting embedding from collection {collection_name}: {str(e)}", exc_info=True)
+            return False
+
+    def delete_by_filter(self, collection_name: str, filter_expr: Dict[str, Any]) -> bool:
+        """Delete documents from a collection by filter expression
+
+        Args:
+            collection_name (str): Name of the collection to delete from
+            filter_expr (Dict[str, Any]): ChromaDB where clause to identify documents to delete
+
+        Returns:
+            bool: True if any document was deleted, False otherwise
+        """
+        try:
+            collection = self._collection(collection_name)
+            ids = collection.get(where=filter_expr or None, include=[]).get('ids', [])
+            if ids:
+                collection.delete(ids=ids)
+            self.logger.info(f"Deleted {len(ids)} documents from collection {collection_name} with filter: {filter_expr}")
+            return len(ids) > 0
+        except Exception as e:
+            self.logger.error(f"Error deleting by filter from collection {collection_name}: {str(e)}", exc_info=True)
+            return False
+
+    def query_by_filter(self, collection_name: str, filter_expr: Dict[str, Any], limit: int = 100,
+                        output_fields: List[str] = None) -> List[Dict[str, Any]]:
+        """Query entries by filter expression
+
+        Args:
+            collection_name (str): Name of the collection to query
+            filter_expr (Dict[str, Any]): ChromaDB where clause for filtering
+            limit (int): Maximum number of results to return
+            output_fields (List[str], optional): Specific fields to return (kept for compatibility)
+
+        Returns:
+            List[Dict]: List of query results
+        """
+        try:
+            results = self._collection(collection_name).get(
+                where=filter_expr or None, limit=limit, include=['metadatas', 'documents'])
+            documents = results.get('documents') or []
+            metadatas = results.get('metadatas') or []
+            return [
+                self._format_entry(doc_id,
+                                   documents[i] if i < len(documents) else '',
+                                   metadatas[i] if i < len(metadatas) else None)
+                for i, doc_id in enumerate(results.get('ids', []))
+            ]
+        except Exception as e:
+            self.logger.error(f"Error querying by filter in collection {collection_name}: {str(e)}", exc_info=True)
+            return []
+
+    def close(self):
+        """Release this client; the shared ChromaDB client stays open for other stores"""
+        self.logger.info("Closing embedded ChromaDB client")
+        self.client = None
+
+    def search_by_text(self, collection_name: str, query_text: str, limit: int = 5,
+                       filter_expr: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Search for similar vectors using text query
+
+        Args:
+            collection_name (str): Name of the collection to search in
+            query_text (str): Text query to search with
+            limit (int): Maximum number of results to return
+            filter_expr (Dict[str, Any], optional): ChromaDB where clause for filtering
+
+        Returns:
+            List[Dict]: List of search results with similarity scores
+        """
+        try:
+            results = self._query(collection_name, limit, filter_expr, query_texts=[query_text])
+            return [self._format_result(result) for result in format_query_results(results)]
+        except Exception as e:
+            self.logger.error(f"Error searching by text in collection {collection_name}: {str(e)}", exc_info=True)
+            return []
+
+    def list_collections(self) -> List[str]:
+        """List all collections
+
+        Returns:
+            List[str]: List of collection names
+        """
+        try:
+            if self.client is None and not self.connect():
+                return []
+            # Older ChromaDB versions return Collection objects, newer ones return names
+            collection_names = [getattr(col, 'name', col) for col in self.client.list_collections()]
+            self.logger.info(f"Found collections: {collection_names}")
+            return collection_names
+        except Exception as e:
+            self.logger.error(f"Error listing collections: {e}")
+            return []
+
+    def get_collection_metadata(self, collection_name: str) -> Dict[str, Any]:
+        """Get metadata for a collection
+
+        Args:
+            collection_name: Name of the collection
+
+        Returns:
+            Dict: Collection metadata
+        """
+        try:
+            collection = self._collection(collection_name)
+            return {
+                'name': collection_name,
+                'count': collection.count(),
+                'metadata': getattr(collection, 'metadata', None) or {}
+            }
+        except Exception as e:
+            self.logger.error(f"Error getting collection metadata for {collection_name}: {e}")
+            return {}
+
+    def tag_collection(self, collection_name: str, embedding_model: str = None) -> bool:
+        """Tag a collection with the embedding model version of its vectors
+
+        Operator step for collections created before tagging, once their vectors are
+        known to come from the given model or have been re-embedded with it.
+
+        Args:
+            collection_name: Name of the collection
+            embedding_model: Version tag, defaults to this client's embedding model
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        embedding_model = embedding_model or self.embedding_model
+        if not embedding_model:
+            self.logger.error(f"No embedding model version to tag collection {collection_name} with")
+            return False
+        try:
+            self._tag(self._collection(collection_name), embedding_model)
+            self.logger.info(f"Tagged collection {collection_name} with {embedding_model}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Error tagging collection {collection_name}: {str(e)}", exc_info=True)
+            return False
+
+    def tag_untagged_collection(self, collection_name: str, embedding_model: str) -> Optional[str]:
+        """Tag a collection that holds vectors but no model tag, leaving other collections as they are
+
+        Args:
+            collection_name: Name of the collection
+            embedding_model: Version tag the collection's vectors are known to have
+
+        Returns:
+            str or None: The collection's tag afterwards, None if it is missing, empty and untagged, or on error
+        """
+        try:
+            collection = self._collection(collection_name)
+        except Exception:
+            return None
+        try:
+            tagged = (getattr(collection, 'metadata', None) or {}).get(EMBEDDING_MODEL_KEY)
+            if tagged is None and collection.count():
+                self._tag(collection, embedding_model)
+                self.logger.info(f"Tagged collection {collection_name} with {embedding_model}")
+                tagged = embedding_model
+            return tagged
+        except Exception as e:
+            self.logger.error(f"Error tagging collection {collection_name}: {str(e)}", exc_info=True)
+            return None
@@ -0,0 +1,129 @@
+"""
+Dynamic micro-batching of embedding requests.
+Embedding requests arriving from different request threads within a few
+milliseconds of each other are merged into one batched encode call.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from config.config import EMBEDDING_MICRO_BATCH_MAX_SIZE, EMBEDDING_MICRO_BATCH_WAIT_MS
+
+logger = logging.getLogger('text2sql.embedding_batcher')
+
+
+class EmbeddingMicroBatcher:
+    """Collects concurrent embedding requests and encodes them together
+
+    The first request of a batch waits at most max_wait_ms for others to join;
+    a batch is dispatched early once it reaches max_batch_size texts. A request
+    with more texts than max_batch_size is encoded as a batch of its own.
+    """
+
+    def __init__(self, encode_batch: Callable[[List[str]], Sequence], max_batch_size: int = EMBEDDING_MICRO_BATCH_MAX_SIZE,
+                 max_wait_ms: float = EMBEDDING_MICRO_BATCH_WAIT_MS):
+        """Initialize the batcher and start its dispatch thread
+
+        Args:
+            encode_batch (callable): Function encoding a list of texts into a 2D array
+            max_batch_size (int, optional): Maximum number of texts per encode call
+            max_wait_ms (float, optional): Maximum milliseconds a request waits for others to join
+        """
+        self.encode_batch = encode_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._requests: "queue.Queue" = queue.Queue()
+        self._pending = None
+
+        self.batches = 0
+        self.items = 0
+        self._stats_lock = threading.Lock()
+
+        self._thread = threading.Thread(target=self._dispatch_loop, name='embedding-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str, timeout: Optional[float] = None) -> np.ndarray:
+        """Embed a single text as part of the next batch
+
+        Args:
+            text (str): Text to embed
+            timeout (float, optional): Maximum seconds to wait for the result
+
+        Returns:
+            numpy.ndarray: The embedding vector; re-raises errors from the encode call
+        """
+        return self.submit_many([text], timeout=timeout)[0]
+
+    def submit_many(self, texts: Sequence[str], timeout: Optional[float] = None) -> np.ndarray:
+        """Embed a list of texts as part of the next batch
+
+        Args:
+            texts (list): Texts to embed
+            timeout (float, optional): Maximum seconds to wait for the result
+
+        Returns:
+            numpy.ndarray: One embedding row per text; re-raises errors from the encode call
+        """
+        future = Future()
+        self._requests.put((list(texts), future))
+        return np.asarray(future.result(timeout=timeout))
+
+    def _dispatch_loop(self):
+        """Collect requests into batches and encode them"""
+        while True:
+            batch = [self._pending or self._requests.get()]
+            self._pending = None
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if size + len(request[0]) > self.max_batch_size:
+                    # Keep the request for the next batch rather than exceeding the cap
+                    self._pending = request
+                    break
+                batch.append(request)
+                size += len(request[0])
+
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                vectors = self.encode_batch(texts)
+            except Exception as e:
+                logger.error(f"Batched embedding of {len(texts)} texts failed: {str(e)}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(texts)
+            start = 0
+            for request_texts, future in batch:
+                future.set_result(vectors[start:start + len(request_texts)])
+                start += len(request_texts)
+
+    def stats(self) -> dict:
+        """Get the number of batches and the average batch size
+
+        Returns:
+            dict: Batch and item counters
+        """
+        with self._stats_lock:
+            return {
+                'batches': self.batches,
+                'items': self.items,
+                'avg_batch_size': (self.items / self.batches) if self.batches else 0.0,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000
+            }
@@ -0,0 +1,416 @@
+"""
+Content-addressed cache of text embeddings.
+Embeddings are keyed by the embedding model and a hash of the normalized text,
+kept in an in-process LRU tier and in a SQLite file shared by all worker
+processes on the host. Entries of any other model are purged when the cache is
+opened with a different model name or revision. Disk writes are buffered and
+flushed in batches by a background thread, off the request path.
+"""
+
+import atexit
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from config.config import (
+    EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_MEMORY_ENTRIES, EMBEDDING_CACHE_DISK_ENTRIES,
+    EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_FLUSH_INTERVAL, EMBEDDING_CACHE_FLUSH_SIZE,
+    EMBEDDING_MODEL_NAME, EMBEDDING_MODEL_REVISION, MODEL_INFERENCE_BACKEND
+)
+
+logger = logging.getLogger('text2sql.embedding_cache')
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text before hashing so whitespace differences share an entry
+
+    Args:
+        text (str): Text to normalize
+
+    Returns:
+        str: Text with surrounding whitespace stripped and inner whitespace collapsed
+    """
+    return ' '.join(text.split())
+
+
+def text_key(model: str, text: str) -> str:
+    """Get the cache key of a text embedded by a model
+
+    Args:
+        model (str): Model name and revision
+        text (str): Text to hash
+
+    Returns:
+        str: The model followed by the SHA-256 hex digest of the normalized text
+    """
+    return f"{model}:{hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()}"
+
+
+class EmbeddingCache:
+    """Two-tier cache of float32 embedding vectors for one embedding model
+
+    Lookups check the in-memory LRU first, then the SQLite tier; disk hits are
+    promoted to memory. New vectors and access times of disk hits are buffered
+    and written by a background thread every flush_interval seconds, or as soon
+    as flush_size vectors are waiting. When the disk tier is unavailable the
+    cache keeps working with memory only.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, model_revision: str = EMBEDDING_MODEL_REVISION,
+                 path: Optional[str] = EMBEDDING_CACHE_PATH, max_memory_entries: int = EMBEDDING_CACHE_MEMORY_ENTRIES,
+                 max_disk_entries: int = EMBEDDING_CACHE_DISK_ENTRIES,
+                 flush_interval: float = EMBEDDING_CACHE_FLUSH_INTERVAL, flush_size: int = EMBEDDING_CACHE_FLUSH_SIZE):
+        """Initialize the cache and purge entries of other models from the disk tier
+
+        Args:
+            model_name (str, optional): Name of the embedding model
+            model_revision (str, optional): Revision of the model, part of every key
+            path (str, optional): Path of the SQLite file, None to keep the cache in memory only
+            max_memory_entries (int, optional): Maximum vectors kept in memory
+            max_disk_entries (int, optional): Maximum vectors kept on disk, 0 disables the disk tier
+            flush_interval (float, optional): Maximum seconds a buffered write waits
+            flush_size (int, optional): Buffered vectors that trigger a write before the interval ends
+        """
+        self.model = f"{model_name}@{model_revision}" if model_revision else model_name
+        self.path = path if max_disk_entries > 0 else None
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._inserted_since_prune = 0
+
+        # Write-behind buffer of the disk tier: vectors waiting to be written, the batch being
+        # written (still readable until it is on disk) and keys whose access time is due
+        self._pending: Dict[str, np.ndarray] = {}
+        self._flushing: Dict[str, np.ndarray] = {}
+        self._pending_touches: set = set()
+        self._flush_lock = threading.Lock()
+        self._flush_wanted = threading.Condition(self._lock)
+        self._flusher = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+        if self.path:
+            try:
+                self._open_disk_tier()
+            except sqlite3.Error as e:
+                logger.error(f"Embedding cache disk tier unavailable at {self.path}: {str(e)}")
+                self.path = None
+        if self.path:
+            atexit.register(self.flush)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _open_disk_tier(self):
+        """Create the tables and drop entries computed by a different model"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)")
+        conn.execute("CREATE TABLE IF NOT EXISTS embedding_cache_meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM embedding_cache_meta WHERE name = 'model'").fetchone()
+            if row is None or row[0] != self.model:
+                if row is not None:
+                    logger.info(f"Embedding model changed from '{row[0]}' to '{self.model}', clearing embedding cache")
+                conn.execute("DELETE FROM embeddings")
+                conn.execute("INSERT OR REPLACE INTO embedding_cache_meta (name, value) VALUES ('model', ?)",
+                             (self.model,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Store a vector in the memory tier, evicting the least recently used; caller must hold the lock"""
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous.nbytes
+        self._memory[key] = vector
+        self._memory_bytes += vector.nbytes
+        while len(self._memory) > self.max_memory_entries:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+            self.memory_evictions += 1
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Look up the embeddings of several texts
+
+        Args:
+            texts (sequence): Texts to look up
+
+        Returns:
+            list: The cached vector of each text, None for misses
+        """
+        keys = [text_key(self.model, text) for text in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(keys)
+        missing: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    results[i] = vector.copy()
+                    continue
+                # Evicted from memory before its buffered write reached the disk
+                vector = self._pending.get(key)
+                if vector is None:
+                    vector = self._flushing.get(key)
+                if vector is not None:
+                    self._remember(key, vector)
+                    self.memory_hits += 1
+                    results[i] = vector.copy()
+                else:
+                    missing.setdefault(key, []).append(i)
+
+        if missing and self.path:
+            found = self._read_disk(list(missing))
+            with self._lock:
+                for key, vector in found.items():
+                    self._remember(key, vector)
+                    for i in missing.pop(key):
+                        self.disk_hits += 1
+                        results[i] = vector.copy()
+
+        with self._lock:
+            self.misses += sum(len(indexes) for indexes in missing.values())
+        return results
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Look up the embedding of a text
+
+        Args:
+            text (str): Text to look up
+
+        Returns:
+            numpy.ndarray or None: The cached vector, None on miss
+        """
+        return self.get_many([text])[0]
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence):
+        """Store the embeddings of several texts in both tiers
+
+        Args:
+            texts (sequence): Embedded texts
+            vectors (sequence): One vector per text
+        """
+        entries = {}
+        for text, vector in zip(texts, vectors):
+            entries[text_key(self.model, text)] = np.asarray(vector, dtype=np.float32).copy()
+
+        with self._lock:
+            for key, vector in entries.items():
+                self._remember(key, vector)
+            if entries and self.path:
+                self._pending.update(entries)
+                self._schedule_flush()
+
+    def put(self, text: str, vector):
+        """Store the embedding of a text
+
+        Args:
+            text (str): Embedded text
+            vector (sequence): Its embedding
+        """
+        self.put_many([text], [vector])
+
+    def _read_disk(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Read vectors from the disk tier and queue the refresh of their access time"""
+        found = {}
+        try:
+            conn = self._connection()
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).copy()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading embedding cache: {str(e)}")
+        if found:
+            with self._lock:
+                self._pending_touches.update(found)
+                self._schedule_flush()
+        return found
+
+    def _schedule_flush(self):
+        """Start the flusher thread, or wake it when the buffer is full; caller must hold the lock"""
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name='embedding-cache-flush', daemon=True)
+            self._flusher.start()
+        if len(self._pending) + len(self._pending_touches) >= self.flush_size:
+            self._flush_wanted.notify()
+
+    def _flush_loop(self):
+        """Write buffered entries every flush_interval seconds, or earlier when the buffer fills up"""
+        while True:
+            with self._lock:
+                if len(self._pending) + len(self._pending_touches) < self.flush_size:
+                    self._flush_wanted.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing embedding cache: {str(e)}")
+
+    def flush(self):
+        """Write all buffered vectors and access times to the disk tier"""
+        if not self.path:
+            return
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending and not self._pending_touches:
+                    return
+                self._flushing, self._pending = self._pending, {}
+                touches, self._pending_touches = self._pending_touches - self._flushing.keys(), set()
+            try:
+                self._write_disk(self._flushing, touches)
+            finally:
+                with self._lock:
+                    self._flushing = {}
+
+    def _write_disk(self, entries: Dict[str, np.ndarray], touches: Iterable[str] = ()):
+        """Write vectors and access times to the disk tier in one transaction, pruning the oldest entries when it is full"""
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                    [(key, vector.tobytes(), now) for key, vector in entries.items()]
+                )
+                conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, key) for key in touches]
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+            # Counting rows is a full scan, so only check the size every 1% of capacity
+            self._inserted_since_prune += len(entries)
+            if self._inserted_since_prune >= max(1, self.max_disk_entries // 100):
+                self._inserted_since_prune = 0
+                self._prune_disk(conn)
+        except sqlite3.Error as e:
+            logger.error(f"Error writing embedding cache: {str(e)}")
+
+    def _prune_disk(self, conn: sqlite3.Connection):
+        """Delete the least recently used vectors beyond the disk capacity"""
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_disk_entries
+        if excess > 0:
+            cursor = conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_access LIMIT ?)", (excess,)
+            )
+            with self._lock:
+                self.disk_evictions += cursor.rowcount
+
+    def clear(self):
+        """Remove all cached vectors from both tiers"""
+        # Waits for a running flush, so its batch cannot land after the delete
+        with self._flush_lock:
+            with self._lock:
+                self._memory.clear()
+                self._memory_bytes = 0
+                self._pending.clear()
+                self._pending_touches.clear()
+            if self.path:
+                try:
+                    self._connection().execute("DELETE FROM embeddings")
+                except sqlite3.Error as e:
+                    logger.error(f"Error clearing embedding cache: {str(e)}")
+
+    def stats(self) -> Dict[str, object]:
+        """Get hit rate, size and eviction statistics
+
+        Returns:
+            Dict: Cache statistics
+        """
+        disk_entries = disk_bytes = None
+        if self.path:
+            try:
+                conn = self._connection()
+                disk_entries, disk_bytes = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.error(f"Error reading embedding cache statistics: {str(e)}")
+
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'model': self.model,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': ((self.memory_hits + self.disk_hits) / lookups) if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'memory_evictions': self.memory_evictions,
+                'pending_writes': len(self._pending) + len(self._flushing),
+                'disk_enabled': self.path is not None,
+                'disk_entries': disk_entries,
+                'disk_bytes': disk_bytes,
+                'disk_evictions': self.disk_evictions
+            }
+
+
+# Shared cache for this process
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Get the process-wide embedding cache for the configured embedding model
+
+    Returns:
+        EmbeddingCache or None: The shared cache, None if disabled in the configuration
+    """
+    global _embedding_cache
+
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                # Quantized backends produce slightly different vectors, so they get their own entries
+                revision = EMBEDDING_MODEL_REVISION
+                if MODEL_INFERENCE_BACKEND != 'torch':
+                    revision = f"{revision}+{MODEL_INFERENCE_BACKEND}" if revision else MODEL_INFERENCE_BACKEND
+                _embedding_cache = EmbeddingCache(model_revision=revision)
+    return _embedding_cache
@@ -0,0 +1,108 @@
+"""
+Client of the shared embedding server.
+RemoteEmbeddingModel mirrors the encode() interface of a SentenceTransformer,
+so the model registry can hand it to every component in place of a locally
+loaded model. The server's model version must match EMBEDDING_MODEL_VERSION,
+otherwise vectors from two embedding spaces would end up in the same
+collections.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import requests
+
+from config.config import (
+    EMBEDDING_MODEL_VERSION, EMBEDDING_SERVICE_MAX_TEXTS, EMBEDDING_SERVICE_TIMEOUT
+)
+from src.utils.vector_codec import VECTOR_MEDIA_TYPE, decode_vectors
+
+logger = logging.getLogger('text2sql.embedding_client')
+
+
+class RemoteEmbeddingModel:
+    """Embedding model served by the embedding server over HTTP"""
+
+    inference_backend = 'remote'
+
+    def __init__(self, service_url: str, model_version: str = EMBEDDING_MODEL_VERSION,
+                 timeout: int = EMBEDDING_SERVICE_TIMEOUT, max_texts: int = EMBEDDING_SERVICE_MAX_TEXTS,
+                 session: Optional[requests.Session] = None):
+        """Connect to the embedding server and check its model version
+
+        Args:
+            service_url (str): Base URL of the embedding server
+            model_version (str, optional): Model version the server must serve
+            timeout (int, optional): Seconds to wait for a response
+            max_texts (int, optional): Maximum texts per request
+            session (requests.Session, optional): HTTP session, a new one by default
+
+        Raises:
+            ValueError: If the server serves a different model version
+            requests.RequestException: If the server cannot be reached
+        """
+        self.service_url = service_url.rstrip('/')
+        self.timeout = timeout
+        self.max_texts = max_texts
+        self.session = session or requests.Session()
+        self.session.headers.update({'Accept': f"{VECTOR_MEDIA_TYPE}, application/json"})
+
+        info = self.info()
+        if info.get('version') != model_version:
+            raise ValueError(f"Embedding server at {self.service_url} serves '{info.get('version')}', "
+                             f"expected '{model_version}'")
+        self.model_version = info['version']
+        self.dimension = info.get('dimension')
+        logger.info(f"Using embedding server at {self.service_url} ({self.model_version}, dimension {self.dimension})")
+
+    def info(self) -> Dict[str, Any]:
+        """Get the model name, version and dimension served by the server
+
+        Returns:
+            Dict: Server information
+        """
+        response = self.session.get(f"{self.service_url}/info", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def get_sentence_embedding_dimension(self) -> Optional[int]:
+        """Get the embedding dimension, like SentenceTransformer"""
+        return self.dimension
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Embed one request's worth of texts"""
+        response = self.session.post(
+            f"{self.service_url}/embed",
+            json={'texts': texts, 'model_version': self.model_version},
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Embedding server returned {response.status_code}: {response.text[:200]}")
+        return decode_vectors(response.json()['embeddings'])
+
+    def encode(self, sentences: Union[str, Sequence[str]], batch_size: Optional[int] = None,
+               convert_to_numpy: bool = True, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        """Embed texts like SentenceTransformer.encode
+
+        The server batches requests itself, so batch_size only caps the texts per request.
+
+        Args:
+            sentences (str or list): A text or a list of texts
+            batch_size (int, optional): Maximum texts per request, defaults to max_texts
+            convert_to_numpy (bool, optional): Accepted for compatibility, results are always NumPy arrays
+            normalize_embeddings (bool, optional): Scale the vectors to unit length
+
+        Returns:
+            numpy.ndarray: A vector for a single text, else one row per text
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        chunk_size = min(batch_size or self.max_texts, self.max_texts)
+
+        chunks = [self._embed(texts[start:start + chunk_size]) for start in range(0, len(texts), chunk_size)]
+        vectors = np.concatenate(chunks) if chunks else np.zeros((0, self.dimension or 0), dtype=np.float32)
+        if normalize_embeddings and len(vectors):
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1.0, norms)
+        return vectors[0] if single else vectors
@@ -78,10 +78,9 @@ class FeedbackManager:
             return None
             
         try:
-            # Use the centralized LLM engine to generate embeddings
-            from src.utils.llm_engine import LLMEngine
-            llm_engine = LLMEngine()
-            embedding = llm_engine.generate_embedding(text)
+            # Use the shared LLM engine to generate embeddings
+            from src.utils.common_llm import get_llm_engine
+            embedding = get_llm_engine().generate_embedding(text)
             
             # Return embedding result
             return embedding
@@ -90,19 +89,18 @@ class FeedbackManager:
             self.logger.error(f"Error generating embedding: {str(e)}", exc_info=True)
             return None
             
-    # _get_reranking_model method has been moved to LLMEngine class
+    # _get_reranking_model method has been moved to the model registry
     def _get_reranking_model(self):
-        """Get the reranking model from the centralized LLM engine
+        """Get the shared reranking model from the model registry
         
         Returns:
             CrossEncoder: The initialized reranking model (cross-encoder)
         """
         try:
-            from src.utils.llm_engine import LLMEngine
-            llm_engine = LLMEngine()
-            return llm_engine.get_reranking_model()
+            from src.utils.model_registry import get_reranking_model
+            return get_reranking_model()
         except Exception as e:
-            self.logger.error(f"Failed to get reranking model from LLMEngine: {str(e)}", exc_info=True)
+            self.logger.error(f"Failed to get reranking model from model registry: {str(e)}", exc_info=True)
             return None
     
     def save_feedback(self, query_text: str, sql_query: str, results_summary: str, 
@@ -727,6 +725,7 @@ class FeedbackManager:
                 """)
                 
                 result = conn.execute(query)
+                entries = []
                 
                 for row in result:
                     try:
@@ -745,24 +744,25 @@ class FeedbackManager:
                             'created_at': str(row.created_at)
                         }
                         
-                        # Insert into vector store
-                        success = self.vector_store.insert_embedding(
-                            collection_name=self.collection_name,
-                            feedback_id=row.feedback_id,
-                            vector=stored_embedding.tolist(),
-                            query_text=row.query_text,
-                            metadata=metadata
-                        )
-                        
-                        if success:
-                            migrated += 1
-                        else:
-                            failed += 1
+                        entries.append({
+                            'id': row.feedback_id,
+                            'vector': stored_embedding,
+                            'text': row.query_text,
+                            'metadata': metadata
+                        })
                             
                     except Exception as e:
                         self.logger.error(f"Error migrating embedding {row.feedback_id}: {str(e)}")
                         failed += 1
             
+            # Insert into vector store with one request per batch
+            if entries:
+                insert_result = self.vector_store.insert_embeddings(self.collection_name, entries)
+                migrated += insert_result['count']
+                failed += len(insert_result['failed'])
+                for failure in insert_result['failed']:
+                    self.logger.error(f"Error migrating embedding {failure['id']}: {failure['error']}")
+            
             total_time = time.time() - start_time
             total = migrated + failed
             
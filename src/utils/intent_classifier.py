@@ -0,0 +1,232 @@
+"""
+Local intent classifier for natural language queries.
+A softmax regression over sentence embeddings, trained from labeled example
+queries and from the questions of positive feedback samples (which are all
+data retrieval questions). Classifying a query costs one embedding and a
+matrix product, so most queries skip the LLM round-trip for intent detection.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config.config import (
+    INTENT_CLASSIFIER_EXAMPLES_PATH, INTENT_CLASSIFIER_MAX_FEEDBACK_EXAMPLES, INTENT_CLASSIFIER_RETRAIN_INTERVAL
+)
+
+logger = logging.getLogger('text2sql.intent_classifier')
+
+INTENTS = ["data_retrieval", "schema_exploration", "metadata_request", "general_question"]
+
+
+class SoftmaxRegression:
+    """Multinomial logistic regression trained with full-batch gradient descent"""
+
+    def __init__(self, epochs: int = 300, learning_rate: float = 0.5, l2: float = 1e-3):
+        """Initialize the model
+
+        Args:
+            epochs (int, optional): Gradient descent iterations
+            learning_rate (float, optional): Step size
+            l2 (float, optional): Weight decay
+        """
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.weights = None
+        self.bias = None
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        """Row-wise softmax"""
+        logits = logits - logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def fit(self, features: np.ndarray, labels: np.ndarray, num_classes: int) -> 'SoftmaxRegression':
+        """Train on feature rows and integer class labels
+
+        Classes are weighted by inverse frequency so that a large number of
+        feedback questions does not drown out the other intents.
+
+        Args:
+            features (numpy.ndarray): Matrix of shape (n, dim)
+            labels (numpy.ndarray): Class index per row
+            num_classes (int): Number of classes
+
+        Returns:
+            SoftmaxRegression: The trained model
+        """
+        count, dimension = features.shape
+        targets = np.eye(num_classes)[labels]
+        frequencies = np.bincount(labels, minlength=num_classes).astype(np.float64)
+        class_weights = np.where(frequencies > 0, count / (num_classes * np.maximum(frequencies, 1)), 0.0)
+        sample_weights = class_weights[labels][:, None] / count
+
+        self.weights = np.zeros((dimension, num_classes))
+        self.bias = np.zeros(num_classes)
+        for _ in range(self.epochs):
+            error = (self._softmax(features @ self.weights + self.bias) - targets) * sample_weights
+            self.weights -= self.learning_rate * (features.T @ error + self.l2 * self.weights)
+            self.bias -= self.learning_rate * error.sum(axis=0)
+        return self
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """Get class probabilities for feature rows"""
+        return self._softmax(features @ self.weights + self.bias)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so that embedding norms do not matter"""
+    vectors = np.asarray(vectors, dtype=np.float64)
+    return vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+
+
+def load_examples(path: str = INTENT_CLASSIFIER_EXAMPLES_PATH) -> Dict[str, List[str]]:
+    """Load labeled example queries
+
+    Args:
+        path (str, optional): JSON file mapping each intent to example queries
+
+    Returns:
+        Dict: Example queries per intent, empty if the file cannot be read
+    """
+    try:
+        with open(path, 'r') as examples_file:
+            examples = json.load(examples_file)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not load intent examples from {path}: {str(e)}")
+        return {}
+    return {intent: list(queries) for intent, queries in examples.items() if intent in INTENTS}
+
+
+class IntentClassifier:
+    """Embedding-based intent classifier that trains and retrains in the background
+
+    Classification never waits for training: until the first model is ready,
+    classify() returns None.
+    """
+
+    def __init__(self, embed_many: Callable[[Sequence[str]], np.ndarray],
+                 feedback_loader: Optional[Callable[[int], List[str]]] = None,
+                 examples_path: str = INTENT_CLASSIFIER_EXAMPLES_PATH,
+                 max_feedback_examples: int = INTENT_CLASSIFIER_MAX_FEEDBACK_EXAMPLES,
+                 retrain_interval: int = INTENT_CLASSIFIER_RETRAIN_INTERVAL):
+        """Initialize the classifier without training it
+
+        Args:
+            embed_many (callable): Function embedding a list of texts into a 2D array
+            feedback_loader (callable, optional): Function returning up to n questions of positive feedback
+            examples_path (str, optional): JSON file of labeled example queries
+            max_feedback_examples (int, optional): Maximum feedback questions used for training
+            retrain_interval (int, optional): Seconds after which the model is retrained in the background
+        """
+        self.embed_many = embed_many
+        self.feedback_loader = feedback_loader
+        self.examples_path = examples_path
+        self.max_feedback_examples = max_feedback_examples
+        self.retrain_interval = retrain_interval
+
+        self.model: Optional[SoftmaxRegression] = None
+        self.trained_at = 0.0
+        self.training_size = 0
+        self._train_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._training = False
+        self._training_started_at = 0.0
+
+    def train(self) -> bool:
+        """Train the model on the labeled examples and the feedback questions
+
+        Returns:
+            bool: True if a model was trained
+        """
+        examples = load_examples(self.examples_path)
+        if self.feedback_loader:
+            try:
+                feedback_queries = self.feedback_loader(self.max_feedback_examples)
+                examples.setdefault('data_retrieval', []).extend(feedback_queries)
+            except Exception as e:
+                logger.warning(f"Could not load feedback questions for intent training: {str(e)}")
+
+        texts, labels = [], []
+        for intent, queries in examples.items():
+            for query in queries:
+                if query:
+                    texts.append(query)
+                    labels.append(INTENTS.index(intent))
+        if len(set(labels)) < 2:
+            logger.warning("Not enough labeled intents to train the intent classifier")
+            return False
+
+        start_time = time.time()
+        embeddings = self.embed_many(texts)
+        if embeddings is None:
+            logger.warning("Embedding model not available, intent classifier not trained")
+            return False
+        features = _normalize(embeddings)
+        model = SoftmaxRegression().fit(features, np.array(labels), len(INTENTS))
+        self.model = model
+        self.trained_at = time.time()
+        self.training_size = len(texts)
+        logger.info(f"Trained intent classifier on {len(texts)} queries in {time.time() - start_time:.2f}s")
+        return True
+
+    def start_training(self) -> bool:
+        """Train in a background thread unless a training run is already in progress
+
+        Returns:
+            bool: True if a training run was started
+        """
+        with self._state_lock:
+            if self._training:
+                return False
+            self._training = True
+            self._training_started_at = time.time()
+
+        def run_training():
+            try:
+                with self._train_lock:
+                    self.train()
+            except Exception as e:
+                logger.error(f"Error training intent classifier: {str(e)}", exc_info=True)
+            finally:
+                with self._state_lock:
+                    self._training = False
+
+        threading.Thread(target=run_training, name='intent-train', daemon=True).start()
+        return True
+
+    def _ensure_trained(self):
+        """Start a background training run once the last one is older than the retrain interval"""
+        if time.time() - self._training_started_at > self.retrain_interval:
+            self.start_training()
+
+    def classify(self, query: str) -> Optional[Dict[str, Any]]:
+        """Classify a query
+
+        Args:
+            query (str): Natural language query
+
+        Returns:
+            Dict or None: intent, confidence and per-intent scores; None while no model is trained
+        """
+        self._ensure_trained()
+        model = self.model
+        if model is None:
+            return None
+
+        embeddings = self.embed_many([query])
+        if embeddings is None:
+            return None
+        probabilities = model.predict_proba(_normalize(embeddings))[0]
+        best = int(np.argmax(probabilities))
+        return {
+            'intent': INTENTS[best],
+            'confidence': float(probabilities[best]),
+            'scores': {intent: round(float(score), 4) for intent, score in zip(INTENTS, probabilities)}
+        }
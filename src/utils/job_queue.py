@@ -0,0 +1,248 @@
+"""
+Bounded priority job queue for background work.
+Runs jobs on a fixed pool of worker threads, rejects new work when the queue
+is full, serves interactive jobs before batch jobs and takes turns between
+users so a single user cannot occupy every worker.
+"""
+
+import contextvars
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Optional
+
+from config.config import JOB_QUEUE_WORKERS, JOB_QUEUE_MAX_SIZE, JOB_QUEUE_MAX_RUNNING_PER_USER
+
+logger = logging.getLogger('text2sql.job_queue')
+
+# Priorities, lower values run first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITIES = {'interactive': PRIORITY_INTERACTIVE, 'batch': PRIORITY_BATCH}
+
+# Number of recent jobs used for wait and run time statistics
+_TIMING_WINDOW = 1000
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """Fixed-size worker pool fed by a bounded, per-user fair priority queue
+
+    Jobs are grouped by priority and, within a priority, by user. Workers take
+    the highest priority level with runnable work and serve its users round-robin,
+    skipping users that already have the maximum number of jobs running.
+    """
+
+    def __init__(self, num_workers: int = JOB_QUEUE_WORKERS, max_queue_size: int = JOB_QUEUE_MAX_SIZE,
+                 max_running_per_user: int = JOB_QUEUE_MAX_RUNNING_PER_USER, name: str = 'jobs'):
+        """Initialize the job queue and start its workers
+
+        Args:
+            num_workers (int, optional): Number of worker threads
+            max_queue_size (int, optional): Maximum number of jobs waiting to run
+            max_running_per_user (int, optional): Maximum concurrent jobs per user, 0 for no limit
+            name (str, optional): Name used for worker threads and logging
+        """
+        self.num_workers = num_workers
+        self.max_queue_size = max_queue_size
+        self.max_running_per_user = max_running_per_user
+        self.name = name
+
+        # priority -> OrderedDict(user -> deque of jobs); the dict order is the round-robin order
+        self._queues: Dict[int, "OrderedDict[Any, deque]"] = {}
+        self._queued = 0
+        self._running_by_user: Dict[Any, int] = {}
+        self._running = 0
+        self._condition = threading.Condition()
+        self._shutdown = False
+
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self._wait_times = deque(maxlen=_TIMING_WINDOW)
+        self._run_times = deque(maxlen=_TIMING_WINDOW)
+
+        self._workers = []
+        for index in range(num_workers):
+            worker = threading.Thread(target=self._worker, name=f"{name}-worker-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        logger.info(f"Started job queue '{name}' with {num_workers} workers and capacity {max_queue_size}")
+
+    def _estimate_retry_after(self) -> int:
+        """Estimate seconds until the queue has room; caller must hold the condition"""
+        average_run_time = (sum(self._run_times) / len(self._run_times)) if self._run_times else 5.0
+        return max(1, math.ceil(average_run_time * max(self._queued, 1) / max(self.num_workers, 1)))
+
+    def submit(self, func: Callable[[], Any], user_id: Any = None, priority: int = PRIORITY_INTERACTIVE,
+               job_id: Optional[str] = None, on_cancel: Optional[Callable[[], Any]] = None) -> str:
+        """Queue a job for execution
+
+        Args:
+            func (callable): Function to run without arguments
+            user_id (hashable, optional): User the job belongs to, used for fairness
+            priority (int, optional): PRIORITY_INTERACTIVE or PRIORITY_BATCH
+            job_id (str, optional): Identifier for logging, generated if omitted
+            on_cancel (callable, optional): Called instead of func when the queue shuts down before the job starts
+
+        Returns:
+            str: The job identifier
+
+        Raises:
+            QueueFullError: If the queue is at capacity
+        """
+        job_id = job_id or uuid.uuid4().hex
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError(f"Job queue '{self.name}' is shut down")
+            if self._queued >= self.max_queue_size:
+                self.rejected += 1
+                retry_after = self._estimate_retry_after()
+                logger.warning(f"Job queue '{self.name}' full ({self._queued} queued), rejecting job {job_id}")
+                raise QueueFullError(retry_after)
+
+            users = self._queues.setdefault(priority, OrderedDict())
+            users.setdefault(user_id, deque()).append({
+                'id': job_id,
+                'func': func,
+                'on_cancel': on_cancel,
+                'context': contextvars.copy_context(),
+                'user_id': user_id,
+                'enqueued_at': time.time()
+            })
+            self._queued += 1
+            self._condition.notify()
+        return job_id
+
+    def _next_job(self) -> Optional[Dict[str, Any]]:
+        """Pick the next runnable job; caller must hold the condition"""
+        for priority in sorted(self._queues):
+            users = self._queues[priority]
+            for user_id in list(users):
+                if (self.max_running_per_user and user_id is not None
+                        and self._running_by_user.get(user_id, 0) >= self.max_running_per_user):
+                    continue
+                jobs = users.pop(user_id)
+                job = jobs.popleft()
+                if jobs:
+                    # Move the user to the back of the round-robin order
+                    users[user_id] = jobs
+                if not users:
+                    del self._queues[priority]
+                return job
+        return None
+
+    def _worker(self):
+        """Worker loop running queued jobs"""
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    if self._shutdown:
+                        return
+                    self._condition.wait()
+                    job = self._next_job()
+                self._queued -= 1
+                self._running += 1
+                self._running_by_user[job['user_id']] = self._running_by_user.get(job['user_id'], 0) + 1
+                start_time = time.time()
+                self._wait_times.append(start_time - job['enqueued_at'])
+
+            try:
+                job['context'].run(job['func'])
+                succeeded = True
+            except Exception as e:
+                logger.exception(f"Job {job['id']} in queue '{self.name}' failed: {str(e)}")
+                succeeded = False
+
+            with self._condition:
+                self._run_times.append(time.time() - start_time)
+                self._running -= 1
+                remaining = self._running_by_user[job['user_id']] - 1
+                if remaining:
+                    self._running_by_user[job['user_id']] = remaining
+                else:
+                    del self._running_by_user[job['user_id']]
+                if succeeded:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                # A user slot was freed, jobs skipped for fairness may be runnable now
+                self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue statistics
+
+        Returns:
+            Dict: Queue depth per priority, running jobs, counters and wait/run times in seconds
+        """
+        with self._condition:
+            wait_times = sorted(self._wait_times)
+            run_times = list(self._run_times)
+            depth_by_priority = {
+                name: sum(len(jobs) for jobs in self._queues.get(priority, {}).values())
+                for name, priority in PRIORITIES.items()
+            }
+            return {
+                'workers': self.num_workers,
+                'capacity': self.max_queue_size,
+                'queued': self._queued,
+                'queued_by_priority': depth_by_priority,
+                'running': self._running,
+                'users_running': len(self._running_by_user),
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'cancelled': self.cancelled,
+                'avg_wait_time': (sum(wait_times) / len(wait_times)) if wait_times else 0.0,
+                'p95_wait_time': wait_times[int(len(wait_times) * 0.95)] if wait_times else 0.0,
+                'max_wait_time': wait_times[-1] if wait_times else 0.0,
+                'avg_run_time': (sum(run_times) / len(run_times)) if run_times else 0.0
+            }
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = None, drain: bool = False):
+        """Stop accepting jobs and let the workers exit once their running jobs finish
+
+        Jobs that have not started are cancelled unless drain is set.
+
+        Args:
+            wait (bool, optional): Wait for the workers to finish
+            timeout (float, optional): Maximum seconds to wait for all workers together
+            drain (bool, optional): Run the queued jobs before the workers exit
+        """
+        cancelled = []
+        with self._condition:
+            self._shutdown = True
+            if not drain:
+                for users in self._queues.values():
+                    for jobs in users.values():
+                        cancelled.extend(jobs)
+                self._queues.clear()
+                self._queued = 0
+                self.cancelled += len(cancelled)
+            self._condition.notify_all()
+
+        if cancelled:
+            logger.warning(f"Job queue '{self.name}' shut down, cancelled {len(cancelled)} queued jobs")
+        for job in cancelled:
+            if job['on_cancel'] is not None:
+                try:
+                    job['context'].run(job['on_cancel'])
+                except Exception as e:
+                    logger.error(f"Error cancelling job {job['id']} in queue '{self.name}': {str(e)}")
+
+        if wait:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            for worker in self._workers:
+                worker.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
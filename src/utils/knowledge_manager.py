@@ -416,30 +416,33 @@ class KnowledgeManager:
         """
         cursor = self.conn.cursor()
         
+        # Create embeddings for all chunks in batches using LLM engine
+        self.processing_status[document_id] = {
+            'status': 'processing',
+            'message': f'Creating embeddings for {len(chunks)} chunks'
+        }
+        embeddings = self.llm_engine.generate_embeddings(chunks)
+        if embeddings is None:
+            raise RuntimeError("Embedding model not available, document chunks were not embedded")
+        
+        # Generate unique chunk IDs and save all embeddings with one request per batch
+        chunk_ids = [str(uuid.uuid4()) for _ in chunks]
+        entries = [
+            {
+                'id': i,  # Use chunk index as the ID
+                'vector': embeddings[i],
+                'text': chunk,
+                'metadata': {'document_id': document_id, 'chunk_id': chunk_ids[i]}
+            }
+            for i, chunk in enumerate(chunks)
+        ]
+        result = self.vector_store.insert_embeddings('knowledge_chunks', entries)
+        for failure in result['failed']:
+            self.logger.info(f"Error storing embedding for chunk {failure['id']} of document {document_id}: {failure['error']}")
+        
         for i, chunk in enumerate(chunks):
-            # Generate unique chunk ID
-            chunk_id = str(uuid.uuid4())
-            
-            # Create embedding for the chunk
+            chunk_id = chunk_ids[i]
             try:
-                # Update status
-                self.processing_status[document_id] = {
-                    'status': 'processing',
-                    'message': f'Creating embedding for chunk {i+1} of {len(chunks)}'
-                }
-                
-                # Create embedding using LLM engine
-                embedding = self._get_embedding(chunk)
-                
-                # Save embedding to vector store
-                self.vector_store.insert_embedding(
-                    'knowledge_chunks', 
-                    i,  # Use chunk index as the ID 
-                    embedding,
-                    chunk,
-                    {'document_id': document_id, 'chunk_id': chunk_id}
-                )
-                
                 # Save chunk to database
                 now = datetime.now().isoformat()
                 cursor.execute(
@@ -448,7 +451,7 @@ class KnowledgeManager:
                 )
                 
             except Exception as e:
-                self.logger.info(f"Error creating embedding for chunk {i} of document {document_id}: {str(e)}", exc_info=True)
+                self.logger.info(f"Error saving chunk {i} of document {document_id}: {str(e)}", exc_info=True)
         
         self.conn.commit()
     
@@ -788,20 +791,18 @@ class KnowledgeManager:
                 'answer': 'Sorry, an error occurred while processing your question.'
             }
     
-    # _get_reranking_model method has been moved to LLMEngine class
-    # _get_reranking_model method has been moved to LLMEngine class
+    # _get_reranking_model method has been moved to the model registry
     def _get_reranking_model(self):
-        """Get the reranking model from the centralized LLM engine
+        """Get the shared reranking model from the model registry
         
         Returns:
             CrossEncoder: The initialized reranking model (cross-encoder)
         """
         try:
-            from src.utils.llm_engine import LLMEngine
-            llm_engine = LLMEngine()
-            return llm_engine.get_reranking_model()
+            from src.utils.model_registry import get_reranking_model
+            return get_reranking_model()
         except Exception as e:
-            self.logger.info(f"Failed to get reranking model from LLMEngine: {str(e)}", exc_info=True)
+            self.logger.info(f"Failed to get reranking model from model registry: {str(e)}", exc_info=True)
             return None
             
     def _rerank_chunks(self, query: str, chunk_ids: List[str]) -> List[str]:
@@ -2,13 +2,43 @@ from openai import OpenAI
 import json
 import sys
 import logging
+import threading
 import time
 import numpy as np
 from config.config import (
     OPENROUTER_API_KEY, OPENROUTER_BASE_URL, OPENROUTER_MODEL,
-    MAX_TOKENS, TEMPERATURE, MESSAGE_FORMAT
+    MAX_TOKENS, TEMPERATURE, MESSAGE_FORMAT, LLM_REQUEST_TIMEOUT, LLM_MAX_RETRIES,
+    EMBEDDING_BATCH_SIZE, EMBEDDING_MICRO_BATCH_ENABLED, EMBEDDING_MICRO_BATCH_MAX_SIZE, EMBEDDING_MODEL_NAME,
+    REQUEST_COALESCING_ENABLED
 )
 from src.utils.message_formatter import MessageFormatter
+from src.utils.model_registry import get_embedding_model, get_reranking_model
+from src.utils.embedding_batcher import EmbeddingMicroBatcher
+from src.utils.embedding_cache import get_embedding_cache, text_key
+from src.utils.async_llm_client import get_async_llm_client, get_llm_metrics
+from src.utils.completion_cache import get_completion_cache, completion_key
+from src.utils.single_flight import get_single_flight
+
+# Micro-batcher shared by all engines, merging concurrent single-text embedding requests
+_embedding_batcher = None
+_embedding_batcher_lock = threading.Lock()
+
+
+def get_embedding_batcher():
+    """Get the process-wide embedding micro-batcher
+    
+    Returns:
+        EmbeddingMicroBatcher: The shared batcher for the default embedding model
+    """
+    global _embedding_batcher
+    
+    if _embedding_batcher is None:
+        with _embedding_batcher_lock:
+            if _embedding_batcher is None:
+                def encode_batch(texts):
+                    return get_embedding_model().encode(texts, batch_size=len(texts), convert_to_numpy=True)
+                _embedding_batcher = EmbeddingMicroBatcher(encode_batch)
+    return _embedding_batcher
 
 
 class LLMEngine:
@@ -34,6 +64,8 @@ class LLMEngine:
             self.client = OpenAI(
                 base_url=OPENROUTER_BASE_URL,
                 api_key=OPENROUTER_API_KEY,
+                timeout=LLM_REQUEST_TIMEOUT,
+                max_retries=LLM_MAX_RETRIES,
             )
             self.model_name = OPENROUTER_MODEL
             self.logger.info("LLM Engine initialized successfully")
@@ -45,22 +77,13 @@ class LLMEngine:
             raise
     
     def get_embedding_model(self):
-        """Get or initialize the sentence transformer model for embeddings
+        """Get the shared sentence transformer model for embeddings
         
         Returns:
-            SentenceTransformer: The initialized embedding model
+            SentenceTransformer: The initialized embedding model, None if it failed to load
         """
         if self.embedding_model is None:
-            start_time = time.time()
-            self.logger.info("Loading embedding model 'sentence-transformers/all-MiniLM-L12-v2'")
-            try:
-                from sentence_transformers import SentenceTransformer
-                self.embedding_model = SentenceTransformer('all-MiniLM-L12-v2')
-                self.logger.info(f"Embedding model loaded in {time.time() - start_time:.2f}s")
-            except Exception as e:
-                self.logger.error(f"Failed to load embedding model: {str(e)}", exc_info=True)
-                # Return None if failed to load model
-                return None
+            self.embedding_model = get_embedding_model()
         return self.embedding_model
     
     def generate_embedding(self, text: str):
@@ -74,13 +97,18 @@ class LLMEngine:
         """
         model = self.get_embedding_model()
         if not model or not text:
-            self.logger.warning("Embedding model not available or empty text, using random embedding as fallback")
-            return np.random.randn(384).tolist()
+            self.logger.warning("Embedding model not available or empty text, no embedding generated")
+            return None
+            
+        cache = get_embedding_cache()
+        if cache:
+            cached = cache.get(text)
+            if cached is not None:
+                return cached
             
         try:
             start_time = time.time()
-            # Generate embedding vector
-            embedding = model.encode(text)
+            embedding = self._encode_one(model, text, cache)
             
             self.logger.info(f"Generated embedding in {time.time() - start_time:.2f}s " +
                              f"with shape {embedding.shape}")
@@ -88,46 +116,132 @@ class LLMEngine:
             
         except Exception as e:
             self.logger.error(f"Error generating embedding: {str(e)}", exc_info=True)
-            # Fallback to random embeddings
-            return np.random.randn(384).tolist()
+            return None
+    
+    def _encode_one(self, model, text, cache):
+        """Encode one uncached text and cache its embedding
+        
+        Concurrent requests for the same text share one encode call, which is
+        batched together with concurrent requests from other threads.
+        """
+        def encode():
+            if EMBEDDING_MICRO_BATCH_ENABLED:
+                embedding = get_embedding_batcher().submit(text)
+            else:
+                embedding = model.encode(text)
+            if cache:
+                cache.put(text, embedding)
+            return embedding
+        
+        if REQUEST_COALESCING_ENABLED:
+            return get_single_flight().do(f"embedding:{text_key(EMBEDDING_MODEL_NAME, text)}", encode)
+        return encode()
+    
+    def generate_embeddings(self, texts, batch_size=None):
+        """Generate embeddings for many texts with batched encoding
+        
+        Cached embeddings are reused. A single uncached text is shared with
+        concurrent requests for it, short lists join the micro-batcher and bulk
+        lists are encoded directly in batches of batch_size.
+        
+        Args:
+            texts (list): Texts to generate embeddings for
+            batch_size (int, optional): Texts per encode batch, defaults to EMBEDDING_BATCH_SIZE
+            
+        Returns:
+            numpy.ndarray or None: One embedding row per text, zeros for empty texts;
+                                   None if the model is unavailable or encoding failed
+        """
+        texts = list(texts)
+        model = self.get_embedding_model()
+        if not model:
+            self.logger.warning("Embedding model not available, no embeddings generated")
+            return None
+        if not texts:
+            return np.zeros((0, self._embedding_dimension(model)), dtype=np.float32)
+        
+        indexes = [i for i, text in enumerate(texts) if text]
+        try:
+            # Only encode texts whose embeddings are not cached yet
+            cache = get_embedding_cache()
+            cached = cache.get_many([texts[i] for i in indexes]) if cache else [None] * len(indexes)
+            hits = {i: vector for i, vector in zip(indexes, cached) if vector is not None}
+            misses = [i for i in indexes if i not in hits]
+            
+            # Duplicate texts in the list are encoded once
+            unique_texts = list(dict.fromkeys(texts[i] for i in misses))
+            
+            start_time = time.time()
+            if len(unique_texts) == 1:
+                unique_vectors = np.asarray([self._encode_one(model, unique_texts[0], cache)])
+            else:
+                if not unique_texts:
+                    unique_vectors = np.zeros((0, self._embedding_dimension(model)), dtype=np.float32)
+                elif EMBEDDING_MICRO_BATCH_ENABLED and len(unique_texts) <= EMBEDDING_MICRO_BATCH_MAX_SIZE:
+                    unique_vectors = get_embedding_batcher().submit_many(unique_texts)
+                else:
+                    unique_vectors = model.encode(
+                        unique_texts,
+                        batch_size=batch_size or EMBEDDING_BATCH_SIZE,
+                        convert_to_numpy=True
+                    )
+                if cache and unique_texts:
+                    cache.put_many(unique_texts, unique_vectors)
+            positions = {text: position for position, text in enumerate(unique_texts)}
+            vectors = unique_vectors[[positions[texts[i]] for i in misses]] if misses else unique_vectors
+            
+            if len(vectors):
+                dimension = vectors.shape[1]
+            elif hits:
+                dimension = len(next(iter(hits.values())))
+            else:
+                dimension = self._embedding_dimension(model)
+            embeddings = np.zeros((len(texts), dimension), dtype=np.float32)
+            if misses:
+                embeddings[misses] = vectors
+            for i, vector in hits.items():
+                embeddings[i] = vector
+            
+            elapsed = time.time() - start_time
+            self.logger.info(f"Generated {len(unique_texts)} embeddings ({len(hits)} cached) in {elapsed:.2f}s " +
+                             f"({(elapsed / max(len(unique_texts), 1)) * 1000:.1f}ms per text)")
+            return embeddings
+            
+        except Exception as e:
+            self.logger.error(f"Error generating embeddings: {str(e)}", exc_info=True)
+            return None
+    
+    def _embedding_dimension(self, model):
+        """Width of the embedding model's vectors, as reported by the model or embedding server
+        
+        Args:
+            model: The loaded embedding model or embedding server client
+            
+        Returns:
+            int: Embedding dimension, 0 if the model does not report one
+        """
+        return int(model.get_sentence_embedding_dimension() or 0)
     
     def get_reranking_model(self):
-        """Get or initialize a cross-encoder model for more accurate reranking
+        """Get the shared cross-encoder model for more accurate reranking
         
         Returns:
-            CrossEncoder: The initialized reranking model (cross-encoder)
+            CrossEncoder: The initialized reranking model (cross-encoder), None if it failed to load
         """
         if self.reranking_model is None:
-            start_time = time.time()
-            self.logger.info("Loading reranking model 'cross-encoder/ms-marco-MiniLM-L-6-v2'")
-            try:
-                from sentence_transformers import CrossEncoder
-                self.reranking_model = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
-                self.logger.info(f"Reranking model loaded in {time.time() - start_time:.2f}s")
-            except Exception as e:
-                self.logger.error(f"Failed to load reranking model: {str(e)}", exc_info=True)
-                return None
+            self.reranking_model = get_reranking_model()
         return self.reranking_model
     
-    def generate_completion(self, messages, log_prefix="LLM", max_tokens=None, temperature=None, stream=False):
-        """
-        Generate a completion using the LLM
+    def _convert_messages(self, messages, log_prefix):
+        """Convert SystemMessage/UserMessage objects and dictionaries to OpenAI format
         
         Args:
-            messages (list): List of SystemMessage and UserMessage objects
-            log_prefix (str, optional): Prefix for logging to identify the caller
-            max_tokens (int, optional): Maximum tokens to generate, defaults to config value
-            temperature (float, optional): Temperature for generation, defaults to config value
-            stream (bool, optional): Whether to stream the response, defaults to False
+            messages (list): Messages to convert
+            log_prefix (str): Prefix for logging to identify the caller
             
         Returns:
-            If stream=False: str: The generated completion text
-            If stream=True: generator: A generator yielding text chunks
+            list: Messages as OpenAI role/content dictionaries
         """
-        start_time = time.time()
-        self.logger.info(f"[{log_prefix}] Completion generation started (format: {MESSAGE_FORMAT})")
-        
-        # Convert message formats to OpenAI format
         openai_messages = []
         for msg in messages:
             if isinstance(msg, dict):
@@ -171,6 +285,43 @@ class LLMEngine:
                 else:
                     self.logger.warning(f"[{log_prefix}] Skipping unknown message format: {type(msg)}")
                     continue
+        return openai_messages
+    
+    def _lookup_completion(self, log_prefix, request_key):
+        """Look up a completion in the response cache if the call site opted in
+        
+        Args:
+            log_prefix (str): Call site, selects whether and how long completions are cached
+            request_key (str): Key of the request from completion_key
+            
+        Returns:
+            tuple: (cache, completion); cache is None when disabled, completion is None on a miss
+        """
+        cache = get_completion_cache()
+        if not cache:
+            return None, None
+        return cache, cache.get(log_prefix, request_key)
+    
+    def generate_completion(self, messages, log_prefix="LLM", max_tokens=None, temperature=None, stream=False):
+        """
+        Generate a completion using the LLM
+        
+        Args:
+            messages (list): List of SystemMessage and UserMessage objects
+            log_prefix (str, optional): Prefix for logging to identify the caller
+            max_tokens (int, optional): Maximum tokens to generate, defaults to config value
+            temperature (float, optional): Temperature for generation, defaults to config value
+            stream (bool, optional): Whether to stream the response, defaults to False
+            
+        Returns:
+            If stream=False: str: The generated completion text
+            If stream=True: generator: A generator yielding text chunks
+        """
+        start_time = time.time()
+        self.logger.info(f"[{log_prefix}] Completion generation started (format: {MESSAGE_FORMAT})")
+        
+        # Convert message formats to OpenAI format
+        openai_messages = self._convert_messages(messages, log_prefix)
         
         # Use provided values or defaults from config
         max_tokens = max_tokens or MAX_TOKENS
@@ -197,25 +348,36 @@ class LLMEngine:
             self.logger.info(f"[{log_prefix}] Sending request to {self.model_name} with max_tokens={max_tokens}, temperature={temperature}, stream={stream}")
             call_start = time.time()
             
-            # Handle streaming case
             self.logger.info(f"message {request_messages}")
+            request_key = completion_key(self.model_name, request_messages, None, temperature, max_tokens)
+            
+            # Handle streaming case
             if stream:
-                response = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=request_messages,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    stream=True
-                )
-                
-                def response_generator():
-                    collected_content = []
+                def open_stream():
+                    response = self.client.chat.completions.create(
+                        model=self.model_name,
+                        messages=request_messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        stream=True
+                    )
                     for chunk in response:
                         if chunk.choices and len(chunk.choices) > 0:
                             content = chunk.choices[0].delta.content
                             if content:
-                                collected_content.append(content)
                                 yield content
+                
+                # Identical concurrent streams are fanned out from one upstream stream
+                if REQUEST_COALESCING_ENABLED:
+                    chunks = get_single_flight().stream(f"stream:{request_key}", open_stream)
+                else:
+                    chunks = open_stream()
+                
+                def response_generator():
+                    collected_content = []
+                    for content in chunks:
+                        collected_content.append(content)
+                        yield content
                     
                     # Log at the end of streaming
                     call_duration = time.time() - call_start
@@ -234,18 +396,34 @@ class LLMEngine:
             
             # Handle non-streaming case (original behavior)
             else:
-                response = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=request_messages,
-                    max_tokens=max_tokens,
-                    temperature=temperature
-                )
+                cache, cached = self._lookup_completion(log_prefix, request_key)
+                if cached is not None:
+                    self.logger.info(f"[{log_prefix}] Completion served from cache in {time.time() - start_time:.4f}s")
+                    return cached
                 
-                call_duration = time.time() - call_start
-                self.logger.info(f"[{log_prefix}] Model response received in {call_duration:.2f}s")
+                def call():
+                    response = self.client.chat.completions.create(
+                        model=self.model_name,
+                        messages=request_messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature
+                    )
+                    
+                    call_duration = time.time() - call_start
+                    self.logger.info(f"[{log_prefix}] Model response received in {call_duration:.2f}s")
+                    get_llm_metrics().record_response(log_prefix, call_duration, response)
+                    
+                    # Extract response text
+                    completion_text = response.choices[0].message.content
+                    if cache:
+                        cache.put(log_prefix, request_key, completion_text)
+                    return completion_text
                 
-                # Extract response text
-                completion_text = response.choices[0].message.content
+                # Concurrent identical requests share one upstream call
+                if REQUEST_COALESCING_ENABLED:
+                    completion_text = get_single_flight().do(f"completion:{request_key}", call)
+                else:
+                    completion_text = call()
                 
                 # Log truncated response if large
                 if len(completion_text) > 500:
@@ -261,27 +439,89 @@ class LLMEngine:
         except Exception as e:
             processing_time = time.time() - start_time
             self.logger.error(f"[{log_prefix}] Completion generation error after {processing_time:.2f}s: {str(e)}", exc_info=True)
+            get_llm_metrics().record(log_prefix, processing_time, error=True)
             raise
     
-    def generate_completion_with_tools(self, messages, tools=None, tool_choice="auto", log_prefix="LLM", max_tokens=None, temperature=None):
+    async def agenerate_completion(self, messages, log_prefix="LLM", max_tokens=None, temperature=None, stream=False):
         """
-        Generate a completion using the LLM with tool calling support
+        Generate a completion without blocking the event loop
+        
+        Requests go through the shared async client, which limits concurrency,
+        retries rate-limited and failed requests and records per-call-site metrics.
         
         Args:
-            messages (list): List of messages in OpenAI format
-            tools (list, optional): List of tool definitions for function calling
-            tool_choice (str, optional): Tool choice strategy ("auto", "none", or specific tool)
-            log_prefix (str, optional): Prefix for logging to identify the caller
+            messages (list): List of SystemMessage and UserMessage objects
+            log_prefix (str, optional): Prefix for logging and metrics to identify the caller
             max_tokens (int, optional): Maximum tokens to generate, defaults to config value
             temperature (float, optional): Temperature for generation, defaults to config value
+            stream (bool, optional): Whether to stream the response, defaults to False
             
         Returns:
-            OpenAI completion response object with tool calls if any
+            If stream=False: str: The generated completion text
+            If stream=True: async generator: An async generator yielding text chunks
         """
         start_time = time.time()
-        self.logger.info(f"[{log_prefix}] Tool-enabled completion generation started (format: {MESSAGE_FORMAT})")
+        openai_messages = self._convert_messages(messages, log_prefix)
         
-        # Convert message format if needed
+        if MESSAGE_FORMAT == 'llama':
+            # Format messages for Llama (no tools)
+            formatted_prompt = MessageFormatter.format_messages(openai_messages, None, 'llama')
+            request_messages = [{"role": "user", "content": formatted_prompt}]
+        else:
+            request_messages = openai_messages
+        
+        params = {
+            "model": self.model_name,
+            "messages": request_messages,
+            "max_tokens": max_tokens or MAX_TOKENS,
+            "temperature": temperature or TEMPERATURE
+        }
+        self.logger.info(f"[{log_prefix}] Sending async request to {self.model_name} with max_tokens={params['max_tokens']}, temperature={params['temperature']}, stream={stream}")
+        
+        client = get_async_llm_client()
+        if stream:
+            return client.stream_chat_completion(call_site=log_prefix, **params)
+        
+        request_key = completion_key(self.model_name, request_messages, None, params['temperature'], params['max_tokens'])
+        cache, cached = self._lookup_completion(log_prefix, request_key)
+        if cached is not None:
+            self.logger.info(f"[{log_prefix}] Completion served from cache in {time.time() - start_time:.4f}s")
+            return cached
+        
+        async def call():
+            response = await client.chat_completion(call_site=log_prefix, **params)
+            completion_text = response.choices[0].message.content
+            if cache:
+                cache.put(log_prefix, request_key, completion_text)
+            return completion_text
+        
+        try:
+            # Concurrent identical requests share one upstream call
+            if REQUEST_COALESCING_ENABLED:
+                completion_text = await get_single_flight().ado(f"completion:{request_key}", call)
+            else:
+                completion_text = await call()
+        except Exception as e:
+            self.logger.error(f"[{log_prefix}] Async completion generation error after {time.time() - start_time:.2f}s: {str(e)}", exc_info=True)
+            raise
+        
+        if completion_text and len(completion_text) > 500:
+            self.logger.info(f"[{log_prefix}] Raw model response: '{completion_text[:500]}...' (truncated)")
+        else:
+            self.logger.info(f"[{log_prefix}] Raw model response: '{completion_text}'")
+        self.logger.info(f"[{log_prefix}] Async completion generation completed in {time.time() - start_time:.2f}s")
+        return completion_text
+    
+    def _convert_tool_messages(self, messages, log_prefix):
+        """Convert messages to OpenAI format, keeping tool call fields of dictionaries
+        
+        Args:
+            messages (list): Messages to convert
+            log_prefix (str): Prefix for logging to identify the caller
+            
+        Returns:
+            list: Messages in OpenAI format
+        """
         openai_messages = []
         for msg in messages:
             if isinstance(msg, dict):
@@ -324,6 +564,29 @@ class LLMEngine:
                     self.logger.warning(f"[{log_prefix}] Skipping unknown message format: {type(msg)}")
                     continue
         
+        return openai_messages
+    
+    def generate_completion_with_tools(self, messages, tools=None, tool_choice="auto", log_prefix="LLM", max_tokens=None, temperature=None):
+        """
+        Generate a completion using the LLM with tool calling support
+        
+        Args:
+            messages (list): List of messages in OpenAI format
+            tools (list, optional): List of tool definitions for function calling
+            tool_choice (str, optional): Tool choice strategy ("auto", "none", or specific tool)
+            log_prefix (str, optional): Prefix for logging to identify the caller
+            max_tokens (int, optional): Maximum tokens to generate, defaults to config value
+            temperature (float, optional): Temperature for generation, defaults to config value
+            
+        Returns:
+            OpenAI completion response object with tool calls if any
+        """
+        start_time = time.time()
+        self.logger.info(f"[{log_prefix}] Tool-enabled completion generation started (format: {MESSAGE_FORMAT})")
+        
+        # Convert message format if needed
+        openai_messages = self._convert_tool_messages(messages, log_prefix)
+        
         # Use provided values or defaults from config
         max_tokens = max_tokens or MAX_TOKENS
         temperature = temperature or TEMPERATURE
@@ -340,6 +603,50 @@ class LLMEngine:
             self.logger.error(f"[{log_prefix}] Tool-enabled completion generation error after {processing_time:.2f}s: {str(e)}", exc_info=True)
             raise
 
+    async def agenerate_completion_with_tools(self, messages, tools=None, tool_choice="auto", log_prefix="LLM", max_tokens=None, temperature=None):
+        """
+        Generate a completion with tool calling support without blocking the event loop
+        
+        Args:
+            messages (list): List of messages in OpenAI format
+            tools (list, optional): List of tool definitions for function calling
+            tool_choice (str, optional): Tool choice strategy ("auto", "none", or specific tool)
+            log_prefix (str, optional): Prefix for logging and metrics to identify the caller
+            max_tokens (int, optional): Maximum tokens to generate, defaults to config value
+            temperature (float, optional): Temperature for generation, defaults to config value
+            
+        Returns:
+            OpenAI completion response object with tool calls if any
+        """
+        start_time = time.time()
+        self.logger.info(f"[{log_prefix}] Async tool-enabled completion generation started (format: {MESSAGE_FORMAT})")
+        openai_messages = self._convert_tool_messages(messages, log_prefix)
+        
+        request_params = {
+            "model": self.model_name,
+            "max_tokens": max_tokens or MAX_TOKENS,
+            "temperature": temperature or TEMPERATURE
+        }
+        if MESSAGE_FORMAT == 'llama':
+            # Tools are described in the Llama prompt instead of the request
+            formatted_prompt = MessageFormatter.format_messages(openai_messages, tools, 'llama')
+            request_params["messages"] = [{"role": "user", "content": formatted_prompt}]
+        else:
+            request_params["messages"] = openai_messages
+            if tools:
+                request_params["tools"] = tools
+                request_params["tool_choice"] = tool_choice
+        
+        try:
+            response = await get_async_llm_client().chat_completion(call_site=log_prefix, **request_params)
+            if MESSAGE_FORMAT == 'llama':
+                return self._parse_llama_tool_response(response, tools, log_prefix, start_time)
+            return self._log_tool_response(response, log_prefix, start_time)
+        except Exception as e:
+            processing_time = time.time() - start_time
+            self.logger.error(f"[{log_prefix}] Async tool-enabled completion generation error after {processing_time:.2f}s: {str(e)}", exc_info=True)
+            raise
+
     def _generate_openai_completion(self, openai_messages, tools, tool_choice, log_prefix, max_tokens, temperature, start_time):
         """Generate completion using OpenAI format."""
         # Log the prompt message but truncate if too large
@@ -371,7 +678,12 @@ class LLMEngine:
         
         call_duration = time.time() - call_start
         self.logger.info(f"[{log_prefix}] Model response received in {call_duration:.2f}s")
+        get_llm_metrics().record_response(log_prefix, call_duration, response)
         
+        return self._log_tool_response(response, log_prefix, start_time)
+    
+    def _log_tool_response(self, response, log_prefix, start_time):
+        """Log the content and tool calls of an OpenAI format tool-enabled response"""
         message = response.choices[0].message
         
         # Log response details
@@ -420,7 +732,12 @@ class LLMEngine:
         
         call_duration = time.time() - call_start
         self.logger.info(f"[{log_prefix}] Llama model response received in {call_duration:.2f}s")
+        get_llm_metrics().record_response(log_prefix, call_duration, response)
         
+        return self._parse_llama_tool_response(response, tools, log_prefix, start_time)
+    
+    def _parse_llama_tool_response(self, response, tools, log_prefix, start_time):
+        """Parse tool calls from a Llama format response into an OpenAI-like response object"""
         # Parse Llama response and convert to OpenAI format
         raw_content = response.choices[0].message.content
         
@@ -468,7 +468,7 @@ Follow these guidelines:
             yield {"type": "status", "message": "Generating initial plan..."}
             
             # First LLM call using the common LLM engine
-            response = self.llm_engine.generate_completion_with_tools(
+            response = await self.llm_engine.agenerate_completion_with_tools(
                 messages=messages,
                 tools=available_tools,
                 tool_choice="auto",
@@ -546,7 +546,7 @@ Follow these guidelines:
 
                 # Next LLM call with the tool results
                 yield {"type": "status", "message": "Processing tool results..."}
-                response = self.llm_engine.generate_completion_with_tools(
+                response = await self.llm_engine.agenerate_completion_with_tools(
                     messages=messages,
                     tools=available_tools,
                     tool_choice="auto",
@@ -1205,7 +1205,7 @@ class MCPClientManager:
             # Use LLM engine for server selection
             llm_engine = get_llm_engine()
             if llm_engine:
-                response = llm_engine.generate_completion(
+                response = await llm_engine.agenerate_completion(
                     messages=[
                         {
                             "role": "system",
@@ -0,0 +1,233 @@
+"""
+CPU inference backends for the local embedding and reranking models.
+Models can run as plain fp32 PyTorch ('torch'), through ONNX Runtime ('onnx')
+or with int8 dynamically quantized linear layers ('int8'). Helpers compare a
+backend against the fp32 reference and benchmark per-item latency and memory.
+
+Usage: python -m src.utils.model_backends --backend int8 [--model embedding|reranking]
+"""
+
+import json
+import logging
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from config.config import EMBEDDING_MODEL_NAME, RERANKING_MODEL_NAME, MODEL_INFERENCE_BACKEND
+
+logger = logging.getLogger('text2sql.model_backends')
+
+BACKENDS = ('torch', 'onnx', 'int8')
+
+# Sample inputs for the parity check and benchmark
+SAMPLE_TEXTS = [
+    "total sales by region for last quarter",
+    "which customers placed more than five orders in 2023",
+    "average order value per month",
+    "list the top 10 products by revenue",
+    "orders.order_date: date the order was placed (DATE)",
+    "customers.email: contact email address of the customer (VARCHAR)",
+    "number of active users per day over the past week",
+    "employees hired after January 2020 in the engineering department",
+]
+
+
+def _quantize_dynamic(module):
+    """Replace the linear layers of a torch module with int8 dynamically quantized ones"""
+    import torch
+    return torch.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_embedding_model(model_name: str = EMBEDDING_MODEL_NAME, backend: str = MODEL_INFERENCE_BACKEND):
+    """Load a sentence-transformers embedding model on the given backend
+
+    Falls back to fp32 PyTorch when the backend is unavailable, for example when
+    onnxruntime is not installed.
+
+    Args:
+        model_name (str, optional): Name of the sentence-transformers model
+        backend (str, optional): 'torch', 'onnx' or 'int8'
+
+    Returns:
+        SentenceTransformer: The model, with inference_backend set to the backend in use
+    """
+    from sentence_transformers import SentenceTransformer
+
+    if backend == 'onnx':
+        try:
+            model = SentenceTransformer(model_name, backend='onnx')
+            model.inference_backend = 'onnx'
+            return model
+        except (TypeError, ImportError, ValueError) as e:
+            logger.warning(f"ONNX backend unavailable for '{model_name}', using torch: {str(e)}")
+
+    model = SentenceTransformer(model_name, device='cpu' if backend == 'int8' else None)
+    model.inference_backend = 'torch'
+    if backend == 'int8':
+        try:
+            model = _quantize_dynamic(model)
+            model.inference_backend = 'int8'
+        except Exception as e:
+            logger.warning(f"int8 quantization failed for '{model_name}', using torch: {str(e)}")
+    elif backend not in BACKENDS:
+        logger.warning(f"Unknown inference backend '{backend}', using torch")
+    return model
+
+
+def load_reranking_model(model_name: str = RERANKING_MODEL_NAME, backend: str = MODEL_INFERENCE_BACKEND):
+    """Load a sentence-transformers cross-encoder on the given backend
+
+    Falls back to fp32 PyTorch when the backend is unavailable.
+
+    Args:
+        model_name (str, optional): Name of the cross-encoder model
+        backend (str, optional): 'torch', 'onnx' or 'int8'
+
+    Returns:
+        CrossEncoder: The model, with inference_backend set to the backend in use
+    """
+    from sentence_transformers import CrossEncoder
+
+    if backend == 'onnx':
+        try:
+            model = CrossEncoder(model_name, backend='onnx')
+            model.inference_backend = 'onnx'
+            return model
+        except (TypeError, ImportError, ValueError) as e:
+            logger.warning(f"ONNX backend unavailable for '{model_name}', using torch: {str(e)}")
+
+    model = CrossEncoder(model_name, device='cpu' if backend == 'int8' else None)
+    model.inference_backend = 'torch'
+    if backend == 'int8':
+        try:
+            model.model = _quantize_dynamic(model.model)
+            model.inference_backend = 'int8'
+        except Exception as e:
+            logger.warning(f"int8 quantization failed for '{model_name}', using torch: {str(e)}")
+    elif backend not in BACKENDS:
+        logger.warning(f"Unknown inference backend '{backend}', using torch")
+    return model
+
+
+def _ranks(values: np.ndarray) -> np.ndarray:
+    """Get the rank of every value, ties broken by position"""
+    ranks = np.empty(len(values), dtype=np.float64)
+    ranks[np.argsort(values, kind='stable')] = np.arange(len(values))
+    return ranks
+
+
+def embedding_parity(reference, candidate, texts: Sequence[str] = SAMPLE_TEXTS) -> Dict[str, float]:
+    """Compare the embeddings of a candidate model with the fp32 reference
+
+    Args:
+        reference: Reference model with an encode method
+        candidate: Model under test with an encode method
+        texts (sequence, optional): Texts to embed
+
+    Returns:
+        Dict: Minimum and mean cosine similarity between matching embeddings
+    """
+    expected = np.asarray(reference.encode(list(texts), convert_to_numpy=True), dtype=np.float64)
+    actual = np.asarray(candidate.encode(list(texts), convert_to_numpy=True), dtype=np.float64)
+    cosines = (expected * actual).sum(axis=1) / (
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1) + 1e-12
+    )
+    return {'min_cosine': float(cosines.min()), 'mean_cosine': float(cosines.mean())}
+
+
+def reranking_parity(reference, candidate, pairs: Sequence[Tuple[str, str]]) -> Dict[str, float]:
+    """Compare the scores of a candidate cross-encoder with the fp32 reference
+
+    Args:
+        reference: Reference model with a predict method
+        candidate: Model under test with a predict method
+        pairs (sequence): (query, passage) pairs to score
+
+    Returns:
+        Dict: Largest absolute score difference and Spearman rank correlation
+    """
+    expected = np.asarray(reference.predict(list(pairs)), dtype=np.float64)
+    actual = np.asarray(candidate.predict(list(pairs)), dtype=np.float64)
+    expected_ranks = _ranks(expected) - (len(pairs) - 1) / 2
+    actual_ranks = _ranks(actual) - (len(pairs) - 1) / 2
+    denominator = np.sqrt((expected_ranks ** 2).sum() * (actual_ranks ** 2).sum())
+    return {
+        'max_abs_diff': float(np.abs(expected - actual).max()),
+        'spearman': float((expected_ranks * actual_ranks).sum() / denominator) if denominator else 1.0
+    }
+
+
+def benchmark(run, inputs: List[Any], repeats: int = 5) -> Dict[str, float]:
+    """Measure per-item latency of a batched inference function
+
+    Args:
+        run (callable): Function running inference on a list of inputs
+        inputs (list): Inputs of one batch
+        repeats (int, optional): Number of timed runs after one warm-up run
+
+    Returns:
+        Dict: Median and p95 milliseconds per item over the timed runs
+    """
+    run(inputs)
+    per_item = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        run(inputs)
+        per_item.append((time.perf_counter() - start_time) * 1000 / len(inputs))
+    return {
+        'p50_ms_per_item': float(np.percentile(per_item, 50)),
+        'p95_ms_per_item': float(np.percentile(per_item, 95))
+    }
+
+
+def compare_backends(kind: str, backend: str) -> Dict[str, Any]:
+    """Load a model on fp32 torch and on another backend, then check parity and benchmark both
+
+    Args:
+        kind (str): 'embedding' or 'reranking'
+        backend (str): Backend to compare with fp32 torch
+
+    Returns:
+        Dict: Parity metrics and per-backend latency and memory
+    """
+    from src.utils.model_registry import _rss_bytes, _parameter_bytes
+
+    if kind == 'embedding':
+        load, inputs = load_embedding_model, list(SAMPLE_TEXTS)
+        call = lambda model: (lambda batch: model.encode(batch, convert_to_numpy=True))
+    else:
+        load = load_reranking_model
+        inputs = [(query, passage) for query in SAMPLE_TEXTS[:4] for passage in SAMPLE_TEXTS[4:]]
+        call = lambda model: model.predict
+
+    report = {'kind': kind, 'backends': {}}
+    models = {}
+    for name in ('torch', backend):
+        rss_before = _rss_bytes()
+        models[name] = load(backend=name)
+        rss_after = _rss_bytes()
+        report['backends'][name] = {
+            'in_use': getattr(models[name], 'inference_backend', name),
+            'parameter_bytes': _parameter_bytes(models[name]),
+            'rss_delta_bytes': (rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+            **benchmark(call(models[name]), inputs)
+        }
+
+    if kind == 'embedding':
+        report['parity'] = embedding_parity(models['torch'], models[backend], inputs)
+    else:
+        report['parity'] = reranking_parity(models['torch'], models[backend], inputs)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare a CPU inference backend with fp32 torch")
+    parser.add_argument('--backend', choices=[name for name in BACKENDS if name != 'torch'], default='int8')
+    parser.add_argument('--model', choices=['embedding', 'reranking', 'both'], default='both')
+    args = parser.parse_args()
+
+    kinds = ['embedding', 'reranking'] if args.model == 'both' else [args.model]
+    print(json.dumps([compare_backends(kind, args.backend) for kind in kinds], indent=2))
@@ -0,0 +1,216 @@
+"""
+Process-wide registry of local ML models.
+Embedding and reranking models are loaded once per process and shared by every
+component, optionally warmed up in the background at startup, with load time
+and memory use recorded per model. With EMBEDDING_SERVICE_URL set, the default
+embedding model is served by the shared embedding server instead.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from config.config import EMBEDDING_MODEL_NAME, EMBEDDING_SERVICE_URL, RERANKING_MODEL_NAME, MODEL_LOAD_RETRY_INTERVAL
+
+logger = logging.getLogger('text2sql.model_registry')
+
+
+def _rss_bytes() -> Optional[int]:
+    """Get the resident memory of this process in bytes, None where unavailable"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _parameter_bytes(model: Any) -> Optional[int]:
+    """Get the size of a torch model's parameters in bytes, None for other models"""
+    module = model if hasattr(model, 'parameters') else getattr(model, 'model', None)
+    if module is None or not hasattr(module, 'parameters'):
+        return None
+    try:
+        return sum(param.numel() * param.element_size() for param in module.parameters())
+    except Exception:
+        return None
+
+
+class ModelRegistry:
+    """Thread-safe cache of loaded models keyed by name
+
+    Concurrent requests for a model that is still loading wait for the one
+    load in progress instead of loading their own copy. Failed loads are
+    retried at most every MODEL_LOAD_RETRY_INTERVAL seconds.
+    """
+
+    def __init__(self, retry_interval: float = MODEL_LOAD_RETRY_INTERVAL):
+        """Initialize the registry
+
+        Args:
+            retry_interval (float, optional): Minimum seconds between attempts to load a failed model
+        """
+        self.retry_interval = retry_interval
+        self._models: Dict[str, Any] = {}
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, key: str, loader: Callable[[], Any]):
+        """Register how to load a model without loading it
+
+        Args:
+            key (str): Model key
+            loader (callable): Function returning the loaded model
+        """
+        with self._lock:
+            self._loaders.setdefault(key, loader)
+            self._stats.setdefault(key, {'status': 'registered'})
+
+    def get(self, key: str, loader: Optional[Callable[[], Any]] = None) -> Optional[Any]:
+        """Get a model, loading it on first use
+
+        Args:
+            key (str): Model key
+            loader (callable, optional): Function returning the model, registered if the key is new
+
+        Returns:
+            Any: The model, or None if it could not be loaded
+        """
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if loader is not None:
+                self._loaders.setdefault(key, loader)
+                self._stats.setdefault(key, {'status': 'registered'})
+            loader = self._loaders.get(key)
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        if loader is None:
+            raise KeyError(f"No loader registered for model '{key}'")
+
+        with load_lock:
+            model = self._models.get(key)
+            if model is not None:
+                return model
+
+            stats = self._stats[key]
+            if stats.get('status') == 'failed' and time.time() - stats['failed_at'] < self.retry_interval:
+                return None
+
+            logger.info(f"Loading model '{key}'")
+            stats['status'] = 'loading'
+            rss_before = _rss_bytes()
+            start_time = time.time()
+            try:
+                model = loader()
+            except Exception as e:
+                logger.error(f"Failed to load model '{key}': {str(e)}", exc_info=True)
+                self._stats[key] = {'status': 'failed', 'error': str(e), 'failed_at': time.time()}
+                return None
+
+            load_time = time.time() - start_time
+            rss_after = _rss_bytes()
+            self._stats[key] = {
+                'status': 'loaded',
+                'load_time': round(load_time, 3),
+                'backend': getattr(model, 'inference_backend', None),
+                'loaded_at': time.time(),
+                'parameter_bytes': _parameter_bytes(model),
+                'rss_delta_bytes': (rss_after - rss_before) if rss_before is not None and rss_after is not None else None
+            }
+            self._models[key] = model
+            logger.info(f"Model '{key}' loaded in {load_time:.2f}s")
+            return model
+
+    def preload(self, keys: Optional[Iterable[str]] = None) -> threading.Thread:
+        """Load registered models in a background thread
+
+        Args:
+            keys (iterable, optional): Models to load, all registered models by default
+
+        Returns:
+            threading.Thread: The loading thread
+        """
+        with self._lock:
+            keys = list(keys) if keys is not None else list(self._loaders)
+
+        def load_all():
+            for key in keys:
+                self.get(key)
+
+        thread = threading.Thread(target=load_all, name='model-preload', daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get load status, load time and memory use per model
+
+        Returns:
+            Dict: Statistics keyed by model key
+        """
+        with self._lock:
+            return {key: dict(stats) for key, stats in self._stats.items()}
+
+
+def _sentence_transformer_loader(model_name: str) -> Callable[[], Any]:
+    """Build a loader for a sentence-transformers embedding model on the configured backend"""
+    def load():
+        if EMBEDDING_SERVICE_URL and model_name == EMBEDDING_MODEL_NAME:
+            from src.utils.embedding_client import RemoteEmbeddingModel
+            return RemoteEmbeddingModel(EMBEDDING_SERVICE_URL)
+        from src.utils.model_backends import load_embedding_model
+        return load_embedding_model(model_name)
+    return load
+
+
+def _cross_encoder_loader(model_name: str) -> Callable[[], Any]:
+    """Build a loader for a sentence-transformers cross-encoder on the configured backend"""
+    def load():
+        from src.utils.model_backends import load_reranking_model
+        return load_reranking_model(model_name)
+    return load
+
+
+# Shared registry for this process, with the default models registered
+_registry = ModelRegistry()
+_registry.register(f"embedding:{EMBEDDING_MODEL_NAME}", _sentence_transformer_loader(EMBEDDING_MODEL_NAME))
+_registry.register(f"reranking:{RERANKING_MODEL_NAME}", _cross_encoder_loader(RERANKING_MODEL_NAME))
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get the process-wide model registry
+
+    Returns:
+        ModelRegistry: The shared registry
+    """
+    return _registry
+
+
+def get_embedding_model(model_name: str = EMBEDDING_MODEL_NAME):
+    """Get a shared SentenceTransformer embedding model
+
+    Args:
+        model_name (str, optional): Name of the sentence-transformers model
+
+    Returns:
+        SentenceTransformer or None: The model, None if it could not be loaded
+    """
+    return _registry.get(f"embedding:{model_name}", _sentence_transformer_loader(model_name))
+
+
+def get_reranking_model(model_name: str = RERANKING_MODEL_NAME):
+    """Get a shared CrossEncoder reranking model
+
+    Args:
+        model_name (str, optional): Name of the cross-encoder model
+
+    Returns:
+        CrossEncoder or None: The model, None if it could not be loaded
+    """
+    return _registry.get(f"reranking:{model_name}", _cross_encoder_loader(model_name))
@@ -0,0 +1,378 @@
+"""
+Handles for truncated query results.
+When a query returns more rows than fit in the first page, the rest of the
+result is read once from the same server-side cursor in the background and
+spilled to a per-handle SQLite file. Further pages and downloads are served
+from that file, so they are consistent with the first page and cost no more
+than the rows they return. Each spill holds a pooled database connection
+until it stops reading, so only a few spills run at once and each one is
+time-limited; a result that finds no free slot is capped at its first page.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.utils.shared_store import create_shared_store
+from config.config import (
+    QUERY_RESULT_HANDLE_TTL, QUERY_RESULT_FETCH_SIZE, QUERY_RESULT_SPILL_DIR,
+    QUERY_RESULT_SPILL_MAX_ROWS, QUERY_RESULT_SPILL_MAX_BYTES, QUERY_RESULT_SPILL_CONCURRENCY,
+    QUERY_RESULT_SPILL_TIMEOUT, QUERY_RESULT_PAGE_WAIT, SHARED_STORE_SWEEP_INTERVAL
+)
+
+logger = logging.getLogger('text2sql.query_results')
+
+# Spill states: rows are still being written, all rows were written, the size caps or time
+# limit were reached before the end of the result (or no spill slot was free), or reading
+# the result failed
+SPILL_RUNNING = 'running'
+SPILL_COMPLETE = 'complete'
+SPILL_CAPPED = 'capped'
+SPILL_ERROR = 'error'
+
+
+def estimate_row_size(row) -> int:
+    """Estimate the serialized size of a result row in bytes
+
+    Args:
+        row (sequence): Row values
+
+    Returns:
+        int: Approximate number of bytes the row takes in a JSON response
+    """
+    return sum(len(str(value)) + 4 for value in row)
+
+
+class ResultHandleStore:
+    """Store of pageable query results that expire when left unused
+
+    Handles are kept in the shared store and rows in spill files on the local
+    disk, so a page or download request can be served by any worker process
+    of the host. Every handle belongs to the user whose query created it.
+    """
+
+    def __init__(self, ttl_seconds: int = QUERY_RESULT_HANDLE_TTL, store=None,
+                 spill_dir: str = QUERY_RESULT_SPILL_DIR, max_rows: int = QUERY_RESULT_SPILL_MAX_ROWS,
+                 max_bytes: int = QUERY_RESULT_SPILL_MAX_BYTES,
+                 max_concurrent: int = QUERY_RESULT_SPILL_CONCURRENCY,
+                 timeout: float = QUERY_RESULT_SPILL_TIMEOUT):
+        """Initialize the store
+
+        Args:
+            ttl_seconds (int, optional): Seconds a handle stays valid after its last use
+            store (MemoryStore, optional): Backing store, the configured shared store by default
+            spill_dir (str, optional): Directory of the spill files
+            max_rows (int, optional): Maximum rows spilled per result
+            max_bytes (int, optional): Approximate maximum size spilled per result
+            max_concurrent (int, optional): Maximum spills reading from a cursor at once
+            timeout (float, optional): Maximum seconds a spill reads from its cursor
+        """
+        self.ttl_seconds = ttl_seconds
+        self.spill_dir = spill_dir
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._spill_slots = threading.BoundedSemaphore(max(max_concurrent, 1))
+        os.makedirs(spill_dir, exist_ok=True)
+        self._store = store or create_shared_store('result_handles')
+        self._store.start_sweeper(max_age=ttl_seconds)
+        self._start_spill_sweeper()
+
+    def register(self, sql: str, columns: List[str], workspace_name: Optional[str] = None,
+                 connection_string: Optional[str] = None, owner: Any = None) -> str:
+        """Register a truncated result and return its handle
+
+        Args:
+            sql (str): The SQL query that produced the result
+            columns (list): Result column names
+            workspace_name (str, optional): Workspace whose database the query ran against
+            connection_string (str, optional): Connection used when no workspace database applies
+            owner (optional): ID of the user allowed to read the result
+
+        Returns:
+            str: Opaque result handle
+        """
+        handle = uuid.uuid4().hex
+        now = time.time()
+        self._store.set(handle, {
+            'sql': sql,
+            'columns': list(columns),
+            'workspace_name': workspace_name,
+            'connection_string': connection_string,
+            'owner': owner,
+            'created_at': now,
+            'last_access': now
+        })
+        return handle
+
+    def get(self, handle: str) -> Optional[Dict[str, Any]]:
+        """Look up a result handle and refresh its expiry
+
+        Args:
+            handle (str): Result handle
+
+        Returns:
+            Dict or None: The stored query details, None if unknown or expired
+        """
+        entry = self._store.get(handle)
+        if entry is None:
+            return None
+        now = time.time()
+        if now - entry['last_access'] > self.ttl_seconds:
+            self._store.delete(handle)
+            self._remove_spill(handle)
+            return None
+        self._touch_spill(handle)
+        return self._store.mutate(handle, lambda stored: stored.update(last_access=now))
+
+    def get_for_owner(self, handle: str, owner: Any) -> Optional[Dict[str, Any]]:
+        """Look up a result handle on behalf of a user
+
+        Args:
+            handle (str): Result handle
+            owner: ID of the requesting user
+
+        Returns:
+            Dict or None: The stored query details, None if unknown, expired or owned by someone else
+        """
+        entry = self.get(handle)
+        if entry is None or entry.get('owner') != owner:
+            return None
+        return entry
+
+    def _spill_path(self, handle: str) -> str:
+        """Path of the spill file of a handle"""
+        return os.path.join(self.spill_dir, f"{handle}.db")
+
+    def _connect(self, handle: str) -> sqlite3.Connection:
+        """Open the spill file of a handle"""
+        conn = sqlite3.connect(self._spill_path(handle), timeout=30.0, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def spill(self, handle: str, rows: Iterable[tuple], release=None, buffered: Iterable[tuple] = ()) -> threading.Thread:
+        """Write all rows of a result to the handle's spill file in a background thread
+
+        The buffered rows are always written. The remaining rows are only read when
+        a spill slot is free; otherwise the cursor is released right away and the
+        spill is capped after the buffered rows, so a download re-runs the query.
+
+        Args:
+            handle (str): Result handle
+            rows (iterable): Rows of the result still to be read, following the buffered rows
+            release (callable, optional): Called once reading is finished, e.g. to close the cursor
+            buffered (iterable, optional): Rows already read, starting with the first page
+
+        Returns:
+            threading.Thread: The spilling thread
+        """
+        conn = self._connect(handle)
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute("CREATE TABLE rows (i INTEGER PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute("INSERT INTO meta (key, value) VALUES ('status', ?)", (SPILL_RUNNING,))
+
+        released = []
+
+        def release_cursor():
+            # Hands the pooled connection back as soon as reading stops
+            if release is not None and not released:
+                released.append(True)
+                try:
+                    release()
+                except Exception as e:
+                    logger.warning(f"Error closing the cursor of result {handle}: {str(e)}")
+
+        has_slot = self._spill_slots.acquire(blocking=False)
+        if not has_slot:
+            logger.warning(f"No free spill slot, result {handle} is capped at its first page")
+            release_cursor()
+            rows = ()
+
+        def insert_batch(batch):
+            # One transaction per batch: readers see whole batches as they are written
+            conn.execute("BEGIN")
+            conn.executemany("INSERT INTO rows (i, value) VALUES (?, ?)", batch)
+            conn.execute("COMMIT")
+
+        def write_rows():
+            status, written, spilled_bytes = SPILL_COMPLETE if has_slot else SPILL_CAPPED, 0, 0
+            deadline = time.time() + self.timeout
+            try:
+                batch = []
+                try:
+                    for row in chain(buffered, rows):
+                        if written >= self.max_rows or spilled_bytes >= self.max_bytes:
+                            status = SPILL_CAPPED
+                            break
+                        if time.time() >= deadline:
+                            logger.warning(f"Spill of result {handle} stopped after {self.timeout}s")
+                            status = SPILL_CAPPED
+                            break
+                        batch.append((written, json.dumps(list(row), default=str)))
+                        written += 1
+                        spilled_bytes += estimate_row_size(row)
+                        if len(batch) >= QUERY_RESULT_FETCH_SIZE:
+                            insert_batch(batch)
+                            batch = []
+                finally:
+                    release_cursor()
+                if batch:
+                    insert_batch(batch)
+            except Exception as e:
+                status = SPILL_ERROR
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                logger.error(f"Error spilling result {handle}: {str(e)}", exc_info=True)
+            finally:
+                if has_slot:
+                    self._spill_slots.release()
+                conn.execute("UPDATE meta SET value = ? WHERE key = 'status'", (status,))
+                conn.close()
+            logger.info(f"Spilled {written} rows (~{spilled_bytes} bytes) of result {handle}: {status}")
+
+        thread = threading.Thread(target=write_rows, name=f"result-spill-{handle[:8]}", daemon=True)
+        thread.start()
+        return thread
+
+    def _read(self, conn: sqlite3.Connection, start: int, count: int) -> Tuple[List[list], str]:
+        """Read rows [start, start + count) and the spill status"""
+        status = conn.execute("SELECT value FROM meta WHERE key = 'status'").fetchone()[0]
+        rows = conn.execute(
+            "SELECT value FROM rows WHERE i >= ? ORDER BY i LIMIT ?", (start, count)
+        ).fetchall()
+        return [json.loads(value) for (value,) in rows], status
+
+    def read_page(self, handle: str, offset: int, limit: int,
+                  wait: float = QUERY_RESULT_PAGE_WAIT) -> Tuple[List[list], bool, str]:
+        """Read a page of a spilled result, waiting for rows that are still being written
+
+        Args:
+            handle (str): Result handle
+            offset (int): Index of the first row
+            limit (int): Maximum number of rows
+            wait (float, optional): Maximum seconds to wait for the spill to reach the page
+
+        Returns:
+            Tuple: (rows, has_more, spill status)
+        """
+        if not os.path.exists(self._spill_path(handle)):
+            return [], False, SPILL_ERROR
+        deadline = time.time() + wait
+        with closing(self._connect(handle)) as conn:
+            while True:
+                # Read one row past the page to know whether another page follows
+                rows, status = self._read(conn, offset, limit + 1)
+                if len(rows) > limit or status != SPILL_RUNNING or time.time() >= deadline:
+                    break
+                time.sleep(0.1)
+        has_more = len(rows) > limit or status == SPILL_RUNNING
+        return rows[:limit], has_more, status
+
+    def iter_rows(self, handle: str) -> Iterator[list]:
+        """Iterate over all rows of a spilled result, following a spill that is still running
+
+        Args:
+            handle (str): Result handle
+
+        Yields:
+            list: Row values
+        """
+        if not os.path.exists(self._spill_path(handle)):
+            return
+        position = 0
+        with closing(self._connect(handle)) as conn:
+            while True:
+                rows, status = self._read(conn, position, QUERY_RESULT_FETCH_SIZE)
+                yield from rows
+                position += len(rows)
+                if not rows:
+                    if status != SPILL_RUNNING:
+                        return
+                    time.sleep(0.1)
+
+    def spill_status(self, handle: str) -> str:
+        """Get the spill status of a handle, SPILL_ERROR if it has no spill file"""
+        if not os.path.exists(self._spill_path(handle)):
+            return SPILL_ERROR
+        with closing(self._connect(handle)) as conn:
+            return conn.execute("SELECT value FROM meta WHERE key = 'status'").fetchone()[0]
+
+    def _touch_spill(self, handle: str):
+        """Mark a spill file as used so the spill sweeper keeps it"""
+        try:
+            os.utime(self._spill_path(handle))
+        except OSError:
+            pass
+
+    def _remove_spill(self, handle: str):
+        """Delete the spill file of a handle"""
+        path = self._spill_path(handle)
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(path + suffix)
+            except FileNotFoundError:
+                pass
+
+    def sweep_spills(self) -> int:
+        """Delete spill files not used for longer than the handle TTL
+
+        Returns:
+            int: Number of deleted spill files
+        """
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for name in os.listdir(self.spill_dir):
+            if not name.endswith('.db'):
+                continue
+            path = os.path.join(self.spill_dir, name)
+            try:
+                last_used = max(os.path.getmtime(path + suffix) for suffix in ('', '-wal')
+                                if os.path.exists(path + suffix))
+            except (OSError, ValueError):
+                continue
+            if last_used < cutoff:
+                self._remove_spill(name[:-len('.db')])
+                removed += 1
+        return removed
+
+    def _start_spill_sweeper(self, interval: float = SHARED_STORE_SWEEP_INTERVAL):
+        """Start a daemon thread that periodically deletes unused spill files"""
+        def sweep_forever():
+            while True:
+                time.sleep(interval)
+                try:
+                    removed = self.sweep_spills()
+                    if removed:
+                        logger.info(f"Deleted {removed} expired result spill files")
+                except Exception as e:
+                    logger.error(f"Error sweeping result spill files: {str(e)}")
+
+        threading.Thread(target=sweep_forever, name="result-spill-sweeper", daemon=True).start()
+
+
+# Shared store for this process
+_result_store = None
+_result_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultHandleStore:
+    """Get the process-wide result handle store
+
+    Returns:
+        ResultHandleStore: The shared store
+    """
+    global _result_store
+
+    if _result_store is None:
+        with _result_store_lock:
+            if _result_store is None:
+                _result_store = ResultHandleStore()
+    return _result_store
@@ -0,0 +1,513 @@
+"""
+Executed-SQL result cache.
+Caches the results of read-only, deterministic queries keyed by normalized SQL
+text, and drops them when one of the referenced tables changes, so repeated
+dashboard and question SQL does not hit the database every time. Table names
+come from a real SQL parser; statements it cannot analyze are never cached,
+metadata commands such as SHOW, DESCRIBE, PRAGMA and EXPLAIN invalidate
+nothing, and known writes it cannot attribute to tables clear the whole cache. Table data
+versions live in the shared store, so an invalidation in one worker process
+is seen by all of them.
+"""
+
+import logging
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+
+from src.utils.shared_store import create_shared_store
+from config.config import RESULT_CACHE_ENABLED, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL
+
+logger = logging.getLogger('text2sql.result_cache')
+
+# sqlglot dialect names for SQLAlchemy dialect names that differ
+_DIALECTS = {
+    'postgresql': 'postgres',
+    'mssql': 'tsql',
+    'mariadb': 'mysql',
+    'teradatasql': 'teradata',
+}
+
+# Functions whose result changes between executions of the same SQL
+_NONDETERMINISTIC_FUNCTIONS = frozenset({
+    'now', 'current_date', 'current_time', 'current_timestamp', 'current_datetime', 'localtime',
+    'localtimestamp', 'sysdate', 'systimestamp', 'sysdatetime', 'sysutcdatetime', 'sysdatetimeoffset',
+    'getdate', 'getutcdate', 'curdate', 'curtime', 'utc_date', 'utc_time', 'utc_timestamp',
+    'unix_timestamp', 'clock_timestamp', 'statement_timestamp', 'transaction_timestamp', 'timeofday',
+    'random', 'rand', 'randn', 'randomblob', 'uuid', 'newid', 'newsequentialid', 'gen_random_uuid',
+    'uuid_generate_v4', 'sys_guid', 'nextval', 'currval', 'lastval', 'last_insert_id', 'last_insert_rowid',
+    'changes', 'found_rows', 'row_count', 'current_user', 'session_user', 'user',
+})
+
+# Keywords some dialects parse as bare column names, and SQLite's date('now') style arguments
+_NONDETERMINISTIC_KEYWORDS = frozenset({
+    'sysdate', 'systimestamp', 'current_date', 'current_time', 'current_timestamp', 'localtime',
+    'localtimestamp', 'current_user', 'session_user', 'user',
+})
+_NONDETERMINISTIC_LITERALS = frozenset({'now', 'localtime', 'today'})
+
+# Statements that write data or change the schema
+_WRITE_EXPRESSIONS = (exp.DML, exp.Create, exp.Drop, exp.Alter, exp.Into, exp.Command, exp.Merge, exp.TruncateTable)
+
+# Statements that only read metadata: they are not cached and invalidate nothing
+_METADATA_EXPRESSIONS = (exp.Show, exp.Describe, exp.Pragma)
+_METADATA_COMMANDS = frozenset({'SHOW', 'EXPLAIN', 'DESCRIBE', 'DESC'})
+
+# SHOW and EXPLAIN are recognized before parsing, as sqlglot falls back to a logged Command for
+# them in most dialects; the prefix covers the plan options, only ANALYZE runs the statement
+_SHOW_RE = re.compile(r'^\s*SHOW\b', re.IGNORECASE)
+_EXPLAIN_RE = re.compile(
+    r'^\s*(?:EXPLAIN|DESCRIBE|DESC)\s+(?:\([^)]*\)\s*|(?:ANALY[SZ]E|VERBOSE|EXTENDED|QUERY\s+PLAN|FORMAT\s*=\s*\w+)\s+)*',
+    re.IGNORECASE
+)
+_ANALYZE_RE = re.compile(r'\bANALY[SZ]E\b', re.IGNORECASE)
+
+# Shared-store key of the table data versions and the epoch bumped by clear()
+_VERSIONS_KEY = 'tables'
+
+
+def normalize_sql(sql: str) -> str:
+    """Normalize SQL text for use as a cache key
+
+    Whitespace is collapsed and trailing semicolons are removed; case is kept
+    because string literals are case-sensitive.
+
+    Args:
+        sql (str): The SQL query
+
+    Returns:
+        str: The normalized SQL
+    """
+    return re.sub(r'\s+', ' ', (sql or '').strip()).rstrip('; ')
+
+
+def sql_dialect(dialect_name: Optional[str]) -> Optional[str]:
+    """Map a SQLAlchemy dialect name to the sqlglot dialect used to parse its SQL
+
+    Args:
+        dialect_name (str, optional): SQLAlchemy dialect name such as 'postgresql' or 'sqlite'
+
+    Returns:
+        str or None: sqlglot dialect name, None for the generic dialect
+    """
+    if not dialect_name:
+        return None
+    return _DIALECTS.get(dialect_name, dialect_name)
+
+
+def _parse(sql: str, dialect: Optional[str] = None) -> Optional[List[exp.Expression]]:
+    """Parse SQL into statements, None if it cannot be parsed"""
+    try:
+        statements = [statement for statement in sqlglot.parse(sql or '', read=dialect) if statement is not None]
+    except (SqlglotError, ValueError) as e:
+        logger.debug(f"Could not parse SQL for the result cache: {str(e)}")
+        return None
+    return statements or None
+
+
+def _tables(statements: List[exp.Expression]) -> Set[str]:
+    """Get the lower-cased names of the tables referenced by parsed statements"""
+    # CTE names are kept: treating them as tables can only cause extra invalidations
+    return {table.name.lower() for statement in statements for table in statement.find_all(exp.Table) if table.name}
+
+
+def _is_query(statement: exp.Expression) -> bool:
+    """Check whether a parsed statement is a query that only reads data"""
+    return isinstance(statement, exp.Query) and statement.find(*_WRITE_EXPRESSIONS) is None
+
+
+def _is_metadata(statement: exp.Expression) -> bool:
+    """Check whether a parsed statement only reads metadata"""
+    if isinstance(statement, exp.Command):
+        return str(statement.this).upper() in _METADATA_COMMANDS
+    return isinstance(statement, _METADATA_EXPRESSIONS)
+
+
+def _is_write(statement: exp.Expression) -> bool:
+    """Check whether a parsed statement is known to write data or change the schema"""
+    if _is_query(statement) or _is_metadata(statement):
+        return False
+    return isinstance(statement, _WRITE_EXPRESSIONS) or statement.find(*_WRITE_EXPRESSIONS) is not None
+
+
+def _is_deterministic(statements: List[exp.Expression]) -> bool:
+    """Check whether parsed statements call no time, random or sequence functions"""
+    for statement in statements:
+        for func in statement.find_all(exp.Func):
+            name = func.name if isinstance(func, exp.Anonymous) else func.sql_name()
+            if name.lower() in _NONDETERMINISTIC_FUNCTIONS:
+                return False
+        for column in statement.find_all(exp.Column):
+            if not column.table and column.name.lower() in _NONDETERMINISTIC_KEYWORDS:
+                return False
+        for literal in statement.find_all(exp.Literal):
+            if literal.is_string and literal.this.strip().lower() in _NONDETERMINISTIC_LITERALS:
+                return False
+    return True
+
+
+class SQLAnalysis:
+    """An SQL statement analyzed once for caching and invalidation
+
+    Attributes:
+        tables (Set[str] or None): Lower-cased names of the referenced tables, None if not parsed
+        read_only (bool): The statement only reads data or metadata
+        writes (bool): The statement is known to write data or change the schema
+        cacheable_tables (Set[str] or None): Tables a cacheable result depends on, None unless the
+            statement is a deterministic read-only query
+    """
+
+    def __init__(self, tables: Optional[Set[str]] = None, read_only: bool = False, writes: bool = False,
+                 cacheable_tables: Optional[Set[str]] = None):
+        self.tables = tables
+        self.read_only = read_only
+        self.writes = writes
+        self.cacheable_tables = cacheable_tables
+
+
+def analyze_sql(sql: str, dialect: Optional[str] = None) -> SQLAnalysis:
+    """Parse an SQL statement once and classify it
+
+    Args:
+        sql (str): The SQL statement
+        dialect (str, optional): sqlglot dialect of the SQL
+
+    Returns:
+        SQLAnalysis: Tables, read-only, write and cacheability of the statement; unparseable
+            SQL is neither read-only nor a known write
+    """
+    if _SHOW_RE.match(sql or ''):
+        return SQLAnalysis(tables=set(), read_only=True)
+    explain = _EXPLAIN_RE.match(sql or '')
+    if explain:
+        if not _ANALYZE_RE.search(explain.group(0)):
+            return SQLAnalysis(tables=set(), read_only=True)
+        # EXPLAIN ANALYZE runs the statement, including its writes
+        inner = analyze_sql(sql[explain.end():], dialect)
+        return SQLAnalysis(tables=inner.tables, read_only=inner.read_only, writes=inner.writes)
+
+    statements = _parse(sql, dialect)
+    if statements is None:
+        return SQLAnalysis()
+    tables = _tables(statements)
+    queries = all(_is_query(statement) for statement in statements)
+    return SQLAnalysis(
+        tables=tables,
+        read_only=all(_is_query(statement) or _is_metadata(statement) for statement in statements),
+        writes=any(_is_write(statement) for statement in statements),
+        cacheable_tables=tables if queries and _is_deterministic(statements) else None
+    )
+
+
+def extract_tables(sql: str, dialect: Optional[str] = None) -> Optional[Set[str]]:
+    """Extract the names of the tables referenced by an SQL statement
+
+    Args:
+        sql (str): The SQL statement
+        dialect (str, optional): sqlglot dialect of the SQL
+
+    Returns:
+        Set[str] or None: Lower-cased table names without schema prefix or quoting,
+            None if the SQL cannot be parsed
+    """
+    return analyze_sql(sql, dialect).tables
+
+
+def is_read_only(sql: str, dialect: Optional[str] = None) -> bool:
+    """Check whether an SQL statement only reads data or metadata
+
+    Args:
+        sql (str): The SQL statement
+        dialect (str, optional): sqlglot dialect of the SQL
+
+    Returns:
+        bool: True for queries without write statements and for SHOW, DESCRIBE, PRAGMA and EXPLAIN
+    """
+    return analyze_sql(sql, dialect).read_only
+
+
+def cacheable_tables(sql: str, dialect: Optional[str] = None) -> Optional[Set[str]]:
+    """Get the tables of a statement whose result may be cached
+
+    Args:
+        sql (str): The SQL statement
+        dialect (str, optional): sqlglot dialect of the SQL
+
+    Returns:
+        Set[str] or None: Tables the result depends on, None unless the statement
+            parses, is a query that only reads data and calls no non-deterministic functions
+    """
+    return analyze_sql(sql, dialect).cacheable_tables
+
+
+def estimate_result_size(result: Dict[str, Any]) -> int:
+    """Estimate the memory held by an execute_query result in bytes"""
+    data = result.get('data')
+    size = sys.getsizeof(result)
+    if data is not None:
+        try:
+            size += int(data.memory_usage(deep=True).sum())
+        except Exception:
+            size += sys.getsizeof(data)
+    return size
+
+
+class ResultCache:
+    """Thread-safe LRU cache of query results bounded by memory size and age
+
+    Every entry remembers the tables its SQL reads and the data version of those
+    tables before it was executed. Bumping a table's data version, in any worker
+    process sharing the version store, drops the entries that read it.
+    """
+
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES, ttl_seconds: int = RESULT_CACHE_TTL,
+                 versions_store=None):
+        """Initialize the result cache
+
+        Args:
+            max_bytes (int, optional): Memory budget for cached results
+            ttl_seconds (int, optional): Maximum age of a cached result in seconds
+            versions_store (MemoryStore, optional): Store of the table data versions,
+                the configured shared store by default
+        """
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._versions = versions_store or create_shared_store('result_cache_versions')
+        if self._versions.get(_VERSIONS_KEY) is None:
+            self._versions.set(_VERSIONS_KEY, {'epoch': 0, 'tables': {}})
+        self._total_bytes = 0
+        self._workspace_stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.invalidations = 0
+
+    def data_versions(self) -> Dict[str, Any]:
+        """Get the current table data versions
+
+        Take them before executing a query and pass them to put(), so a write that
+        lands while the query runs makes the stored result stale.
+
+        Returns:
+            Dict: {'epoch': int, 'tables': {table: version}}
+        """
+        state = self._versions.get(_VERSIONS_KEY) or {'epoch': 0, 'tables': {}}
+        return {'epoch': state['epoch'], 'tables': dict(state['tables'])}
+
+    def _update_versions(self, func):
+        """Atomically modify the shared table data versions"""
+        if self._versions.mutate(_VERSIONS_KEY, func) is None:
+            # The versions were deleted from the store: start over from a new epoch
+            state = {'epoch': time.time_ns(), 'tables': {}}
+            func(state)
+            self._versions.set(_VERSIONS_KEY, state)
+
+    def _workspace(self, workspace_name: Optional[str]) -> Dict[str, float]:
+        """Get the counters of a workspace; caller must hold the lock"""
+        key = workspace_name or 'default'
+        if key not in self._workspace_stats:
+            self._workspace_stats[key] = {'hits': 0, 'misses': 0, 'saved_time': 0.0}
+        return self._workspace_stats[key]
+
+    def _remove(self, key: tuple):
+        """Remove an entry; caller must hold the lock"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry['size']
+
+    def _is_stale(self, entry: Dict[str, Any], now: float, state: Dict[str, Any]) -> bool:
+        """Check whether an entry expired, the cache was cleared or one of its tables changed"""
+        if now - entry['created_at'] > self.ttl_seconds or entry['epoch'] != state['epoch']:
+            return True
+        return any(state['tables'].get(table, 0) != version for table, version in entry['versions'].items())
+
+    def get(self, database: str, workspace_name: Optional[str], sql: str, variant: Any = None) -> Optional[Dict[str, Any]]:
+        """Look up a cached result
+
+        Args:
+            database (str): Identifier of the database the SQL runs against
+            workspace_name (str, optional): Workspace the query belongs to, used for statistics
+            sql (str): The SQL query
+            variant (hashable, optional): Extra key part such as the row/byte caps
+
+        Returns:
+            Dict or None: Copy of the cached result with 'cached' set, None on miss
+        """
+        key = (database, normalize_sql(sql), variant)
+        now = time.time()
+        with self._lock:
+            cached = key in self._entries
+        # Only consult the shared versions when there is something to validate
+        state = self.data_versions() if cached else None
+        with self._lock:
+            stats = self._workspace(workspace_name)
+            entry = self._entries.get(key)
+            if entry is not None and (state is None or self._is_stale(entry, now, state)):
+                self._remove(key)
+                entry = None
+            if entry is None:
+                stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            stats['hits'] += 1
+            stats['saved_time'] += entry['execution_time']
+            return {**entry['result'], 'cached': True}
+
+    def put(self, database: str, workspace_name: Optional[str], sql: str, result: Dict[str, Any],
+            variant: Any = None, dialect: Optional[str] = None,
+            data_versions: Optional[Dict[str, Any]] = None, analysis: Optional[SQLAnalysis] = None) -> bool:
+        """Cache the result of a read-only, deterministic query
+
+        Args:
+            database (str): Identifier of the database the SQL ran against
+            workspace_name (str, optional): Workspace the query belongs to
+            sql (str): The SQL query
+            result (dict): Successful execute_query result
+            variant (hashable, optional): Extra key part such as the row/byte caps
+            dialect (str, optional): sqlglot dialect of the SQL
+            data_versions (dict, optional): Result of data_versions() taken before the query ran
+            analysis (SQLAnalysis, optional): analyze_sql() result of the SQL, to avoid parsing it again
+
+        Returns:
+            bool: True if the result was cached
+        """
+        tables = (analysis or analyze_sql(sql, dialect)).cacheable_tables
+        if tables is None:
+            return False
+        size = estimate_result_size(result)
+        if size > self.max_bytes:
+            return False
+
+        state = data_versions or self.data_versions()
+        key = (database, normalize_sql(sql), variant)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = {
+                'result': result,
+                'size': size,
+                'epoch': state['epoch'],
+                'versions': {table: state['tables'].get(table, 0) for table in tables},
+                'execution_time': result.get('execution_time') or 0.0,
+                'created_at': time.time()
+            }
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def _drop_local(self, tables: Optional[Set[str]] = None) -> int:
+        """Drop this process's entries reading any of the tables, or all entries"""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items()
+                     if tables is None or tables & entry['versions'].keys()]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += 1
+        return len(stale)
+
+    def invalidate_tables(self, tables: Iterable[str]):
+        """Bump the data version of tables and drop the results that read them
+
+        Args:
+            tables (iterable): Names of tables whose data changed
+        """
+        tables = {table.lower() for table in tables}
+        if not tables:
+            return
+
+        def bump(state):
+            for table in tables:
+                state['tables'][table] = state['tables'].get(table, 0) + 1
+
+        self._update_versions(bump)
+        removed = self._drop_local(tables)
+        logger.info(f"Result cache invalidated {removed} entries for tables: {', '.join(sorted(tables))}")
+
+    def invalidate_statement(self, sql: str, dialect: Optional[str] = None, analysis: Optional[SQLAnalysis] = None):
+        """Invalidate the results a write statement may have changed
+
+        Reads, metadata commands and statements that are not known writes
+        (unparseable SQL, SET, USE) leave the cache alone.
+
+        Args:
+            sql (str): The executed statement
+            dialect (str, optional): sqlglot dialect of the SQL
+            analysis (SQLAnalysis, optional): analyze_sql() result of the SQL, to avoid parsing it again
+        """
+        analysis = analysis or analyze_sql(sql, dialect)
+        if not analysis.writes:
+            return
+        if analysis.tables:
+            self.invalidate_tables(analysis.tables)
+        else:
+            # The write cannot be attributed to tables
+            self.clear()
+
+    def set_data_version(self, table: str, version: int):
+        """Report an externally maintained data version for a table
+
+        Results that read the table are dropped when the version differs from the last one seen.
+
+        Args:
+            table (str): Table name
+            version (int): Current data version of the table
+        """
+        table = table.lower()
+        if self.data_versions()['tables'].get(table, 0) == version:
+            return
+        self._update_versions(lambda state: state['tables'].update({table: version}))
+        self._drop_local({table})
+
+    def clear(self):
+        """Drop all cached results, in every process sharing the version store"""
+        self._update_versions(lambda state: state.update(epoch=state['epoch'] + 1))
+        self._drop_local()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics
+
+        Returns:
+            Dict: Size and eviction counters, with hit rate and saved execution time per workspace
+        """
+        with self._lock:
+            workspaces = {}
+            for name, counters in self._workspace_stats.items():
+                lookups = counters['hits'] + counters['misses']
+                workspaces[name] = {
+                    'hits': counters['hits'],
+                    'misses': counters['misses'],
+                    'hit_rate': (counters['hits'] / lookups) if lookups else 0.0,
+                    'saved_time': round(counters['saved_time'], 3)
+                }
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'workspaces': workspaces
+            }
+
+
+# Shared cache for this process
+_result_cache = ResultCache() if RESULT_CACHE_ENABLED else None
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Get the process-wide result cache
+
+    Returns:
+        ResultCache or None: The shared cache, None if disabled in configuration
+    """
+    return _result_cache
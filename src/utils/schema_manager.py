@@ -1,10 +1,124 @@
+import copy
 import json
 import os
 import logging
-from typing import Dict, List, Optional, Any, Tuple
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Any, Tuple
+
+from config.config import SCHEMA_RELOAD_CHECK_INTERVAL
+
+# Callbacks notified with the new schema version whenever schema.json or condition.json is saved
+_schema_change_listeners: List[Callable[[str], None]] = []
+
+# Process-wide shared schema manager
+_shared_schema_manager = None
+_shared_schema_manager_lock = threading.Lock()
+
+def register_schema_change_listener(callback: Callable[[str], None]) -> None:
+    """Register a callback to be invoked after the schema or join conditions are saved
+    
+    Args:
+        callback (callable): Function receiving the new schema version string
+    """
+    if callback not in _schema_change_listeners:
+        _schema_change_listeners.append(callback)
+
+def _notify_schema_change(version: str) -> None:
+    """Invoke all registered schema change listeners"""
+    logger = logging.getLogger('text2sql.schema_manager')
+    for callback in list(_schema_change_listeners):
+        try:
+            callback(version)
+        except Exception as e:
+            logger.error(f"Schema change listener failed: {str(e)}", exc_info=True)
+
+def get_schema_manager() -> 'SchemaManager':
+    """Get the shared schema manager instance for the default schema files
+    
+    Returns:
+        SchemaManager: The process-wide schema manager
+    """
+    global _shared_schema_manager
+    
+    if _shared_schema_manager is None:
+        with _shared_schema_manager_lock:
+            if _shared_schema_manager is None:
+                _shared_schema_manager = SchemaManager()
+    return _shared_schema_manager
+
+def _file_version(path: str) -> str:
+    """Version token of a file derived from its modification time and size"""
+    try:
+        stat = os.stat(path)
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+    except OSError:
+        return "missing"
+
+def _build_schema_indexes(workspaces: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build lookup indexes for workspaces, tables and columns"""
+    workspaces_by_name = {}
+    tables_by_workspace = {}
+    tables_by_name = {}
+    columns_by_table = {}
+    all_tables = []
+    
+    for workspace in workspaces:
+        workspace_name = workspace.get("name")
+        # Keep the first occurrence to match the previous linear-scan semantics
+        workspaces_by_name.setdefault(workspace_name, workspace)
+        workspace_tables = tables_by_workspace.setdefault(workspace_name, {})
+        for table in workspace.get("tables", []):
+            table_name = table.get("name")
+            all_tables.append(table)
+            workspace_tables.setdefault(table_name, table)
+            tables_by_name.setdefault(table_name, table)
+    
+    for workspace_name, workspace_tables in tables_by_workspace.items():
+        for table_name, table in workspace_tables.items():
+            columns_by_table[(workspace_name, table_name)] = {
+                col.get("name"): col for col in table.get("columns", [])
+            }
+    for table_name, table in tables_by_name.items():
+        columns_by_table[(None, table_name)] = {
+            col.get("name"): col for col in table.get("columns", [])
+        }
+    
+    return {
+        'workspaces_by_name': workspaces_by_name,
+        'tables_by_workspace': tables_by_workspace,
+        'tables_by_name': tables_by_name,
+        'columns_by_table': columns_by_table,
+        'all_tables': all_tables
+    }
+
+def _build_join_indexes(joins: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build the table adjacency and table-pair indexes for join conditions"""
+    joins_by_table = {}
+    joins_by_pair = {}
+    
+    for position, join in enumerate(joins):
+        left_table = join.get("left_table", "")
+        right_table = join.get("right_table", "")
+        joins_by_table.setdefault(left_table, []).append((position, right_table))
+        if right_table != left_table:
+            joins_by_table.setdefault(right_table, []).append((position, left_table))
+        joins_by_pair.setdefault(frozenset((left_table, right_table)), join)
+    
+    return {
+        'joins_by_table': joins_by_table,
+        'joins_by_pair': joins_by_pair
+    }
 
 class SchemaManager:
-    """Manager class for handling database schema from a JSON file"""
+    """Manager class for handling database schema from a JSON file
+    
+    Schema and join conditions are held in an immutable snapshot with dict indexes by
+    workspace, table and (table, column) plus a join adjacency index. The snapshot is
+    replaced atomically when either file changes on disk, so one instance can be
+    shared by all threads of a process (see get_schema_manager).
+    """
     
     def __init__(self, schema_file_path=None, condition_file_path=None):
         """Initialize the schema manager with paths to the schema JSON and condition JSON files
@@ -29,15 +143,61 @@ class SchemaManager:
         self.schema_file_path = schema_file_path
         self.condition_file_path = condition_file_path
         
-        self.schema_data = None
-        self.condition_data = None
-        self.workspaces = []
-        self.joins = []
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._schema_part = {'data': None, 'workspaces': [], 'file_version': 'missing',
+                             **_build_schema_indexes([])}
+        self._join_part = {'data': None, 'joins': [], 'file_version': 'missing',
+                           **_build_join_indexes([])}
         
         # Load both files
         self.load_schema()
         self.load_join_conditions()
     
+    @property
+    def schema_data(self) -> Optional[Dict[str, Any]]:
+        """Editable copy of the raw schema data; pass it to save_schema to persist changes"""
+        self._ensure_current()
+        return copy.deepcopy(self._schema_part['data'])
+    
+    @property
+    def condition_data(self) -> Optional[Dict[str, Any]]:
+        """Editable copy of the raw join condition data; pass it to save_join_conditions to persist changes"""
+        self._ensure_current()
+        return copy.deepcopy(self._join_part['data'])
+    
+    @property
+    def workspaces(self) -> List[Dict[str, Any]]:
+        """Workspaces of the current snapshot (read-only)"""
+        self._ensure_current()
+        return self._schema_part['workspaces']
+    
+    @property
+    def joins(self) -> List[Dict[str, Any]]:
+        """Join conditions of the current snapshot (read-only)"""
+        self._ensure_current()
+        return self._join_part['joins']
+    
+    def _ensure_current(self):
+        """Reload the schema or join conditions if their files changed on disk
+        
+        The file check is throttled to once per SCHEMA_RELOAD_CHECK_INTERVAL seconds.
+        """
+        now = time.monotonic()
+        if now - self._last_check < SCHEMA_RELOAD_CHECK_INTERVAL:
+            return
+        self._last_check = now
+        
+        reloaded = False
+        if _file_version(self.schema_file_path) != self._schema_part['file_version']:
+            self.logger.info("Schema file changed on disk, reloading")
+            reloaded = self.load_schema() or reloaded
+        if _file_version(self.condition_file_path) != self._join_part['file_version']:
+            self.logger.info("Condition file changed on disk, reloading")
+            reloaded = self.load_join_conditions() or reloaded
+        if reloaded:
+            _notify_schema_change(self.get_schema_version())
+    
     def load_schema(self) -> bool:
         """Load schema data from the JSON file
         
@@ -46,22 +206,43 @@ class SchemaManager:
         """
         try:
             self.logger.info(f"Loading schema from {self.schema_file_path}")
-            with open(self.schema_file_path, 'r') as f:
-                self.schema_data = json.load(f)
-                
-            # Extract workspaces for easier access
-            if self.schema_data and 'workspaces' in self.schema_data:
-                self.workspaces = self.schema_data['workspaces']
-                self.logger.info(f"Loaded {len(self.workspaces)} workspaces from schema file")
-                return True
-            else:
-                self.logger.error("Schema file does not contain 'workspaces' key")
-                return False
+            with self._lock:
+                file_version = _file_version(self.schema_file_path)
+                with open(self.schema_file_path, 'r') as f:
+                    schema_data = json.load(f)
+                    
+                # Extract workspaces for easier access
+                if schema_data and 'workspaces' in schema_data:
+                    workspaces = schema_data['workspaces']
+                    # Swap in the new data and indexes as one object
+                    self._schema_part = {
+                        'data': schema_data,
+                        'workspaces': workspaces,
+                        'file_version': file_version,
+                        **_build_schema_indexes(workspaces)
+                    }
+                    self.logger.info(f"Loaded {len(workspaces)} workspaces from schema file")
+                    return True
+                else:
+                    self.logger.error("Schema file does not contain 'workspaces' key")
+                    return False
                 
         except Exception as e:
             self.logger.error(f"Error loading schema file: {str(e)}", exc_info=True)
             return False
     
+    def get_schema_version(self) -> str:
+        """Get a version identifier for the loaded schema and join conditions
+        
+        The version changes whenever either file is rewritten, including by another
+        worker process, so it can be used as part of cache keys.
+        
+        Returns:
+            str: Version string derived from the file modification times and sizes
+        """
+        self._ensure_current()
+        return f"{self._schema_part['file_version']}-{self._join_part['file_version']}"
+    
     def get_workspaces(self) -> List[Dict[str, Any]]:
         """Get all available workspaces
         
@@ -85,10 +266,8 @@ class SchemaManager:
         Returns:
             Dict or None: Workspace data if found, None otherwise
         """
-        for workspace in self.workspaces:
-            if workspace.get("name") == name:
-                return workspace
-        return None
+        self._ensure_current()
+        return self._schema_part['workspaces_by_name'].get(name)
     
     def get_tables(self, workspace_name: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get all tables for a specific workspace or across all workspaces
@@ -99,20 +278,15 @@ class SchemaManager:
         Returns:
             List[Dict]: List of table dictionaries
         """
-        tables = []
+        self._ensure_current()
         
         if workspace_name:
             # Get tables from specific workspace
-            workspace = self.get_workspace_by_name(workspace_name)
-            if workspace and "tables" in workspace:
-                tables.extend(workspace["tables"])
-        else:
-            # Get tables from all workspaces
-            for workspace in self.workspaces:
-                if "tables" in workspace:
-                    tables.extend(workspace["tables"])
-        
-        return tables
+            workspace = self._schema_part['workspaces_by_name'].get(workspace_name)
+            return list(workspace.get("tables", [])) if workspace else []
+        
+        # Get tables from all workspaces
+        return list(self._schema_part['all_tables'])
     
     def get_table_names(self, workspace_name: Optional[str] = None) -> List[str]:
         """Get all table names for a specific workspace or across all workspaces
@@ -136,13 +310,12 @@ class SchemaManager:
         Returns:
             Dict or None: Table data if found, None otherwise
         """
-        tables = self.get_tables(workspace_name)
-        
-        for table in tables:
-            if table.get("name") == table_name:
-                return table
+        self._ensure_current()
+        schema_part = self._schema_part
         
-        return None
+        if workspace_name:
+            return schema_part['tables_by_workspace'].get(workspace_name, {}).get(table_name)
+        return schema_part['tables_by_name'].get(table_name)
     
     def get_columns(self, table_name: str, workspace_name: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get all columns for a specific table
@@ -161,6 +334,21 @@ class SchemaManager:
         
         return []
     
+    def get_column(self, table_name: str, column_name: str, workspace_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get a specific column of a table
+        
+        Args:
+            table_name (str): Name of the table
+            column_name (str): Name of the column
+            workspace_name (str, optional): Name of workspace to search in
+            
+        Returns:
+            Dict or None: Column data if found, None otherwise
+        """
+        self._ensure_current()
+        columns = self._schema_part['columns_by_table'].get((workspace_name or None, table_name), {})
+        return columns.get(column_name)
+    
     def get_primary_keys(self, table_name: str, workspace_name: Optional[str] = None) -> List[str]:
         """Get primary key column names for a specific table
         
@@ -237,6 +425,22 @@ class SchemaManager:
         
         return "\n".join(schema_info)
     
+    def _write_json_atomically(self, path: str, data: Dict[str, Any]):
+        """Write JSON to a temporary file and move it over the target in one step
+        
+        Readers in other threads or worker processes never see a partially written file.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    
     def save_schema(self, schema_data=None) -> bool:
         """Save schema data back to the JSON file
         
@@ -247,7 +451,7 @@ class SchemaManager:
             bool: True if successful, False otherwise
         """
         try:
-            data_to_save = schema_data or self.schema_data
+            data_to_save = schema_data or self._schema_part['data']
             
             if not data_to_save:
                 self.logger.error("No schema data to save")
@@ -255,9 +459,10 @@ class SchemaManager:
                 
             self.logger.info(f"Saving schema to {self.schema_file_path}")
             
-            with open(self.schema_file_path, 'w') as f:
-                json.dump(data_to_save, f, indent=2)
-                
+            self._write_json_atomically(self.schema_file_path, data_to_save)
+            self.load_schema()
+            
+            _notify_schema_change(self.get_schema_version())
             return True
             
         except Exception as e:
@@ -272,17 +477,26 @@ class SchemaManager:
         """
         try:
             self.logger.info(f"Loading join conditions from {self.condition_file_path}")
-            with open(self.condition_file_path, 'r') as f:
-                self.condition_data = json.load(f)
-                
-            # Extract joins for easier access
-            if self.condition_data and 'joins' in self.condition_data:
-                self.joins = self.condition_data['joins']
-                self.logger.info(f"Loaded {len(self.joins)} join conditions from condition file")
-                return True
-            else:
-                self.logger.error("Condition file does not contain 'joins' key")
-                return False
+            with self._lock:
+                file_version = _file_version(self.condition_file_path)
+                with open(self.condition_file_path, 'r') as f:
+                    condition_data = json.load(f)
+                    
+                # Extract joins for easier access
+                if condition_data and 'joins' in condition_data:
+                    joins = condition_data['joins']
+                    # Swap in the new data and adjacency index as one object
+                    self._join_part = {
+                        'data': condition_data,
+                        'joins': joins,
+                        'file_version': file_version,
+                        **_build_join_indexes(joins)
+                    }
+                    self.logger.info(f"Loaded {len(joins)} join conditions from condition file")
+                    return True
+                else:
+                    self.logger.error("Condition file does not contain 'joins' key")
+                    return False
                 
         except Exception as e:
             self.logger.error(f"Error loading condition file: {str(e)}", exc_info=True)
@@ -300,18 +514,20 @@ class SchemaManager:
         """
         if not tables or len(tables) < 2:
             return []
-            
-        relevant_joins = []
         
-        for join in self.joins:
-            left_table = join.get("left_table", "")
-            right_table = join.get("right_table", "")
-            
-            # Check if both tables in the join are in our list of tables
-            if left_table in tables and right_table in tables:
-                relevant_joins.append(join)
+        self._ensure_current()
+        join_part = self._join_part
+        table_set = set(tables)
+        
+        # Walk the adjacency lists of the requested tables only, keeping file order
+        positions = set()
+        for table in table_set:
+            for position, other_table in join_part['joins_by_table'].get(table, []):
+                # Check if both tables in the join are in our list of tables
+                if other_table in table_set:
+                    positions.add(position)
                 
-        return relevant_joins
+        return [join_part['joins'][position] for position in sorted(positions)]
         
     def has_join_condition(self, table1: str, table2: str) -> bool:
         """Check if a join condition exists between two specific tables
@@ -323,15 +539,7 @@ class SchemaManager:
         Returns:
             bool: True if a join condition exists, False otherwise
         """
-        for join in self.joins:
-            left_table = join.get("left_table", "")
-            right_table = join.get("right_table", "")
-            
-            # Check both directions
-            if (left_table == table1 and right_table == table2) or (left_table == table2 and right_table == table1):
-                return True
-                
-        return False
+        return self.get_specific_join(table1, table2) is not None
         
     def get_specific_join(self, table1: str, table2: str) -> Optional[Dict[str, Any]]:
         """Get the specific join condition between two tables
@@ -343,15 +551,9 @@ class SchemaManager:
         Returns:
             Dict or None: Join condition if found, None otherwise
         """
-        for join in self.joins:
-            left_table = join.get("left_table", "")
-            right_table = join.get("right_table", "")
-            
-            # Match in either direction
-            if (left_table == table1 and right_table == table2) or (left_table == table2 and right_table == table1):
-                return join
-                
-        return None
+        self._ensure_current()
+        # Match in either direction
+        return self._join_part['joins_by_pair'].get(frozenset((table1, table2)))
         
     def save_join_conditions(self, condition_data=None) -> bool:
         """Save join condition data back to the JSON file
@@ -363,7 +565,7 @@ class SchemaManager:
             bool: True if successful, False otherwise
         """
         try:
-            data_to_save = condition_data or self.condition_data
+            data_to_save = condition_data or self._join_part['data']
             
             if not data_to_save:
                 self.logger.error("No join condition data to save")
@@ -371,11 +573,12 @@ class SchemaManager:
                 
             self.logger.info(f"Saving join conditions to {self.condition_file_path}")
             
-            with open(self.condition_file_path, 'w') as f:
-                json.dump(data_to_save, f, indent=2)
-                
+            self._write_json_atomically(self.condition_file_path, data_to_save)
+            self.load_join_conditions()
+            
+            _notify_schema_change(self.get_schema_version())
             return True
             
         except Exception as e:
             self.logger.error(f"Error saving join condition file: {str(e)}", exc_info=True)
-            return False
\ No newline at end of file
+            return False
@@ -11,7 +11,7 @@ from datetime import datetime
 import numpy as np
 
 from src.utils.vector_store import VectorStore
-from src.utils.schema_manager import SchemaManager
+from src.utils.schema_manager import get_schema_manager
 from src.utils.llm_engine import LLMEngine
 from src.utils.metadata_search_enhancer import MetadataSearchEnhancer
 
@@ -32,7 +32,7 @@ class SchemaVectorizer:
         self.vector_store.init_collection('schema_metadata')
         
         # Initialize schema manager
-        self.schema_manager = SchemaManager()
+        self.schema_manager = get_schema_manager()
         
         # Initialize LLM engine for embeddings
         self.llm_engine = LLMEngine()
@@ -58,8 +58,9 @@ class SchemaVectorizer:
             
             total_columns = 0
             processed_columns = 0
+            pending = []
             
-            # Process each workspace
+            # Collect the metadata text of every column
             for workspace in workspaces:
                 workspace_name = workspace.get("name")
                 workspace_description = workspace.get("description", "")
@@ -96,15 +97,21 @@ class SchemaVectorizer:
                             is_primary
                         )
                         
-                        # Embed and store the metadata
-                        self._embed_and_store_metadata(
-                            workspace_name,
-                            table_name,
-                            column_name,
-                            metadata_text
-                        )
-                        
-                        processed_columns += 1
+                        pending.append((workspace_name, table_name, column_name, metadata_text))
+            
+            # Embed all columns in batches, then store them with one request per batch
+            embeddings = self.llm_engine.generate_embeddings([item[3] for item in pending])
+            if embeddings is None:
+                self.logger.error("Embedding model not available, schema metadata not embedded")
+                return False
+            entries = [
+                self._metadata_entry(workspace_name, table_name, column_name, metadata_text, embedding)
+                for (workspace_name, table_name, column_name, metadata_text), embedding in zip(pending, embeddings)
+            ]
+            result = self.vector_store.insert_embeddings('schema_metadata', entries)
+            processed_columns = result['count']
+            for failure in result['failed']:
+                self.logger.warning(f"Failed to insert embedding {failure['id']}: {failure['error']}")
             
             elapsed_time = time.time() - start_time
             self.logger.info(f"Schema metadata processing completed: {processed_columns} columns processed in {elapsed_time:.2f} seconds")
@@ -145,50 +152,35 @@ Datatype: {datatype}
 Description: {column_description}
         """.strip()
     
-    def _embed_and_store_metadata(self, workspace: str, table: str, column: str, metadata_text: str) -> bool:
-        """Embed metadata text and store in vector database
+    def _metadata_entry(self, workspace: str, table: str, column: str, metadata_text: str,
+                        embedding: List[float]) -> Dict[str, Any]:
+        """Build the vector store entry for a column's metadata
         
         Args:
             workspace: Workspace/database name
             table: Table name
             column: Column name
             metadata_text: Formatted metadata text
+            embedding: Embedding of the metadata text
             
         Returns:
-            bool: True if successful, False otherwise
+            Dict: Entry with 'id', 'vector', 'text' and 'metadata'
         """
-        try:
-            # Get embedding for metadata text
-            embedding = self._get_embedding(metadata_text)
-            
-            # Create identifier for this metadata
-            metadata_id = self.processed_count
-            self.processed_count += 1
-            
-            # Store metadata in vector database
-            metadata = {
+        # Create identifier for this metadata
+        metadata_id = self.processed_count
+        self.processed_count += 1
+        
+        return {
+            'id': metadata_id,
+            'vector': embedding,
+            'text': metadata_text,
+            'metadata': {
                 "workspace": workspace,
                 "table": table,
                 "column": column,
                 "text": metadata_text
             }
-            
-            result = self.vector_store.insert_embedding(
-                'schema_metadata',
-                metadata_id,
-                embedding,
-                metadata_text,
-                metadata
-            )
-            
-            if not result:
-                self.logger.warning(f"Failed to insert embedding for {workspace}.{table}.{column}")
-            
-            return result
-            
-        except Exception as e:
-            self.logger.error(f"Error embedding schema metadata: {str(e)}", exc_info=True)
-            return False
+        }
     
     # _get_embedding_model method has been moved to LLMEngine class
     
@@ -199,7 +191,7 @@ Description: {column_description}
             text: Text to embed
             
         Returns:
-            List[float]: Vector embedding
+            List[float]: Vector embedding, None if the embedding model is unavailable
         """
         # Use the centralized LLM engine to generate embeddings
         embedding = self.llm_engine.generate_embedding(text)
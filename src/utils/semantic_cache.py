@@ -0,0 +1,297 @@
+"""
+Semantic answer cache for the Text2SQL pipeline.
+Returns previously generated SQL for questions that are near-duplicates of an
+earlier question asked against the same workspace and schema version. Near
+duplicates must also mention the same literals (numbers, dates, quoted values,
+months, relative periods...), since "sales for 2023" and "sales for 2024" embed
+almost identically but need different SQL.
+"""
+
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger('text2sql.semantic_cache')
+
+# Quoted values, and numbers including dates, times and decimals like 2024-01-31, 10:30 or 1.5
+_QUOTED_PATTERN = re.compile(r"'([^']*)'|\"([^\"]*)\"")
+_NUMBER_PATTERN = re.compile(r'\d+(?:[.,/:-]\d+)*')
+
+# Words that change the SQL of otherwise identical questions
+_LITERAL_WORDS = frozenset("""
+    january february march april may june july august september october november december
+    jan feb mar apr jun jul aug sep sept oct nov dec
+    monday tuesday wednesday thursday friday saturday sunday
+    q1 q2 q3 q4 quarter quarterly year yearly annual month monthly week weekly day daily hour hourly
+    today yesterday tomorrow last this next previous current past ytd mtd
+    one two three four five six seven eight nine ten eleven twelve twenty fifty hundred thousand million
+    top bottom highest lowest most least max maximum min minimum first
+    above below over under more less greater fewer before after since until between
+    ascending descending asc desc increasing decreasing
+    not without except excluding
+""".split())
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a natural language question for caching
+
+    Args:
+        question (str): The raw question text
+
+    Returns:
+        str: Lower-cased question with collapsed whitespace and no trailing punctuation
+    """
+    normalized = re.sub(r'\s+', ' ', (question or '').strip().lower())
+    return normalized.rstrip(' ?!.;')
+
+
+def extract_literals(question: str) -> FrozenSet[str]:
+    """Extract the literals a cached answer must share with a question
+
+    Args:
+        question (str): The raw question text
+
+    Returns:
+        frozenset: Quoted values, numbers, dates and period, ranking, comparison and negation words
+    """
+    text = (question or '').lower()
+    literals = {quoted for match in _QUOTED_PATTERN.findall(text) for quoted in match if quoted}
+    unquoted = _QUOTED_PATTERN.sub(' ', text)
+    literals.update(_NUMBER_PATTERN.findall(unquoted))
+    literals.update(word for word in re.findall(r'[a-z0-9]+', unquoted) if word in _LITERAL_WORDS)
+    return frozenset(literals)
+
+
+class CacheQuestion:
+    """A question prepared for the cache: normalized text, literals and embedding
+
+    The embedding is computed on first use and kept, so a lookup miss followed
+    by storing the generated answer embeds the question only once.
+    """
+
+    def __init__(self, question: str, embed: Callable[[str], Optional[np.ndarray]]):
+        self.text = question
+        self.normalized = normalize_question(question)
+        self.literals = extract_literals(question)
+        self._embed = embed
+        self._vector = None
+        self._embedded = False
+
+    @property
+    def vector(self) -> Optional[np.ndarray]:
+        """Unit-length embedding of the normalized question, None if it cannot be embedded"""
+        if not self._embedded:
+            self._vector = self._embed(self.normalized)
+            self._embedded = True
+        return self._vector
+
+
+class SemanticQueryCache:
+    """Thread-safe LRU/TTL cache of generated SQL keyed on question embeddings
+
+    Entries are partitioned by a scope key (workspace, explicit tables) and the
+    schema version they were generated against. A lookup returns the most similar
+    entry in the same scope with the same literals whose cosine similarity reaches
+    the threshold.
+    """
+
+    def __init__(self, embed_func: Callable[[str], Any], threshold: float = 0.95,
+                 max_entries: int = 500, ttl_seconds: int = 3600):
+        """Initialize the semantic cache
+
+        Args:
+            embed_func (callable): Function returning an embedding vector for a text
+            threshold (float, optional): Minimum cosine similarity for a hit
+            max_entries (int, optional): Maximum number of cached answers (LRU eviction)
+            ttl_seconds (int, optional): Maximum age of a cached answer in seconds
+        """
+        self.embed_func = embed_func
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._exact_index: Dict[Tuple[Any, str, str], str] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _embed(self, normalized: str) -> Optional[np.ndarray]:
+        """Embed a normalized question as a unit-length float32 vector"""
+        try:
+            vector = np.asarray(self.embed_func(normalized), dtype=np.float32).ravel()
+        except Exception as e:
+            logger.warning(f"Could not embed question for semantic cache: {str(e)}")
+            return None
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return None
+        return vector / norm
+
+    def question(self, question: Union[str, CacheQuestion]) -> CacheQuestion:
+        """Prepare a question for lookup and store
+
+        Args:
+            question (str or CacheQuestion): The natural language question
+
+        Returns:
+            CacheQuestion: The question with its normalized text, literals and lazy embedding
+        """
+        if isinstance(question, CacheQuestion):
+            return question
+        return CacheQuestion(question, self._embed)
+
+    def _remove(self, entry_id: str):
+        """Remove an entry; caller must hold the lock"""
+        entry = self._entries.pop(entry_id, None)
+        if entry is not None:
+            self._exact_index.pop((entry['scope'], entry['schema_version'], entry['question']), None)
+
+    def _purge_expired(self, now: float):
+        """Drop entries older than the TTL; caller must hold the lock"""
+        expired = [entry_id for entry_id, entry in self._entries.items()
+                   if now - entry['created_at'] > self.ttl_seconds]
+        for entry_id in expired:
+            self._remove(entry_id)
+            self.evictions += 1
+
+    def lookup(self, question: Union[str, CacheQuestion], scope: Any,
+               schema_version: str) -> Optional[Dict[str, Any]]:
+        """Find a cached answer for a question
+
+        Args:
+            question (str or CacheQuestion): The natural language question
+            scope (hashable): Cache partition, e.g. workspace and explicit tables
+            schema_version (str): Current schema version
+
+        Returns:
+            Dict or None: Cached answer with 'similarity' and 'cached_question' added, None on miss
+        """
+        question = self.question(question)
+        normalized = question.normalized
+        now = time.time()
+
+        with self._lock:
+            self._purge_expired(now)
+            entry_id = self._exact_index.get((scope, schema_version, normalized))
+            if entry_id is not None:
+                self._entries.move_to_end(entry_id)
+                self.hits += 1
+                entry = self._entries[entry_id]
+                return {**entry['answer'], 'similarity': 1.0, 'cached_question': entry['question']}
+            candidates = [(entry_id, entry) for entry_id, entry in self._entries.items()
+                          if entry['scope'] == scope and entry['schema_version'] == schema_version
+                          and entry['literals'] == question.literals]
+
+        if not candidates:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        vector = question.vector
+        if vector is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        matrix = np.stack([entry['embedding'] for _, entry in candidates])
+        similarities = matrix @ vector
+        best = int(np.argmax(similarities))
+        best_similarity = float(similarities[best])
+
+        with self._lock:
+            best_id, best_entry = candidates[best]
+            if best_similarity < self.threshold or best_id not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+
+        logger.info(f"Semantic cache hit (similarity {best_similarity:.4f}) for '{question.text[:50]}'")
+        return {**best_entry['answer'], 'similarity': best_similarity, 'cached_question': best_entry['question']}
+
+    def store(self, question: Union[str, CacheQuestion], scope: Any, schema_version: str,
+              answer: Dict[str, Any]) -> bool:
+        """Cache the answer generated for a question
+
+        Args:
+            question (str or CacheQuestion): The natural language question, prepared
+                questions reuse the embedding computed by their lookup
+            scope (hashable): Cache partition, e.g. workspace and explicit tables
+            schema_version (str): Schema version the answer was generated against
+            answer (dict): Answer payload to return on future hits
+
+        Returns:
+            bool: True if the answer was cached
+        """
+        question = self.question(question)
+        normalized = question.normalized
+        vector = question.vector
+        if vector is None:
+            return False
+
+        with self._lock:
+            existing = self._exact_index.get((scope, schema_version, normalized))
+            if existing is not None:
+                self._remove(existing)
+
+            entry_id = uuid.uuid4().hex
+            self._entries[entry_id] = {
+                'question': normalized,
+                'scope': scope,
+                'schema_version': schema_version,
+                'embedding': vector,
+                'literals': question.literals,
+                'answer': answer,
+                'created_at': time.time()
+            }
+            self._exact_index[(scope, schema_version, normalized)] = entry_id
+
+            while len(self._entries) > self.max_entries:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self.evictions += 1
+        return True
+
+    def invalidate(self, schema_version: Optional[str] = None):
+        """Drop cached answers that do not belong to the given schema version
+
+        Args:
+            schema_version (str, optional): Version to keep; drops everything if None
+        """
+        with self._lock:
+            stale = [entry_id for entry_id, entry in self._entries.items()
+                     if schema_version is None or entry['schema_version'] != schema_version]
+            for entry_id in stale:
+                self._remove(entry_id)
+            self.invalidations += 1
+        logger.info(f"Semantic cache invalidated {len(stale)} entries")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics
+
+        Returns:
+            Dict: Entry count, hit/miss/eviction counters and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'threshold': self.threshold,
+                'ttl_seconds': self.ttl_seconds
+            }
@@ -0,0 +1,338 @@
+"""
+Key-value stores for request state shared between worker processes.
+Query progress and result handles live here so a poll can be answered by any
+gunicorn worker. The memory backend is process-local; the SQLite backend keeps
+entries in a WAL-mode database file that every worker on the host can read.
+"""
+
+import copy
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.config import (
+    SHARED_STORE_BACKEND, SHARED_STORE_PATH, SHARED_STORE_SWEEP_INTERVAL
+)
+
+logger = logging.getLogger('text2sql.shared_store')
+
+
+def _json_default(value):
+    """Serialize values json does not handle, such as numpy scalars and timestamps"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class MemoryStore:
+    """Process-local store of JSON-like dictionaries
+
+    Entries are deep-copied on the way in and out, so callers get the same
+    isolation as with the SQLite backend, which serializes every entry.
+    """
+
+    def __init__(self, namespace: str):
+        """Initialize the store
+
+        Args:
+            namespace (str): Name of the store, used for logging
+        """
+        self.namespace = namespace
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._updated_at: Dict[str, float] = {}
+        self._entry_versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._sweeper = None
+        # In-process change signalling: a sequence number, the last change of each key
+        # and a condition per key that has waiters, so a change only wakes its own waiters
+        self._change_lock = threading.Lock()
+        self._change_seq = 0
+        self._last_change: Dict[str, Tuple[int, float]] = {}
+        self._waiters: Dict[str, List[Any]] = {}
+
+    def _notify_change(self, key: str):
+        """Wake up threads waiting for changes of a key made in this process"""
+        with self._change_lock:
+            self._change_seq += 1
+            self._last_change[key] = (self._change_seq, time.time())
+            waiters = self._waiters.get(key)
+            if waiters is not None:
+                waiters[0].notify_all()
+
+    def _forget_changes(self, max_age: float):
+        """Drop the change records of keys not changed for more than max_age seconds"""
+        cutoff = time.time() - max_age
+        with self._change_lock:
+            for key in [k for k, (_, changed_at) in self._last_change.items() if changed_at < cutoff]:
+                del self._last_change[key]
+
+    def change_count(self, key: str) -> int:
+        """Get a marker of the changes seen so far, to pass to wait_for_change()
+
+        Args:
+            key (str): Entry key
+        """
+        with self._change_lock:
+            return self._change_seq
+
+    def wait_for_change(self, key: str, since: int, timeout: float) -> int:
+        """Wait until an entry is changed in this process or the timeout expires
+
+        Changes made by other processes are not signalled, so callers should
+        check the entry's version after every wait.
+
+        Args:
+            key (str): Entry key
+            since (int): Marker returned by change_count() or the previous wait
+            timeout (float): Maximum seconds to wait
+
+        Returns:
+            int: The new marker
+        """
+        with self._change_lock:
+            if self._last_change.get(key, (0, 0.0))[0] <= since:
+                waiters = self._waiters.setdefault(key, [threading.Condition(self._change_lock), 0])
+                waiters[1] += 1
+                try:
+                    waiters[0].wait(timeout)
+                finally:
+                    waiters[1] -= 1
+                    if not waiters[1]:
+                        del self._waiters[key]
+            return self._change_seq
+
+    def version(self, key: str) -> Optional[int]:
+        """Get the version of an entry, which changes on every write, None if it does not exist
+
+        Cheaper than get(): the entry itself is not copied or deserialized.
+        """
+        with self._lock:
+            return self._entry_versions.get(key)
+
+    def get_versioned(self, key: str) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+        """Get a copy of an entry together with its version, (None, None) if it does not exist"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            return copy.deepcopy(entry), self._entry_versions[key]
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """Create or replace an entry"""
+        with self._lock:
+            self._entries[key] = copy.deepcopy(value)
+            self._updated_at[key] = time.time()
+            self._entry_versions[key] = self._entry_versions.get(key, 0) + 1
+        self._notify_change(key)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a copy of an entry, None if it does not exist"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return copy.deepcopy(entry) if entry is not None else None
+
+    def mutate(self, key: str, func: Callable[[Dict[str, Any]], None]) -> Optional[Dict[str, Any]]:
+        """Atomically modify an entry in place
+
+        Args:
+            key (str): Entry key
+            func (callable): Function modifying the entry dictionary
+
+        Returns:
+            Dict or None: Copy of the modified entry, None if it does not exist
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            func(entry)
+            self._updated_at[key] = time.time()
+            self._entry_versions[key] += 1
+            entry = copy.deepcopy(entry)
+        self._notify_change(key)
+        return entry
+
+    def update(self, key: str, **values) -> bool:
+        """Set fields of an existing entry
+
+        Returns:
+            bool: True if the entry exists
+        """
+        return self.mutate(key, lambda entry: entry.update(values)) is not None
+
+    def delete(self, key: str):
+        """Remove an entry if it exists"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._updated_at.pop(key, None)
+            self._entry_versions.pop(key, None)
+        self._notify_change(key)
+
+    def sweep(self, max_age: float) -> int:
+        """Remove entries not modified for more than max_age seconds
+
+        Returns:
+            int: Number of removed entries
+        """
+        cutoff = time.time() - max_age
+        with self._lock:
+            expired = [key for key, updated_at in self._updated_at.items() if updated_at < cutoff]
+            for key in expired:
+                self._entries.pop(key, None)
+                self._updated_at.pop(key, None)
+                self._entry_versions.pop(key, None)
+        self._forget_changes(max_age)
+        return len(expired)
+
+    def start_sweeper(self, max_age: float, interval: float = SHARED_STORE_SWEEP_INTERVAL):
+        """Start a daemon thread that periodically removes entries older than max_age
+
+        Args:
+            max_age (float): Maximum seconds since an entry was last modified
+            interval (float, optional): Seconds between sweeps
+        """
+        if self._sweeper is not None:
+            return
+
+        def sweep_forever():
+            while True:
+                time.sleep(interval)
+                try:
+                    removed = self.sweep(max_age)
+                    if removed:
+                        logger.info(f"Swept {removed} expired entries from '{self.namespace}'")
+                except Exception as e:
+                    logger.error(f"Error sweeping '{self.namespace}': {str(e)}")
+
+        self._sweeper = threading.Thread(target=sweep_forever, name=f"{self.namespace}-sweeper", daemon=True)
+        self._sweeper.start()
+
+
+class SQLiteStore(MemoryStore):
+    """Store of JSON-serialized dictionaries in a WAL-mode SQLite database shared by all workers"""
+
+    def __init__(self, namespace: str, path: str = SHARED_STORE_PATH):
+        """Initialize the store and create its table
+
+        Args:
+            namespace (str): Name of the store, used as table name
+            path (str, optional): Path of the SQLite database file
+        """
+        super().__init__(namespace)
+        self.path = path
+        self.table = ''.join(ch if ch.isalnum() else '_' for ch in namespace)
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL, "
+            "version INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_updated_at ON {self.table}(updated_at)")
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({self.table})")}
+        if 'version' not in columns:
+            try:
+                conn.execute(f"ALTER TABLE {self.table} ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError:
+                pass  # Added by another worker in the meantime
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """Create or replace an entry"""
+        self._connection().execute(
+            f"INSERT INTO {self.table} (key, value, updated_at, version) VALUES (?, ?, ?, 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at, "
+            "version = version + 1",
+            (key, json.dumps(value, default=_json_default), time.time())
+        )
+        self._notify_change(key)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get an entry, None if it does not exist"""
+        row = self._connection().execute(
+            f"SELECT value FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def version(self, key: str) -> Optional[int]:
+        """Get the version of an entry without deserializing it, None if it does not exist"""
+        row = self._connection().execute(
+            f"SELECT version FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_versioned(self, key: str) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+        """Get an entry together with its version, (None, None) if it does not exist"""
+        row = self._connection().execute(
+            f"SELECT value, version FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else (None, None)
+
+    def mutate(self, key: str, func: Callable[[Dict[str, Any]], None]) -> Optional[Dict[str, Any]]:
+        """Atomically modify an entry; other workers are locked out for the duration"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            entry = json.loads(row[0])
+            func(entry)
+            conn.execute(
+                f"UPDATE {self.table} SET value = ?, updated_at = ?, version = version + 1 WHERE key = ?",
+                (json.dumps(entry, default=_json_default), time.time(), key)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._notify_change(key)
+        return entry
+
+    def delete(self, key: str):
+        """Remove an entry if it exists"""
+        self._connection().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        self._notify_change(key)
+
+    def sweep(self, max_age: float) -> int:
+        """Remove entries not modified for more than max_age seconds"""
+        cursor = self._connection().execute(
+            f"DELETE FROM {self.table} WHERE updated_at < ?", (time.time() - max_age,)
+        )
+        self._forget_changes(max_age)
+        return cursor.rowcount
+
+
+def create_shared_store(namespace: str, backend: str = SHARED_STORE_BACKEND):
+    """Create a store using the configured backend
+
+    Args:
+        namespace (str): Name of the store
+        backend (str, optional): 'memory' or 'sqlite'
+
+    Returns:
+        MemoryStore or SQLiteStore: The store
+    """
+    if backend == 'sqlite':
+        logger.info(f"Using SQLite shared store '{namespace}' at {SHARED_STORE_PATH}")
+        return SQLiteStore(namespace)
+    if backend != 'memory':
+        logger.warning(f"Unknown shared store backend '{backend}', using memory")
+    return MemoryStore(namespace)
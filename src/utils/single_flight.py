@@ -0,0 +1,193 @@
+"""
+Coalescing of identical in-flight requests.
+When several callers make the same upstream request at the same time, only the
+first one (the leader) performs it and the others wait for and share its
+result. Streams are fanned out: every subscriber receives all chunks from the
+start, including the ones produced before it joined.
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List
+
+logger = logging.getLogger('text2sql.single_flight')
+
+
+class _Broadcast:
+    """Chunks of one upstream stream, shared by all of its subscribers"""
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error = None
+        self.condition = threading.Condition()
+
+    def subscribe(self) -> Iterator[Any]:
+        """Iterate over all chunks of the stream, waiting for new ones until it ends"""
+        index = 0
+        while True:
+            with self.condition:
+                while index >= len(self.chunks) and not self.done:
+                    self.condition.wait()
+                if index < len(self.chunks):
+                    chunk = self.chunks[index]
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            index += 1
+            yield chunk
+
+
+class SingleFlight:
+    """Thread-safe registry of in-flight requests keyed by request key
+
+    Synchronous and asynchronous callers share the same registry, so a request
+    started by a worker thread can be awaited by a coroutine and vice versa.
+    """
+
+    def __init__(self):
+        """Initialize the registry"""
+        self._calls: Dict[str, Future] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def _join(self, key: str):
+        """Get the in-flight call of a key, registering a new one if there is none
+
+        Returns:
+            tuple: (future, is_leader)
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.followers += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.leaders += 1
+            return future, True
+
+    def _finish(self, key: str, future: Future, result: Any = None, error: BaseException = None):
+        """Publish the leader's outcome and forget the call"""
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """Run func unless an identical call is in flight, then share its result
+
+        Args:
+            key (str): Request key; calls with equal keys are coalesced
+            func (callable): Function performing the request
+
+        Returns:
+            Any: The result of the leader's call; its exception is raised to every caller
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = func()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def ado(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Await func unless an identical call is in flight, then share its result
+
+        Args:
+            key (str): Request key; calls with equal keys are coalesced
+            func (callable): Coroutine function performing the request
+
+        Returns:
+            Any: The result of the leader's call; its exception is raised to every caller
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await func()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    def stream(self, key: str, func: Callable[[], Iterable[Any]]) -> Iterator[Any]:
+        """Subscribe to a stream, starting it unless an identical one is in flight
+
+        The upstream stream is consumed by a background thread so a subscriber
+        that stops reading does not hold up the others.
+
+        Args:
+            key (str): Request key; streams with equal keys are shared
+            func (callable): Function opening the upstream stream
+
+        Returns:
+            iterator: All chunks of the stream
+        """
+        with self._lock:
+            broadcast = self._streams.get(key)
+            if broadcast is not None:
+                self.followers += 1
+                return broadcast.subscribe()
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            self.leaders += 1
+
+        def pump():
+            try:
+                for chunk in func():
+                    with broadcast.condition:
+                        broadcast.chunks.append(chunk)
+                        broadcast.condition.notify_all()
+            except BaseException as e:
+                logger.error(f"Shared stream {key[:16]} failed: {str(e)}")
+                broadcast.error = e
+            finally:
+                with self._lock:
+                    self._streams.pop(key, None)
+                with broadcast.condition:
+                    broadcast.done = True
+                    broadcast.condition.notify_all()
+
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(pump,), name='single-flight-stream', daemon=True).start()
+        return broadcast.subscribe()
+
+    def stats(self) -> Dict[str, int]:
+        """Get the number of upstream calls and of callers that shared one
+
+        Returns:
+            Dict: Leader, follower and in-flight counts
+        """
+        with self._lock:
+            return {
+                'leaders': self.leaders,
+                'followers': self.followers,
+                'in_flight': len(self._calls) + len(self._streams)
+            }
+
+
+# Shared registry for this process
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Get the process-wide single-flight registry
+
+    Returns:
+        SingleFlight: The shared registry
+    """
+    return _single_flight
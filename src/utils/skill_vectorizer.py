@@ -46,17 +46,23 @@ class SkillVectorizer:
             # Get all active skills
             skills = Skill.get_all(status=SkillStatus.ACTIVE.value)
             
+            # Embed all skills in batches before touching the stored vectors
+            embeddings = self.llm_engine.generate_embeddings([skill.get_searchable_text() for skill in skills])
+            if embeddings is None:
+                self.logger.error("Embedding model not available, keeping the existing skill vectors")
+                return False
+            
             # Clear existing skills from vector store
             self.vector_store.clear_collection('skills')
             
             processed_skills = 0
             
-            # Process each skill
-            for skill in skills:
-                if self._embed_and_store_skill(skill):
-                    processed_skills += 1
-                else:
-                    self.logger.warning(f"Failed to process skill: {skill.name}")
+            # Store the skills with one request per batch
+            entries = [self._skill_entry(skill, embedding) for skill, embedding in zip(skills, embeddings)]
+            result = self.vector_store.insert_embeddings('skills', entries)
+            processed_skills = result['count']
+            for failure in result['failed']:
+                self.logger.warning(f"Failed to process skill entry {failure['id']}: {failure['error']}")
             
             elapsed_time = time.time() - start_time
             self.logger.info(f"Skill vectorization completed: {processed_skills}/{len(skills)} skills processed in {elapsed_time:.2f} seconds")
@@ -125,11 +131,12 @@ class SkillVectorizer:
             self.logger.error(f"Error removing skill {skill_id}: {str(e)}", exc_info=True)
             return False
     
-    def _embed_and_store_skill(self, skill: Skill) -> bool:
+    def _embed_and_store_skill(self, skill: Skill, embedding: Optional[List[float]] = None) -> bool:
         """Embed skill and store in vector database
         
         Args:
             skill: Skill object to embed
+            embedding: Precomputed embedding of the skill's searchable text, computed if omitted
             
         Returns:
             bool: True if successful, False otherwise
@@ -139,29 +146,20 @@ class SkillVectorizer:
             skill_text = skill.get_searchable_text()
             
             # Get embedding for skill text
-            embedding = self._get_embedding(skill_text)
-            
-            # Create identifier for this skill
-            vector_id = self.processed_count
-            self.processed_count += 1
+            if embedding is None:
+                embedding = self._get_embedding(skill_text)
+            if embedding is None:
+                self.logger.warning(f"Embedding model not available, skill {skill.name} not embedded")
+                return False
             
             # Store skill in vector database
-            metadata = {
-                "skill_id": skill.skill_id,
-                "name": skill.name,
-                "category": skill.category,
-                "description": skill.description,
-                "tags": skill.tags,
-                "version": skill.version,
-                "text": skill_text
-            }
-            
+            entry = self._skill_entry(skill, embedding)
             result = self.vector_store.insert_embedding(
                 'skills',
-                vector_id,
-                embedding,
-                skill_text,
-                metadata
+                entry['id'],
+                entry['vector'],
+                entry['text'],
+                entry['metadata']
             )
             
             if result:
@@ -175,6 +173,37 @@ class SkillVectorizer:
             self.logger.error(f"Error embedding skill {skill.name}: {str(e)}", exc_info=True)
             return False
     
+    def _skill_entry(self, skill: Skill, embedding: List[float]) -> Dict[str, Any]:
+        """Build the vector store entry for a skill
+        
+        Args:
+            skill: Skill object to store
+            embedding: Embedding of the skill's searchable text
+            
+        Returns:
+            Dict: Entry with 'id', 'vector', 'text' and 'metadata'
+        """
+        skill_text = skill.get_searchable_text()
+        
+        # Create identifier for this skill
+        vector_id = self.processed_count
+        self.processed_count += 1
+        
+        return {
+            'id': vector_id,
+            'vector': embedding,
+            'text': skill_text,
+            'metadata': {
+                "skill_id": skill.skill_id,
+                "name": skill.name,
+                "category": skill.category,
+                "description": skill.description,
+                "tags": skill.tags,
+                "version": skill.version,
+                "text": skill_text
+            }
+        }
+    
     def _get_embedding(self, text: str) -> List[float]:
         """Get embedding for text using the centralized LLM engine
         
@@ -182,7 +211,7 @@ class SkillVectorizer:
             text: Text to embed
             
         Returns:
-            List[float]: Vector embedding
+            List[float]: Vector embedding, None if the embedding model is unavailable
         """
         # Use the centralized LLM engine to generate embeddings
         embedding = self.llm_engine.generate_embedding(text)
@@ -0,0 +1,197 @@
+"""
+Dependency-aware stage executor for the Text2SQL pipeline.
+Runs independent pipeline stages concurrently on a shared, bounded thread pool
+and lets the caller join on individual stage results where they are needed.
+Each pipeline only keeps a bounded slice of its stages in the pool, so one
+request cannot queue its stages ahead of every other request's.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from config.config import SQL_PIPELINE_MAX_WORKERS, SQL_PIPELINE_STAGES_PER_REQUEST
+
+logger = logging.getLogger('text2sql.stage_executor')
+
+# Shared pool for all pipelines in this process
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_stage_pool() -> ThreadPoolExecutor:
+    """Get the shared bounded thread pool used for pipeline stages
+
+    Returns:
+        ThreadPoolExecutor: The process-wide stage pool
+    """
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                logger.info(f"Creating pipeline stage pool with {SQL_PIPELINE_MAX_WORKERS} workers")
+                _executor = ThreadPoolExecutor(
+                    max_workers=SQL_PIPELINE_MAX_WORKERS,
+                    thread_name_prefix='sql-stage'
+                )
+    return _executor
+
+
+class StageExecutor:
+    """Schedules named stages once all of their dependencies have completed.
+
+    Each stage function receives the results of its dependencies as keyword
+    arguments named after the dependency stages. Stages are never submitted to
+    the pool before their dependencies finish, so a bounded pool cannot deadlock
+    on stages waiting for each other. At most max_parallel stages of one
+    executor are in the pool at a time; further ready stages wait in the
+    executor until one of its own stages finishes.
+    """
+
+    def __init__(self, executor: Optional[ThreadPoolExecutor] = None, log_prefix: str = "PIPELINE",
+                 max_parallel: int = SQL_PIPELINE_STAGES_PER_REQUEST):
+        """Initialize the stage executor
+
+        Args:
+            executor (ThreadPoolExecutor, optional): Pool to run stages on, defaults to the shared stage pool
+            log_prefix (str, optional): Prefix for logging to identify the pipeline
+            max_parallel (int, optional): Maximum stages of this executor submitted to the pool at once
+        """
+        self.executor = executor or get_stage_pool()
+        self.log_prefix = log_prefix
+        self.max_parallel = max(1, max_parallel)
+        self.futures: Dict[str, Future] = {}
+        self.timings: Dict[str, float] = {}
+        self._ready = deque()
+        self._in_pool = 0
+        self._dispatch_lock = threading.Lock()
+
+    def _dispatch(self, run_stage: Callable[[], None], stage_future: Future):
+        """Submit a ready stage to the pool, or queue it until this executor has a free slot
+
+        Args:
+            run_stage (callable): Stage runner to submit
+            stage_future (Future): Future of the stage, cancelled if the pool is shutting down
+        """
+        with self._dispatch_lock:
+            if self._in_pool >= self.max_parallel:
+                self._ready.append((run_stage, stage_future))
+                return
+            self._in_pool += 1
+        self._submit(run_stage, stage_future)
+
+    def _submit(self, run_stage: Callable[[], None], stage_future: Future):
+        """Submit a stage holding one of this executor's slots, handing the slot on when it finishes"""
+        def run_and_release():
+            try:
+                run_stage()
+            finally:
+                with self._dispatch_lock:
+                    next_stage = self._ready.popleft() if self._ready else None
+                    if next_stage is None:
+                        self._in_pool -= 1
+                if next_stage is not None:
+                    self._submit(*next_stage)
+
+        try:
+            self.executor.submit(run_and_release)
+        except RuntimeError:
+            # Pool is shutting down with the process
+            with self._dispatch_lock:
+                self._in_pool -= 1
+                queued = list(self._ready)
+                self._ready.clear()
+            for _, future in [(run_stage, stage_future)] + queued:
+                future.cancel()
+
+    def add(self, name: str, func: Callable[..., Any], depends_on: Iterable[str] = ()) -> Future:
+        """Register a stage and schedule it as soon as its dependencies are done
+
+        Args:
+            name (str): Unique stage name, also used as keyword for dependents
+            func (callable): Stage function, called with dependency results as keyword arguments
+            depends_on (iterable, optional): Names of previously added stages this stage needs
+
+        Returns:
+            Future: Future resolving to the stage result
+        """
+        if name in self.futures:
+            raise ValueError(f"Stage '{name}' is already registered")
+
+        dependencies = list(depends_on)
+        missing = [dep for dep in dependencies if dep not in self.futures]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stage(s): {', '.join(missing)}")
+
+        stage_future = Future()
+        self.futures[name] = stage_future
+        # Stages see the context variables of the code that registered them
+        context = contextvars.copy_context()
+
+        def run_stage():
+            # A cancelled dependency cancels every stage downstream of it
+            if any(self.futures[dep].cancelled() for dep in dependencies):
+                stage_future.cancel()
+                return
+            if not stage_future.set_running_or_notify_cancel():
+                return
+            kwargs = {}
+            for dep in dependencies:
+                dep_future = self.futures[dep]
+                if dep_future.exception() is not None:
+                    stage_future.set_exception(dep_future.exception())
+                    return
+                kwargs[dep] = dep_future.result()
+
+            start_time = time.time()
+            try:
+                result = context.run(func, **kwargs)
+            except BaseException as e:
+                self.timings[name] = time.time() - start_time
+                logger.error(f"[{self.log_prefix}] Stage '{name}' failed after {self.timings[name]:.2f}s: {str(e)}")
+                stage_future.set_exception(e)
+            else:
+                self.timings[name] = time.time() - start_time
+                logger.info(f"[{self.log_prefix}] Stage '{name}' completed in {self.timings[name]:.2f}s")
+                stage_future.set_result(result)
+
+        if not dependencies:
+            self._dispatch(run_stage, stage_future)
+            return stage_future
+
+        pending = {'count': len(dependencies)}
+        pending_lock = threading.Lock()
+
+        def on_dependency_done(_):
+            with pending_lock:
+                pending['count'] -= 1
+                ready = pending['count'] == 0
+            if ready:
+                self._dispatch(run_stage, stage_future)
+
+        for dep in dependencies:
+            self.futures[dep].add_done_callback(on_dependency_done)
+
+        return stage_future
+
+    def result(self, name: str, timeout: Optional[float] = None) -> Any:
+        """Wait for a stage and return its result
+
+        Args:
+            name (str): Name of the stage
+            timeout (float, optional): Maximum number of seconds to wait
+
+        Returns:
+            Any: The stage result; re-raises the stage exception if it failed
+        """
+        return self.futures[name].result(timeout=timeout)
+
+    def cancel_pending(self):
+        """Cancel stages that have not started yet"""
+        for future in self.futures.values():
+            future.cancel()
@@ -0,0 +1,181 @@
+"""
+Table-level vector index for the Text2SQL pipeline.
+Embeds each table's name, description and column names so the candidate
+tables for a question can be narrowed to a top-K shortlist before the LLM is asked.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger('text2sql.table_index')
+
+
+def table_document(table: Dict[str, Any]) -> str:
+    """Build the text that represents a table in the index
+
+    Args:
+        table (dict): Table dictionary from the schema
+
+    Returns:
+        str: Table name, description and column names as a single text
+    """
+    columns = ", ".join(col.get("name", "") for col in table.get("columns", []))
+    return f"{table.get('name', '')}: {table.get('description', '')}. Columns: {columns}"
+
+
+class TableIndex:
+    """Per-workspace in-memory index of table embeddings
+
+    The index is rebuilt lazily whenever the schema version changes. Rebuilds are
+    incremental: only tables whose name, description or columns changed are re-embedded.
+    """
+
+    def __init__(self, schema_manager, embed_texts: Callable[[List[str]], Optional[np.ndarray]]):
+        """Initialize the table index
+
+        Args:
+            schema_manager (SchemaManager): Source of table metadata and schema version
+            embed_texts (callable): Function embedding a list of texts into a 2D array, or None if unavailable
+        """
+        self.schema_manager = schema_manager
+        self.embed_texts = embed_texts
+        self._workspaces: Dict[Optional[str], Dict[str, Any]] = {}
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._pruned_version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, schema_version: Optional[str] = None):
+        """Mark all workspace indexes as stale so they are rebuilt on next use
+
+        Args:
+            schema_version (str, optional): New schema version (unused, accepted for listener compatibility)
+        """
+        with self._lock:
+            self._workspaces.clear()
+
+    def _build(self, workspace_name: Optional[str], schema_version: str) -> Optional[Dict[str, Any]]:
+        """(Re)build the index for a workspace, re-embedding only changed tables
+
+        The embedding call runs without holding the lock, so a rebuild does not
+        stall lookups and rebuilds of other workspaces.
+        """
+        start_time = time.time()
+        tables = self.schema_manager.get_tables(workspace_name)
+        names, hashes, documents = [], [], {}
+        for table in tables:
+            document = table_document(table)
+            digest = hashlib.sha1(document.encode('utf-8')).hexdigest()
+            names.append(table["name"])
+            hashes.append(digest)
+            documents[digest] = document
+
+        with self._lock:
+            vectors = {digest: self._vectors[digest] for digest in documents if digest in self._vectors}
+        missing_hashes = [digest for digest in documents if digest not in vectors]
+
+        if missing_hashes:
+            embedded = self.embed_texts([documents[digest] for digest in missing_hashes])
+            if embedded is None:
+                logger.warning("Embedding model not available, table index disabled")
+                return None
+            embedded = np.asarray(embedded, dtype=np.float32)
+            norms = np.linalg.norm(embedded, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            vectors.update(zip(missing_hashes, embedded / norms))
+
+        matrix = np.stack([vectors[digest] for digest in hashes]) if hashes else np.zeros((0, 0), dtype=np.float32)
+        centroid = None
+        if hashes:
+            centroid = matrix.mean(axis=0)
+            norm = np.linalg.norm(centroid)
+            centroid = centroid / norm if norm else None
+        index = {
+            'version': schema_version,
+            'names': names,
+            'hashes': set(hashes),
+            'matrix': matrix,
+            'centroid': centroid,
+            'new_vectors': {digest: vectors[digest] for digest in missing_hashes}
+        }
+        logger.info(f"Built table index for workspace '{workspace_name}' with {len(names)} tables "
+                    f"({len(missing_hashes)} embedded) in {time.time() - start_time:.2f}s")
+        return index
+
+    def _live_hashes(self) -> set:
+        """Get the hashes of all tables in the current schema, across every workspace"""
+        return {hashlib.sha1(table_document(table).encode('utf-8')).hexdigest()
+                for table in self.schema_manager.get_tables()}
+
+    def _get_index(self, workspace_name: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Get an up-to-date index for a workspace"""
+        schema_version = self.schema_manager.get_schema_version()
+        with self._lock:
+            index = self._workspaces.get(workspace_name)
+            if index is not None and index['version'] == schema_version:
+                return index
+            pruned_version = self._pruned_version
+
+        index = self._build(workspace_name, schema_version)
+        if index is None:
+            return None
+        live_hashes = self._live_hashes() if pruned_version != schema_version else None
+
+        with self._lock:
+            self._vectors.update(index.pop('new_vectors'))
+            current = self._workspaces.get(workspace_name)
+            if current is None or current['version'] != schema_version:
+                self._workspaces[workspace_name] = index
+
+            # Drop vectors of tables that no longer exist in any workspace of the current schema,
+            # once per schema version; vectors survive invalidate() so rebuilds stay incremental
+            if live_hashes is not None and self._pruned_version != schema_version:
+                for digest in [d for d in self._vectors if d not in live_hashes]:
+                    del self._vectors[digest]
+                self._pruned_version = schema_version
+            return self._workspaces[workspace_name]
+
+    def rank(self, query_vector: Sequence[float], workspace_name: Optional[str] = None,
+             top_k: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """Rank the tables of a workspace by similarity to a query embedding
+
+        Args:
+            query_vector (array-like): Embedding of the user question
+            workspace_name (str, optional): Workspace to rank tables from
+            top_k (int, optional): Maximum number of tables to return
+
+        Returns:
+            List[Dict] or None: Tables as {'name', 'score'} sorted by score, None if the index is unavailable
+        """
+        index = self._get_index(workspace_name)
+        if index is None or not index['names']:
+            return None
+
+        vector = np.asarray(query_vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return None
+        scores = index['matrix'] @ (vector / norm)
+
+        order = np.argsort(-scores)
+        if top_k:
+            order = order[:top_k]
+        return [{'name': index['names'][i], 'score': float(scores[i])} for i in order]
+
+    def centroid(self, workspace_name: Optional[str] = None) -> Optional[np.ndarray]:
+        """Get the normalized mean of a workspace's table embeddings
+
+        Args:
+            workspace_name (str, optional): Workspace to get the centroid of
+
+        Returns:
+            numpy.ndarray or None: Unit-length centroid, None if the index is unavailable or empty
+        """
+        index = self._get_index(workspace_name)
+        if index is None:
+            return None
+        return index['centroid']
@@ -1,15 +1,23 @@
 """
 Vector database client for Text2SQL application.
-Handles storage and retrieval of vector embeddings using ChromaDB REST API.
+Handles storage and retrieval of vector embeddings using ChromaDB, either through
+the ChromaDB service REST API or in-process for embedded:// URLs.
 """
 
 import logging
 from typing import List, Dict, Any, Optional
 from .vector_store_client import VectorStoreClient
-from config.config import CHROMADB_SERVICE_URL
+from .embedded_vector_store import EmbeddedVectorStoreClient, embedded_path, is_embedded_url
+from config.config import (
+    CHROMADB_SERVICE_URL, EMBEDDING_MODEL_VERSION, LEGACY_EMBEDDING_MODEL_VERSION, VECTOR_STORE_BATCH_SIZE,
+    VECTOR_WIRE_FORMAT, VECTOR_GZIP_MIN_BYTES
+)
 
 logger = logging.getLogger('text2sql.vector')
 
+# Collections the app writes with its own embedding model: feedback, knowledge, schema and skills
+APP_COLLECTIONS = ('query_embeddings', 'knowledge_chunks', 'schema_metadata', 'skills')
+
 class VectorStore:
     """Vector database client for storing and retrieving embeddings using ChromaDB REST API"""
     
@@ -17,11 +25,25 @@ class VectorStore:
         """Initialize the vector database client
         
         Args:
-            uri (str, optional): ChromaDB service URL, defaults to config setting
+            uri (str, optional): ChromaDB service URL, defaults to config setting;
+                embedded://<path> opens the ChromaDB data directory in-process instead
         """
         self.logger = logging.getLogger('text2sql.vector')
         service_url = uri or CHROMADB_SERVICE_URL
-        self.client = VectorStoreClient(service_url=service_url)
+        if is_embedded_url(service_url):
+            self.client = EmbeddedVectorStoreClient(
+                persist_directory=embedded_path(service_url),
+                batch_size=VECTOR_STORE_BATCH_SIZE,
+                embedding_model=EMBEDDING_MODEL_VERSION
+            )
+        else:
+            self.client = VectorStoreClient(
+                service_url=service_url,
+                batch_size=VECTOR_STORE_BATCH_SIZE,
+                binary_vectors=VECTOR_WIRE_FORMAT == 'binary',
+                gzip_min_bytes=VECTOR_GZIP_MIN_BYTES,
+                embedding_model=EMBEDDING_MODEL_VERSION
+            )
         # Default dimension for popular embedding models - can be overridden per collection
         self.default_vector_dim = 384
         
@@ -95,21 +117,70 @@ class VectorStore:
         """
         return self.client.insert_embedding(collection_name, feedback_id, vector, query_text, metadata)
     
+    def insert_embeddings(self, collection_name: str, items: List[Dict[str, Any]],
+                          batch_size: int = None) -> Dict[str, Any]:
+        """Insert many vector embeddings with one request per batch
+        
+        Args:
+            collection_name (str): Name of the collection to insert into
+            items (List[Dict]): Entries with 'id', 'text' and optional 'vector' and 'metadata'
+            batch_size (int, optional): Entries per request, defaults to VECTOR_STORE_BATCH_SIZE
+            
+        Returns:
+            Dict: 'success' (all written), 'count' (written) and 'failed' ([{'id', 'error'}])
+        """
+        return self.client.insert_embeddings(collection_name, items, batch_size)
+    
+    def upsert_embeddings(self, collection_name: str, items: List[Dict[str, Any]],
+                          batch_size: int = None) -> Dict[str, Any]:
+        """Insert or replace many vector embeddings with one request per batch
+        
+        Args:
+            collection_name (str): Name of the collection to write to
+            items (List[Dict]): Entries with 'id', 'text' and optional 'vector' and 'metadata'
+            batch_size (int, optional): Entries per request, defaults to VECTOR_STORE_BATCH_SIZE
+            
+        Returns:
+            Dict: 'success' (all written), 'count' (written) and 'failed' ([{'id', 'error'}])
+        """
+        return self.client.upsert_embeddings(collection_name, items, batch_size)
+    
+    def search_many(self, collection_name: str, vectors: List[List[float]], limit: int = 5,
+                    filter_expr: Optional[Dict[str, Any]] = None,
+                    include_embeddings: bool = False) -> List[List[Dict[str, Any]]]:
+        """Search for similar vectors for many query vectors with one request per batch
+        
+        Args:
+            collection_name (str): Name of the collection to search in
+            vectors (List[List[float]] or numpy.ndarray): Query vectors to search with
+            limit (int): Maximum number of results per query
+            filter_expr (Optional[Dict], optional): ChromaDB filter dictionary applied to every query
+            include_embeddings (bool, optional): Add each match's embedding as a NumPy array
+            
+        Returns:
+            List[List[Dict]]: Search results per query vector, in input order
+        """
+        return self.client.search_many(collection_name, vectors, limit, filter_expr,
+                                       include_embeddings=include_embeddings)
+    
     def search_similar(self, collection_name: str, vector: List[float], limit: int = 5, 
-                       filter_expr: Optional[Dict[str, Any]] = None, output_fields: List[str] = None) -> List[Dict[str, Any]]:
+                       filter_expr: Optional[Dict[str, Any]] = None, output_fields: List[str] = None,
+                       include_embeddings: bool = False) -> List[Dict[str, Any]]:
         """Search for similar vectors
         
         Args:
             collection_name (str): Name of the collection to search in
-            vector (List[float]): Query vector to search with
+            vector (List[float] or numpy.ndarray): Query vector to search with
             limit (int): Maximum number of results to return
             filter_expr (Optional[Dict], optional): ChromaDB filter dictionary
             output_fields (List[str], optional): Specific fields to return (kept for compatibility)
+            include_embeddings (bool, optional): Add each match's embedding as a NumPy array
             
         Returns:
             List[Dict]: List of search results with similarity scores
         """
-        return self.client.search_similar(collection_name, vector, limit, filter_expr, output_fields)
+        return self.client.search_similar(collection_name, vector, limit, filter_expr, output_fields,
+                                          include_embeddings=include_embeddings)
     
     def update_embedding(self, collection_name: str, feedback_id: int, vector: List[float], 
                         query_text: str, metadata: Dict[str, Any] = None) -> bool:
@@ -203,3 +274,39 @@ class VectorStore:
             Dict: Collection metadata
         """
         return self.client.get_collection_metadata(collection_name)
+
+    def tag_collection(self, collection_name: str, embedding_model: str = None) -> bool:
+        """Tag a collection created before tagging with the embedding model version of its vectors
+        
+        Args:
+            collection_name: Name of the collection
+            embedding_model: Version tag, defaults to EMBEDDING_MODEL_VERSION
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        return self.client.tag_collection(collection_name, embedding_model)
+
+    def tag_app_collections(self, embedding_model: str = LEGACY_EMBEDDING_MODEL_VERSION) -> List[str]:
+        """Tag the app's own collections that were written before tagging
+        
+        Untagged app collections holding vectors are tagged with the model the app
+        embedded them with, so they are not refused after an upgrade. Collections
+        whose tag still differs from EMBEDDING_MODEL_VERSION are reported; they
+        must be re-indexed.
+        
+        Args:
+            embedding_model: Version tag of the untagged vectors, defaults to LEGACY_EMBEDDING_MODEL_VERSION
+            
+        Returns:
+            List[str]: Collections holding vectors of another embedding model
+        """
+        mismatched = []
+        for collection_name in APP_COLLECTIONS:
+            tagged = self.client.tag_untagged_collection(collection_name, embedding_model)
+            if tagged is not None and tagged != EMBEDDING_MODEL_VERSION:
+                mismatched.append(collection_name)
+        if mismatched:
+            self.logger.error(f"Collections {', '.join(mismatched)} hold embeddings of another model than "
+                              f"{EMBEDDING_MODEL_VERSION} and are refused until they are re-indexed")
+        return mismatched
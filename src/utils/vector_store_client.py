@@ -9,22 +9,128 @@ import requests
 import json
 from typing import List, Dict, Any, Optional
 
+from src.utils.vector_codec import VECTOR_MEDIA_TYPE, decode_vectors, encode_body
+
 logger = logging.getLogger('text2sql.vector_client')
 
 class VectorStoreClient:
     """HTTP client for ChromaDB service that maintains compatibility with the original VectorStore interface"""
     
-    def __init__(self, service_url=None):
+    def __init__(self, service_url=None, batch_size=256, binary_vectors=True, gzip_min_bytes=65536,
+                 embedding_model=None):
         """Initialize the vector database HTTP client
         
         Args:
             service_url (str, optional): URL of the ChromaDB service, defaults to http://localhost:8001
+            batch_size (int, optional): Default number of vectors or queries per bulk request
+            binary_vectors (bool, optional): Send and accept embeddings as base64 float32 buffers
+            gzip_min_bytes (int, optional): Compress request bodies at least this large; 0 disables compression
+            embedding_model (str, optional): Version tag of the model that produced the vectors; the
+                service refuses vectors of another version than the one a collection holds
         """
         self.logger = logging.getLogger('text2sql.vector_client')
         self.service_url = service_url or "http://localhost:8001"
+        self.batch_size = batch_size
+        self.binary_vectors = binary_vectors
+        self.gzip_min_bytes = gzip_min_bytes
+        self.embedding_model = embedding_model
         self.client = None  # For compatibility with existing code
         self.session = requests.Session()
         self.session.headers.update({'Content-Type': 'application/json'})
+        if binary_vectors:
+            self.session.headers.update({'Accept': f"{VECTOR_MEDIA_TYPE}, application/json"})
+        
+    def _post(self, path: str, payload: Dict[str, Any]) -> requests.Response:
+        """POST a JSON body with embeddings in the negotiated wire format
+        
+        Args:
+            path (str): Service path starting with a slash
+            payload (Dict): Request body; embedding fields may hold lists or NumPy arrays
+            
+        Returns:
+            requests.Response: The service response
+        """
+        body, headers = encode_body(payload, binary=self.binary_vectors, gzip_min_bytes=self.gzip_min_bytes)
+        return self.session.post(f"{self.service_url}{path}", data=body, headers=headers)
+    
+    def _put(self, path: str, payload: Dict[str, Any]) -> requests.Response:
+        """PUT a JSON body with embeddings in the negotiated wire format
+        
+        Args:
+            path (str): Service path starting with a slash
+            payload (Dict): Request body; embedding fields may hold lists or NumPy arrays
+            
+        Returns:
+            requests.Response: The service response
+        """
+        body, headers = encode_body(payload, binary=self.binary_vectors, gzip_min_bytes=self.gzip_min_bytes)
+        return self.session.put(f"{self.service_url}{path}", data=body, headers=headers)
+    
+    @staticmethod
+    def _attach_embeddings(results: List[Dict[str, Any]], block: Any) -> List[Dict[str, Any]]:
+        """Add the returned embeddings of search matches to the formatted results
+        
+        Args:
+            results (List[Dict]): Formatted search results
+            block: Embeddings of the matches in either wire format, or None
+            
+        Returns:
+            List[Dict]: The results, each with an 'embedding' NumPy array if embeddings were returned
+        """
+        embeddings = decode_vectors(block)
+        if embeddings is not None:
+            for result, embedding in zip(results, embeddings):
+                result['embedding'] = embedding
+        return results
+    
+    @staticmethod
+    def _clean_metadata(metadata: Optional[Dict[str, Any]], query_text: str) -> Dict[str, Any]:
+        """Convert metadata values to types the service can store
+        
+        Args:
+            metadata (Dict, optional): Metadata to store with a vector
+            query_text (str): Text of the entry, stored as 'query_text'
+            
+        Returns:
+            Dict: Metadata with lists joined by commas and None values dropped
+        """
+        clean_metadata = {}
+        if not metadata:
+            return clean_metadata
+        for k, v in metadata.items():
+            if isinstance(v, list):
+                clean_metadata[k] = ','.join(str(x) for x in v)
+            elif v is not None:
+                clean_metadata[k] = str(v)
+        clean_metadata['query_text'] = query_text
+        return clean_metadata
+    
+    @staticmethod
+    def _format_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Format a search result of the service to match the original interface
+        
+        Args:
+            result (Dict): Result with 'id', 'document', 'metadata', 'similarity' and 'distance'
+            
+        Returns:
+            Dict: Flattened result with metadata fields at the top level
+        """
+        formatted_result = {
+            'id': result.get('id'),
+            'query_text': result.get('document', ''),
+            'text': result.get('document', ''),
+            'similarity': result.get('similarity', 0),
+            'distance': result.get('distance', 0)
+        }
+        
+        # Add metadata fields
+        metadata = result.get('metadata', {})
+        for key, value in metadata.items():
+            if isinstance(value, str) and ',' in value and key.endswith('_used'):
+                formatted_result[key] = value.split(',')
+            else:
+                formatted_result[key] = value
+        return formatted_result
         
     def connect(self) -> bool:
         """Test connection to ChromaDB service
@@ -122,9 +228,12 @@ class VectorStoreClient:
                 return True
             
             # Create the collection
+            metadata = {"created_by": "text2sql_app"}
+            if self.embedding_model:
+                metadata["embedding_model"] = self.embedding_model
             response = self.session.post(
                 f"{self.service_url}/collections/{collection_name}",
-                json={"metadata": {"created_by": "text2sql_app"}}
+                json={"metadata": metadata}
             )
             
             if response.status_code == 200:
@@ -137,6 +246,60 @@ class VectorStoreClient:
             self.logger.error(f"Error initializing collection {collection_name}: {str(e)}", exc_info=True)
             return False
     
+    def tag_collection(self, collection_name: str, embedding_model: str = None) -> bool:
+        """Tag a collection with the embedding model version of its vectors
+        
+        Operator step for collections created before tagging, once their vectors are
+        known to come from the given model or have been re-embedded with it.
+        
+        Args:
+            collection_name: Name of the collection
+            embedding_model: Version tag, defaults to this client's embedding model
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        embedding_model = embedding_model or self.embedding_model
+        if not embedding_model:
+            self.logger.error(f"No embedding model version to tag collection {collection_name} with")
+            return False
+        try:
+            response = self._put(f"/collections/{collection_name}/embedding_model",
+                                 {"embedding_model": embedding_model})
+            if response.status_code == 200:
+                self.logger.info(f"Tagged collection {collection_name} with {embedding_model}")
+                return True
+            self.logger.error(f"Failed to tag collection {collection_name}: {response.status_code} - {response.text}")
+            return False
+        except Exception as e:
+            self.logger.error(f"Error tagging collection {collection_name}: {str(e)}", exc_info=True)
+            return False
+    
+    def tag_untagged_collection(self, collection_name: str, embedding_model: str) -> Optional[str]:
+        """Tag a collection that holds vectors but no model tag, leaving other collections as they are
+        
+        Args:
+            collection_name: Name of the collection
+            embedding_model: Version tag the collection's vectors are known to have
+            
+        Returns:
+            str or None: The collection's tag afterwards, None if it is missing, empty and untagged, or on error
+        """
+        try:
+            response = self._put(f"/collections/{collection_name}/embedding_model",
+                                 {"embedding_model": embedding_model, "untagged_only": True})
+            if response.status_code == 200:
+                data = response.json()
+                if data.get('previous') is None and data.get('embedding_model'):
+                    self.logger.info(f"Tagged collection {collection_name} with {embedding_model}")
+                return data.get('embedding_model')
+            if response.status_code != 404:
+                self.logger.error(f"Failed to tag collection {collection_name}: {response.status_code} - {response.text}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Error tagging collection {collection_name}: {str(e)}", exc_info=True)
+            return None
+    
     def delete_collection(self, collection_name: str) -> bool:
         """Delete a collection
         
@@ -182,23 +345,14 @@ class VectorStoreClient:
             
             # Add metadata if provided
             if metadata:
-                clean_metadata = {}
-                for k, v in metadata.items():
-                    if isinstance(v, list):
-                        clean_metadata[k] = ','.join(str(x) for x in v)
-                    elif v is not None:
-                        clean_metadata[k] = str(v)
-                clean_metadata['query_text'] = query_text
-                doc_data["metadatas"] = [clean_metadata]
+                doc_data["metadatas"] = [self._clean_metadata(metadata, query_text)]
             
             # Add embedding if provided
-            if vector and len(vector) > 0:
+            if vector is not None and len(vector) > 0:
                 doc_data["embeddings"] = [vector]
+                doc_data["embedding_model"] = self.embedding_model
             
-            response = self.session.post(
-                f"{self.service_url}/collections/{collection_name}/documents",
-                json=doc_data
-            )
+            response = self._post(f"/collections/{collection_name}/documents", doc_data)
             
             if response.status_code == 200:
                 self.logger.info(f"Inserted embedding for feedback_id {feedback_id} into collection {collection_name}")
@@ -210,16 +364,150 @@ class VectorStoreClient:
             self.logger.error(f"Error inserting embedding into collection {collection_name}: {str(e)}", exc_info=True)
             return False
     
+    def _write_embeddings(self, collection_name: str, items: List[Dict[str, Any]], mode: str,
+                          batch_size: int = None) -> Dict[str, Any]:
+        """Write many embeddings through the batch endpoint, one request per chunk
+        
+        Args:
+            collection_name (str): Name of the collection to write to
+            items (List[Dict]): Entries with 'id', 'text' and optional 'vector' and 'metadata'
+            mode (str): 'add' or 'upsert'
+            batch_size (int, optional): Entries per request, defaults to the client's batch size
+            
+        Returns:
+            Dict: 'success' (all written), 'count' (written) and 'failed' ([{'id', 'error'}])
+        """
+        batch_size = batch_size or self.batch_size
+        written = 0
+        failed = []
+        
+        # The service needs embeddings for all documents of a request or for none
+        with_vectors = [item for item in items if item.get('vector') is not None and len(item['vector']) > 0]
+        without_vectors = [item for item in items if item.get('vector') is None or len(item['vector']) == 0]
+        
+        for group in (with_vectors, without_vectors):
+            for start in range(0, len(group), batch_size):
+                chunk = group[start:start + batch_size]
+                doc_data = {
+                    "documents": [item['text'] for item in chunk],
+                    "ids": [str(item['id']) for item in chunk],
+                    "mode": mode
+                }
+                if any(item.get('metadata') for item in chunk):
+                    doc_data["metadatas"] = [
+                        self._clean_metadata(item.get('metadata'), item['text']) for item in chunk
+                    ]
+                if group is with_vectors:
+                    doc_data["embeddings"] = [item['vector'] for item in chunk]
+                    doc_data["embedding_model"] = self.embedding_model
+                
+                try:
+                    response = self._post(f"/collections/{collection_name}/documents/batch", doc_data)
+                    data = response.json() if response.headers.get('Content-Type', '').startswith('application/json') else {}
+                    if response.status_code in (200, 207):
+                        written += data.get('count', 0)
+                        failed.extend(data.get('failed', []))
+                    else:
+                        error = data.get('error') or f"HTTP {response.status_code}"
+                        failed.extend(data.get('failed') or [{'id': id_, 'error': error} for id_ in doc_data['ids']])
+                except Exception as e:
+                    self.logger.error(f"Error writing embedding batch to collection {collection_name}: {str(e)}")
+                    failed.extend({'id': id_, 'error': str(e)} for id_ in doc_data['ids'])
+        
+        if failed:
+            self.logger.warning(f"Wrote {written}/{len(items)} embeddings to collection {collection_name}, {len(failed)} failed")
+        else:
+            self.logger.info(f"Wrote {written} embeddings to collection {collection_name} ({mode})")
+        return {'success': not failed, 'count': written, 'failed': failed}
+    
+    def insert_embeddings(self, collection_name: str, items: List[Dict[str, Any]],
+                          batch_size: int = None) -> Dict[str, Any]:
+        """Insert many vector embeddings with one request per batch
+        
+        Args:
+            collection_name (str): Name of the collection to insert into
+            items (List[Dict]): Entries with 'id', 'text' and optional 'vector' and 'metadata'
+            batch_size (int, optional): Entries per request, defaults to the client's batch size
+            
+        Returns:
+            Dict: 'success' (all written), 'count' (written) and 'failed' ([{'id', 'error'}])
+        """
+        return self._write_embeddings(collection_name, items, 'add', batch_size)
+    
+    def upsert_embeddings(self, collection_name: str, items: List[Dict[str, Any]],
+                          batch_size: int = None) -> Dict[str, Any]:
+        """Insert or replace many vector embeddings with one request per batch
+        
+        Args:
+            collection_name (str): Name of the collection to write to
+            items (List[Dict]): Entries with 'id', 'text' and optional 'vector' and 'metadata'
+            batch_size (int, optional): Entries per request, defaults to the client's batch size
+            
+        Returns:
+            Dict: 'success' (all written), 'count' (written) and 'failed' ([{'id', 'error'}])
+        """
+        return self._write_embeddings(collection_name, items, 'upsert', batch_size)
+    
+    def search_many(self, collection_name: str, vectors: List[List[float]], limit: int = 5,
+                    filter_expr: Optional[Dict[str, Any]] = None, batch_size: int = None,
+                    include_embeddings: bool = False) -> List[List[Dict[str, Any]]]:
+        """Search for similar vectors for many query vectors with one request per batch
+        
+        Args:
+            collection_name (str): Name of the collection to search in
+            vectors (List[List[float]] or numpy.ndarray): Query vectors to search with
+            limit (int): Maximum number of results per query
+            filter_expr (Dict[str, Any], optional): ChromaDB where clause applied to every query
+            batch_size (int, optional): Queries per request, defaults to the client's batch size
+            include_embeddings (bool, optional): Add each match's embedding as a NumPy array
+            
+        Returns:
+            List[List[Dict]]: Search results per query vector, in input order; empty for failed batches
+        """
+        batch_size = batch_size or self.batch_size
+        all_results = []
+        for start in range(0, len(vectors), batch_size):
+            chunk = vectors[start:start + batch_size]
+            chunk_results = [[] for _ in range(len(chunk))]
+            try:
+                search_data = {
+                    "query_embeddings": chunk,
+                    "n_results": limit,
+                    "embedding_model": self.embedding_model
+                }
+                if filter_expr:
+                    search_data["where"] = filter_expr
+                if include_embeddings:
+                    search_data["include_embeddings"] = True
+                
+                response = self._post(f"/collections/{collection_name}/search/batch", search_data)
+                
+                if response.status_code == 200:
+                    data = response.json()
+                    if data.get('success'):
+                        blocks = data.get('embeddings') or [None] * len(chunk)
+                        for i, results in enumerate(data.get('results', [])[:len(chunk)]):
+                            chunk_results[i] = self._attach_embeddings(
+                                [self._format_result(result) for result in results], blocks[i])
+                else:
+                    self.logger.error(f"Batch search failed in collection {collection_name}: {response.status_code}")
+            except Exception as e:
+                self.logger.error(f"Error batch searching collection {collection_name}: {str(e)}", exc_info=True)
+            all_results.extend(chunk_results)
+        return all_results
+    
     def search_similar(self, collection_name: str, vector: List[float], limit: int = 5, 
-                       filter_expr: Optional[Dict[str, Any]] = None, output_fields: List[str] = None) -> List[Dict[str, Any]]:
+                       filter_expr: Optional[Dict[str, Any]] = None, output_fields: List[str] = None,
+                       include_embeddings: bool = False) -> List[Dict[str, Any]]:
         """Search for similar vectors
         
         Args:
             collection_name (str): Name of the collection to search in
-            vector (List[float]): Query vector to search with
+            vector (List[float] or numpy.ndarray): Query vector to search with
             limit (int): Maximum number of results to return
             filter_expr (Dict[str, Any], optional): ChromaDB where clause for filtering
             output_fields (List[str], optional): Specific fields to return (kept for compatibility)
+            include_embeddings (bool, optional): Add each match's embedding as a NumPy array
             
         Returns:
             List[Dict]: List of search results with similarity scores
@@ -228,42 +516,24 @@ class VectorStoreClient:
             # Prepare search data
             search_data = {
                 "query_embeddings": [vector],
-                "n_results": limit
+                "n_results": limit,
+                "embedding_model": self.embedding_model
             }
             
             # Use filter expression directly as where clause
             if filter_expr:
                 search_data["where"] = filter_expr
+            if include_embeddings:
+                search_data["include_embeddings"] = True
             
-            response = self.session.post(
-                f"{self.service_url}/collections/{collection_name}/search",
-                json=search_data
-            )
+            response = self._post(f"/collections/{collection_name}/search", search_data)
             
             if response.status_code == 200:
                 data = response.json()
                 if data.get('success'):
-                    results = []
-                    for result in data.get('results', []):
-                        # Format result to match original interface
-                        formatted_result = {
-                            'id': result.get('id'),
-                            'query_text': result.get('document', ''),
-                            'text': result.get('document', ''),
-                            'similarity': result.get('similarity', 0),
-                            'distance': result.get('distance', 0)
-                        }
-                        
-                        # Add metadata fields
-                        metadata = result.get('metadata', {})
-                        for key, value in metadata.items():
-                            if isinstance(value, str) and ',' in value and key.endswith('_used'):
-                                formatted_result[key] = value.split(',')
-                            else:
-                                formatted_result[key] = value
-                        
-                        results.append(formatted_result)
-                    return results
+                    # Format results to match original interface
+                    results = [self._format_result(result) for result in data.get('results', [])]
+                    return self._attach_embeddings(results, data.get('embeddings'))
             return []
         except Exception as e:
             self.logger.error(f"Error searching similar vectors in collection {collection_name}: {str(e)}", exc_info=True)
@@ -290,22 +560,13 @@ class VectorStoreClient:
             }
             
             if metadata:
-                clean_metadata = {}
-                for k, v in metadata.items():
-                    if isinstance(v, list):
-                        clean_metadata[k] = ','.join(str(x) for x in v)
-                    elif v is not None:
-                        clean_metadata[k] = str(v)
-                clean_metadata['query_text'] = query_text
-                update_data["metadata"] = clean_metadata
-            
-            if vector and len(vector) > 0:
+                update_data["metadata"] = self._clean_metadata(metadata, query_text)
+            
+            if vector is not None and len(vector) > 0:
                 update_data["embedding"] = vector
+                update_data["embedding_model"] = self.embedding_model
             
-            response = self.session.put(
-                f"{self.service_url}/collections/{collection_name}/documents/{feedback_id}",
-                json=update_data
-            )
+            response = self._put(f"/collections/{collection_name}/documents/{feedback_id}", update_data)
             
             if response.status_code == 200:
                 self.logger.info(f"Updated embedding for feedback_id {feedback_id} in collection {collection_name}")
@@ -472,26 +733,7 @@ class VectorStoreClient:
             if response.status_code == 200:
                 data = response.json()
                 if data.get('success'):
-                    results = []
-                    for result in data.get('results', []):
-                        formatted_result = {
-                            'id': result.get('id'),
-                            'query_text': result.get('document', ''),
-                            'text': result.get('document', ''),
-                            'similarity': result.get('similarity', 0),
-                            'distance': result.get('distance', 0)
-                        }
-                        
-                        # Add metadata fields
-                        metadata = result.get('metadata', {})
-                        for key, value in metadata.items():
-                            if isinstance(value, str) and ',' in value and key.endswith('_used'):
-                                formatted_result[key] = value.split(',')
-                            else:
-                                formatted_result[key] = value
-                        
-                        results.append(formatted_result)
-                    return results
+                    return [self._format_result(result) for result in data.get('results', [])]
             return []
         except Exception as e:
             self.logger.error(f"Error searching by text in collection {collection_name}: {str(e)}", exc_info=True)
@@ -0,0 +1,75 @@
+"""
+Workspace-level vector index for the Text2SQL pipeline.
+Scores each workspace against a question by combining the similarity to the
+centroid of its table embeddings with the similarity of its best matching
+table, so the workspace can be routed without listing every table to the LLM.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.utils.table_index import TableIndex
+
+logger = logging.getLogger('text2sql.workspace_index')
+
+
+class WorkspaceIndex:
+    """Ranks workspaces by embedding similarity to a question
+
+    Table embeddings and centroids come from a TableIndex, which is usually
+    shared with the table agent, so they are computed once per schema version
+    and rebuilt incrementally by whoever owns the index.
+    """
+
+    def __init__(self, table_index: TableIndex, centroid_weight: float = 0.5, top_tables: int = 3):
+        """Initialize the workspace index
+
+        Args:
+            table_index (TableIndex): Index of the table embeddings of every workspace
+            centroid_weight (float, optional): Weight of the centroid score; the rest goes to the best table score
+            top_tables (int, optional): Number of best matching tables reported per workspace
+        """
+        self.table_index = table_index
+        self.centroid_weight = centroid_weight
+        self.top_tables = top_tables
+
+    def rank(self, query_vector: Sequence[float], workspace_names: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """Rank workspaces by similarity to a query embedding
+
+        Args:
+            query_vector (array-like): Embedding of the user question
+            workspace_names (list): Names of the candidate workspaces
+
+        Returns:
+            List[Dict] or None: Workspaces as {'name', 'score', 'centroid_score', 'tables'} sorted by
+                                score, where 'tables' holds the best matching tables; None if unavailable
+        """
+        vector = np.asarray(query_vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return None
+        vector = vector / norm
+
+        ranking = []
+        for workspace_name in workspace_names:
+            tables = self.table_index.rank(vector, workspace_name, top_k=self.top_tables)
+            if tables is None:
+                # Either the model is unavailable or the workspace has no tables
+                ranking.append({'name': workspace_name, 'score': 0.0, 'centroid_score': 0.0, 'tables': []})
+                continue
+
+            centroid_score = float(self.table_index.centroid(workspace_name) @ vector)
+            score = self.centroid_weight * centroid_score + (1 - self.centroid_weight) * tables[0]['score']
+            ranking.append({
+                'name': workspace_name,
+                'score': float(score),
+                'centroid_score': centroid_score,
+                'tables': tables
+            })
+
+        if not any(workspace['tables'] for workspace in ranking):
+            return None
+        ranking.sort(key=lambda workspace: workspace['score'], reverse=True)
+        return ranking
@@ -0,0 +1,31 @@
+#!/bin/bash
+
+# Shared Embedding Server Startup Script
+# Point the app and the ChromaDB service at it with
+# EMBEDDING_SERVICE_URL=http://localhost:8004
+
+# Get the script directory (this script is in the project root)
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+PROJECT_ROOT="$SCRIPT_DIR"
+
+# Configuration
+HOST="${EMBEDDING_SERVICE_HOST:-0.0.0.0}"
+PORT="${EMBEDDING_SERVICE_PORT:-8004}"
+
+# Python environment
+PYTHON_PATH="${PYTHON_PATH:-/home/vijay/anaconda3/bin/python}"
+
+# Set PYTHONPATH
+export PYTHONPATH="$PROJECT_ROOT:$PYTHONPATH"
+
+# Change to project directory
+cd "$PROJECT_ROOT"
+
+echo "Starting Embedding Server..."
+echo "Host: $HOST"
+echo "Port: $PORT"
+echo "Model: ${EMBEDDING_MODEL_NAME:-all-MiniLM-L12-v2}"
+echo "Python: $PYTHON_PATH"
+
+# Start the server
+"$PYTHON_PATH" -m src.services.embedding_server --host "$HOST" --port "$PORT"
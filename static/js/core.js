@@ -6,6 +6,7 @@
 const text2sql = {
     dataTable: null,
     progressInterval: null,
+    progressStream: null,
     selectedTables: [],
     workspaceSelect: null,
     queryInput: null,
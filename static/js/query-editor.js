@@ -200,6 +200,7 @@ function executeQuery(query) {
             hideStatus();
             if (response.status === 'success') {
                 displayResults(response);
+                renderTruncationNotice(response);
             } else {
                 showQueryError(response.error || 'Error executing query');
             }
@@ -299,6 +300,56 @@ function displayResults(response) {
     }
 }
 
+// Show load-more and download links when only the first page of a result was returned
+function renderTruncationNotice(response) {
+    const notice = $('#truncatedResultsNotice');
+    const loadMore = $('#loadMoreResultsBtn');
+    loadMore.off('click');
+    if (!response.truncated || !response.result_handle) {
+        notice.attr('style', 'display: none !important;');
+        return;
+    }
+    
+    const baseUrl = `/api/query/results/${encodeURIComponent(response.result_handle)}`;
+    $('#truncatedResultsText').text(`Showing the first ${response.results.length} rows of a larger result.`);
+    $('#downloadCsvBtn').attr('href', `${baseUrl}/download?format=csv`);
+    $('#downloadNdjsonBtn').attr('href', `${baseUrl}/download?format=ndjson`);
+    loadMore.prop('disabled', false);
+    notice.attr('style', '');
+    
+    loadMore.on('click', function() {
+        const table = $('#queryEditorResultsTable').DataTable();
+        const offset = table.rows().count();
+        loadMore.prop('disabled', true);
+        fetch(`${baseUrl}?offset=${offset}`)
+            .then(page => page.json())
+            .then(page => {
+                if (page.error) {
+                    throw new Error(page.error);
+                }
+                const rows = page.data.map(row => {
+                    const transformedRow = {};
+                    page.columns.forEach(column => {
+                        transformedRow[column] = row[column] !== null ? row[column] : 'NULL';
+                    });
+                    return transformedRow;
+                });
+                table.rows.add(rows).draw(false);
+                $('#truncatedResultsText').text(page.has_more
+                    ? `Showing the first ${offset + page.row_count} rows of a larger result.`
+                    : page.capped
+                        ? `Showing the first ${offset + page.row_count} rows, download the result for the rest.`
+                        : `Showing all ${offset + page.row_count} rows.`);
+                loadMore.prop('disabled', !page.has_more);
+            })
+            .catch(error => {
+                console.error('Error loading more results:', error);
+                $('#truncatedResultsText').text(`Could not load more rows: ${error.message}`);
+                loadMore.prop('disabled', false);
+            });
+    });
+}
+
 // Show status message
 function showStatus(message) {
     $('#queryStatusText').text(message);
@@ -39,11 +39,19 @@ const queryHandler = {
             return response.json();
         })
         .then(result => {
-            // Start polling for progress
             if (text2sql.progressInterval) {
                 clearInterval(text2sql.progressInterval);
             }
-            text2sql.progressInterval = setInterval(() => queryHandler.pollQueryProgress(result.query_id), 500);
+            if (text2sql.progressStream) {
+                text2sql.progressStream.close();
+            }
+            
+            // Receive progress as server-sent events, or poll where EventSource is unavailable
+            if (window.EventSource) {
+                queryHandler.streamQueryProgress(result.query_id);
+            } else {
+                text2sql.progressInterval = setInterval(() => queryHandler.pollQueryProgress(result.query_id), 500);
+            }
         })
         .catch(error => {
             uiUtils.showError(error.message);
@@ -76,6 +84,47 @@ const queryHandler = {
         progressStatus.textContent = stepMessages[step] || "Processing...";
     },
 
+    // Receive query progress pushed by the server
+    streamQueryProgress: function(queryId) {
+        const source = new EventSource(`/api/query/stream/${queryId}`);
+        const steps = [];
+        let finished = false;
+        text2sql.progressStream = source;
+        
+        source.addEventListener('step', event => {
+            const data = JSON.parse(event.data);
+            steps[data.index] = data.step;
+            queryHandler.updateProgress(steps.length - 1);
+            resultsDisplay.displaySteps(steps, steps.length - 1);
+        });
+        
+        source.addEventListener('result', event => {
+            finished = true;
+            source.close();
+            resultsDisplay.displayResults(JSON.parse(event.data));
+            document.querySelector('#queryProgress').classList.add('d-none');
+        });
+        
+        source.addEventListener('failed', event => {
+            finished = true;
+            source.close();
+            const error = JSON.parse(event.data).error || 'An error occurred while processing your query';
+            if (error.includes('timed out')) {
+                uiUtils.showTimeoutWarning(error);
+            } else {
+                uiUtils.showError(error);
+            }
+            document.querySelector('#queryProgress').classList.add('d-none');
+        });
+        
+        source.onerror = () => {
+            // The browser reconnects with Last-Event-ID on its own; fall back to polling if it gave up
+            if (!finished && source.readyState === EventSource.CLOSED) {
+                text2sql.progressInterval = setInterval(() => queryHandler.pollQueryProgress(queryId), 500);
+            }
+        };
+    },
+
     // Poll the server for query progress
     pollQueryProgress: function(queryId) {
         fetch(`/api/query/progress/${queryId}`)
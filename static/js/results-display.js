@@ -116,6 +116,48 @@ const resultsDisplay = {
         });
     },
     
+    // Show load-more and download links when only the first page of a result was returned
+    renderTruncationNotice: function(chartData) {
+        $('#resultsTruncatedNotice').remove();
+        if (!chartData || !chartData.truncated || !chartData.result_handle) {
+            return;
+        }
+        
+        const baseUrl = `/api/query/results/${encodeURIComponent(chartData.result_handle)}`;
+        const notice = $('<div id="resultsTruncatedNotice" class="alert alert-info d-flex align-items-center justify-content-between py-2">');
+        const message = $('<span>').text(`Showing the first ${chartData.data.length} rows of a larger result.`).appendTo(notice);
+        const actions = $('<span>').appendTo(notice);
+        const loadMore = $('<button type="button" class="btn btn-sm btn-outline-primary me-2">').text('Load more').appendTo(actions);
+        $('<a class="btn btn-sm btn-outline-secondary me-2">').attr('href', `${baseUrl}/download?format=csv`).text('Download CSV').appendTo(actions);
+        $('<a class="btn btn-sm btn-outline-secondary">').attr('href', `${baseUrl}/download?format=ndjson`).text('Download NDJSON').appendTo(actions);
+        
+        loadMore.on('click', function() {
+            const offset = text2sql.dataTable.rows().count();
+            loadMore.prop('disabled', true);
+            fetch(`${baseUrl}?offset=${offset}`)
+                .then(response => response.json())
+                .then(page => {
+                    if (page.error) {
+                        throw new Error(page.error);
+                    }
+                    text2sql.dataTable.rows.add(page.data).draw(false);
+                    message.text(page.has_more
+                        ? `Showing the first ${offset + page.row_count} rows of a larger result.`
+                        : page.capped
+                            ? `Showing the first ${offset + page.row_count} rows, download the result for the rest.`
+                            : `Showing all ${offset + page.row_count} rows.`);
+                    loadMore.prop('disabled', !page.has_more);
+                })
+                .catch(error => {
+                    console.error('Error loading more results:', error);
+                    message.text(`Could not load more rows: ${error.message}`);
+                    loadMore.prop('disabled', false);
+                });
+        });
+        
+        notice.insertBefore($('#resultsTable').closest('.dataTables_wrapper'));
+    },
+    
     // Clear all results from all tabs
     clearAllResults: function() {
         try {
@@ -152,6 +194,7 @@ const resultsDisplay = {
             
             // Reset DataTable with empty state
             this.initializeEmptyTable();
+            this.renderTruncationNotice(null);
         } catch (error) {
             console.error('Error clearing results:', error);
         }
@@ -231,8 +274,10 @@ const resultsDisplay = {
             const columns = result.chart_data.columns;
             const data = result.chart_data.data;
             this.initializeDataTable(columns, data);
+            this.renderTruncationNotice(result.chart_data);
         } else {
             this.initializeEmptyTable();
+            this.renderTruncationNotice(null);
         }
         
         // Display steps
@@ -73,6 +73,11 @@ $(document).ready(function() {
                     if (resultsLink) new bootstrap.Tab(resultsLink).show();
                     // Render table
                     resultsDisplay.initializeDataTable(response.columns, response.results);
+                    resultsDisplay.renderTruncationNotice({
+                        truncated: response.truncated,
+                        result_handle: response.result_handle,
+                        data: response.results
+                    });
                     // Save chart data for dashboard tab
                     text2sql.currentResult = text2sql.currentResult || {};
                     text2sql.currentResult.chart_data = {
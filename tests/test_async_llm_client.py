@@ -0,0 +1,153 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+from openai import APIStatusError
+
+from src.utils.async_llm_client import AsyncLLMClient, LLMCallMetrics, retry_delay
+
+
+def completion(content="ok"):
+    return {
+        "id": "c1", "object": "chat.completion", "created": 0, "model": "m",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+    }
+
+
+def make_client(handler, **kwargs):
+    return AsyncLLMClient(api_key="key", base_url="http://llm.test/v1", metrics=kwargs.pop("metrics", LLMCallMetrics()),
+                          transport=httpx.MockTransport(handler), **kwargs)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_rate_limited_requests_are_retried_after_retry_after():
+    responses = [httpx.Response(429, headers={"retry-after": "0"}, json={"error": "slow down"}),
+                 httpx.Response(503, headers={"retry-after-ms": "1"}, json={"error": "busy"}),
+                 httpx.Response(200, json=completion("done"))]
+
+    client = make_client(lambda request: responses.pop(0), max_retries=3)
+    response = run(client.chat_completion(call_site="TEST", model="m", messages=[{"role": "user", "content": "hi"}]))
+
+    assert response.choices[0].message.content == "done"
+    stats = client.metrics.stats()["TEST"]
+    assert stats["retries"] == 2
+    assert stats["prompt_tokens"] == 3
+    assert stats["completion_tokens"] == 2
+
+
+def test_client_errors_are_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={"error": "bad request"})
+
+    client = make_client(handler, max_retries=3)
+    with pytest.raises(APIStatusError):
+        run(client.chat_completion(call_site="TEST", model="m", messages=[]))
+    assert len(calls) == 1
+    assert client.metrics.stats()["TEST"]["errors"] == 1
+
+
+def test_concurrency_is_capped_per_model():
+    in_flight = []
+    peak = []
+
+    async def handler(request):
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.02)
+        in_flight.pop()
+        return httpx.Response(200, json=completion())
+
+    client = make_client(handler, max_concurrency=10, max_concurrency_per_model=2)
+
+    async def many():
+        await asyncio.gather(*[client.chat_completion(model="m", messages=[]) for _ in range(8)])
+
+    run(many())
+    assert max(peak) == 2
+
+
+def test_slow_requests_are_hedged():
+    metrics = LLMCallMetrics(min_samples=5)
+    for _ in range(10):
+        metrics.record("TEST", 0.01)
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(2)
+        return httpx.Response(200, json=completion(f"answer {len(calls)}"))
+
+    client = make_client(handler, metrics=metrics, hedge_percentile=95)
+
+    async def timed():
+        start = asyncio.get_running_loop().time()
+        response = await client.chat_completion(call_site="TEST", model="m", messages=[])
+        return response, asyncio.get_running_loop().time() - start
+
+    response, elapsed = run(timed())
+    assert response.choices[0].message.content == "answer 2"
+    assert elapsed < 1
+    stats = metrics.stats()["TEST"]
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
+
+
+def test_concurrency_is_capped_across_event_loops():
+    in_flight = []
+    peak = []
+
+    async def handler(request):
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.02)
+        in_flight.pop()
+        return httpx.Response(200, json=completion())
+
+    client = make_client(handler, max_concurrency=2, max_concurrency_per_model=10)
+
+    async def many():
+        await asyncio.gather(*[client.chat_completion(model="m", messages=[]) for _ in range(4)])
+
+    # Every request handler runs its own event loop, as the Flask routes do
+    threads = [threading.Thread(target=run, args=(many(),)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(peak) == 12
+    assert max(peak) == 2
+    client.close()
+
+
+def test_hedging_respects_the_per_model_cap():
+    metrics = LLMCallMetrics(min_samples=5)
+    for _ in range(10):
+        metrics.record("TEST", 0.01)
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json=completion())
+
+    client = make_client(handler, metrics=metrics, hedge_percentile=95, max_concurrency_per_model=1)
+    run(client.chat_completion(call_site="TEST", model="m", messages=[]))
+
+    assert len(calls) == 1
+    assert metrics.stats()["TEST"]["hedges"] == 0
+    client.close()
+
+
+def test_retry_delay_without_header_grows_exponentially_within_bounds():
+    error = Exception("connection reset")
+    assert 0 <= retry_delay(error, 0, base_delay=1, max_delay=30) <= 1
+    assert 0 <= retry_delay(error, 10, base_delay=1, max_delay=30) <= 30
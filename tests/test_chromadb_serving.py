@@ -0,0 +1,66 @@
+import importlib.util
+import os
+import threading
+import time
+
+_spec = importlib.util.spec_from_file_location(
+    'chromadb_serving', os.path.join(os.path.dirname(__file__), '..', 'chromadb_service', 'serving.py'))
+serving = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(serving)
+
+
+def test_admission_queue_rejects_when_full_and_admits_after_release():
+    queue = serving.AdmissionQueue('write', concurrency=1, max_waiting=1, timeout=5)
+    assert queue.acquire()
+
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(queue.acquire()))
+    waiter.start()
+    while queue.stats()['waiting'] < 1:
+        time.sleep(0.001)
+
+    assert queue.saturated()
+    assert not queue.acquire()
+
+    queue.release()
+    waiter.join(timeout=5)
+    assert admitted == [True]
+    assert queue.stats() == {'concurrency': 1, 'max_waiting': 1, 'active': 1, 'waiting': 0,
+                             'admitted': 2, 'rejected': 1}
+
+
+def test_admission_queue_times_out_waiting_requests():
+    queue = serving.AdmissionQueue('read', concurrency=1, max_waiting=4, timeout=0.01)
+    assert queue.acquire()
+    assert not queue.acquire()
+    assert queue.stats()['waiting'] == 0
+
+
+def test_latency_histograms_render_cumulative_buckets():
+    histograms = serving.LatencyHistograms(buckets=(0.1, 1.0))
+    histograms.observe('search_collection', 0.05, 200)
+    histograms.observe('search_collection', 0.5, 200)
+    histograms.observe('search_collection', 3.0, 503)
+
+    text = histograms.render()
+    assert 'chromadb_service_request_duration_seconds_bucket{endpoint="search_collection",le="0.1"} 1' in text
+    assert 'chromadb_service_request_duration_seconds_bucket{endpoint="search_collection",le="1.0"} 2' in text
+    assert 'chromadb_service_request_duration_seconds_bucket{endpoint="search_collection",le="+Inf"} 3' in text
+    assert 'chromadb_service_request_duration_seconds_count{endpoint="search_collection"} 3' in text
+    assert 'chromadb_service_requests_total{endpoint="search_collection",status="503"} 1' in text
+
+
+def test_collection_stats_cache_reloads_after_invalidation():
+    loads = []
+
+    def loader(name):
+        loads.append(name)
+        return {'name': name, 'count': len(loads)}
+
+    cache = serving.CollectionStatsCache(ttl=60)
+    assert cache.get('feedback', loader)['count'] == 1
+    assert cache.get('feedback', loader)['count'] == 1
+
+    cache.invalidate('feedback')
+    assert cache.get('feedback', loader)['count'] == 2
+    assert loads == ['feedback', 'feedback']
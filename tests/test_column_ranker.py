@@ -0,0 +1,87 @@
+import numpy as np
+
+from src.utils.column_ranker import ColumnRanker, join_key_columns, tokenize
+
+VOCABULARY = ["order", "date", "amount", "customer", "email", "status"]
+
+
+def embed(texts):
+    return np.array([[float(text.lower().count(term)) + 0.01 for term in VOCABULARY] for text in texts])
+
+
+def make_tables():
+    return [
+        {"name": "orders", "columns": [
+            {"name": "order_id", "is_primary_key": True},
+            {"name": "customer_id"},
+            {"name": "orderDate", "description": "Date the order was placed"},
+            {"name": "total_amount", "description": "Order amount"},
+            {"name": "status"},
+        ]},
+        {"name": "customers", "columns": [
+            {"name": "id", "is_primary_key": True},
+            {"name": "email", "description": "Customer email"},
+            {"name": "notes"},
+        ]},
+    ]
+
+
+def test_tokenize_splits_identifiers_and_plurals():
+    assert tokenize("orderDate") == ["order", "date"]
+    assert tokenize("Total amounts by STATUS") == ["total", "amount", "by", "status"]
+
+
+def test_join_key_columns_parses_conditions():
+    joins = [{"condition": "orders.customer_id = customers.id"}]
+    assert join_key_columns(joins) == {"orders": {"customer_id"}, "customers": {"id"}}
+
+
+def test_rank_puts_required_columns_first_then_best_match():
+    ranker = ColumnRanker(embed)
+    required = {"orders": {"customer_id"}}
+    ranking = ranker.rank("total amount per order date", make_tables(), required)
+
+    orders = ranking["orders"]
+    assert [c["name"] for c in orders[:2]] == ["order_id", "customer_id"]
+    assert all(c["required"] for c in orders[:2])
+    assert {c["name"] for c in orders[2:4]} == {"orderDate", "total_amount"}
+    assert orders[-1]["name"] == "status"
+    assert ranking["customers"][0]["name"] == "id"
+
+
+def test_column_embeddings_are_reused():
+    calls = []
+
+    def counting_embed(texts):
+        calls.append(len(texts))
+        return embed(texts)
+
+    ranker = ColumnRanker(counting_embed)
+    ranker.rank("order amount", make_tables())
+    ranker.rank("customer email", make_tables())
+    # One query embedding per call, the eight columns only once
+    assert calls == [1, 8, 1]
+
+
+def test_lexical_only_when_model_unavailable():
+    ranker = ColumnRanker(lambda texts: None)
+    ranking = ranker.rank("customer email", make_tables())
+    assert ranking["customers"][1] == {"name": "email", "score": 1.0, "required": False}
+
+
+def test_column_vector_cache_is_bounded_and_cleared_on_schema_change():
+    calls = []
+
+    def counting_embed(texts):
+        calls.append(list(texts))
+        return embed(texts)
+
+    ranker = ColumnRanker(counting_embed, max_vectors=4)
+    ranker.rank("order amount", make_tables())
+    assert len(ranker._vectors) == 4
+
+    calls.clear()
+    ranker.invalidate("v2")
+    assert not ranker._vectors
+    ranker.rank("order amount", make_tables()[1:])
+    assert calls[-1] == ["id: ", "email: Customer email", "note: "]
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from src.utils.completion_cache import CompletionCache, bypass_completion_cache, cache_bypassed, completion_key
+from src.utils.job_queue import JobQueue
+
+
+def make_cache(tmp_path, **ttls):
+    return CompletionCache(path=str(tmp_path / "completions.db"), ttls=ttls or {"TABLE": 60})
+
+
+def test_key_depends_on_every_request_parameter():
+    messages = [{"role": "user", "content": "pick tables"}]
+    key = completion_key("m", messages, None, 0.0, 100)
+    assert key == completion_key("m", [dict(messages[0])], None, 0.0, 100)
+    assert key != completion_key("other", messages, None, 0.0, 100)
+    assert key != completion_key("m", messages, None, 0.5, 100)
+    assert key != completion_key("m", messages, [{"type": "function"}], 0.0, 100)
+    assert key != completion_key("m", messages, None, 0.0, 200)
+
+
+def test_only_opted_in_call_sites_are_cached(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("TABLE", "k1", "orders")
+    cache.put("SQL_GEN", "k2", "SELECT 1")
+
+    assert cache.get("TABLE", "k1") == "orders"
+    assert cache.get("SQL_GEN", "k2") is None
+    stats = cache.stats()
+    assert stats["TABLE"]["hits"] == 1
+    assert stats["TABLE"]["entries"] == 1
+    assert "SQL_GEN" not in stats
+
+
+def test_entries_expire_after_call_site_ttl(tmp_path):
+    cache = make_cache(tmp_path, TABLE=1)
+    cache.put("TABLE", "k1", "orders")
+    cache._connection().execute("UPDATE completions SET created_at = ?", (time.time() - 5,))
+    assert cache.get("TABLE", "k1") is None
+
+
+def test_bypass_skips_the_cache_and_reaches_background_jobs(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("TABLE", "k1", "orders")
+    queue = JobQueue(num_workers=1, name="test-bypass")
+    seen = []
+    done = threading.Event()
+
+    def job():
+        seen.append(cache_bypassed())
+        done.set()
+
+    with bypass_completion_cache():
+        assert cache.get("TABLE", "k1") is None
+        queue.submit(job)
+    assert done.wait(5)
+    queue.shutdown()
+
+    assert seen == [True]
+    assert cache.get("TABLE", "k1") == "orders"
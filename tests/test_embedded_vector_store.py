@@ -0,0 +1,214 @@
+import fcntl
+
+import numpy as np
+import pytest
+
+from src.utils import embedded_vector_store
+from src.utils.embedded_vector_store import EmbeddedVectorStoreClient, embedded_path, is_embedded_url
+from src.utils import vector_store as vector_store_module
+from src.utils.vector_store import VectorStore
+from src.utils.vector_store_client import VectorStoreClient
+
+
+class FakeCollection:
+    """In-memory stand-in for a ChromaDB collection with exact L2 search"""
+
+    def __init__(self, fail_ids=(), metadata=None):
+        self.name = 'fake'
+        self.metadata = metadata
+        self.entries = {}
+        self.fail_ids = set(fail_ids)
+        self.calls = []
+
+    def _write(self, ids, documents, metadatas=None, embeddings=None, replace=False):
+        self.calls.append(len(ids))
+        if self.fail_ids & set(ids):
+            raise ValueError('write failed')
+        for i, id_ in enumerate(ids):
+            if id_ in self.entries and not replace:
+                raise ValueError(f'duplicate id {id_}')
+            self.entries[id_] = {
+                'document': documents[i],
+                'metadata': metadatas[i] if metadatas else None,
+                'embedding': np.asarray(embeddings[i], dtype=np.float32) if embeddings is not None else None
+            }
+
+    def add(self, **kwargs):
+        self._write(**kwargs)
+
+    def upsert(self, **kwargs):
+        self._write(replace=True, **kwargs)
+
+    def _matches(self, where):
+        return [id_ for id_, entry in self.entries.items()
+                if not where or all((entry['metadata'] or {}).get(k) == v for k, v in where.items())]
+
+    def get(self, where=None, limit=None, include=()):
+        ids = self._matches(where)[:limit]
+        return {
+            'ids': ids,
+            'documents': [self.entries[id_]['document'] for id_ in ids],
+            'metadatas': [self.entries[id_]['metadata'] for id_ in ids]
+        }
+
+    def delete(self, ids):
+        for id_ in ids:
+            self.entries.pop(id_, None)
+
+    def count(self):
+        return len(self.entries)
+
+    def modify(self, metadata):
+        self.metadata = metadata
+
+    def query(self, query_embeddings, n_results, include, where=None):
+        ids = self._matches(where)
+        results = {key: [] for key in ('ids', 'documents', 'metadatas', 'distances')}
+        results['embeddings'] = [] if 'embeddings' in include else None
+        for query in query_embeddings:
+            distances = sorted((float(np.sum((self.entries[id_]['embedding'] - query) ** 2)), id_) for id_ in ids)
+            top = distances[:n_results]
+            results['ids'].append([id_ for _, id_ in top])
+            results['documents'].append([self.entries[id_]['document'] for _, id_ in top])
+            results['metadatas'].append([self.entries[id_]['metadata'] for _, id_ in top])
+            results['distances'].append([distance for distance, _ in top])
+            if results['embeddings'] is not None:
+                results['embeddings'].append([self.entries[id_]['embedding'] for _, id_ in top])
+        return results
+
+
+class FakeChromaClient:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def create_collection(self, name, embedding_function=None, metadata=None):
+        self.collection.metadata = metadata
+        return self.collection
+
+    def get_collection(self, name, embedding_function=None):
+        return self.collection
+
+
+def make_client(batch_size=256, fail_ids=(), embedding_model=None, collection_metadata=None):
+    client = EmbeddedVectorStoreClient('./unused', batch_size=batch_size, embedding_model=embedding_model)
+    client.client = FakeChromaClient(FakeCollection(fail_ids, collection_metadata))
+    return client
+
+
+def test_embedded_url_selects_in_process_backend():
+    assert is_embedded_url('embedded://./chroma_data')
+    assert not is_embedded_url('http://localhost:8001')
+    assert embedded_path('embedded://./chroma_data') == './chroma_data'
+    assert embedded_path('embedded:///var/lib/chroma') == '/var/lib/chroma'
+    assert embedded_path('embedded://') == './chroma_data'
+
+    assert isinstance(VectorStore('embedded://./chroma_data').client, EmbeddedVectorStoreClient)
+    assert isinstance(VectorStore('http://localhost:8001').client, VectorStoreClient)
+
+
+def test_bulk_writes_are_chunked_and_report_failures():
+    client = make_client(batch_size=2, fail_ids={'3'})
+    items = [
+        {'id': i, 'text': f'q{i}', 'vector': np.full(3, i, dtype=np.float32), 'metadata': {'tables_used': ['a', 'b']}}
+        for i in range(5)
+    ]
+
+    result = client.insert_embeddings('feedback', items)
+
+    assert client.client.collection.calls == [2, 2, 1]
+    assert result['count'] == 3
+    assert [failure['id'] for failure in result['failed']] == ['2', '3']
+    assert client.client.collection.entries['0']['metadata'] == {'tables_used': 'a,b', 'query_text': 'q0'}
+
+
+def test_search_results_match_the_service_format():
+    client = make_client()
+    client.upsert_embeddings('feedback', [
+        {'id': i, 'text': f'q{i}', 'vector': np.eye(3, dtype=np.float32)[i], 'metadata': {'tables_used': ['t', 'u']}}
+        for i in range(3)
+    ])
+
+    results = client.search_similar('feedback', np.array([1, 0, 0], dtype=np.float32), limit=2,
+                                    include_embeddings=True)
+    assert [result['id'] for result in results] == ['0', '1']
+    assert results[0]['similarity'] == 1.0
+    assert results[0]['tables_used'] == ['t', 'u']
+    np.testing.assert_array_equal(results[0]['embedding'], [1, 0, 0])
+
+    many = client.search_many('feedback', np.eye(3, dtype=np.float32)[[2, 1]], limit=1, batch_size=1)
+    assert [[result['id'] for result in results] for results in many] == [['2'], ['1']]
+
+
+def test_delete_by_filter_removes_matching_entries():
+    client = make_client()
+    client.insert_embeddings('knowledge', [
+        {'id': f'doc{i}', 'text': 'chunk', 'metadata': {'document_id': str(i % 2)}} for i in range(4)
+    ])
+
+    assert client.delete_by_filter('knowledge', {'document_id': '1'})
+    assert sorted(entry['id'] for entry in client.query_by_filter('knowledge', {})) == ['doc0', 'doc2']
+    assert not client.delete_by_filter('knowledge', {'document_id': '1'})
+
+
+def test_collections_of_another_embedding_model_are_refused():
+    item = {'id': 1, 'text': 'q', 'vector': np.ones(3, dtype=np.float32)}
+
+    client = make_client(embedding_model='model-b', collection_metadata={'embedding_model': 'model-a'})
+    result = client.insert_embeddings('feedback', [item])
+    assert result['count'] == 0
+    assert "model-a" in result['failed'][0]['error']
+    assert client.search_similar('feedback', np.ones(3, dtype=np.float32)) == []
+
+    # Empty untagged collections take the tag of their first write
+    client = make_client(embedding_model='model-b', collection_metadata={'hnsw:space': 'l2'})
+    assert client.insert_embeddings('feedback', [item])['success']
+    assert client.client.collection.metadata == {'embedding_model': 'model-b'}
+    assert len(client.search_similar('feedback', np.ones(3, dtype=np.float32))) == 1
+
+
+def test_untagged_collections_with_vectors_are_refused_until_tagged():
+    item = {'id': 1, 'text': 'q', 'vector': np.ones(3, dtype=np.float32)}
+    client = make_client(embedding_model='model-b', collection_metadata={'hnsw:space': 'l2'})
+    client.client.collection.add(ids=['0'], documents=['old'], embeddings=[np.zeros(3)])
+
+    result = client.insert_embeddings('feedback', [item])
+    assert result['count'] == 0
+    assert "untagged" in result['failed'][0]['error']
+    assert client.search_similar('feedback', np.ones(3, dtype=np.float32)) == []
+    assert client.client.collection.metadata == {'hnsw:space': 'l2'}
+
+    assert client.tag_collection('feedback')
+    assert client.client.collection.metadata == {'embedding_model': 'model-b'}
+    assert client.insert_embeddings('feedback', [item])['success']
+    assert len(client.search_similar('feedback', np.ones(3, dtype=np.float32))) == 2
+
+
+def test_app_collections_written_before_tagging_are_tagged_at_startup(monkeypatch):
+    monkeypatch.setattr(vector_store_module, 'EMBEDDING_MODEL_VERSION', 'model-b')
+    store = VectorStore('embedded://./unused')
+    store.client = make_client(embedding_model='model-b', collection_metadata={'hnsw:space': 'l2'})
+    store.client.client.collection.add(ids=['0'], documents=['old'], embeddings=[np.zeros(3)])
+
+    assert store.tag_app_collections('model-b') == []
+    assert store.client.client.collection.metadata == {'embedding_model': 'model-b'}
+    assert len(store.client.search_similar('query_embeddings', np.zeros(3, dtype=np.float32))) == 1
+
+    # Tagged collections keep their tag and are reported when it differs
+    assert store.tag_app_collections('model-a') == []
+    assert store.client.client.collection.metadata == {'embedding_model': 'model-b'}
+    store.client.client.collection.metadata = {'embedding_model': 'model-a'}
+    assert 'query_embeddings' in store.tag_app_collections('model-b')
+
+    # Empty untagged collections are left for their first write to tag
+    store.client = make_client(embedding_model='model-b', collection_metadata={'hnsw:space': 'l2'})
+    assert store.tag_app_collections('model-a') == []
+    assert store.client.client.collection.metadata == {'hnsw:space': 'l2'}
+
+
+def test_data_directory_is_locked_against_other_processes(tmp_path):
+    with open(tmp_path / embedded_vector_store.LOCK_FILE_NAME, 'a') as held:
+        # Locks taken through another open file conflict like another process's
+        fcntl.flock(held, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        with pytest.raises(RuntimeError, match="another process"):
+            embedded_vector_store._lock_data_directory(str(tmp_path))
+    assert str(tmp_path) not in embedded_vector_store._lock_files
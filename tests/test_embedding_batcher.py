@@ -0,0 +1,85 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src.utils.embedding_batcher import EmbeddingMicroBatcher
+
+
+def encode_lengths(texts):
+    return np.array([[len(text), i] for i, text in enumerate(texts)], dtype=np.float32)
+
+
+def test_concurrent_submits_are_merged_into_batches():
+    batch_sizes = []
+
+    def encode(texts):
+        batch_sizes.append(len(texts))
+        return encode_lengths(texts)
+
+    batcher = EmbeddingMicroBatcher(encode, max_batch_size=32, max_wait_ms=50)
+    texts = ["x" * n for n in range(1, 17)]
+    results = {}
+    threads = [threading.Thread(target=lambda t=t: results.__setitem__(t, batcher.submit(t, timeout=5))) for t in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(batch_sizes) == len(texts)
+    assert len(batch_sizes) < len(texts)
+    for text in texts:
+        assert results[text][0] == len(text)
+    assert batcher.stats()["items"] == len(texts)
+
+
+def test_batch_size_is_capped():
+    batch_sizes = []
+
+    def encode(texts):
+        batch_sizes.append(len(texts))
+        return encode_lengths(texts)
+
+    batcher = EmbeddingMicroBatcher(encode, max_batch_size=4, max_wait_ms=50)
+    threads = [threading.Thread(target=batcher.submit, args=(f"text {i}", 5)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(batch_sizes) <= 4
+    assert sum(batch_sizes) == 10
+
+
+def test_encode_errors_are_raised_to_every_caller():
+    def encode(texts):
+        raise RuntimeError("model unavailable")
+
+    batcher = EmbeddingMicroBatcher(encode, max_batch_size=8, max_wait_ms=1)
+    with pytest.raises(RuntimeError):
+        batcher.submit("query", timeout=5)
+
+
+def test_text_lists_are_merged_and_split_back():
+    batch_sizes = []
+
+    def encode(texts):
+        batch_sizes.append(len(texts))
+        return encode_lengths(texts)
+
+    batcher = EmbeddingMicroBatcher(encode, max_batch_size=8, max_wait_ms=50)
+    requests = [["a" * (i + 1)] * 3 for i in range(4)]
+    results = [None] * len(requests)
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, batcher.submit_many(requests[i], timeout=5)))
+               for i in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(batch_sizes) <= 8
+    assert sum(batch_sizes) == 12
+    for texts, vectors in zip(requests, results):
+        assert vectors.shape == (3, 2)
+        assert list(vectors[:, 0]) == [len(texts[0])] * 3
+    assert batcher.submit_many(["x" * 20] * 10, timeout=5).shape == (10, 2)
@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+
+from src.utils.embedding_cache import EmbeddingCache, text_key
+
+
+def test_whitespace_variants_share_a_key():
+    assert text_key("m", "  total   sales\n") == text_key("m", "total sales")
+    assert text_key("m", "total sales") != text_key("other", "total sales")
+
+
+def test_memory_tier_hits_and_evicts_least_recently_used():
+    cache = EmbeddingCache(model_name="m", path=None, max_memory_entries=2)
+    cache.put_many(["a", "b"], np.eye(2, dtype=np.float32))
+    assert cache.get("a") is not None
+    cache.put("c", [1.0, 1.0])
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    stats = cache.stats()
+    assert stats["memory_hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["memory_evictions"] == 1
+    assert stats["memory_bytes"] == 2 * 2 * 4
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = EmbeddingCache(model_name="m", path=path, max_memory_entries=10, max_disk_entries=100)
+    first.put("question", [0.5, 0.25, 0.125])
+    first.flush()
+
+    second = EmbeddingCache(model_name="m", path=path, max_memory_entries=10, max_disk_entries=100)
+    vector = second.get("question")
+    assert np.allclose(vector, [0.5, 0.25, 0.125])
+    assert vector.dtype == np.float32
+    assert second.stats()["disk_hits"] == 1
+    assert second.stats()["disk_bytes"] == 12
+
+
+def test_model_change_invalidates_disk_tier(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = EmbeddingCache(model_name="m", path=path, max_disk_entries=100)
+    cache.put("question", [1.0])
+    cache.flush()
+
+    assert EmbeddingCache(model_name="m", model_revision="2", path=path, max_disk_entries=100).get("question") is None
+    assert EmbeddingCache(model_name="m", path=path, max_disk_entries=100).get("question") is None
+
+
+def test_disk_tier_prunes_oldest_entries(tmp_path):
+    cache = EmbeddingCache(model_name="m", path=str(tmp_path / "cache.db"), max_memory_entries=1, max_disk_entries=3)
+    for i in range(5):
+        cache.put(f"text {i}", [float(i)])
+        cache.flush()
+
+    stats = cache.stats()
+    assert stats["disk_entries"] == 3
+    assert stats["disk_evictions"] == 2
+    assert cache.get("text 4") is not None
+
+
+def test_disk_writes_are_buffered_and_flushed_in_batches(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = EmbeddingCache(model_name="m", path=path, max_memory_entries=1, max_disk_entries=100,
+                           flush_interval=60, flush_size=100)
+    cache.put_many(["a", "b", "c"], np.eye(3, dtype=np.float32))
+
+    # Nothing on disk yet, but vectors evicted from memory are served from the buffer
+    assert cache.stats()["disk_entries"] == 0
+    assert cache.stats()["pending_writes"] == 3
+    assert np.allclose(cache.get("a"), [1.0, 0.0, 0.0])
+
+    cache.flush()
+    assert cache.stats()["disk_entries"] == 3
+    assert cache.stats()["pending_writes"] == 0
+    assert EmbeddingCache(model_name="m", path=path, max_disk_entries=100).get("b") is not None
+
+
+def test_full_buffer_is_flushed_in_the_background(tmp_path):
+    cache = EmbeddingCache(model_name="m", path=str(tmp_path / "cache.db"), max_disk_entries=100,
+                           flush_interval=60, flush_size=2)
+    cache.put_many(["a", "b"], np.eye(2, dtype=np.float32))
+
+    deadline = time.time() + 5
+    while cache.stats()["disk_entries"] != 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.stats()["disk_entries"] == 2
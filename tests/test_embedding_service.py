@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from config.config import EMBEDDING_MODEL_VERSION
+from src.services import embedding_server
+from src.utils.embedding_batcher import EmbeddingMicroBatcher
+from src.utils.embedding_client import RemoteEmbeddingModel
+from src.utils.vector_codec import VECTOR_MEDIA_TYPE, decode_vectors
+
+
+class FakeModel:
+    inference_backend = 'torch'
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=None, convert_to_numpy=True):
+        self.calls.append(len(texts))
+        return np.array([[len(text), 1.0, 0.0] for text in texts], dtype=np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return 3
+
+
+@pytest.fixture
+def server(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(embedding_server, '_model', model)
+    monkeypatch.setattr(embedding_server, '_batcher', EmbeddingMicroBatcher(model.encode, max_batch_size=8, max_wait_ms=1))
+    return embedding_server.app.test_client()
+
+
+class FakeResponse:
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.text = response.get_data(as_text=True)
+        self._json = response.get_json()
+
+    def json(self):
+        return self._json
+
+    def raise_for_status(self):
+        assert self.status_code < 400
+
+
+class FlaskSession:
+    """requests.Session stand-in that forwards to the Flask test client"""
+
+    def __init__(self, client):
+        self.client = client
+        self.headers = {}
+        self.posted = []
+
+    def get(self, url, timeout=None):
+        return FakeResponse(self.client.get('/' + url.split('/', 3)[3], headers=self.headers))
+
+    def post(self, url, json, timeout=None):
+        self.posted.append(len(json['texts']))
+        return FakeResponse(self.client.post('/' + url.split('/', 3)[3], json=json, headers=self.headers))
+
+
+def test_embed_returns_vectors_in_the_negotiated_format(server):
+    response = server.post('/embed', json={'texts': ['a', 'abc']}, headers={'Accept': VECTOR_MEDIA_TYPE})
+    data = response.get_json()
+    assert data['version'] == EMBEDDING_MODEL_VERSION
+    np.testing.assert_array_equal(decode_vectors(data['embeddings'])[:, 0], [1, 3])
+
+    data = server.post('/embed', json={'texts': ['ab']}).get_json()
+    assert data['embeddings'] == [[2.0, 1.0, 0.0]]
+
+
+def test_embed_refuses_other_model_versions_and_bad_input(server):
+    assert server.post('/embed', json={'texts': ['a'], 'model_version': 'other-model'}).status_code == 409
+    assert server.post('/embed', json={'texts': 'a'}).status_code == 400
+
+
+def test_remote_model_encodes_like_a_sentence_transformer(server):
+    session = FlaskSession(server)
+    model = RemoteEmbeddingModel('http://embedder:8004', max_texts=2, session=session)
+
+    assert model.get_sentence_embedding_dimension() == 3
+    assert model.encode('abcd')[0] == 4
+    vectors = model.encode(['a', 'ab', 'abc'])
+    assert vectors.shape == (3, 3)
+    assert list(vectors[:, 0]) == [1, 2, 3]
+    assert session.posted == [1, 2, 1]
+
+
+def test_remote_model_refuses_a_server_with_another_version(server):
+    with pytest.raises(ValueError):
+        RemoteEmbeddingModel('http://embedder:8004', model_version='other-model', session=FlaskSession(server))
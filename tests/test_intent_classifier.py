@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+
+import numpy as np
+
+from src.utils.intent_classifier import IntentClassifier
+
+KEYWORDS = {
+    "data_retrieval": ["total", "sales", "orders", "count", "revenue"],
+    "schema_exploration": ["tables", "columns", "schema", "describe"],
+    "metadata_request": ["database", "overview", "size", "connected"],
+    "general_question": ["hello", "thanks", "help", "sql"],
+}
+VOCABULARY = [word for words in KEYWORDS.values() for word in words]
+
+
+def bag_of_words(texts):
+    rows = [[float(word in text.lower().split()) for word in VOCABULARY] + [0.1] for text in texts]
+    return np.array(rows)
+
+
+def write_examples(tmp_path):
+    examples = {
+        "data_retrieval": ["total sales", "count orders", "revenue by month"],
+        "schema_exploration": ["list tables", "show columns", "describe schema"],
+        "metadata_request": ["database size", "database overview", "which database connected"],
+        "general_question": ["hello", "thanks", "help me with sql"],
+    }
+    path = tmp_path / "examples.json"
+    path.write_text(json.dumps(examples))
+    return str(path)
+
+
+def test_classifies_queries_by_learned_intent(tmp_path):
+    classifier = IntentClassifier(bag_of_words, examples_path=write_examples(tmp_path))
+    classifier.train()
+
+    assert classifier.classify("show all tables and columns")["intent"] == "schema_exploration"
+    assert classifier.classify("hello there")["intent"] == "general_question"
+    prediction = classifier.classify("total revenue of orders")
+    assert prediction["intent"] == "data_retrieval"
+    assert prediction["confidence"] > 0.5
+
+
+def test_unknown_query_has_low_confidence(tmp_path):
+    classifier = IntentClassifier(bag_of_words, examples_path=write_examples(tmp_path))
+    classifier.train()
+    assert classifier.classify("something entirely different")["confidence"] < 0.5
+
+
+def test_feedback_questions_train_data_retrieval(tmp_path):
+    path = tmp_path / "examples.json"
+    path.write_text(json.dumps({"schema_exploration": ["list tables"], "general_question": ["hello"]}))
+    classifier = IntentClassifier(bag_of_words, examples_path=str(path),
+                                  feedback_loader=lambda limit: ["total sales", "count orders"])
+    classifier.train()
+
+    assert classifier.classify("total orders")["intent"] == "data_retrieval"
+    assert classifier.training_size == 4
+
+
+def test_no_model_without_examples(tmp_path):
+    classifier = IntentClassifier(bag_of_words, examples_path=str(tmp_path / "missing.json"))
+    assert classifier.classify("total sales") is None
+
+
+def test_no_model_without_embeddings(tmp_path):
+    classifier = IntentClassifier(lambda texts: None, examples_path=write_examples(tmp_path))
+    assert not classifier.train()
+    assert classifier.classify("total sales") is None
+    assert classifier.model is None
+
+
+def test_classify_does_not_wait_for_training(tmp_path):
+    release = threading.Event()
+
+    def slow_embed(texts):
+        release.wait(5)
+        return bag_of_words(texts)
+
+    classifier = IntentClassifier(slow_embed, examples_path=write_examples(tmp_path))
+    assert classifier.classify("list tables") is None
+    assert not classifier.start_training()
+
+    release.set()
+    deadline = time.time() + 5
+    while classifier.model is None and time.time() < deadline:
+        time.sleep(0.01)
+    assert classifier.classify("list tables")["intent"] == "schema_exploration"
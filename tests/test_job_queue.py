@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+from src.utils.job_queue import JobQueue, QueueFullError, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+
+
+def blocked_queue(**kwargs):
+    """Create a single-worker queue whose worker is held by a blocking job"""
+    release = threading.Event()
+    started = threading.Event()
+    queue = JobQueue(num_workers=1, **kwargs)
+    queue.submit(lambda: started.set() or release.wait(5), user_id="blocker")
+    assert started.wait(5)
+    return queue, release
+
+
+def test_rejects_when_full_with_retry_after():
+    queue, release = blocked_queue(max_queue_size=2, max_running_per_user=0)
+    try:
+        queue.submit(lambda: None)
+        queue.submit(lambda: None)
+        with pytest.raises(QueueFullError) as error:
+            queue.submit(lambda: None)
+        assert error.value.retry_after >= 1
+        assert queue.stats()["rejected"] == 1
+    finally:
+        release.set()
+        queue.shutdown(timeout=5)
+
+
+def test_interactive_runs_before_batch_and_users_take_turns():
+    queue, release = blocked_queue(max_queue_size=10, max_running_per_user=0)
+    order = []
+    try:
+        queue.submit(lambda: order.append("batch"), user_id="a", priority=PRIORITY_BATCH)
+        queue.submit(lambda: order.append("a1"), user_id="a", priority=PRIORITY_INTERACTIVE)
+        queue.submit(lambda: order.append("a2"), user_id="a", priority=PRIORITY_INTERACTIVE)
+        queue.submit(lambda: order.append("b1"), user_id="b", priority=PRIORITY_INTERACTIVE)
+    finally:
+        release.set()
+        queue.shutdown(timeout=5, drain=True)
+
+    assert order == ["a1", "b1", "a2", "batch"]
+
+
+def test_per_user_running_limit():
+    running = {"a": 0, "max": 0}
+    lock = threading.Lock()
+    barrier = threading.Event()
+
+    def job():
+        with lock:
+            running["a"] += 1
+            running["max"] = max(running["max"], running["a"])
+        barrier.wait(0.05)
+        with lock:
+            running["a"] -= 1
+
+    queue = JobQueue(num_workers=4, max_queue_size=10, max_running_per_user=1)
+    for _ in range(4):
+        queue.submit(job, user_id="a")
+    queue.shutdown(timeout=5, drain=True)
+
+    assert running["max"] == 1
+    assert queue.stats()["completed"] == 4
+
+
+def test_failed_jobs_are_counted():
+    queue = JobQueue(num_workers=1, max_queue_size=5)
+    queue.submit(lambda: 1 / 0)
+    queue.shutdown(timeout=5, drain=True)
+
+    assert queue.stats()["failed"] == 1
+
+
+def test_shutdown_cancels_queued_jobs_and_bounds_the_total_wait():
+    queue, release = blocked_queue(max_queue_size=10, max_running_per_user=0)
+    queue.submit(lambda: None, on_cancel=None)
+    ran, cancelled = [], []
+    queue.submit(lambda: ran.append(1), on_cancel=lambda: cancelled.append(1))
+
+    started = time.monotonic()
+    queue.shutdown(timeout=0.2)
+    assert time.monotonic() - started < 1
+    assert ran == [] and cancelled == [1]
+    assert queue.stats()["cancelled"] == 2
+    assert queue.stats()["queued"] == 0
+
+    release.set()
+    queue.shutdown(timeout=5)
+    assert ran == []
@@ -0,0 +1,47 @@
+import numpy as np
+
+from src.utils.model_backends import benchmark, embedding_parity, reranking_parity
+
+
+class FakeEncoder:
+    def __init__(self, noise=0.0):
+        self.noise = noise
+
+    def encode(self, texts, convert_to_numpy=True):
+        vectors = np.array([[len(text), text.count(" ") + 1, 1.0] for text in texts])
+        return vectors + self.noise
+
+
+class FakeReranker:
+    def __init__(self, scale=1.0):
+        self.scale = scale
+
+    def predict(self, pairs):
+        return np.array([len(query) - len(passage) for query, passage in pairs], dtype=np.float64) * self.scale
+
+
+def test_embedding_parity_of_identical_models_is_perfect():
+    parity = embedding_parity(FakeEncoder(), FakeEncoder())
+    assert parity["min_cosine"] > 0.9999
+
+
+def test_embedding_parity_detects_drift():
+    parity = embedding_parity(FakeEncoder(), FakeEncoder(noise=20.0))
+    assert parity["min_cosine"] < 0.99
+
+
+def test_reranking_parity_reports_rank_agreement():
+    pairs = [("a" * n, "bb") for n in range(1, 8)]
+    parity = reranking_parity(FakeReranker(), FakeReranker(scale=1.01), pairs)
+    assert parity["spearman"] == 1.0
+    assert 0 < parity["max_abs_diff"] < 0.1
+
+    reversed_parity = reranking_parity(FakeReranker(), FakeReranker(scale=-1.0), pairs)
+    assert reversed_parity["spearman"] == -1.0
+
+
+def test_benchmark_reports_per_item_latency():
+    calls = []
+    result = benchmark(lambda batch: calls.append(len(batch)), ["x"] * 4, repeats=3)
+    assert calls == [4, 4, 4, 4]
+    assert 0 <= result["p50_ms_per_item"] <= result["p95_ms_per_item"]
@@ -0,0 +1,54 @@
+import threading
+import time
+
+from src.utils.model_registry import ModelRegistry
+
+
+def test_concurrent_gets_load_model_once():
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    registry = ModelRegistry()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("model", load))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len({id(model) for model in results}) == 1
+    stats = registry.stats()["model"]
+    assert stats["status"] == "loaded"
+    assert stats["load_time"] >= 0.05
+
+
+def test_failed_load_is_retried_after_interval():
+    attempts = []
+
+    def load():
+        attempts.append(1)
+        raise RuntimeError("download failed")
+
+    registry = ModelRegistry(retry_interval=60)
+    assert registry.get("model", load) is None
+    assert registry.get("model", load) is None
+    assert len(attempts) == 1
+    assert registry.stats()["model"]["status"] == "failed"
+
+    registry.retry_interval = 0
+    assert registry.get("model", load) is None
+    assert len(attempts) == 2
+
+
+def test_preload_loads_registered_models():
+    registry = ModelRegistry()
+    registry.register("a", lambda: "model-a")
+    registry.preload().join(timeout=5)
+
+    assert registry.stats()["a"]["status"] == "loaded"
+    assert registry.get("a") == "model-a"
@@ -0,0 +1,118 @@
+import sqlite3
+
+import pytest
+
+from src.utils import query_results
+from src.utils.database import DatabaseManager
+from src.utils.query_results import ResultHandleStore, SPILL_CAPPED, SPILL_COMPLETE, get_result_store
+from src.utils.shared_store import MemoryStore
+
+
+@pytest.fixture(autouse=True)
+def result_store(tmp_path, monkeypatch):
+    store = ResultHandleStore(store=MemoryStore("result_handles"), spill_dir=str(tmp_path / "spill"))
+    monkeypatch.setattr(query_results, "_result_store", store)
+    return store
+
+
+@pytest.fixture()
+def db_manager(tmp_path):
+    path = tmp_path / "results.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE numbers (n INTEGER, label TEXT)")
+    conn.executemany("INSERT INTO numbers VALUES (?, ?)", [(i, f"row {i}") for i in range(250)])
+    conn.commit()
+    conn.close()
+    return DatabaseManager(f"sqlite:///{path}")
+
+
+def test_small_result_is_not_truncated(db_manager):
+    result = db_manager.execute_query("SELECT n FROM numbers WHERE n < 5", max_rows=10)
+
+    assert result["success"]
+    assert result["row_count"] == 5
+    assert not result["truncated"]
+    assert result["result_handle"] is None
+
+
+def test_row_cap_truncates_and_registers_handle(db_manager):
+    result = db_manager.execute_query("SELECT n, label FROM numbers ORDER BY n", max_rows=100)
+
+    assert result["success"]
+    assert result["row_count"] == 100
+    assert result["truncated"]
+    entry = get_result_store().get(result["result_handle"])
+    assert entry["sql"] == "SELECT n, label FROM numbers ORDER BY n"
+    assert entry["columns"] == ["n", "label"]
+
+
+def test_byte_cap_truncates(db_manager):
+    result = db_manager.execute_query("SELECT label FROM numbers", max_rows=1000, max_bytes=100)
+
+    assert result["truncated"]
+    assert 0 < result["row_count"] < 250
+
+
+def test_stream_query_iterates_all_rows(db_manager):
+    with db_manager.stream_query("SELECT n FROM numbers ORDER BY n") as (columns, rows):
+        values = [row[0] for row in rows]
+
+    assert columns == ["n"]
+    assert values == list(range(250))
+
+
+def test_sql_error_is_reported(db_manager):
+    result = db_manager.execute_query("SELECT * FROM missing_table")
+
+    assert not result["success"]
+    assert result["error"]
+
+
+def test_truncated_result_is_spilled_and_paged(db_manager, result_store):
+    result = db_manager.execute_query("SELECT n FROM numbers ORDER BY n", max_rows=100, result_owner=7)
+    handle = result["result_handle"]
+
+    rows, has_more, status = result_store.read_page(handle, 240, 20)
+    assert [row[0] for row in rows] == list(range(240, 250))
+    assert not has_more
+    assert status == SPILL_COMPLETE
+    assert [row[0] for row in result_store.iter_rows(handle)] == list(range(250))
+
+
+def test_spill_stops_at_the_row_cap(db_manager, result_store):
+    result_store.max_rows = 150
+    handle = db_manager.execute_query("SELECT n FROM numbers", max_rows=100)["result_handle"]
+
+    rows, has_more, status = result_store.read_page(handle, 100, 100)
+    assert len(rows) == 50
+    assert not has_more
+    assert status == SPILL_CAPPED
+
+
+def test_handles_are_only_returned_to_their_owner(db_manager, result_store):
+    handle = db_manager.execute_query("SELECT n FROM numbers", max_rows=100, result_owner=7)["result_handle"]
+
+    assert result_store.get_for_owner(handle, 7)["sql"] == "SELECT n FROM numbers"
+    assert result_store.get_for_owner(handle, 8) is None
+
+
+def test_spill_without_free_slot_keeps_only_the_first_page(db_manager, result_store):
+    result_store._spill_slots = query_results.threading.BoundedSemaphore(1)
+    result_store._spill_slots.acquire()
+    handle = db_manager.execute_query("SELECT n FROM numbers ORDER BY n", max_rows=100)["result_handle"]
+
+    rows, has_more, status = result_store.read_page(handle, 100, 100)
+    assert [row[0] for row in rows] == [100]
+    assert not has_more
+    assert status == SPILL_CAPPED
+
+
+def test_spill_stops_at_the_time_limit(db_manager, result_store):
+    result_store.timeout = 0
+    handle = db_manager.execute_query("SELECT n FROM numbers", max_rows=100)["result_handle"]
+
+    rows, has_more, status = result_store.read_page(handle, 0, 100)
+    assert rows == []
+    assert not has_more
+    assert status == SPILL_CAPPED
+    assert result_store._spill_slots.acquire(blocking=False)
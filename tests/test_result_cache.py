@@ -0,0 +1,138 @@
+import pandas as pd
+
+from src.utils.result_cache import ResultCache, cacheable_tables, extract_tables, is_read_only, normalize_sql
+from src.utils.shared_store import SQLiteStore
+
+
+def make_result(rows=3):
+    df = pd.DataFrame({"n": list(range(rows))})
+    return {"success": True, "data": df, "row_count": rows, "columns": ["n"], "execution_time": 0.5}
+
+
+def test_extract_tables_handles_joins_and_schemas():
+    sql = 'SELECT * FROM sales.orders o JOIN "customers" c ON o.cid = c.id'
+    assert extract_tables(sql) == {"orders", "customers"}
+    assert extract_tables("UPDATE orders SET total = 0") == {"orders"}
+    assert extract_tables("DELETE FROM Orders WHERE id = 1") == {"orders"}
+
+
+def test_extract_tables_handles_comma_joins_and_extract():
+    assert extract_tables("SELECT * FROM orders o, customers c WHERE o.cid = c.id") == {"orders", "customers"}
+    assert extract_tables("SELECT EXTRACT(YEAR FROM order_date) FROM orders") == {"orders"}
+    assert extract_tables("SELEC broken FROM") is None
+
+
+def test_read_only_detection():
+    assert is_read_only("WITH x AS (SELECT 1) SELECT * FROM x")
+    assert is_read_only("select updated_at from orders")
+    assert not is_read_only("DELETE FROM orders")
+    assert is_read_only("SHOW TABLES", "mysql")
+    assert is_read_only("SHOW TABLES", "postgres")
+    assert is_read_only("PRAGMA table_info(orders)", "sqlite")
+    assert is_read_only("DESCRIBE orders")
+    assert is_read_only("EXPLAIN SELECT * FROM orders", "sqlite")
+    assert is_read_only("EXPLAIN QUERY PLAN DELETE FROM orders", "sqlite")
+    assert not is_read_only("EXPLAIN ANALYZE DELETE FROM orders", "postgres")
+    assert cacheable_tables("SHOW TABLES", "mysql") is None
+
+
+def test_metadata_commands_do_not_invalidate():
+    cache = ResultCache(max_bytes=10 ** 6, ttl_seconds=60)
+    cache.put("db", None, "SELECT n FROM orders", make_result())
+
+    for sql, dialect in (("SHOW TABLES", "mysql"), ("SHOW TABLES", "postgres"),
+                         ("PRAGMA table_info(orders)", "sqlite"), ("DESCRIBE orders", None),
+                         ("EXPLAIN SELECT * FROM orders", "sqlite"), ("SET search_path = sales", "postgres"),
+                         ("SELEC broken FROM", None)):
+        cache.invalidate_statement(sql, dialect)
+        assert cache.get("db", None, "SELECT n FROM orders") is not None, sql
+
+    cache.invalidate_statement("EXPLAIN ANALYZE DELETE FROM orders", "postgres")
+    assert cache.get("db", None, "SELECT n FROM orders") is None
+
+    cache.put("db", None, "SELECT n FROM orders", make_result())
+    cache.invalidate_statement("CALL refresh_all()", "postgres")
+    assert cache.get("db", None, "SELECT n FROM orders") is None
+
+
+def test_hit_ignores_whitespace_and_records_saved_time():
+    cache = ResultCache(max_bytes=10 ** 6, ttl_seconds=60)
+    cache.put("db", "sales", "SELECT n FROM orders;", make_result())
+
+    hit = cache.get("db", "sales", "SELECT  n\nFROM orders")
+    assert hit["cached"] and hit["row_count"] == 3
+    assert cache.get("db", "sales", "SELECT n FROM customers") is None
+
+    stats = cache.stats()["workspaces"]["sales"]
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["saved_time"] == 0.5
+
+
+def test_table_invalidation_only_drops_dependent_results():
+    cache = ResultCache(max_bytes=10 ** 6, ttl_seconds=60)
+    cache.put("db", None, "SELECT n FROM orders", make_result())
+    cache.put("db", None, "SELECT n FROM customers", make_result())
+
+    cache.invalidate_tables(["ORDERS"])
+    assert cache.get("db", None, "SELECT n FROM orders") is None
+    assert cache.get("db", None, "SELECT n FROM customers") is not None
+
+    cache.set_data_version("customers", 7)
+    assert cache.get("db", None, "SELECT n FROM customers") is None
+
+
+def test_memory_budget_evicts_least_recently_used():
+    cache = ResultCache(max_bytes=10 ** 6, ttl_seconds=60)
+    cache.put("db", None, "SELECT n FROM a", make_result())
+    entry_size = cache.stats()["bytes"]
+    cache.max_bytes = entry_size * 2
+
+    cache.put("db", None, "SELECT n FROM b", make_result())
+    cache.get("db", None, "SELECT n FROM a")
+    cache.put("db", None, "SELECT n FROM c", make_result())
+
+    assert cache.get("db", None, "SELECT n FROM a") is not None
+    assert cache.get("db", None, "SELECT n FROM b") is None
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_write_statements_are_not_cached():
+    cache = ResultCache(max_bytes=10 ** 6, ttl_seconds=60)
+    assert not cache.put("db", None, "INSERT INTO orders VALUES (1)", make_result())
+    assert normalize_sql("SELECT 1 ;  ") == "SELECT 1"
+
+
+def test_nondeterministic_and_unparseable_sql_is_not_cached():
+    assert cacheable_tables("SELECT n FROM orders") == {"orders"}
+    for sql in ("SELECT now() FROM orders",
+                "SELECT n FROM orders WHERE created_at > CURRENT_DATE",
+                "SELECT n FROM orders ORDER BY random()",
+                "SELECT n FROM orders WHERE day = date('now')",
+                "SELEC n FROM orders"):
+        assert cacheable_tables(sql) is None, sql
+
+    cache = ResultCache(max_bytes=10 ** 6, ttl_seconds=60)
+    assert not cache.put("db", None, "SELECT n, now() FROM orders", make_result())
+
+
+def test_invalidation_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "store.db")
+    first = ResultCache(max_bytes=10 ** 6, ttl_seconds=60, versions_store=SQLiteStore("versions", path))
+    second = ResultCache(max_bytes=10 ** 6, ttl_seconds=60, versions_store=SQLiteStore("versions", path))
+    first.put("db", None, "SELECT n FROM orders", make_result())
+    first.put("db", None, "SELECT n FROM customers", make_result())
+
+    second.invalidate_statement("UPDATE orders SET n = 1")
+    assert first.get("db", None, "SELECT n FROM orders") is None
+    assert first.get("db", None, "SELECT n FROM customers") is not None
+
+    second.clear()
+    assert first.get("db", None, "SELECT n FROM customers") is None
+
+
+def test_write_during_execution_makes_result_stale():
+    cache = ResultCache(max_bytes=10 ** 6, ttl_seconds=60)
+    versions = cache.data_versions()
+    cache.invalidate_tables(["orders"])
+    cache.put("db", None, "SELECT n FROM orders", make_result(), data_versions=versions)
+    assert cache.get("db", None, "SELECT n FROM orders") is None
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from src.utils import schema_manager as schema_manager_module
+from src.utils.schema_manager import SchemaManager, register_schema_change_listener
+
+SCHEMA = {
+    "workspaces": [
+        {
+            "name": "Sales",
+            "description": "Sales data",
+            "tables": [
+                {"name": "customers", "columns": [
+                    {"name": "customer_id", "datatype": "INTEGER", "is_primary_key": True},
+                    {"name": "email", "datatype": "TEXT"},
+                ]},
+                {"name": "orders", "columns": [
+                    {"name": "order_id", "datatype": "INTEGER", "is_primary_key": True},
+                    {"name": "customer_id", "datatype": "INTEGER"},
+                ]},
+            ],
+        },
+        {
+            "name": "Catalog",
+            "tables": [{"name": "products", "columns": [{"name": "product_id", "datatype": "INTEGER"}]}],
+        },
+    ]
+}
+
+CONDITIONS = {
+    "joins": [
+        {"left_table": "orders", "right_table": "customers", "join_type": "INNER",
+         "condition": "orders.customer_id = customers.customer_id"},
+        {"left_table": "orders", "right_table": "products", "join_type": "LEFT",
+         "condition": "orders.product_id = products.product_id"},
+    ]
+}
+
+
+@pytest.fixture()
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(schema_manager_module, "SCHEMA_RELOAD_CHECK_INTERVAL", 0)
+    schema_path = tmp_path / "schema.json"
+    condition_path = tmp_path / "condition.json"
+    schema_path.write_text(json.dumps(SCHEMA))
+    condition_path.write_text(json.dumps(CONDITIONS))
+    return SchemaManager(str(schema_path), str(condition_path))
+
+
+def test_indexed_lookups(manager):
+    assert manager.get_table_by_name("orders", "Sales")["name"] == "orders"
+    assert manager.get_table_by_name("orders", "Catalog") is None
+    assert manager.get_table_by_name("products")["name"] == "products"
+    assert manager.get_column("customers", "email", "Sales")["datatype"] == "TEXT"
+    assert manager.get_primary_keys("customers", "Sales") == ["customer_id"]
+    assert manager.get_table_names() == ["customers", "orders", "products"]
+
+
+def test_join_lookups(manager):
+    joins = manager.get_join_conditions(["customers", "orders"])
+    assert [join["right_table"] for join in joins] == ["customers"]
+    assert len(manager.get_join_conditions(["orders", "customers", "products"])) == 2
+    assert manager.has_join_condition("customers", "orders")
+    assert manager.get_specific_join("products", "orders")["join_type"] == "LEFT"
+    assert manager.get_specific_join("customers", "products") is None
+
+
+def test_schema_data_is_an_editable_copy(manager):
+    data = manager.schema_data
+    data["workspaces"].append({"name": "Scratch", "tables": []})
+    assert manager.get_workspace_by_name("Scratch") is None
+
+    assert manager.save_schema(data)
+    assert manager.get_workspace_by_name("Scratch") is not None
+
+
+def test_reloads_when_file_changes_on_disk(manager, tmp_path):
+    versions = []
+    register_schema_change_listener(versions.append)
+    old_version = manager.get_schema_version()
+
+    changed = json.loads(json.dumps(CONDITIONS))
+    changed["joins"].pop()
+    (tmp_path / "condition.json").write_text(json.dumps(changed, indent=4))
+
+    assert manager.get_specific_join("orders", "products") is None
+    assert manager.get_schema_version() != old_version
+    assert versions and versions[-1] == manager.get_schema_version()
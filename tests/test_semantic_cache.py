@@ -0,0 +1,98 @@
+import numpy as np
+
+from src.utils.semantic_cache import SemanticQueryCache, extract_literals, normalize_question
+
+VOCABULARY = ["total", "sales", "by", "region", "count", "customers", "per", "country"]
+
+
+def bag_of_words(text):
+    words = text.split()
+    return np.array([float(words.count(term)) for term in VOCABULARY])
+
+
+def make_cache(**kwargs):
+    embedded = []
+
+    def embed(text):
+        embedded.append(text)
+        return bag_of_words(text)
+
+    cache = SemanticQueryCache(embed_func=embed, **kwargs)
+    return cache, embedded
+
+
+def test_normalize_question():
+    assert normalize_question("  Total   Sales by Region?? ") == "total sales by region"
+
+
+def test_exact_hit_skips_embedding():
+    cache, embedded = make_cache(threshold=0.9)
+    cache.store("Total sales by region", ("Default",), "v1", {"sql": "SELECT 1"})
+    embedded.clear()
+
+    hit = cache.lookup("total sales by region?", ("Default",), "v1")
+    assert hit["sql"] == "SELECT 1"
+    assert hit["similarity"] == 1.0
+    assert embedded == []
+
+
+def test_near_duplicate_hit_and_threshold_miss():
+    cache, _ = make_cache(threshold=0.7)
+    cache.store("total sales by region", ("Default",), "v1", {"sql": "SELECT region"})
+
+    assert cache.lookup("total sales per region", ("Default",), "v1")["sql"] == "SELECT region"
+    assert cache.lookup("count customers per country", ("Default",), "v1") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_scope_and_schema_version_isolation():
+    cache, _ = make_cache(threshold=0.5)
+    cache.store("total sales by region", ("Default",), "v1", {"sql": "SELECT 1"})
+
+    assert cache.lookup("total sales by region", ("Other",), "v1") is None
+    assert cache.lookup("total sales by region", ("Default",), "v2") is None
+
+
+def test_invalidate_keeps_only_current_version():
+    cache, _ = make_cache()
+    cache.store("total sales by region", ("Default",), "v1", {"sql": "SELECT 1"})
+    cache.store("count customers per country", ("Default",), "v2", {"sql": "SELECT 2"})
+
+    cache.invalidate("v2")
+    assert cache.stats()["entries"] == 1
+    assert cache.lookup("count customers per country", ("Default",), "v2")["sql"] == "SELECT 2"
+
+
+def test_lru_eviction():
+    cache, _ = make_cache(max_entries=2)
+    cache.store("total sales", ("Default",), "v1", {"sql": "a"})
+    cache.store("count customers", ("Default",), "v1", {"sql": "b"})
+    cache.lookup("total sales", ("Default",), "v1")
+    cache.store("sales per country", ("Default",), "v1", {"sql": "c"})
+
+    assert cache.lookup("total sales", ("Default",), "v1") is not None
+    assert cache.lookup("count customers", ("Default",), "v1") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_questions_with_different_literals_never_match():
+    cache, _ = make_cache(threshold=0.5)
+    cache.store("total sales by region for 2023", ("Default",), "v1", {"sql": "SELECT 2023"})
+    cache.store("top 5 customers per country", ("Default",), "v1", {"sql": "SELECT 5"})
+
+    assert cache.lookup("total sales per region for 2024", ("Default",), "v1") is None
+    assert cache.lookup("top 10 customers per country", ("Default",), "v1") is None
+    assert cache.lookup("total sales per region for 2023", ("Default",), "v1")["sql"] == "SELECT 2023"
+    assert extract_literals("Sales in 'North' since March 2024-01-31") == {"north", "since", "march", "2024-01-31"}
+
+
+def test_miss_then_store_embeds_once():
+    cache, embedded = make_cache(threshold=0.9)
+    cache.store("count customers", ("Default",), "v1", {"sql": "a"})
+    embedded.clear()
+
+    question = cache.question("total sales by region")
+    assert cache.lookup(question, ("Default",), "v1") is None
+    assert cache.store(question, ("Default",), "v1", {"sql": "b"})
+    assert embedded == ["total sales by region"]
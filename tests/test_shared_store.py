@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from src.utils.shared_store import MemoryStore, SQLiteStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStore("progress")
+    return SQLiteStore("progress", path=str(tmp_path / "shared.db"))
+
+
+def test_set_get_update_delete(store):
+    store.set("q1", {"status": "queued", "steps": []})
+    assert store.update("q1", status="processing")
+    assert store.get("q1")["status"] == "processing"
+
+    store.delete("q1")
+    assert store.get("q1") is None
+    assert not store.update("q1", status="completed")
+
+
+def test_returned_entries_are_independent_copies(store):
+    value = {"steps": [{"name": "parse"}]}
+    store.set("q1", value)
+    value["steps"].append({"name": "leaked"})
+
+    entry = store.get("q1")
+    entry["steps"][0]["name"] = "changed"
+    store.mutate("q1", lambda stored: None)["steps"].append({"name": "changed"})
+
+    assert store.get("q1") == {"steps": [{"name": "parse"}]}
+
+
+def test_concurrent_mutations_are_not_lost(store):
+    store.set("q1", {"current_step": 0, "steps": []})
+
+    def add_steps():
+        for i in range(20):
+            store.mutate("q1", lambda entry: (entry.update(current_step=entry["current_step"] + 1),
+                                              entry["steps"].append(i)))
+
+    threads = [threading.Thread(target=add_steps) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    entry = store.get("q1")
+    assert entry["current_step"] == 80
+    assert len(entry["steps"]) == 80
+
+
+def test_sweep_removes_only_stale_entries(store):
+    store.set("old", {"status": "error"})
+    time.sleep(0.05)
+    store.set("new", {"status": "processing"})
+
+    assert store.sweep(max_age=0.03) == 1
+    assert store.get("old") is None
+    assert store.get("new") is not None
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "shared.db")
+    writer = SQLiteStore("progress", path=path)
+    reader = SQLiteStore("progress", path=path)
+
+    writer.set("q1", {"status": "completed", "result": {"rows": [1, 2]}})
+    assert reader.get("q1") == {"status": "completed", "result": {"rows": [1, 2]}}
+
+
+def test_version_changes_on_every_write(store):
+    assert store.version("q1") is None
+    store.set("q1", {"steps": []})
+    first = store.version("q1")
+    store.update("q1", status="processing")
+    entry, version = store.get_versioned("q1")
+
+    assert version != first and version == store.version("q1")
+    assert entry == {"steps": [], "status": "processing"}
+    store.delete("q1")
+    assert store.get_versioned("q1") == (None, None)
+
+
+def test_wait_for_change_only_wakes_on_its_key(store):
+    store.set("q1", {"steps": []})
+    store.set("q2", {"steps": []})
+    seen = store.change_count("q1")
+
+    def write_later(key):
+        time.sleep(0.05)
+        store.update(key, status="processing")
+
+    writer = threading.Thread(target=write_later, args=("q2",))
+    writer.start()
+    start = time.time()
+    store.wait_for_change("q1", seen, timeout=0.3)
+    writer.join()
+    assert time.time() - start >= 0.25
+
+    writer = threading.Thread(target=write_later, args=("q1",))
+    writer.start()
+    start = time.time()
+    store.wait_for_change("q1", seen, timeout=2)
+    writer.join()
+    assert time.time() - start < 1
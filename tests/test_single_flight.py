@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.utils.single_flight import SingleFlight
+
+
+def run_concurrently(count, func):
+    results = [None] * count
+    errors = [None] * count
+
+    def worker(i):
+        try:
+            results[i] = func()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    flight = SingleFlight()
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        time.sleep(0.1)
+        return "answer"
+
+    results, errors = run_concurrently(5, lambda: flight.do("key", upstream))
+
+    assert results == ["answer"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"leaders": 1, "followers": 4, "in_flight": 0}
+
+
+def test_errors_reach_every_waiting_caller_and_are_not_remembered():
+    flight = SingleFlight()
+
+    def failing():
+        time.sleep(0.05)
+        raise RuntimeError("provider down")
+
+    results, errors = run_concurrently(3, lambda: flight.do("key", failing))
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert flight.do("key", lambda: "recovered") == "recovered"
+
+
+def test_async_callers_share_an_in_flight_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def many():
+        return await asyncio.gather(*[flight.ado("key", upstream) for _ in range(4)])
+
+    assert asyncio.run(many()) == ["answer"] * 4
+    assert len(calls) == 1
+
+
+def test_stream_is_fanned_out_to_late_subscribers():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def upstream():
+        calls.append(1)
+        yield "a"
+        release.wait(5)
+        yield "b"
+        yield "c"
+
+    first = flight.stream("key", upstream)
+    assert next(first) == "a"
+    second = flight.stream("key", upstream)
+    release.set()
+
+    assert list(first) == ["b", "c"]
+    assert list(second) == ["a", "b", "c"]
+    assert len(calls) == 1
+
+
+def test_stream_errors_are_raised_after_delivered_chunks():
+    flight = SingleFlight()
+
+    def upstream():
+        yield "partial"
+        raise RuntimeError("connection reset")
+
+    chunks = flight.stream("key", upstream)
+    assert next(chunks) == "partial"
+    with pytest.raises(RuntimeError):
+        next(chunks)
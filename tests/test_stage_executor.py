@@ -0,0 +1,93 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.utils.stage_executor import StageExecutor
+
+
+@pytest.fixture()
+def pool():
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        yield executor
+    finally:
+        executor.shutdown(wait=True)
+
+
+def test_dependencies_receive_results(pool):
+    stages = StageExecutor(executor=pool)
+    stages.add("a", lambda: 2)
+    stages.add("b", lambda: 3)
+    stages.add("c", lambda a, b: a * b, depends_on=["a", "b"])
+
+    assert stages.result("c", timeout=5) == 6
+
+
+def test_independent_stages_overlap(pool):
+    barrier = threading.Barrier(2, timeout=5)
+    stages = StageExecutor(executor=pool)
+    stages.add("left", lambda: barrier.wait() is not None)
+    stages.add("right", lambda: barrier.wait() is not None)
+
+    # Both stages can only pass the barrier if they run at the same time
+    assert stages.result("left", timeout=5)
+    assert stages.result("right", timeout=5)
+
+
+def test_dependency_chain_does_not_deadlock_small_pool():
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        stages = StageExecutor(executor=executor)
+        stages.add("first", lambda: time.sleep(0.01) or 1)
+        stages.add("second", lambda first: first + 1, depends_on=["first"])
+        stages.add("third", lambda second: second + 1, depends_on=["second"])
+
+        assert stages.result("third", timeout=5) == 3
+    finally:
+        executor.shutdown(wait=True)
+
+
+def test_failure_propagates_to_dependents(pool):
+    def fail():
+        raise RuntimeError("boom")
+
+    stages = StageExecutor(executor=pool)
+    stages.add("broken", fail)
+    stages.add("dependent", lambda broken: broken, depends_on=["broken"])
+
+    with pytest.raises(RuntimeError, match="boom"):
+        stages.result("dependent", timeout=5)
+
+
+def test_unknown_dependency_is_rejected(pool):
+    stages = StageExecutor(executor=pool)
+    with pytest.raises(ValueError):
+        stages.add("orphan", lambda missing: missing, depends_on=["missing"])
+
+
+def test_one_executor_only_holds_its_slice_of_the_pool():
+    executor = ThreadPoolExecutor(max_workers=4)
+    try:
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def stage():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+            return True
+
+        stages = StageExecutor(executor=executor, max_parallel=2)
+        for i in range(5):
+            stages.add(f"s{i}", stage)
+
+        assert all(stages.result(f"s{i}", timeout=5) for i in range(5))
+        assert max(peak) == 2
+    finally:
+        executor.shutdown(wait=True)
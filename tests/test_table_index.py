@@ -0,0 +1,94 @@
+import numpy as np
+
+from src.utils.table_index import TableIndex
+
+VOCABULARY = ["customers", "orders", "products", "email", "amount", "price"]
+
+
+def embed(texts):
+    return np.array([[float(text.lower().count(term)) + 0.01 for term in VOCABULARY] for text in texts])
+
+
+class FakeSchemaManager:
+    def __init__(self, tables):
+        self.tables = tables
+        self.version = 1
+
+    def get_tables(self, workspace_name=None):
+        return self.tables
+
+    def get_schema_version(self):
+        return str(self.version)
+
+
+def make_tables():
+    return [
+        {"name": "customers", "description": "Customer master", "columns": [{"name": "email"}]},
+        {"name": "orders", "description": "Customer orders", "columns": [{"name": "amount"}]},
+        {"name": "products", "description": "Product catalog", "columns": [{"name": "price"}]},
+    ]
+
+
+def test_rank_orders_tables_by_similarity():
+    index = TableIndex(FakeSchemaManager(make_tables()), embed)
+    ranking = index.rank(embed(["product price"])[0])
+
+    assert ranking[0]["name"] == "products"
+    assert [t["name"] for t in index.rank(embed(["order amount"])[0], top_k=1)] == ["orders"]
+
+
+def test_rebuild_only_embeds_changed_tables():
+    calls = []
+
+    def counting_embed(texts):
+        calls.append(len(texts))
+        return embed(texts)
+
+    schema = FakeSchemaManager(make_tables())
+    index = TableIndex(schema, counting_embed)
+    index.rank(embed(["customers"])[0])
+    assert calls == [3]
+
+    schema.tables[2]["description"] = "Products with list price"
+    schema.version = 2
+    index.rank(embed(["customers"])[0])
+    assert calls == [3, 1]
+
+    # Same version: no rebuild at all
+    index.rank(embed(["customers"])[0])
+    assert calls == [3, 1]
+
+
+def test_unavailable_model_disables_index():
+    index = TableIndex(FakeSchemaManager(make_tables()), lambda texts: None)
+    assert index.rank([1.0] * len(VOCABULARY)) is None
+
+
+class FakeWorkspaceSchemaManager(FakeSchemaManager):
+    def __init__(self, workspaces):
+        super().__init__([table for tables in workspaces.values() for table in tables])
+        self.workspaces = workspaces
+
+    def get_tables(self, workspace_name=None):
+        return self.workspaces[workspace_name] if workspace_name else self.tables
+
+
+def test_invalidate_keeps_vectors_of_every_workspace():
+    calls = []
+
+    def counting_embed(texts):
+        calls.append(len(texts))
+        return embed(texts)
+
+    tables = make_tables()
+    schema = FakeWorkspaceSchemaManager({"A": tables[:1], "B": tables[1:]})
+    index = TableIndex(schema, counting_embed)
+    index.rank(embed(["customers"])[0], "A")
+    index.rank(embed(["customers"])[0], "B")
+    assert calls == [1, 2]
+
+    schema.version = 2
+    index.invalidate()
+    index.rank(embed(["customers"])[0], "A")
+    index.rank(embed(["customers"])[0], "B")
+    assert calls == [1, 2]
@@ -0,0 +1,27 @@
+import json
+
+import numpy as np
+
+from src.utils.vector_codec import decode_vectors, encode_body, encode_vectors
+
+
+def test_round_trip_preserves_float32_values_and_shape():
+    vectors = np.random.default_rng(0).standard_normal((3, 384)).astype(np.float32)
+    decoded = decode_vectors(json.loads(json.dumps(encode_vectors(vectors))))
+
+    assert decoded.dtype == np.float32
+    assert decoded.shape == (3, 384)
+    assert np.array_equal(decoded, vectors)
+
+
+def test_binary_body_is_much_smaller_than_json_arrays():
+    vectors = np.random.default_rng(1).standard_normal((100, 384))
+    binary, _ = encode_body({"embeddings": vectors}, binary=True, gzip_min_bytes=0)
+    plain, _ = encode_body({"embeddings": vectors}, binary=False, gzip_min_bytes=0)
+
+    assert len(binary) * 3 < len(plain)
+
+
+def test_decode_accepts_plain_lists():
+    assert decode_vectors([[1, 2], [3, 4]]).tolist() == [[1.0, 2.0], [3.0, 4.0]]
+    assert decode_vectors(None) is None
@@ -0,0 +1,133 @@
+import gzip
+import json
+
+import numpy as np
+
+from src.utils.vector_codec import VECTOR_MEDIA_TYPE, decode_vectors
+from src.utils.vector_store_client import VectorStoreClient
+
+
+class FakeResponse:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.data = data
+        self.headers = {'Content-Type': 'application/json'}
+        self.text = str(data)
+
+    def json(self):
+        return self.data
+
+
+class FakeSession:
+    """Records posted batches and answers like the ChromaDB service"""
+
+    def __init__(self, fail_ids=()):
+        self.fail_ids = set(fail_ids)
+        self.requests = []
+
+    def post(self, url, data, headers):
+        if headers.get('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        body = json.loads(data)
+        if headers['Content-Type'] == VECTOR_MEDIA_TYPE:
+            for field in ('embeddings', 'query_embeddings'):
+                if field in body:
+                    body[field] = decode_vectors(body[field])
+        self.requests.append((url, body, headers))
+        return self.respond(url, body)
+
+    def respond(self, url, json):
+        if url.endswith('/documents/batch'):
+            failed = [{'id': id_, 'error': 'bad vector'} for id_ in json['ids'] if id_ in self.fail_ids]
+            count = len(json['ids']) - len(failed)
+            return FakeResponse(207 if failed else 200, {'success': not failed, 'count': count, 'failed': failed})
+        if url.endswith('/search/batch'):
+            results = [[{'id': str(i), 'document': f'doc {vector[0]}', 'similarity': 0.9,
+                         'metadata': {'tables_used': 'a,b'}}] for i, vector in enumerate(json['query_embeddings'])]
+            response = {'success': True, 'results': results}
+            if json.get('include_embeddings'):
+                response['embeddings'] = [[list(vector)] for vector in json['query_embeddings'].tolist()]
+            return FakeResponse(200, response)
+        raise AssertionError(url)
+
+
+def make_client(session, batch_size=2, **kwargs):
+    client = VectorStoreClient(service_url='http://vectors', batch_size=batch_size, **kwargs)
+    client.session = session
+    return client
+
+
+def make_items(count, with_vectors=True):
+    return [{'id': i, 'text': f'text {i}', 'vector': [float(i), 1.0] if with_vectors else None,
+             'metadata': {'tags': ['x', 'y']}} for i in range(count)]
+
+
+def test_insert_embeddings_sends_one_request_per_batch():
+    session = FakeSession()
+    result = make_client(session).insert_embeddings('docs', make_items(5))
+
+    assert result == {'success': True, 'count': 5, 'failed': []}
+    assert len(session.requests) == 3
+    url, body, headers = session.requests[0]
+    assert url == 'http://vectors/collections/docs/documents/batch'
+    assert headers['Content-Type'] == VECTOR_MEDIA_TYPE
+    assert body['mode'] == 'add'
+    assert body['ids'] == ['0', '1']
+    assert body['embeddings'].tolist() == [[0.0, 1.0], [1.0, 1.0]]
+    assert body['metadatas'][0] == {'tags': 'x,y', 'query_text': 'text 0'}
+
+
+def test_upsert_reports_partial_failures():
+    session = FakeSession(fail_ids={'3'})
+    result = make_client(session, batch_size=10).upsert_embeddings('docs', make_items(4))
+
+    assert session.requests[0][1]['mode'] == 'upsert'
+    assert result['success'] is False
+    assert result['count'] == 3
+    assert result['failed'] == [{'id': '3', 'error': 'bad vector'}]
+
+
+def test_items_without_vectors_are_sent_separately():
+    session = FakeSession()
+    items = make_items(2) + make_items(1, with_vectors=False)
+    make_client(session, batch_size=10).insert_embeddings('docs', items)
+
+    assert len(session.requests) == 2
+    assert 'embeddings' in session.requests[0][1]
+    assert 'embeddings' not in session.requests[1][1]
+
+
+def test_failed_request_marks_whole_batch_failed():
+    class BrokenSession(FakeSession):
+        def post(self, url, data, headers):
+            raise ConnectionError('service down')
+
+    result = make_client(BrokenSession(), batch_size=10).insert_embeddings('docs', make_items(2))
+    assert result['count'] == 0
+    assert [failure['id'] for failure in result['failed']] == ['0', '1']
+
+
+def test_search_many_returns_results_per_query_in_order():
+    session = FakeSession()
+    results = make_client(session).search_many('docs', [[1.0], [2.0], [3.0]], limit=1)
+
+    assert len(session.requests) == 2
+    assert [r[0]['text'] for r in results] == ['doc 1.0', 'doc 2.0', 'doc 3.0']
+    assert results[0][0]['tables_used'] == ['a', 'b']
+
+
+def test_search_many_decodes_returned_embeddings():
+    results = make_client(FakeSession()).search_many('docs', np.array([[1.0, 2.0]]), include_embeddings=True)
+    assert isinstance(results[0][0]['embedding'], np.ndarray)
+    assert results[0][0]['embedding'].tolist() == [1.0, 2.0]
+
+
+def test_json_wire_format_and_gzip_for_large_bodies():
+    session = FakeSession()
+    make_client(session, batch_size=10, binary_vectors=False, gzip_min_bytes=100).insert_embeddings(
+        'docs', make_items(5))
+
+    _, body, headers = session.requests[0]
+    assert headers['Content-Type'] == 'application/json'
+    assert headers['Content-Encoding'] == 'gzip'
+    assert body['embeddings'][1] == [1.0, 1.0]
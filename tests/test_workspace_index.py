@@ -0,0 +1,57 @@
+import numpy as np
+
+from src.utils.table_index import TableIndex
+from src.utils.workspace_index import WorkspaceIndex
+
+VOCABULARY = ["customers", "orders", "invoices", "employees", "salary", "payroll"]
+
+
+def embed(texts):
+    return np.array([[float(text.lower().count(term)) + 0.01 for term in VOCABULARY] for text in texts])
+
+
+class FakeSchemaManager:
+    def __init__(self, workspaces):
+        self.workspaces = workspaces
+
+    def get_tables(self, workspace_name=None):
+        return self.workspaces.get(workspace_name, [])
+
+    def get_schema_version(self):
+        return "1"
+
+
+def make_schema():
+    return FakeSchemaManager({
+        "sales": [
+            {"name": "customers", "description": "Customers", "columns": [{"name": "email"}]},
+            {"name": "orders", "description": "Customer orders", "columns": [{"name": "amount"}]},
+            {"name": "invoices", "description": "Invoices for orders", "columns": [{"name": "total"}]},
+        ],
+        "hr": [
+            {"name": "employees", "description": "Employees", "columns": [{"name": "name"}]},
+            {"name": "payroll", "description": "Employee salary payments", "columns": [{"name": "salary"}]},
+        ],
+        "empty": [],
+    })
+
+
+def test_rank_prefers_workspace_with_matching_tables():
+    index = WorkspaceIndex(TableIndex(make_schema(), embed), top_tables=2)
+    ranking = index.rank(embed(["total salary of employees"])[0], ["sales", "hr", "empty"])
+
+    assert [w["name"] for w in ranking] == ["hr", "sales", "empty"]
+    assert [t["name"] for t in ranking[0]["tables"]][0] in ("employees", "payroll")
+    assert len(ranking[1]["tables"]) == 2
+    assert ranking[2] == {"name": "empty", "score": 0.0, "centroid_score": 0.0, "tables": []}
+
+
+def test_score_blends_centroid_and_best_table():
+    index = WorkspaceIndex(TableIndex(make_schema(), embed), centroid_weight=1.0)
+    ranking = index.rank(embed(["orders"])[0], ["sales"])
+    assert ranking[0]["score"] == ranking[0]["centroid_score"]
+
+
+def test_unavailable_model_disables_ranking():
+    index = WorkspaceIndex(TableIndex(make_schema(), lambda texts: None))
+    assert index.rank([1.0] * len(VOCABULARY), ["sales", "hr"]) is None